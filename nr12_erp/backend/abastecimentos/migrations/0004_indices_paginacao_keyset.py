@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('abastecimentos', '0003_abastecimento_origem'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='abastecimento',
+            index=models.Index(fields=['data', 'id'], name='abastecimen_data_222ab6_idx'),
+        ),
+    ]
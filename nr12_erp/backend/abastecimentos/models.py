@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 
 class Abastecimento(models.Model):
     TIPO_COMBUSTIVEL_CHOICES = [
@@ -101,6 +101,7 @@ class Abastecimento(models.Model):
         indexes = [
             models.Index(fields=["equipamento", "-data"]),
             models.Index(fields=["data"]),
+            models.Index(fields=["data", "id"]),  # paginação keyset
         ]
 
     def __str__(self):
@@ -114,51 +115,15 @@ class Abastecimento(models.Model):
         # Se origem é almoxarifado e tem produto, buscar preços do estoque
         if self.origem == 'ALMOXARIFADO' and self.produto and self.local_estoque:
             from almoxarifado.models import Estoque
-            try:
-                estoque = Estoque.objects.get(
-                    produto=self.produto,
-                    local=self.local_estoque
-                )
+            if Estoque.objects.filter(produto=self.produto, local=self.local_estoque).exists():
                 # Buscar preço do produto (assumindo que existe um campo preco_venda)
                 # Se não informou valor_total, calcular baseado no preço do produto
                 if not self.valor_total and hasattr(self.produto, 'preco_venda'):
                     self.valor_total = self.quantidade_litros * self.produto.preco_venda
                     self.valor_unitario = self.produto.preco_venda
-            except Estoque.DoesNotExist:
-                pass
 
-        is_new = self.pk is None
-        super().save(*args, **kwargs)
-
-        # Dar baixa automática no estoque se origem for almoxarifado
-        if self.origem == 'ALMOXARIFADO' and self.produto and self.local_estoque and is_new:
-            from almoxarifado.models import MovimentoEstoque, Estoque
-            from django.db import transaction
-
-            with transaction.atomic():
-                # Criar movimento de saída
-                MovimentoEstoque.objects.create(
-                    produto=self.produto,
-                    local=self.local_estoque,
-                    tipo='SAIDA',
-                    quantidade=self.quantidade_litros,
-                    documento=f"ABAST-{self.id}",
-                    observacao=f"Abastecimento equipamento {self.equipamento.codigo}",
-                    abastecimento=self
-                )
-
-                # Atualizar saldo do estoque
-                try:
-                    estoque = Estoque.objects.get(
-                        produto=self.produto,
-                        local=self.local_estoque
-                    )
-                    estoque.saldo -= self.quantidade_litros
-                    estoque.save()
-                except Estoque.DoesNotExist:
-                    # Se não existe estoque, criar com saldo negativo (indicando falta)
-                    Estoque.objects.create(
-                        produto=self.produto,
-                        local=self.local_estoque,
-                        saldo=-self.quantidade_litros
-                    )
+        # A saída de estoque (produto + local) é lançada pelo signal post_save
+        # (abastecimentos.signals); atômico para que um saldo insuficiente
+        # desfaça também o abastecimento
+        with transaction.atomic():
+            super().save(*args, **kwargs)
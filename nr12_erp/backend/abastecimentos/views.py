@@ -1,12 +1,32 @@
 from rest_framework import viewsets, filters, status
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.core.exceptions import ValidationError
 from .models import Abastecimento
 from .serializers import AbastecimentoSerializer
 from django_filters.rest_framework import DjangoFilterBackend
+from core.exportacao import exportar_queryset, filtrar_periodo
 from core.permissions import HasModuleAccess, OperadorCanOnlyCreate, filter_by_role
 
+COLUNAS_EXPORTACAO = [
+    ("Data", "data"),
+    ("Equipamento", "equipamento__codigo"),
+    ("Descrição do equipamento", "equipamento__descricao"),
+    ("Cliente", "equipamento__cliente__nome_razao"),
+    ("Empreendimento", "equipamento__empreendimento__nome"),
+    ("Horímetro/KM", "horimetro_km"),
+    ("Combustível", "tipo_combustivel"),
+    ("Litros", "quantidade_litros"),
+    ("Valor unitário", "valor_unitario"),
+    ("Valor total", "valor_total"),
+    ("Origem", "origem"),
+    ("Local", "local"),
+    ("Operador", "operador__nome_completo"),
+    ("Nota", "numero_nota"),
+    ("Observações", "observacoes"),
+]
+
 class AbastecimentoViewSet(viewsets.ModelViewSet):
     """
     ViewSet para Abastecimentos com filtro seguro por role.
@@ -24,6 +44,18 @@ class AbastecimentoViewSet(viewsets.ModelViewSet):
     search_fields = ["equipamento__codigo", "equipamento__descricao", "local", "numero_nota"]
     ordering_fields = ["data", "horimetro_km", "valor_total"]
     ordering = ["-data", "-horimetro_km"]
+    paginacao_keyset = "data"  # ?paginacao=keyset (core/pagination.py)
+
+    @action(detail=False, methods=["get"])
+    def exportar(self, request):
+        """
+        Exporta os abastecimentos filtrados em CSV/XLSX (streaming).
+
+        Query params: os mesmos da listagem, data_inicio/data_fim (YYYY-MM-DD)
+        e formato=csv|xlsx (padrão csv).
+        """
+        qs = filtrar_periodo(self.filter_queryset(self.get_queryset()), request, "data")
+        return exportar_queryset(request, qs, COLUNAS_EXPORTACAO, "abastecimentos")
 
     def create(self, request, *args, **kwargs):
         """
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import UnidadeMedida, CategoriaProduto, Produto, LocalEstoque, Estoque, MovimentoEstoque
+from .models import (UnidadeMedida, CategoriaProduto, Produto, LocalEstoque, Estoque, MovimentoEstoque,
+                     FechamentoEstoque)
 
 @admin.register(UnidadeMedida)
 class UnidadeMedidaAdmin(admin.ModelAdmin):
@@ -92,3 +93,10 @@ class MovimentoEstoqueAdmin(admin.ModelAdmin):
         if not change:  # Apenas na criação
             obj.criado_por = request.user
         super().save_model(request, obj, form, change)
+
+@admin.register(FechamentoEstoque)
+class FechamentoEstoqueAdmin(admin.ModelAdmin):
+    list_display = ('data_hora', 'criado_em')
+    ordering = ('-data_hora',)
+    readonly_fields = ('data_hora', 'criado_em')
+    date_hierarchy = 'data_hora'
@@ -0,0 +1,235 @@
+"""
+Saldos históricos do estoque sem reprocessar todos os movimentos.
+
+saldos_em(momento) parte do FechamentoEstoque mais recente com data_hora <=
+momento (gerado diariamente por `python manage.py fechar_estoque`) e soma só
+os movimentos posteriores a ele, agrupados no banco (um SUM por
+produto/local). curva_estoque() monta a série diária de um produto a partir
+do saldo de abertura e de um GROUP BY por dia.
+
+AJUSTE define o saldo (a quantidade é o novo saldo): o último ajuste de cada
+produto/local no período substitui o saldo acumulado até ele. Ajustes são
+raros, então são lidos à parte.
+
+Remover um movimento anterior a um fechamento corrige só o saldo do
+produto/local dele nos fechamentos seguintes, até o próximo AJUSTE desse
+produto/local (corrigir_fechamentos, signal em almoxarifado.signals).
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Q, Sum, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import FechamentoEstoque, MovimentoEstoque, SaldoFechamento
+
+ZERO = Decimal('0')
+# Entradas somam, saídas subtraem (ajustes tratados à parte)
+VARIACAO = Sum(
+    Case(
+        When(tipo='ENTRADA', then=F('quantidade')),
+        When(tipo='SAIDA', then=-F('quantidade')),
+        default=ZERO,
+        output_field=DecimalField(max_digits=14, decimal_places=3),
+    )
+)
+
+
+def _filtros(produto=None, local=None):
+    filtros = {}
+    if produto is not None:
+        filtros['produto'] = produto
+    if local is not None:
+        filtros['local'] = local
+    return filtros
+
+
+def _ultimos_ajustes(movimentos):
+    """Último AJUSTE de cada (produto_id, local_id) em `movimentos`: {chave: (data_hora, id, quantidade)}."""
+    ajustes = {}
+    for produto_id, local_id, data_hora, mov_id, quantidade in (
+        movimentos.filter(tipo='AJUSTE').order_by('data_hora', 'id')
+        .values_list('produto_id', 'local_id', 'data_hora', 'id', 'quantidade')
+    ):
+        ajustes[(produto_id, local_id)] = (data_hora, mov_id, quantidade)
+    return ajustes
+
+
+def aplicar_periodo(saldos, movimentos):
+    """Soma a `saldos` ({(produto_id, local_id): saldo}) o efeito de `movimentos`. Altera e retorna o dict."""
+    ajustes = _ultimos_ajustes(movimentos)
+    depois_do_ajuste = Q()
+    for (produto_id, local_id), (data_hora, mov_id, quantidade) in ajustes.items():
+        saldos[(produto_id, local_id)] = quantidade
+        depois_do_ajuste &= (
+            ~Q(produto_id=produto_id, local_id=local_id)
+            | Q(data_hora__gt=data_hora)
+            | Q(data_hora=data_hora, id__gt=mov_id)
+        )
+    variacoes = (
+        movimentos.exclude(tipo='AJUSTE').filter(depois_do_ajuste)
+        .order_by().values('produto_id', 'local_id').annotate(variacao=VARIACAO)
+        .values_list('produto_id', 'local_id', 'variacao')
+    )
+    for produto_id, local_id, variacao in variacoes:
+        chave = (produto_id, local_id)
+        saldos[chave] = saldos.get(chave, ZERO) + variacao
+    return saldos
+
+
+def fechamento_anterior(momento):
+    """FechamentoEstoque mais recente com data_hora <= momento (ou None)."""
+    return FechamentoEstoque.objects.filter(data_hora__lte=momento).order_by('-data_hora').first()
+
+
+def saldos_em(momento, produto=None, local=None):
+    """
+    Saldo de cada produto/local no instante `momento` (movimentos com
+    data_hora <= momento): {(produto_id, local_id): saldo}. Filtra por
+    produto e/ou local se informados.
+    """
+    filtros = _filtros(produto, local)
+    movimentos = MovimentoEstoque.objects.filter(data_hora__lte=momento, **filtros)
+    saldos = {}
+    fechamento = fechamento_anterior(momento)
+    if fechamento:
+        saldos = {
+            (produto_id, local_id): saldo
+            for produto_id, local_id, saldo in fechamento.saldos.filter(**filtros)
+            .values_list('produto_id', 'local_id', 'saldo')
+        }
+        movimentos = movimentos.filter(data_hora__gt=fechamento.data_hora)
+    return aplicar_periodo(saldos, movimentos)
+
+
+def inicio_do_dia(dia):
+    return datetime.combine(dia, time.min, tzinfo=timezone.get_current_timezone())
+
+
+def curva_estoque(produto, inicio, fim, local=None):
+    """
+    Saldo de `produto` no fim de cada dia de `inicio` a `fim` (datas, no fuso
+    do projeto), somando os locais se `local` não for informado.
+    Retorna [(dia, saldo), ...].
+    """
+    abertura = inicio_do_dia(inicio)
+    encerramento = inicio_do_dia(fim + timedelta(days=1))
+    filtros = _filtros(produto, local)
+    # Saldo de abertura por local: tudo antes do primeiro dia
+    saldos = {
+        local_id: saldo
+        for (_, local_id), saldo in saldos_em(abertura - timedelta(microseconds=1), **filtros).items()
+    }
+
+    movimentos = MovimentoEstoque.objects.filter(data_hora__gte=abertura, data_hora__lt=encerramento, **filtros)
+    tz = timezone.get_current_timezone()
+    variacoes = {}  # (local_id, dia) -> variação do dia
+    for local_id, dia, variacao in (
+        movimentos.exclude(tipo='AJUSTE').annotate(dia=TruncDate('data_hora', tzinfo=tz))
+        .order_by().values('local_id', 'dia').annotate(variacao=VARIACAO)
+        .values_list('local_id', 'dia', 'variacao')
+    ):
+        variacoes[(local_id, dia)] = variacao
+
+    # Dias com ajuste (raros): saldo do fim do dia = último ajuste + movimentos posteriores a ele no dia
+    fim_com_ajuste = {}
+    for local_id, data_hora in movimentos.filter(tipo='AJUSTE').values_list('local_id', 'data_hora'):
+        dia = timezone.localtime(data_hora, tz).date()
+        if (local_id, dia) not in fim_com_ajuste:
+            do_dia = movimentos.filter(
+                local_id=local_id, data_hora__gte=inicio_do_dia(dia), data_hora__lt=inicio_do_dia(dia + timedelta(days=1))
+            )
+            fim_com_ajuste[(local_id, dia)] = sum(aplicar_periodo({}, do_dia).values(), ZERO)
+
+    locais = set(saldos) | {local_id for local_id, _ in variacoes} | {local_id for local_id, _ in fim_com_ajuste}
+    curva = []
+    dia = inicio
+    while dia <= fim:
+        for local_id in locais:
+            if (local_id, dia) in fim_com_ajuste:
+                saldos[local_id] = fim_com_ajuste[(local_id, dia)]
+            else:
+                saldos[local_id] = saldos.get(local_id, ZERO) + variacoes.get((local_id, dia), ZERO)
+        curva.append((dia, sum(saldos.values(), ZERO)))
+        dia += timedelta(days=1)
+    return curva
+
+
+def gerar_fechamento(momento):
+    """
+    Grava (ou regrava) o FechamentoEstoque de `momento` com o saldo de todos
+    os produtos/locais, a partir do fechamento anterior. Saldos zero não são
+    gravados. Retorna o fechamento.
+    """
+    with transaction.atomic():
+        FechamentoEstoque.objects.filter(data_hora=momento).delete()
+        saldos = saldos_em(momento)
+        fechamento = FechamentoEstoque.objects.create(data_hora=momento)
+        SaldoFechamento.objects.bulk_create([
+            SaldoFechamento(fechamento=fechamento, produto_id=produto_id, local_id=local_id, saldo=saldo)
+            for (produto_id, local_id), saldo in saldos.items()
+            if saldo
+        ], batch_size=1000)
+    return fechamento
+
+
+def corrigir_fechamentos(movimento):
+    """
+    Tira de FechamentoEstoque o efeito de `movimento` (removido): só o saldo
+    do produto/local dele, nos fechamentos com data_hora >= movimento e
+    anteriores ao próximo AJUSTE desse produto/local. Entrada/saída: um
+    UPDATE com a diferença; ajuste: recalcula o produto/local nesses
+    fechamentos a partir do fechamento anterior.
+    """
+    chave = {'produto_id': movimento.produto_id, 'local_id': movimento.local_id}
+    afetados = FechamentoEstoque.objects.filter(data_hora__gte=movimento.data_hora)
+    proximo_ajuste = MovimentoEstoque.objects.filter(
+        Q(data_hora__gt=movimento.data_hora) | Q(data_hora=movimento.data_hora, id__gt=movimento.id),
+        tipo='AJUSTE', **chave,
+    ).order_by('data_hora', 'id').values_list('data_hora', flat=True).first()
+    if proximo_ajuste is not None:
+        afetados = afetados.filter(data_hora__lt=proximo_ajuste)
+
+    with transaction.atomic():
+        if movimento.tipo == 'AJUSTE':
+            _recalcular_fechamentos(afetados.order_by('data_hora'), chave)
+            return
+        diferenca = -movimento.quantidade if movimento.tipo == 'ENTRADA' else movimento.quantidade
+        saldos = SaldoFechamento.objects.filter(fechamento__in=afetados, **chave)
+        # Saldo zero não é gravado: cria a linha onde o produto/local não tinha saldo
+        sem_linha = list(afetados.exclude(id__in=saldos.values('fechamento_id')).values_list('id', flat=True))
+        saldos.update(saldo=F('saldo') + diferenca)
+        SaldoFechamento.objects.bulk_create([
+            SaldoFechamento(fechamento_id=fechamento_id, saldo=diferenca, **chave) for fechamento_id in sem_linha
+        ], batch_size=1000)
+        saldos.filter(saldo=0).delete()
+
+
+def _recalcular_fechamentos(fechamentos, chave):
+    """Regrava o saldo de um produto/local em `fechamentos` (em ordem), partindo do fechamento anterior."""
+    fechamentos = list(fechamentos)
+    if not fechamentos:
+        return
+    anterior = FechamentoEstoque.objects.filter(data_hora__lt=fechamentos[0].data_hora).order_by('-data_hora').first()
+    saldo = ZERO
+    movimentos = MovimentoEstoque.objects.filter(**chave)
+    if anterior:
+        saldo = anterior.saldos.filter(**chave).values_list('saldo', flat=True).first() or ZERO
+        movimentos = movimentos.filter(data_hora__gt=anterior.data_hora)
+
+    novos = []
+    inicio = None
+    for fechamento in fechamentos:
+        periodo = movimentos.filter(data_hora__lte=fechamento.data_hora)
+        if inicio is not None:
+            periodo = periodo.filter(data_hora__gt=inicio)
+        chave_saldo = (chave['produto_id'], chave['local_id'])
+        saldo = aplicar_periodo({chave_saldo: saldo}, periodo)[chave_saldo]
+        inicio = fechamento.data_hora
+        if saldo:
+            novos.append(SaldoFechamento(fechamento=fechamento, saldo=saldo, **chave))
+
+    SaldoFechamento.objects.filter(fechamento__in=fechamentos, **chave).delete()
+    SaldoFechamento.objects.bulk_create(novos, batch_size=1000)
@@ -0,0 +1,64 @@
+"""
+Management command para gravar os fechamentos diários de estoque (saldo de
+cada produto/local à meia-noite), usados por almoxarifado/historico.py.
+
+Uso:
+    python manage.py fechar_estoque                        # fechamento de hoje 00:00 (rodar diariamente)
+    python manage.py fechar_estoque --data 2025-06-30      # fechamento de 30/06 00:00
+    python manage.py fechar_estoque --dias 90              # preenche os 90 dias até hoje que faltarem
+    python manage.py fechar_estoque --dias 90 --refazer    # regrava os 90 dias
+"""
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from almoxarifado.historico import gerar_fechamento, inicio_do_dia
+from almoxarifado.models import FechamentoEstoque
+
+
+class Command(BaseCommand):
+    help = 'Grava o saldo de estoque de cada produto/local à meia-noite (FechamentoEstoque)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--data', type=str, help='Dia do fechamento YYYY-MM-DD, às 00:00 (padrão: hoje)')
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=1,
+            help='Quantidade de dias até --data, um fechamento por dia (padrão: 1)',
+        )
+        parser.add_argument(
+            '--refazer',
+            action='store_true',
+            help='Regrava fechamentos já existentes (padrão: só cria os que faltam)',
+        )
+
+    def handle(self, *args, **options):
+        dia_final = timezone.localdate()
+        if options['data']:
+            try:
+                dia_final = datetime.strptime(options['data'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError(f"Data inválida: {options['data']} (use YYYY-MM-DD)")
+        if inicio_do_dia(dia_final) > timezone.now():
+            raise CommandError('Não é possível fechar o estoque de um dia futuro')
+        if options['dias'] < 1:
+            raise CommandError('--dias deve ser pelo menos 1')
+
+        # Do mais antigo para o mais recente: cada fechamento parte do anterior
+        dias = [dia_final - timedelta(days=n) for n in range(options['dias'] - 1, -1, -1)]
+        existentes = set(FechamentoEstoque.objects.filter(
+            data_hora__in=[inicio_do_dia(dia) for dia in dias]
+        ).values_list('data_hora', flat=True))
+
+        gerados = 0
+        for dia in dias:
+            momento = inicio_do_dia(dia)
+            if momento in existentes and not options['refazer']:
+                continue
+            fechamento = gerar_fechamento(momento)
+            gerados += 1
+            self.stdout.write(f"  {dia}: {fechamento.saldos.count()} saldo(s)")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ {gerados} fechamento(s) de estoque gravado(s)"))
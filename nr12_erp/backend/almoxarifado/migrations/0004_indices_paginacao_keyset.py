@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('almoxarifado', '0003_produto_aliquota_cofins_produto_aliquota_icms_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movimentoestoque',
+            index=models.Index(fields=['data_hora', 'id'], name='almoxarifad_data_ho_4354ab_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimentoestoque',
+            index=models.Index(fields=['produto', 'data_hora', 'id'], name='almoxarifad_produto_2ace99_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('almoxarifado', '0004_indices_paginacao_keyset'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FechamentoEstoque',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data_hora', models.DateTimeField(unique=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Fechamento de Estoque',
+                'verbose_name_plural': 'Fechamentos de Estoque',
+                'ordering': ['-data_hora'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SaldoFechamento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('saldo', models.DecimalField(decimal_places=3, max_digits=14)),
+                ('fechamento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saldos', to='almoxarifado.fechamentoestoque')),
+                ('local', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='almoxarifado.localestoque')),
+                ('produto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='almoxarifado.produto')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('fechamento', 'produto', 'local'), name='unique_saldo_fechamento')],
+            },
+        ),
+    ]
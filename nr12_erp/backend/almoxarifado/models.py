@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 
 class UnidadeMedida(models.Model):
@@ -115,3 +115,51 @@ class MovimentoEstoque(models.Model):
         "abastecimentos.Abastecimento",
         null=True, blank=True, on_delete=models.SET_NULL, related_name="movimentos_estoque"
     )
+
+    class Meta:
+        # Paginação keyset: (data_hora, id), geral e por produto
+        indexes = [
+            models.Index(fields=["data_hora", "id"]),
+            models.Index(fields=["produto", "data_hora", "id"]),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Movimento novo: saldo pelo razão do estoque (services.aplicar_saldos), na mesma transação
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+        from .services import aplicar_saldos
+        with transaction.atomic():
+            aplicar_saldos([self])
+            super().save(*args, **kwargs)
+
+
+class FechamentoEstoque(models.Model):
+    """
+    Fechamento (checkpoint) do estoque em um instante: saldo de cada
+    produto/local considerando os movimentos com data_hora <= data_hora.
+    Gerado pelo comando fechar_estoque; consultas históricas partem do
+    fechamento anterior mais próximo (almoxarifado/historico.py).
+    """
+    data_hora = models.DateTimeField(unique=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-data_hora']
+        verbose_name = 'Fechamento de Estoque'
+        verbose_name_plural = 'Fechamentos de Estoque'
+
+    def __str__(self):
+        return f"Fechamento {self.data_hora:%d/%m/%Y %H:%M}"
+
+
+class SaldoFechamento(models.Model):
+    """Saldo de um produto/local em um FechamentoEstoque (ausente = zero)."""
+    fechamento = models.ForeignKey(FechamentoEstoque, on_delete=models.CASCADE, related_name='saldos')
+    produto = models.ForeignKey(Produto, on_delete=models.CASCADE)
+    local = models.ForeignKey(LocalEstoque, on_delete=models.CASCADE)
+    saldo = models.DecimalField(max_digits=14, decimal_places=3)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['fechamento', 'produto', 'local'], name='unique_saldo_fechamento'),
+        ]
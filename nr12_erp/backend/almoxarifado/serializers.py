@@ -1,3 +1,4 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
 from .models import UnidadeMedida, CategoriaProduto, Produto, LocalEstoque, Estoque, MovimentoEstoque
 
@@ -75,7 +76,7 @@ class MovimentoSerializer(serializers.ModelSerializer):
     def validate(self, data):
         """
         Validação adicional para garantir que saídas não excedam o saldo.
-        A validação principal está no signal, mas mantemos aqui para feedback imediato.
+        A garantia está no razão do estoque (services.aplicar_saldos), mas mantemos aqui para feedback imediato.
         """
         if data.get('tipo') == 'SAIDA':
             try:
@@ -96,4 +97,8 @@ class MovimentoSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         # Adiciona o usuário que criou
         validated_data['criado_por'] = self.context['request'].user
-        return super().create(validated_data)
+        try:
+            return super().create(validated_data)
+        except DjangoValidationError as e:
+            # Saldo consumido por outra saída entre a validação e a gravação
+            raise serializers.ValidationError({'quantidade': e.messages})
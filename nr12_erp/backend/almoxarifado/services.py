@@ -1,16 +1,159 @@
+"""
+Razão do estoque: todo movimento altera Estoque.saldo por aqui.
+
+O saldo muda com um único UPDATE condicional por lote, sem ler o saldo antes
+nem travar a linha com select_for_update:
+
+    UPDATE estoque SET saldo = saldo - q WHERE produto = p AND local = l AND saldo >= q
+
+Saídas simultâneas no mesmo produto/local (ex.: abastecimentos) só esperam
+pelo UPDATE uma da outra e nunca deixam o saldo negativo: a que não cabe no
+saldo não altera nenhuma linha e vira ValidationError (a transação inteira é
+desfeita). MovimentoEstoque.save() passa por aplicar_saldos() em movimentos
+novos, então MovimentoEstoque.objects.create(...) continua valendo; lotes
+usam registrar_movimentos() (um UPDATE + um INSERT).
+"""
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
 from django.db import transaction
+from django.db.models import Case, DecimalField, F, Q, Value, When
+from django.db.models.functions import Greatest
+
 from .models import Estoque, MovimentoEstoque
 
+ZERO = Decimal('0')
+SALDO = DecimalField(max_digits=14, decimal_places=3)
+
+
+def _variacoes(movimentos):
+    """
+    Efeito líquido do lote por (produto_id, local_id): (novo saldo do último
+    AJUSTE ou None, variação após ele), na ordem dos movimentos.
+    """
+    variacoes = {}
+    for mov in movimentos:
+        chave = (mov.produto_id, mov.local_id)
+        ajuste, delta = variacoes.get(chave, (None, ZERO))
+        if mov.tipo == 'AJUSTE':
+            # No ajuste, a quantidade representa o novo saldo
+            ajuste, delta = mov.quantidade, ZERO
+        elif mov.tipo == 'ENTRADA':
+            delta += mov.quantidade
+        elif mov.tipo == 'SAIDA':
+            delta -= mov.quantidade
+        variacoes[chave] = (ajuste, delta)
+    return variacoes
+
+
+def _erro_saldo(movimentos, chave, saldo):
+    """ValidationError (mesmas mensagens de antes) para o produto/local que não comportou o lote."""
+    mov = next(m for m in movimentos if (m.produto_id, m.local_id) == chave)
+    if saldo is None:
+        return ValidationError(f"Não existe estoque de {mov.produto.nome} no local {mov.local.nome}")
+    quantidade = sum(
+        (m.quantidade for m in movimentos if (m.produto_id, m.local_id) == chave and m.tipo == 'SAIDA'), ZERO
+    )
+    return ValidationError(
+        f"Saldo insuficiente para {mov.produto.nome} no local {mov.local.nome}. "
+        f"Saldo atual: {saldo}, Quantidade solicitada: {quantidade}"
+    )
+
+
+class _LoteRecusado(Exception):
+    pass
+
+
+def aplicar_saldos(movimentos):
+    """
+    Aplica ao Estoque o efeito dos movimentos (ainda não gravados) em um
+    UPDATE condicional. Saídas exigem estoque existente com saldo suficiente
+    (ValidationError caso contrário); entradas e ajustes criam o Estoque se
+    preciso. Deve rodar na mesma transação que grava os movimentos.
+    """
+    variacoes = {
+        chave: (ajuste, delta) for chave, (ajuste, delta) in _variacoes(movimentos).items()
+        if ajuste is not None or delta
+    }
+    if not variacoes:
+        return
+
+    for chave, (ajuste, delta) in variacoes.items():
+        if ajuste is not None and ajuste + delta < 0:
+            raise _erro_saldo(movimentos, chave, ajuste)
+
+    # Entradas/ajustes em produto/local sem estoque: cria a linha (concorrência resolvida pelo unique_together)
+    novos = [
+        Estoque(produto_id=produto_id, local_id=local_id, saldo=ZERO)
+        for (produto_id, local_id), (ajuste, delta) in variacoes.items()
+        if ajuste is not None or delta > 0
+    ]
+    if novos:
+        Estoque.objects.bulk_create(novos, ignore_conflicts=True)
+
+    condicao = Q()
+    casos = []
+    for (produto_id, local_id), (ajuste, delta) in variacoes.items():
+        linha = Q(produto_id=produto_id, local_id=local_id)
+        if ajuste is not None:
+            novo_saldo = Value(ajuste + delta, output_field=SALDO)
+        else:
+            novo_saldo = F('saldo') + Value(delta, output_field=SALDO)
+            if delta < 0:
+                linha &= Q(saldo__gte=-delta)
+        condicao |= linha
+        casos.append(When(linha, then=novo_saldo))
+    linhas = Estoque.objects.filter(condicao)
+
+    if len(casos) == 1:
+        if linhas.update(saldo=casos[0].result) == 1:
+            return
+    else:
+        # Lote com vários produtos/locais: em savepoint, para que uma recusa
+        # não deixe parte das linhas alteradas na leitura do saldo abaixo
+        try:
+            with transaction.atomic():
+                if linhas.update(saldo=Case(*casos, output_field=SALDO)) != len(casos):
+                    raise _LoteRecusado
+            return
+        except _LoteRecusado:
+            pass
+
+    saldos = {
+        (produto_id, local_id): saldo
+        for produto_id, local_id, saldo in Estoque.objects.filter(
+            produto_id__in={c[0] for c in variacoes}, local_id__in={c[1] for c in variacoes}
+        ).values_list('produto_id', 'local_id', 'saldo')
+    }
+    for chave, (ajuste, delta) in variacoes.items():
+        saldo = saldos.get(chave)
+        if ajuste is None and delta < 0 and (saldo is None or saldo < -delta):
+            raise _erro_saldo(movimentos, chave, saldo)
+    raise ValidationError("Saldo alterado durante o lançamento, tente novamente")
+
+
 @transaction.atomic
+def registrar_movimentos(movimentos):
+    """Grava um lote de MovimentoEstoque (ainda não salvos) e atualiza os saldos. Tudo ou nada."""
+    aplicar_saldos(movimentos)
+    return MovimentoEstoque.objects.bulk_create(movimentos)
+
+
 def lancar_movimento(*, produto, local, tipo, quantidade, documento='', obs='', criado_por=None, abastecimento=None):
-    mov = MovimentoEstoque.objects.create(
+    mov = MovimentoEstoque(
         produto=produto, local=local, tipo=tipo, quantidade=quantidade,
         documento=documento, observacao=obs, criado_por=criado_por, abastecimento=abastecimento
     )
-    est, _ = Estoque.objects.select_for_update().get_or_create(produto=produto, local=local)
-    if tipo == 'ENTRADA':
-        est.saldo = (est.saldo or 0) + quantidade
-    elif tipo == 'SAIDA':
-        est.saldo = (est.saldo or 0) - quantidade
-    est.save()
+    mov.save()
     return mov
+
+
+def estornar_movimento(mov):
+    """Reverte no saldo um movimento removido (AJUSTE não pode ser revertido). Nunca deixa saldo negativo."""
+    if mov.tipo == 'ENTRADA':
+        saldo = Greatest(F('saldo') - Value(mov.quantidade, output_field=SALDO), Value(ZERO, output_field=SALDO))
+    elif mov.tipo == 'SAIDA':
+        saldo = F('saldo') + Value(mov.quantidade, output_field=SALDO)
+    else:
+        return
+    Estoque.objects.filter(produto_id=mov.produto_id, local_id=mov.local_id).update(saldo=saldo)
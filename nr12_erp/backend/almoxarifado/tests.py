@@ -0,0 +1,292 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.exceptions import ValidationError
+from django.db import OperationalError, close_old_connections, connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from abastecimentos.models import Abastecimento
+from cadastro.models import Cliente, Empreendimento
+from equipamentos.models import Equipamento, TipoEquipamento
+
+from .historico import aplicar_periodo, curva_estoque, gerar_fechamento, inicio_do_dia, saldos_em
+from .models import (CategoriaProduto, Estoque, FechamentoEstoque, LocalEstoque, MovimentoEstoque, Produto,
+                     SaldoFechamento, UnidadeMedida)
+from .services import lancar_movimento, registrar_movimentos
+
+
+def criar_produto(codigo='DIESEL'):
+    unidade, _ = UnidadeMedida.objects.get_or_create(sigla='L', defaults={'descricao': 'Litro'})
+    categoria, _ = CategoriaProduto.objects.get_or_create(nome='Combustíveis')
+    return Produto.objects.create(nome=codigo.title(), codigo=codigo, tipo='COMBUSTIVEL', categoria=categoria, unidade=unidade)
+
+
+def saldo(produto, local):
+    return Estoque.objects.get(produto=produto, local=local).saldo
+
+
+class RazaoEstoqueTest(TestCase):
+    """Saldos pelo razão do estoque (services.aplicar_saldos)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.diesel = criar_produto('DIESEL')
+        cls.oleo = criar_produto('OLEO')
+        cls.tanque = LocalEstoque.objects.create(nome='Tanque 1', tipo='TANQUE')
+        cls.almox = LocalEstoque.objects.create(nome='Almox', tipo='ALMOX')
+
+    def mov(self, produto, local, tipo, quantidade):
+        return MovimentoEstoque(produto=produto, local=local, tipo=tipo, quantidade=Decimal(quantidade))
+
+    def test_movimento_altera_saldo_uma_vez(self):
+        lancar_movimento(produto=self.diesel, local=self.tanque, tipo='ENTRADA', quantidade=Decimal('100'))
+        MovimentoEstoque.objects.create(produto=self.diesel, local=self.tanque, tipo='SAIDA', quantidade=Decimal('30'))
+        self.assertEqual(saldo(self.diesel, self.tanque), Decimal('70'))
+
+        with self.assertRaisesMessage(ValidationError, 'Saldo insuficiente'):
+            lancar_movimento(produto=self.diesel, local=self.tanque, tipo='SAIDA', quantidade=Decimal('70.5'))
+        with self.assertRaisesMessage(ValidationError, 'Não existe estoque'):
+            lancar_movimento(produto=self.oleo, local=self.tanque, tipo='SAIDA', quantidade=Decimal('1'))
+        self.assertEqual(MovimentoEstoque.objects.count(), 2)
+
+        MovimentoEstoque.objects.get(tipo='SAIDA').delete()
+        self.assertEqual(saldo(self.diesel, self.tanque), Decimal('100'))
+
+    def test_lote_em_um_update(self):
+        registrar_movimentos([
+            self.mov(self.diesel, self.tanque, 'ENTRADA', '500'),
+            self.mov(self.oleo, self.almox, 'ENTRADA', '20'),
+        ])
+        lote = [self.mov(self.diesel, self.tanque, 'SAIDA', '10') for _ in range(50)]
+        lote += [self.mov(self.oleo, self.almox, 'SAIDA', '2'), self.mov(self.oleo, self.almox, 'AJUSTE', '8')]
+        lote.append(self.mov(self.oleo, self.almox, 'SAIDA', '3'))
+
+        # INSERT do estoque novo, um UPDATE para os dois saldos, um INSERT dos movimentos (+ savepoints)
+        with self.assertNumQueries(7):
+            registrar_movimentos(lote)
+
+        self.assertEqual(saldo(self.diesel, self.tanque), Decimal('0'))
+        self.assertEqual(saldo(self.oleo, self.almox), Decimal('5'))
+        self.assertEqual(MovimentoEstoque.objects.count(), 55)
+
+    def test_lote_recusado_nao_altera_nada(self):
+        registrar_movimentos([
+            self.mov(self.diesel, self.tanque, 'ENTRADA', '100'),
+            self.mov(self.oleo, self.almox, 'ENTRADA', '5'),
+        ])
+        with self.assertRaisesMessage(ValidationError, 'Oleo no local Almox. Saldo atual: 5.000'):
+            registrar_movimentos([
+                self.mov(self.diesel, self.tanque, 'SAIDA', '40'),
+                self.mov(self.oleo, self.almox, 'SAIDA', '4'),
+                self.mov(self.oleo, self.almox, 'SAIDA', '4'),
+            ])
+        self.assertEqual(saldo(self.diesel, self.tanque), Decimal('100'))
+        self.assertEqual(saldo(self.oleo, self.almox), Decimal('5'))
+        self.assertEqual(MovimentoEstoque.objects.count(), 2)
+
+    def test_abastecimento_baixa_estoque_uma_vez(self):
+        cliente = Cliente.objects.create(nome_razao='Mineradora Teste', documento='11222333000181', qr_code='x.png')
+        empreendimento = Empreendimento.objects.create(cliente=cliente, nome='Lavra 1', qr_code='x.png')
+        equip = Equipamento.objects.create(
+            cliente=cliente, empreendimento=empreendimento, tipo=TipoEquipamento.objects.create(nome='Escavadeira'),
+            codigo='EQ-001', qr_code='x.png',
+        )
+        lancar_movimento(produto=self.diesel, local=self.tanque, tipo='ENTRADA', quantidade=Decimal('100'))
+
+        def abastecer(litros, leitura):
+            return Abastecimento.objects.create(
+                equipamento=equip, origem='ALMOXARIFADO', data=date(2026, 1, 1), horimetro_km=Decimal(leitura),
+                produto=self.diesel, local_estoque=self.tanque, quantidade_litros=Decimal(litros),
+            )
+
+        abastecer('60', '10')
+        self.assertEqual(saldo(self.diesel, self.tanque), Decimal('40'))
+        self.assertEqual(MovimentoEstoque.objects.filter(tipo='SAIDA').count(), 1)
+
+        # Sem saldo: o abastecimento também é desfeito
+        with self.assertRaises(ValidationError):
+            abastecer('41', '20')
+        self.assertEqual(Abastecimento.objects.count(), 1)
+        self.assertEqual(saldo(self.diesel, self.tanque), Decimal('40'))
+
+
+class HistoricoEstoqueTest(TestCase):
+    """Saldo em um instante passado e curva diária (almoxarifado/historico.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.diesel = criar_produto('DIESEL')
+        cls.tanque = LocalEstoque.objects.create(nome='Tanque 1', tipo='TANQUE')
+        cls.almox = LocalEstoque.objects.create(nome='Almox', tipo='ALMOX')
+        cls.dia = date(2026, 3, 1)
+
+    def em(self, dia, hora):
+        return inicio_do_dia(self.dia + timedelta(days=dia)) + timedelta(hours=hora)
+
+    def mov(self, dia, hora, tipo, quantidade, local=None):
+        # data_hora é auto_now_add: ajustada depois de lançar
+        mov = lancar_movimento(produto=self.diesel, local=local or self.tanque, tipo=tipo, quantidade=Decimal(quantidade))
+        mov.data_hora = self.em(dia, hora)
+        MovimentoEstoque.objects.filter(pk=mov.pk).update(data_hora=mov.data_hora)
+        return mov
+
+    def lancar_historico(self):
+        self.mov(0, 8, 'ENTRADA', '1000')
+        self.mov(0, 15, 'SAIDA', '100')
+        self.mov(1, 10, 'ENTRADA', '50', local=self.almox)
+        self.mov(2, 9, 'SAIDA', '200')
+        self.mov(2, 11, 'AJUSTE', '650')  # inventário: saldo passa a 650
+        self.mov(2, 18, 'SAIDA', '50')
+        self.mov(4, 7, 'SAIDA', '100')
+        return {0: Decimal('900'), 1: Decimal('900'), 2: Decimal('600'), 3: Decimal('600'), 4: Decimal('500')}
+
+    def saldo_tanque(self, momento):
+        return saldos_em(momento, produto=self.diesel).get((self.diesel.pk, self.tanque.pk), Decimal('0'))
+
+    def test_saldo_em_com_e_sem_fechamento(self):
+        esperado = self.lancar_historico()
+        momentos = [self.em(dia, 23) for dia in esperado] + [self.em(2, 10), self.em(2, 12)]
+        sem_fechamento = [self.saldo_tanque(m) for m in momentos]
+        self.assertEqual(sem_fechamento[:5], list(esperado.values()))
+        self.assertEqual(sem_fechamento[5:], [Decimal('700'), Decimal('650')])
+
+        for dia in (1, 3):
+            gerar_fechamento(inicio_do_dia(self.dia + timedelta(days=dia)))
+        self.assertEqual([self.saldo_tanque(m) for m in momentos], sem_fechamento)
+        self.assertEqual(saldos_em(self.em(1, 23)), {
+            (self.diesel.pk, self.tanque.pk): Decimal('900'), (self.diesel.pk, self.almox.pk): Decimal('50'),
+        })
+        # Último saldo bate com o Estoque
+        self.assertEqual(self.saldo_tanque(timezone.now()), saldo(self.diesel, self.tanque))
+
+    def test_curva_diaria(self):
+        esperado = self.lancar_historico()
+        gerar_fechamento(inicio_do_dia(self.dia + timedelta(days=2)))
+        fim = self.dia + timedelta(days=4)
+
+        curva = curva_estoque(self.diesel.pk, self.dia, fim, local=self.tanque.pk)
+        self.assertEqual(curva, [(self.dia + timedelta(days=d), s) for d, s in esperado.items()])
+
+        # Todos os locais, a partir do meio do histórico
+        curva = curva_estoque(self.diesel.pk, self.dia + timedelta(days=1), fim)
+        self.assertEqual([s for _, s in curva], [esperado[d] + 50 for d in range(1, 5)])
+
+    def saldos_fechamentos(self):
+        return {
+            (data_hora, produto_id, local_id): valor
+            for data_hora, produto_id, local_id, valor in SaldoFechamento.objects.values_list(
+                'fechamento__data_hora', 'produto_id', 'local_id', 'saldo')
+        }
+
+    def assert_fechamentos_corretos(self):
+        """Cada fechamento igual ao recalculado do zero."""
+        for fechamento in FechamentoEstoque.objects.all():
+            esperado = {
+                chave: valor for chave, valor in aplicar_periodo(
+                    {}, MovimentoEstoque.objects.filter(data_hora__lte=fechamento.data_hora)).items() if valor
+            }
+            gravado = dict(((p, l), v) for p, l, v in fechamento.saldos.values_list('produto_id', 'local_id', 'saldo'))
+            self.assertEqual(gravado, esperado, fechamento)
+
+    def test_remover_movimento_corrige_so_o_produto_local(self):
+        self.mov(0, 8, 'ENTRADA', '1000')
+        saida = self.mov(1, 8, 'SAIDA', '300')
+        self.mov(1, 9, 'ENTRADA', '40', local=self.almox)
+        entrada = self.mov(1, 10, 'ENTRADA', '25', local=self.almox)
+        call_command('fechar_estoque', data=str(self.dia + timedelta(days=3)), dias=3, stdout=StringIO())
+        almox_antes = {k: v for k, v in self.saldos_fechamentos().items() if k[2] == self.almox.pk}
+
+        with CaptureQueriesContext(connection) as contexto:
+            saida.delete()
+        self.assertEqual(FechamentoEstoque.objects.count(), 3)
+        self.assertEqual(self.saldo_tanque(self.em(2, 12)), Decimal('1000'))
+        self.assertEqual({k: v for k, v in self.saldos_fechamentos().items() if k[2] == self.almox.pk}, almox_antes)
+        self.assertLess(len(contexto), 12)
+        self.assert_fechamentos_corretos()
+
+        # Saldo zerado sai do fechamento; saldo que não existia é criado
+        self.mov(1, 11, 'SAIDA', '65', local=self.almox)
+        call_command('fechar_estoque', data=str(self.dia + timedelta(days=3)), dias=3, refazer=True, stdout=StringIO())
+        entrada.delete()
+        self.assert_fechamentos_corretos()
+        self.assertEqual(saldos_em(self.em(2, 12))[(self.diesel.pk, self.almox.pk)], Decimal('-25'))
+
+    def test_remover_ajuste_recalcula_ate_o_proximo_ajuste(self):
+        self.lancar_historico()
+        ajuste = MovimentoEstoque.objects.get(tipo='AJUSTE')
+        self.mov(3, 10, 'AJUSTE', '400')
+        call_command('fechar_estoque', data=str(self.dia + timedelta(days=5)), dias=5, stdout=StringIO())
+        antes = self.saldos_fechamentos()
+
+        ajuste.delete()
+        depois = self.saldos_fechamentos()
+        self.assert_fechamentos_corretos()
+        # Só o fechamento de 00:00 do dia 3 (entre os dois ajustes) muda
+        mudou = {k[0] for k in set(antes) | set(depois) if antes.get(k) != depois.get(k)}
+        self.assertEqual(mudou, {self.em(3, 0)})
+        self.assertEqual(self.saldo_tanque(self.em(3, 0)), Decimal('650'))
+
+    def test_endpoints(self):
+        self.lancar_historico()
+        api = APIClient()
+        api.force_authenticate(get_user_model().objects.create_user(username='almox', password='x', is_staff=True))
+
+        resposta = api.get('/api/v1/almoxarifado/estoque/saldo-em/', {'data': str(self.dia + timedelta(days=2))})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(
+            [(s['local_nome'], Decimal(s['saldo'])) for s in resposta.data['saldos']],
+            [('Almox', Decimal('50')), ('Tanque 1', Decimal('600'))],
+        )
+        resposta = api.get('/api/v1/almoxarifado/estoque/saldo-em/', {'data_hora': 'ontem'})
+        self.assertEqual(resposta.status_code, 400)
+
+        resposta = api.get('/api/v1/almoxarifado/estoque/curva/', {
+            'produto': self.diesel.pk, 'local': self.tanque.pk,
+            'data_inicio': str(self.dia), 'data_fim': str(self.dia + timedelta(days=4)),
+        })
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual([Decimal(p['saldo']) for p in resposta.data['serie']][-1], Decimal('500'))
+        resposta = api.get('/api/v1/almoxarifado/estoque/curva/', {
+            'produto': self.diesel.pk, 'data_inicio': '2024-01-01', 'data_fim': '2026-01-01',
+        })
+        self.assertEqual(resposta.status_code, 400)
+
+
+class SaidasConcorrentesTest(TransactionTestCase):
+    """Saídas em paralelo no mesmo produto/local nunca passam do saldo."""
+
+    def test_saidas_em_paralelo(self):
+        diesel = criar_produto('DIESEL')
+        tanque = LocalEstoque.objects.create(nome='Tanque 1', tipo='TANQUE')
+        lancar_movimento(produto=diesel, local=tanque, tipo='ENTRADA', quantidade=Decimal('25'))
+
+        def saida(_):
+            try:
+                while True:
+                    try:
+                        lancar_movimento(produto=diesel, local=tanque, tipo='SAIDA', quantidade=Decimal('2'))
+                        return True
+                    except ValidationError:
+                        return False
+                    except OperationalError:
+                        # SQLite: banco travado por outra escrita (no PostgreSQL o UPDATE só espera)
+                        if connection.vendor != 'sqlite':
+                            raise
+                        time.sleep(0.005)
+            finally:
+                close_old_connections()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            resultados = list(pool.map(saida, range(40)))
+
+        self.assertEqual(sum(resultados), 12)
+        self.assertEqual(saldo(diesel, tanque), Decimal('1'))
+        self.assertEqual(MovimentoEstoque.objects.filter(tipo='SAIDA').count(), 12)
@@ -1,7 +1,12 @@
 from rest_framework import viewsets, permissions, mixins, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from datetime import timedelta
+
 from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .historico import curva_estoque, inicio_do_dia, saldos_em
 from .models import UnidadeMedida, CategoriaProduto, Produto, LocalEstoque, Estoque, MovimentoEstoque
 from .serializers import (UnidadeSerializer, CategoriaSerializer, ProdutoSerializer, ProdutoListSerializer,
                           LocalEstoqueSerializer, EstoqueSerializer, MovimentoSerializer)
@@ -140,6 +145,119 @@ class EstoqueViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.
             'sem_saldo': sem_saldo,
         })
 
+    def _data_param(self, nome):
+        texto = self.request.query_params.get(nome)
+        if not texto:
+            return None, None
+        try:
+            valor = parse_date(texto)
+        except ValueError:
+            valor = None
+        if valor is None:
+            return None, Response({nome: 'Use o formato YYYY-MM-DD.'}, status=status.HTTP_400_BAD_REQUEST)
+        return valor, None
+
+    def _id_param(self, nome):
+        texto = self.request.query_params.get(nome)
+        if not texto:
+            return None, None
+        if not texto.isdigit():
+            return None, Response({nome: 'Informe o id.'}, status=status.HTTP_400_BAD_REQUEST)
+        return int(texto), None
+
+    @action(detail=False, methods=['get'], url_path='saldo-em')
+    def saldo_em(self, request):
+        """
+        Saldo de cada produto/local em um instante passado, a partir do
+        fechamento de estoque anterior (almoxarifado/historico.py).
+        ?data_hora= (ISO 8601) ou ?data= (YYYY-MM-DD, fim do dia); opcionais ?produto= e ?local=.
+        """
+        from core.permissions import get_user_role_safe
+        if get_user_role_safe(request.user) == 'CLIENTE':
+            return Response({'detail': 'Sem acesso ao estoque.'}, status=status.HTTP_403_FORBIDDEN)
+
+        texto = request.query_params.get('data_hora')
+        if texto:
+            try:
+                momento = parse_datetime(texto)
+            except ValueError:
+                momento = None
+            if momento is None:
+                return Response({'data_hora': 'Use o formato ISO 8601 (YYYY-MM-DDTHH:MM).'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(momento):
+                momento = timezone.make_aware(momento)
+        else:
+            dia, erro = self._data_param('data')
+            if erro:
+                return erro
+            if dia is None:
+                return Response({'detail': 'Informe data_hora ou data.'}, status=status.HTTP_400_BAD_REQUEST)
+            momento = inicio_do_dia(dia + timedelta(days=1)) - timedelta(microseconds=1)
+
+        produto, erro = self._id_param('produto')
+        if erro:
+            return erro
+        local, erro = self._id_param('local')
+        if erro:
+            return erro
+
+        saldos = saldos_em(momento, produto=produto, local=local)
+        produtos = Produto.objects.in_bulk({p for p, _ in saldos})
+        locais = LocalEstoque.objects.in_bulk({l for _, l in saldos})
+        resultado = [
+            {
+                'produto': produto_id,
+                'produto_codigo': produtos[produto_id].codigo,
+                'produto_nome': produtos[produto_id].nome,
+                'local': local_id,
+                'local_nome': locais[local_id].nome,
+                'saldo': saldo,
+            }
+            for (produto_id, local_id), saldo in saldos.items()
+            if saldo
+        ]
+        resultado.sort(key=lambda s: (s['produto_codigo'], s['local_nome']))
+        return Response({'data_hora': momento, 'saldos': resultado})
+
+    @action(detail=False, methods=['get'])
+    def curva(self, request):
+        """
+        Saldo diário de um produto (fim de cada dia), somando os locais ou só ?local=.
+        ?produto= obrigatório; ?data_inicio=/?data_fim= (YYYY-MM-DD, padrão: últimos 30 dias, máx. 366 dias).
+        """
+        from core.permissions import get_user_role_safe
+        if get_user_role_safe(request.user) == 'CLIENTE':
+            return Response({'detail': 'Sem acesso ao estoque.'}, status=status.HTTP_403_FORBIDDEN)
+
+        produto, erro = self._id_param('produto')
+        if erro:
+            return erro
+        if produto is None:
+            return Response({'produto': 'Obrigatório.'}, status=status.HTTP_400_BAD_REQUEST)
+        local, erro = self._id_param('local')
+        if erro:
+            return erro
+        data_fim, erro = self._data_param('data_fim')
+        if erro:
+            return erro
+        data_fim = data_fim or timezone.localdate()
+        data_inicio, erro = self._data_param('data_inicio')
+        if erro:
+            return erro
+        data_inicio = data_inicio or data_fim - timedelta(days=29)
+        if data_inicio > data_fim:
+            return Response({'data_inicio': 'Deve ser anterior a data_fim.'}, status=status.HTTP_400_BAD_REQUEST)
+        if (data_fim - data_inicio).days >= 366:
+            return Response({'detail': 'Período máximo de 366 dias.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        serie = curva_estoque(produto, data_inicio, data_fim, local=local)
+        return Response({
+            'produto': produto,
+            'local': local,
+            'serie': [{'data': dia, 'saldo': saldo} for dia, saldo in serie],
+        })
+
 
 class MovimentoViewSet(mixins.ListModelMixin, mixins.CreateModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
     queryset = MovimentoEstoque.objects.select_related(
@@ -151,6 +269,7 @@ class MovimentoViewSet(mixins.ListModelMixin, mixins.CreateModelMixin, mixins.Re
     search_fields = ['produto__codigo', 'produto__nome', 'documento', 'observacao']
     ordering_fields = ['data_hora', 'quantidade']
     ordering = ['-data_hora']
+    paginacao_keyset = 'data_hora'  # ?paginacao=keyset (core/pagination.py)
 
     def get_queryset(self):
         queryset = super().get_queryset()
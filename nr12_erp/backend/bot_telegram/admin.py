@@ -1,3 +1,10 @@
 from django.contrib import admin
+from .models import EstadoConversa
 
-# Register your models here.
+
+@admin.register(EstadoConversa)
+class EstadoConversaAdmin(admin.ModelAdmin):
+    list_display = ("tipo", "chave", "atualizado_em")
+    list_filter = ("tipo",)
+    search_fields = ("chave",)
+    readonly_fields = ("atualizado_em",)
@@ -6,3 +6,6 @@ class BotTelegramConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'bot_telegram'
     verbose_name = 'Bot do Telegram'
+
+    def ready(self):
+        import bot_telegram.signals
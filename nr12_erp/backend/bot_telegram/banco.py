@@ -0,0 +1,39 @@
+# backend/bot_telegram/banco.py
+"""
+Acesso ao banco a partir do código assíncrono do bot.
+
+As consultas rodam num pool próprio (BOT_DB_WORKERS threads): com
+thread_sensitive=True (padrão do asgiref) todas as chamadas de todos os chats
+passariam por uma única thread. Essas threads ficam fora do ciclo de request
+do Django, então cada chamada fecha, antes e depois, as conexões vencidas ou
+quebradas (close_old_connections), como o database_sync_to_async do
+channels: vale o CONN_MAX_AGE de config/database.py (0 nos modos pooler e
+psycopg-pool devolve a conexão ao pool) e uma conexão derrubada (restart do
+PostgreSQL, pgbouncer) é reaberta na chamada seguinte.
+"""
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async as _sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor_db = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'BOT_DB_WORKERS', 8), thread_name_prefix='bot-db'
+)
+
+
+def _com_conexao(func):
+    @functools.wraps(func)
+    def executar(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return executar
+
+
+def sync_to_async(func):
+    """Versão assíncrona de `func` no pool do bot, com as conexões gerenciadas."""
+    return _sync_to_async(_com_conexao(func), thread_sensitive=False, executor=_executor_db)
@@ -13,6 +13,7 @@ from telegram.ext import (
 )
 
 from . import handlers
+from .persistencia import obter_persistencia
 
 logger = logging.getLogger(__name__)
 
@@ -22,10 +23,15 @@ AGUARDANDO_ABAST_LEITURA, AGUARDANDO_ABAST_LITROS, AGUARDANDO_ABAST_VALOR, AGUAR
 AGUARDANDO_MANUT_TIPO, AGUARDANDO_MANUT_HORIMETRO, AGUARDANDO_MANUT_DESCRICAO, AGUARDANDO_MANUT_OBSERVACOES, AGUARDANDO_MANUT_PROXIMA = range(8, 13)
 
 
-def criar_bot():
-    """Cria e configura Application para PTB 22.x"""
+def criar_bot(token=None, request=None):
+    """
+    Cria e configura Application para PTB 22.x
+
+    request: BaseRequest alternativo para as chamadas à API do Telegram
+    (usado pelo teste de carga offline, manage.py bot_carga).
+    """
     print("[DEBUG] Iniciando criar_bot()")
-    token = getattr(settings, "TELEGRAM_BOT_TOKEN", None)
+    token = token or getattr(settings, "TELEGRAM_BOT_TOKEN", None)
     if not token:
         raise ValueError(
             "TELEGRAM_BOT_TOKEN não configurado. "
@@ -34,7 +40,14 @@ def criar_bot():
 
     print("[DEBUG] Token obtido, criando Application...")
     # Application (API 20.x)
-    application = Application.builder().token(token).build()
+    builder = Application.builder().token(token)
+    if request is not None:
+        builder = builder.request(request).get_updates_request(request)
+    # Estado das conversas fora do processo (compartilhado entre workers)
+    persistencia = obter_persistencia()
+    if persistencia is not None:
+        builder = builder.persistence(persistencia)
+    application = builder.build()
     print("[DEBUG] Application criado com sucesso")
 
     # --- Handlers de comandos simples ---
@@ -62,6 +75,8 @@ def criar_bot():
             ],
         },
         fallbacks=[CommandHandler("cancelar", handlers.cancelar)],
+        name='vincular',
+        persistent=persistencia is not None,
     )
     application.add_handler(conv_vincular)
 
@@ -86,6 +101,8 @@ def criar_bot():
             ],
         },
         fallbacks=[CommandHandler("cancelar", handlers.cancelar)],
+        name='checklist',
+        persistent=persistencia is not None,
         allow_reentry=True,
         per_chat=True,
         per_user=True,  # Track per user to maintain context across messages
@@ -126,6 +143,8 @@ def criar_bot():
             ],
         },
         fallbacks=[CommandHandler("cancelar", handlers.cancelar)],
+        name='abastecimento',
+        persistent=persistencia is not None,
         allow_reentry=True,
         per_chat=True,
         per_user=True,  # Track per user to maintain context across messages
@@ -160,6 +179,8 @@ def criar_bot():
             ],
         },
         fallbacks=[CommandHandler("cancelar", handlers.cancelar)],
+        name='manutencao',
+        persistent=persistencia is not None,
         allow_reentry=True,
         per_chat=True,
         per_user=True,  # Track per user to maintain context across messages
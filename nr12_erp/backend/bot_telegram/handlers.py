@@ -1,8 +1,9 @@
 # backend/bot_telegram/handlers.py
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove
 from telegram.ext import ContextTypes, ConversationHandler
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
-from asgiref.sync import sync_to_async
 from core.models import Operador, Supervisor
 from tecnicos.models import Tecnico
 from equipamentos.models import Equipamento, MedicaoEquipamento
@@ -10,6 +11,9 @@ from cadastro.models import Empreendimento
 from nr12.models import ChecklistRealizado, RespostaItemChecklist, ModeloChecklist
 from abastecimentos.models import Abastecimento
 from manutencao.models import Manutencao
+from .banco import sync_to_async
+from .identidade import invalidar_identidade, obter_identidade
+from collections import OrderedDict
 from decimal import Decimal, InvalidOperation
 import logging
 
@@ -27,31 +31,20 @@ def get_usuario_by_chat_id(chat_id):
     """
     Busca usuário (Operador, Supervisor ou Técnico) pelo chat_id
     Retorna tupla (usuario, tipo) onde tipo = 'operador', 'supervisor' ou 'tecnico'
-    """
-    chat_id_str = str(chat_id)
-
-    # Tentar como Operador
-    try:
-        operador = Operador.objects.get(telegram_chat_id=chat_id_str)
-        return (operador, 'operador')
-    except Operador.DoesNotExist:
-        pass
 
-    # Tentar como Supervisor
-    try:
-        supervisor = Supervisor.objects.get(telegram_chat_id=chat_id_str)
-        return (supervisor, 'supervisor')
-    except Supervisor.DoesNotExist:
-        pass
+    O tipo e o id vêm da identidade em cache (bot_telegram/identidade.py);
+    só o registro do usuário é lido do banco.
+    """
+    identidade = obter_identidade(chat_id)
+    if identidade is None:
+        raise Exception("Usuário não encontrado")
 
-    # Tentar como Técnico
+    modelo = {'operador': Operador, 'supervisor': Supervisor, 'tecnico': Tecnico}[identidade.tipo]
     try:
-        tecnico = Tecnico.objects.get(telegram_chat_id=chat_id_str)
-        return (tecnico, 'tecnico')
-    except Tecnico.DoesNotExist:
-        pass
-
-    raise Exception("Usuário não encontrado")
+        return (modelo.objects.get(id=identidade.id), identidade.tipo)
+    except modelo.DoesNotExist:
+        invalidar_identidade(chat_id)
+        raise Exception("Usuário não encontrado")
 
 
 @sync_to_async
@@ -59,6 +52,23 @@ def get_operador_by_chat_id(chat_id):
     return Operador.objects.get(telegram_chat_id=str(chat_id))
 
 
+@sync_to_async
+def get_usuario_by_id(usuario_id, tipo_usuario):
+    """Recarrega o usuário guardado na conversa (id + tipo)"""
+    modelo = {'operador': Operador, 'supervisor': Supervisor, 'tecnico': Tecnico}[tipo_usuario]
+    return modelo.objects.get(id=usuario_id)
+
+
+def estado_equipamento(equipamento):
+    """Campos do equipamento guardados na conversa (somente primitivos)"""
+    return {
+        'id': equipamento.id,
+        'codigo': equipamento.codigo,
+        'leitura_atual': str(equipamento.leitura_atual or 0),
+        'tipo_medicao_display': equipamento.get_tipo_medicao_display(),
+    }
+
+
 @sync_to_async
 def get_usuario_by_codigo(codigo):
     """
@@ -195,6 +205,26 @@ def get_equipamentos_autorizados(usuario, tipo_usuario='operador'):
         return list(usuario.equipamentos_autorizados.filter(ativo=True).select_related('tipo', 'empreendimento', 'cliente'))
 
 
+# ETag do QR renderizado -> file_id no Telegram (evita reenviar a mesma imagem).
+# LRU limitado: cada variante de etiqueta gera um ETag novo. Só usado na thread do loop do bot.
+QR_FILE_IDS_MAX = 512
+_qr_file_ids = OrderedDict()
+
+
+def _file_id_qr(etag):
+    file_id = _qr_file_ids.get(etag)
+    if file_id is not None:
+        _qr_file_ids.move_to_end(etag)
+    return file_id
+
+
+def _guardar_file_id_qr(etag, file_id):
+    _qr_file_ids[etag] = file_id
+    _qr_file_ids.move_to_end(etag)
+    while len(_qr_file_ids) > QR_FILE_IDS_MAX:
+        _qr_file_ids.popitem(last=False)
+
+
 @sync_to_async
 def get_equipamento_by_id(equipamento_id):
     return Equipamento.objects.select_related('tipo', 'empreendimento', 'cliente').get(id=equipamento_id, ativo=True)
@@ -217,7 +247,15 @@ def tem_acesso_equipamento(usuario, equipamento_id, tipo_usuario='operador'):
     - Operador: verifica se está autorizado
     - Supervisor: verifica se equipamento está em seus empreendimentos (M2M OU FK)
     - Técnico: verifica se equipamento é do cliente vinculado OU do empreendimento vinculado
+
+    Para o usuário vinculado ao chat, é uma consulta ao conjunto de
+    equipamentos da identidade em cache (sem acesso ao banco).
     """
+    if usuario.telegram_chat_id:
+        identidade = obter_identidade(usuario.telegram_chat_id)
+        if identidade is not None and identidade.tipo == tipo_usuario and identidade.id == usuario.id:
+            return identidade.tem_acesso(equipamento_id)
+
     try:
         equipamento = Equipamento.objects.get(id=equipamento_id, ativo=True)
 
@@ -261,25 +299,47 @@ def criar_checklist_realizado(modelo, equipamento, usuario, tipo_usuario='operad
 
 @sync_to_async
 def get_itens_modelo(modelo):
-    return list(modelo.itens.all().order_by('ordem'))
+    """Itens do modelo como dicts (guardados na conversa; sem nova consulta por mensagem)"""
+    return [
+        {
+            'id': item.id,
+            'pergunta': item.pergunta,
+            'categoria': item.get_categoria_display(),
+            'descricao_ajuda': item.descricao_ajuda or '',
+        }
+        for item in modelo.itens.all().order_by('ordem')
+    ]
 
 
-@sync_to_async
-def criar_resposta_item(checklist, item, resposta):
-    return RespostaItemChecklist.objects.create(
-        checklist=checklist,
-        item=item,
-        resposta=resposta
+def _gravar_respostas(checklist_id, respostas):
+    # ignore_conflicts: uma resposta já gravada num checkpoint anterior não duplica (checklist, item)
+    RespostaItemChecklist.objects.bulk_create(
+        [
+            RespostaItemChecklist(checklist_id=checklist_id, item_id=item_id, resposta=resposta)
+            for item_id, resposta in respostas
+        ],
+        ignore_conflicts=True,
     )
 
 
 @sync_to_async
-def finalizar_checklist_db(checklist):
-    checklist.finalizar()
-    checklist.refresh_from_db()
+def gravar_respostas(checklist_id, respostas):
+    """Checkpoint: grava as respostas acumuladas na conversa"""
+    _gravar_respostas(checklist_id, respostas)
+
+
+@sync_to_async
+def finalizar_checklist_db(checklist_id, respostas, contagem):
+    """
+    Grava as respostas pendentes e finaliza o checklist numa transação.
+    O resultado vem da contagem acumulada na conversa (sem recontar no banco).
+    """
+    with transaction.atomic():
+        _gravar_respostas(checklist_id, respostas)
+        checklist = ChecklistRealizado.objects.select_related('equipamento', 'modelo').get(id=checklist_id)
+        checklist.finalizar(contagem)
     # Retornar dados necessários para evitar acesso síncrono depois
     return {
-        'checklist': checklist,
         'equipamento_codigo': checklist.equipamento.codigo,
         'data_hora_fim': checklist.data_hora_fim,
         'resultado_geral': checklist.resultado_geral,
@@ -287,21 +347,37 @@ def finalizar_checklist_db(checklist):
     }
 
 
-@sync_to_async
-def get_respostas_checklist(checklist):
-    respostas = checklist.respostas.all()
+def estatisticas_respostas(contagem):
     return {
-        'total': respostas.count(),
-        'conformes': respostas.filter(resposta='CONFORME').count(),
-        'nao_conformes': respostas.filter(resposta='NAO_CONFORME').count(),
-        'nao_aplicaveis': respostas.filter(resposta='NA').count(),
+        'total': sum(contagem.values()),
+        'conformes': contagem.get('CONFORME', 0),
+        'nao_conformes': contagem.get('NAO_CONFORME', 0),
+        'nao_aplicaveis': contagem.get('NA', 0),
     }
 
 
 @sync_to_async
-def cancelar_checklist_db(checklist):
-    checklist.status = 'CANCELADO'
-    checklist.save()
+def cancelar_checklist_db(checklist_id, respostas):
+    with transaction.atomic():
+        _gravar_respostas(checklist_id, respostas)
+        checklist = ChecklistRealizado.objects.get(id=checklist_id)
+        checklist.status = 'CANCELADO'
+        checklist.save()
+
+
+def iniciar_respostas(context):
+    """Zera o acumulado de respostas do checklist na conversa"""
+    context.user_data['respostas_pendentes'] = []
+    context.user_data['contagem_respostas'] = {}
+
+
+async def gravar_checkpoint_checklist(context):
+    """Grava as respostas pendentes do checklist em andamento (se houver)"""
+    pendentes = context.user_data.get('respostas_pendentes')
+    checklist_id = context.user_data.get('checklist_id')
+    if pendentes and checklist_id:
+        await gravar_respostas(checklist_id, pendentes)
+        pendentes.clear()
 
 
 @sync_to_async
@@ -769,6 +845,8 @@ async def confirmar_cpf(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def cancelar(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Cancela a operação atual"""
+    # Respostas já dadas num checklist interrompido continuam registradas
+    await gravar_checkpoint_checklist(context)
     await update.message.reply_text(
         "Operação cancelada.\n\n"
         "Use /start para ver os comandos disponíveis."
@@ -838,11 +916,9 @@ async def checklist_inicio(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         usuario, tipo_usuario = await get_usuario_by_chat_id(chat_id)
 
-        # Armazenar usuário e tipo no contexto
-        context.user_data['usuario'] = usuario
+        # Armazenar usuário e tipo no contexto (apenas ids: o estado é persistido)
+        context.user_data['usuario_id'] = usuario.id
         context.user_data['tipo_usuario'] = tipo_usuario
-        # Manter compatibilidade com código antigo que usa 'operador'
-        context.user_data['operador'] = usuario
 
         await update.message.reply_text(
             "📋 *Realizar Checklist NR12*\n\n"
@@ -864,12 +940,13 @@ async def checklist_inicio(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def checklist_equipamento(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Processa o código do equipamento"""
     codigo = update.message.text.strip()
-    usuario = context.user_data.get('usuario') or context.user_data.get('operador')
+    usuario_id = context.user_data.get('usuario_id')
     tipo_usuario = context.user_data.get('tipo_usuario', 'operador')
 
-    if not usuario:
+    if not usuario_id:
         await update.message.reply_text("Erro: sessão expirada. Use /checklist para começar novamente.")
         return ConversationHandler.END
+    usuario = await get_usuario_by_id(usuario_id, tipo_usuario)
 
     # Buscar equipamento pelo código ou QR payload
     try:
@@ -903,7 +980,7 @@ async def checklist_equipamento(update: Update, context: ContextTypes.DEFAULT_TY
         return ConversationHandler.END
 
     # Armazenar equipamento no contexto
-    context.user_data['equipamento'] = equipamento
+    context.user_data['equipamento'] = estado_equipamento(equipamento)
 
     # Buscar template de checklist do equipamento
     try:
@@ -916,14 +993,18 @@ async def checklist_equipamento(update: Update, context: ContextTypes.DEFAULT_TY
             )
             return ConversationHandler.END
 
-        context.user_data['modelo'] = modelo
+        context.user_data['modelo_id'] = modelo.id
+
+        # Checklist anterior interrompido: preserva as respostas já dadas
+        await gravar_checkpoint_checklist(context)
 
         # Criar o checklist realizado
         checklist = await criar_checklist_realizado(modelo, equipamento, usuario, tipo_usuario)
 
-        context.user_data['checklist'] = checklist
+        context.user_data['checklist_id'] = checklist.id
         context.user_data['itens'] = await get_itens_modelo(modelo)
         context.user_data['item_index'] = 0
+        iniciar_respostas(context)
 
         # Enviar primeira pergunta
         return await enviar_proxima_pergunta(update, context)
@@ -956,14 +1037,14 @@ async def enviar_proxima_pergunta(update: Update, context: ContextTypes.DEFAULT_
     reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
 
     texto = (
-        f"📋 Checklist: {equipamento.codigo}\n\n"
+        f"📋 Checklist: {equipamento['codigo']}\n\n"
         f"Item {item_index + 1}/{len(itens)}:\n\n"
-        f"*{item.pergunta}*\n\n"
-        f"Categoria: {item.get_categoria_display()}"
+        f"*{item['pergunta']}*\n\n"
+        f"Categoria: {item['categoria']}"
     )
 
-    if item.descricao_ajuda:
-        texto += f"\n\n💡 {item.descricao_ajuda}"
+    if item['descricao_ajuda']:
+        texto += f"\n\n💡 {item['descricao_ajuda']}"
 
     await update.message.reply_text(texto, reply_markup=reply_markup, parse_mode='Markdown')
 
@@ -991,14 +1072,14 @@ async def enviar_proxima_pergunta_callback(chat_id: int, context: ContextTypes.D
     reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
 
     texto = (
-        f"📋 Checklist: {equipamento.codigo}\n\n"
+        f"📋 Checklist: {equipamento['codigo']}\n\n"
         f"Item {item_index + 1}/{len(itens)}:\n\n"
-        f"*{item.pergunta}*\n\n"
-        f"Categoria: {item.get_categoria_display()}"
+        f"*{item['pergunta']}*\n\n"
+        f"Categoria: {item['categoria']}"
     )
 
-    if item.descricao_ajuda:
-        texto += f"\n\n💡 {item.descricao_ajuda}"
+    if item['descricao_ajuda']:
+        texto += f"\n\n💡 {item['descricao_ajuda']}"
 
     await context.bot.send_message(
         chat_id=chat_id,
@@ -1016,9 +1097,9 @@ async def processar_resposta_checklist(update: Update, context: ContextTypes.DEF
     logger.info(f"[PROCESSAR_CHECKLIST] user_data keys: {list(context.user_data.keys())}")
 
     if resposta == "🚫 Cancelar":
-        checklist = context.user_data.get('checklist')
-        if checklist:
-            await cancelar_checklist_db(checklist)
+        checklist_id = context.user_data.get('checklist_id')
+        if checklist_id:
+            await cancelar_checklist_db(checklist_id, context.user_data.get('respostas_pendentes', []))
 
         await update.message.reply_text(
             "Checklist cancelado.",
@@ -1042,9 +1123,9 @@ async def processar_resposta_checklist(update: Update, context: ContextTypes.DEF
     # Salvar resposta
     itens = context.user_data.get('itens', [])
     item_index = context.user_data.get('item_index', 0)
-    checklist = context.user_data.get('checklist')
+    checklist_id = context.user_data.get('checklist_id')
 
-    logger.info(f"[PROCESSAR_CHECKLIST] Itens: {len(itens)}, Index: {item_index}, Checklist: {checklist}")
+    logger.info(f"[PROCESSAR_CHECKLIST] Itens: {len(itens)}, Index: {item_index}, Checklist: {checklist_id}")
 
     if not itens:
         logger.error(f"[PROCESSAR_CHECKLIST] ERRO: Lista de itens vazia!")
@@ -1063,30 +1144,39 @@ async def processar_resposta_checklist(update: Update, context: ContextTypes.DEF
         return ConversationHandler.END
 
     item = itens[item_index]
-    # Não acessar atributos do item aqui - pode causar query síncrona
     logger.info(f"[PROCESSAR_CHECKLIST] Processando item index {item_index}")
 
-    await criar_resposta_item(checklist, item, conformidade)
+    # Acumula na conversa; gravado na finalização (e a cada checkpoint)
+    context.user_data.setdefault('respostas_pendentes', []).append([item['id'], conformidade])
+    contagem = context.user_data.setdefault('contagem_respostas', {})
+    contagem[conformidade] = contagem.get(conformidade, 0) + 1
 
     # Avançar para próximo item
     context.user_data['item_index'] = item_index + 1
 
+    # Checkpoint periódico: limita o que se perde se o estado da conversa sumir
+    checkpoint = getattr(settings, 'BOT_CHECKLIST_CHECKPOINT', 10)
+    pendentes = context.user_data['respostas_pendentes']
+    if checkpoint and len(pendentes) >= checkpoint and item_index + 1 < len(itens):
+        await gravar_checkpoint_checklist(context)
+
     return await enviar_proxima_pergunta(update, context)
 
 
 async def finalizar_checklist(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Finaliza o checklist e calcula o resultado"""
-    checklist = context.user_data.get('checklist')
+    checklist_id = context.user_data.get('checklist_id')
 
-    if not checklist:
+    if not checklist_id:
         await update.message.reply_text("Erro ao finalizar checklist.")
         return ConversationHandler.END
 
     # Finalizar checklist (usa o método do modelo que calcula tudo)
-    dados = await finalizar_checklist_db(checklist)
+    contagem = context.user_data.get('contagem_respostas', {})
+    dados = await finalizar_checklist_db(checklist_id, context.user_data.get('respostas_pendentes', []), contagem)
 
     # Calcular estatísticas
-    stats = await get_respostas_checklist(dados['checklist'])
+    stats = estatisticas_respostas(contagem)
 
     # Enviar resultado
     emoji_resultado = {
@@ -1121,17 +1211,18 @@ async def finalizar_checklist(update: Update, context: ContextTypes.DEFAULT_TYPE
 
 async def finalizar_checklist_callback(chat_id: int, context: ContextTypes.DEFAULT_TYPE):
     """Finaliza o checklist e calcula o resultado (versão para callback)"""
-    checklist = context.user_data.get('checklist')
+    checklist_id = context.user_data.get('checklist_id')
 
-    if not checklist:
+    if not checklist_id:
         await context.bot.send_message(chat_id, "Erro ao finalizar checklist.")
         return
 
     # Finalizar checklist
-    checklist = await finalizar_checklist_db(checklist)
+    contagem = context.user_data.get('contagem_respostas', {})
+    dados = await finalizar_checklist_db(checklist_id, context.user_data.get('respostas_pendentes', []), contagem)
 
     # Calcular estatísticas
-    stats = await get_respostas_checklist(checklist)
+    stats = estatisticas_respostas(contagem)
 
     # Enviar resultado
     emoji_resultado = {
@@ -1142,9 +1233,9 @@ async def finalizar_checklist_callback(chat_id: int, context: ContextTypes.DEFAU
 
     texto = (
         f"📋 *Checklist Concluído!*\n\n"
-        f"Equipamento: {checklist.equipamento.codigo}\n"
-        f"Data: {checklist.data_hora_fim.strftime('%d/%m/%Y %H:%M')}\n\n"
-        f"*Resultado: {emoji_resultado.get(checklist.resultado_geral, '?')} {checklist.get_resultado_geral_display()}*\n\n"
+        f"Equipamento: {dados['equipamento_codigo']}\n"
+        f"Data: {dados['data_hora_fim'].strftime('%d/%m/%Y %H:%M')}\n\n"
+        f"*Resultado: {emoji_resultado.get(dados['resultado_geral'], '?')} {dados['resultado_geral_display']}*\n\n"
         f"Total de itens: {stats['total']}\n"
         f"✅ Conformes: {stats['conformes']}\n"
         f"❌ Não conformes: {stats['nao_conformes']}\n"
@@ -1255,7 +1346,7 @@ async def abastecimento_inicio(update: Update, context: ContextTypes.DEFAULT_TYP
 
     try:
         operador = await get_operador_by_chat_id(chat_id)
-        context.user_data['operador'] = operador
+        context.user_data['operador_id'] = operador.id
 
         await update.message.reply_text(
             "⛽ *Registrar Abastecimento*\n\n"
@@ -1290,8 +1381,8 @@ async def abastecimento_via_callback(equipamento_id: int, chat_id: int, context:
             return
 
         # Armazenar no contexto
-        context.user_data['operador'] = operador
-        context.user_data['equipamento_abast'] = equipamento
+        context.user_data['operador_id'] = operador.id
+        context.user_data['equipamento_abast'] = estado_equipamento(equipamento)
 
         # Buscar último abastecimento para sugestão
         ultimo = await get_ultimo_abastecimento(equipamento_id)
@@ -1341,20 +1432,21 @@ async def abastecimento_leitura(update: Update, context: ContextTypes.DEFAULT_TY
             return AGUARDANDO_ABAST_LEITURA
 
         equipamento = context.user_data.get('equipamento_abast')
+        leitura_atual = Decimal(equipamento['leitura_atual'])
 
         # Validar se leitura não é menor que a última
-        if leitura < equipamento.leitura_atual:
+        if leitura < leitura_atual:
             await update.message.reply_text(
                 f"⚠️ *Atenção!*\n\n"
-                f"A leitura informada ({leitura}) é MENOR que a última registrada ({equipamento.leitura_atual}).\n\n"
+                f"A leitura informada ({leitura}) é MENOR que a última registrada ({leitura_atual}).\n\n"
                 f"Tem certeza? Digite a leitura novamente para confirmar, ou envie /cancelar.",
                 parse_mode='Markdown'
             )
 
-        context.user_data['abast_leitura'] = leitura
+        context.user_data['abast_leitura'] = str(leitura)
 
         await update.message.reply_text(
-            f"✅ Leitura: *{leitura}* {equipamento.get_tipo_medicao_display()}\n\n"
+            f"✅ Leitura: *{leitura}* {equipamento['tipo_medicao_display']}\n\n"
             f"Agora, digite a quantidade de litros abastecidos:",
             parse_mode='Markdown'
         )
@@ -1391,7 +1483,7 @@ async def abastecimento_litros(update: Update, context: ContextTypes.DEFAULT_TYP
             )
             return AGUARDANDO_ABAST_LITROS
 
-        context.user_data['abast_litros'] = litros
+        context.user_data['abast_litros'] = str(litros)
 
         await update.message.reply_text(
             f"✅ Quantidade: *{litros}L*\n\n"
@@ -1422,10 +1514,10 @@ async def abastecimento_valor(update: Update, context: ContextTypes.DEFAULT_TYPE
             )
             return AGUARDANDO_ABAST_VALOR
 
-        context.user_data['abast_valor'] = valor
+        context.user_data['abast_valor'] = str(valor)
 
         # Calcular valor por litro
-        litros = context.user_data['abast_litros']
+        litros = Decimal(context.user_data['abast_litros'])
         valor_litro = valor / litros
 
         # Teclado para escolher tipo de combustível
@@ -1487,14 +1579,14 @@ async def abastecimento_tipo(update: Update, context: ContextTypes.DEFAULT_TYPE)
     # Registrar abastecimento
     try:
         equipamento = context.user_data['equipamento_abast']
-        operador = context.user_data['operador']
-        leitura = context.user_data['abast_leitura']
-        litros = context.user_data['abast_litros']
-        valor = context.user_data['abast_valor']
+        operador_id = context.user_data['operador_id']
+        leitura = Decimal(context.user_data['abast_leitura'])
+        litros = Decimal(context.user_data['abast_litros'])
+        valor = Decimal(context.user_data['abast_valor'])
 
         abastecimento = await criar_abastecimento(
-            equipamento.id,
-            operador.id,
+            equipamento['id'],
+            operador_id,
             leitura,
             litros,
             valor,
@@ -1505,8 +1597,8 @@ async def abastecimento_tipo(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
         await update.message.reply_text(
             f"✅ *Abastecimento Registrado!*\n\n"
-            f"🚗 Equipamento: {equipamento.codigo}\n"
-            f"📊 Leitura: {leitura} {equipamento.get_tipo_medicao_display()}\n"
+            f"🚗 Equipamento: {equipamento['codigo']}\n"
+            f"📊 Leitura: {leitura} {equipamento['tipo_medicao_display']}\n"
             f"⛽ Combustível: {abastecimento.get_tipo_combustivel_display()}\n"
             f"📦 Quantidade: {litros}L\n"
             f"💰 Valor total: R$ {valor:.2f}\n"
@@ -1547,7 +1639,7 @@ async def manutencao_horimetro(update: Update, context: ContextTypes.DEFAULT_TYP
             )
             return AGUARDANDO_MANUT_HORIMETRO
 
-        context.user_data['manut_horimetro'] = horimetro
+        context.user_data['manut_horimetro'] = str(horimetro)
 
         await update.message.reply_text(
             f"✅ Horímetro: *{horimetro}*\n\n"
@@ -1622,7 +1714,7 @@ async def finalizar_manutencao(update: Update, context: ContextTypes.DEFAULT_TYP
 
         equipamento_id = context.user_data['manut_equipamento_id']
         tipo = context.user_data['manut_tipo']
-        horimetro = context.user_data['manut_horimetro']
+        horimetro = Decimal(context.user_data['manut_horimetro'])
         descricao = context.user_data['manut_descricao']
         observacoes = context.user_data.get('manut_observacoes', '')
 
@@ -1839,18 +1931,21 @@ async def callback_checklist_equipamento(update: Update, context: ContextTypes.D
             )
             return ConversationHandler.END
 
-        # Armazenar no contexto
-        context.user_data['usuario'] = usuario
+        # Armazenar no contexto (apenas ids e campos simples: o estado é persistido)
+        context.user_data['usuario_id'] = usuario.id
         context.user_data['tipo_usuario'] = tipo_usuario
-        context.user_data['operador'] = usuario  # compatibilidade
-        context.user_data['equipamento'] = equipamento
-        context.user_data['modelo'] = modelo
+        context.user_data['equipamento'] = estado_equipamento(equipamento)
+        context.user_data['modelo_id'] = modelo.id
+
+        # Checklist anterior interrompido: preserva as respostas já dadas
+        await gravar_checkpoint_checklist(context)
 
         # Criar checklist
         checklist = await criar_checklist_realizado(modelo, equipamento, usuario, tipo_usuario)
-        context.user_data['checklist'] = checklist
+        context.user_data['checklist_id'] = checklist.id
         context.user_data['itens'] = await get_itens_modelo(modelo)
         context.user_data['item_index'] = 0
+        iniciar_respostas(context)
 
         logger.info(f"[CALLBACK_CHECKLIST] Checklist criado - ID: {checklist.id}, Itens: {len(context.user_data['itens'])}")
 
@@ -2819,33 +2914,28 @@ async def callback_query_handler(update: Update, context: ContextTypes.DEFAULT_T
             ]
             reply_markup = InlineKeyboardMarkup(keyboard)
 
-            if equipamento.qr_code:
-                # Enviar o QR code como imagem
-                texto = f"📍 *QR Code - {equipamento.codigo}*\n\n{equipamento.descricao or equipamento.modelo}"
-
-                # Deletar mensagem anterior
-                await query.message.delete()
+            # Mesmo PNG de equipamento_qr_view, do cache do processo (não depende do arquivo salvo)
+            from core.qr_utils import qr_etag, render_qr_png
+            bottom_text = f"{equipamento.codigo} - {equipamento.descricao or equipamento.modelo}"
+            etag = qr_etag(equipamento.qr_payload, top_text="MANDACARU S M", bottom_text=bottom_text)
+            texto = f"📍 *QR Code - {equipamento.codigo}*\n\n{equipamento.descricao or equipamento.modelo}"
 
-                # Enviar QR code como foto
-                from django.conf import settings
-                import os
-                qr_path = os.path.join(settings.MEDIA_ROOT, equipamento.qr_code.name)
+            # Deletar mensagem anterior
+            await query.message.delete()
 
-                with open(qr_path, 'rb') as photo:
-                    await context.bot.send_photo(
-                        chat_id=chat_id,
-                        photo=photo,
-                        caption=texto,
-                        reply_markup=reply_markup,
-                        parse_mode='Markdown'
-                    )
-            else:
-                texto = (
-                    f"📍 *QR Code - {equipamento.codigo}*\n\n"
-                    f"❌ QR Code não disponível para este equipamento.\n\n"
-                    f"Entre em contato com o supervisor."
-                )
-                await query.edit_message_text(texto, reply_markup=reply_markup, parse_mode='Markdown')
+            # Reenvia pelo file_id do Telegram quando a imagem não mudou (sem novo upload)
+            photo = _file_id_qr(etag) or render_qr_png(
+                equipamento.qr_payload, top_text="MANDACARU S M", bottom_text=bottom_text
+            )
+            mensagem = await context.bot.send_photo(
+                chat_id=chat_id,
+                photo=photo,
+                caption=texto,
+                reply_markup=reply_markup,
+                parse_mode='Markdown'
+            )
+            if mensagem.photo:
+                _guardar_file_id_qr(etag, mensagem.photo[-1].file_id)
 
         except Exception as e:
             logger.error(f"[ERRO] Ao buscar QR code: {e}")
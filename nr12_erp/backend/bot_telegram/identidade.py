@@ -0,0 +1,123 @@
+# backend/bot_telegram/identidade.py
+"""
+Identidade de quem conversa com o bot, a partir do chat_id do Telegram.
+
+IdentidadeBot reúne o tipo (operador, supervisor ou técnico), o id e os ids
+dos equipamentos ativos que o usuário pode acessar. É resolvida com uma
+única consulta (UNION das três tabelas de usuário e dos caminhos de
+autorização) e guardada em memória por BOT_IDENTIDADE_TTL segundos.
+
+O cache é do processo: os signals (bot_telegram/signals.py) o invalidam
+quando o vínculo do Telegram ou as autorizações mudam neste processo; em
+outros workers a mudança vale ao fim do TTL.
+
+Regras de acesso (as mesmas de handlers.tem_acesso_equipamento):
+- Operador: equipamentos autorizados (OperadorEquipamento).
+- Supervisor: equipamentos dos empreendimentos vinculados (M2M) ou dos
+  empreendimentos onde é o supervisor (FK).
+- Técnico: equipamentos dos clientes vinculados ou dos empreendimentos
+  vinculados.
+"""
+import threading
+import time
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db.models import CharField, IntegerField, Value
+from django.db.models.functions import Cast
+
+TIPOS = ('operador', 'supervisor', 'tecnico')  # em ordem de precedência
+
+
+@dataclass(frozen=True)
+class IdentidadeBot:
+    tipo: str
+    id: int
+    equipamentos_ids: frozenset = field(default_factory=frozenset)
+
+    def tem_acesso(self, equipamento_id):
+        return int(equipamento_id) in self.equipamentos_ids
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _consulta(chat_id):
+    from core.models import Operador, Supervisor
+    from equipamentos.models import Equipamento
+    from tecnicos.models import Tecnico
+
+    def usuarios(modelo, tipo):
+        return modelo.objects.filter(telegram_chat_id=chat_id).order_by().values_list(
+            Value(tipo, output_field=CharField()), 'id', Cast(Value(None), IntegerField())
+        )
+
+    def equipamentos(tipo, caminho):
+        return Equipamento.objects.filter(
+            ativo=True, **{f'{caminho}__telegram_chat_id': chat_id}
+        ).order_by().values_list(Value(tipo, output_field=CharField()), f'{caminho}__id', 'id')
+
+    return usuarios(Operador, 'operador').union(
+        usuarios(Supervisor, 'supervisor'),
+        usuarios(Tecnico, 'tecnico'),
+        equipamentos('operador', 'operadores_autorizados'),
+        equipamentos('supervisor', 'empreendimento__supervisores_vinculados'),
+        equipamentos('supervisor', 'empreendimento__supervisor'),
+        equipamentos('tecnico', 'cliente__tecnicos'),
+        equipamentos('tecnico', 'empreendimento__tecnicos_vinculados'),
+        all=True,
+    )
+
+
+def resolver_identidade(chat_id):
+    """Consulta o banco (sem cache). None se o chat não estiver vinculado."""
+    encontrados = {}
+    equipamentos = {}
+    for tipo, usuario_id, equipamento_id in _consulta(str(chat_id)):
+        if equipamento_id is None:
+            encontrados.setdefault(tipo, usuario_id)
+        else:
+            equipamentos.setdefault((tipo, usuario_id), set()).add(equipamento_id)
+
+    for tipo in TIPOS:
+        if tipo in encontrados:
+            usuario_id = encontrados[tipo]
+            return IdentidadeBot(tipo, usuario_id, frozenset(equipamentos.get((tipo, usuario_id), ())))
+    return None
+
+
+def obter_identidade(chat_id):
+    """Identidade do chat: do cache do processo (TTL) ou resolvida agora."""
+    chave = str(chat_id)
+    ttl = getattr(settings, 'BOT_IDENTIDADE_TTL', 60)
+    agora = time.monotonic()
+    with _cache_lock:
+        entrada = _cache.get(chave)
+    if entrada is not None and entrada[0] > agora:
+        return entrada[1]
+
+    identidade = resolver_identidade(chave)
+    if ttl:
+        with _cache_lock:
+            _cache[chave] = (agora + ttl, identidade)
+    return identidade
+
+
+def invalidar_identidade(*chat_ids, tipo=None, usuario_id=None):
+    """
+    Descarta identidades em cache: pelos chat_ids e/ou pelo usuário
+    (tipo + id, cobre o chat antigo depois de desvincular). Sem
+    argumentos, limpa tudo.
+    """
+    with _cache_lock:
+        if not chat_ids and tipo is None:
+            _cache.clear()
+            return
+        for chat_id in chat_ids:
+            if chat_id:
+                _cache.pop(str(chat_id), None)
+        if tipo is not None:
+            for chave, (_, identidade) in list(_cache.items()):
+                if identidade is not None and identidade.tipo == tipo and identidade.id == usuario_id:
+                    del _cache[chave]
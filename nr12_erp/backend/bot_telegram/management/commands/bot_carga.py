@@ -0,0 +1,158 @@
+"""
+Teste de carga do bot: reexecuta updates gravados (JSON) no runtime do
+webhook (bot_telegram/runtime.py) e mede a latência de processamento.
+
+Grave updates reais com BOT_GRAVAR_UPDATES=/caminho/updates.jsonl (um JSON
+por linha, como recebidos no webhook) e reexecute com este comando. Os
+handlers rodam de verdade contra o banco configurado: use uma base de
+desenvolvimento/homologação. Com --offline as chamadas à API do Telegram
+são respondidas localmente (com --latencia-api simulando o tempo de rede).
+
+Uso:
+    python manage.py bot_carga updates.jsonl --offline
+    python manage.py bot_carga updates.jsonl --offline --multiplicar 100 --concorrencia 32
+    python manage.py bot_carga updates.jsonl --offline --latencia-api 80 --json
+"""
+import asyncio
+import copy
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from telegram.request import BaseRequest
+
+from bot_telegram.bot import criar_bot
+from bot_telegram.runtime import BotRuntime
+
+DESLOCAMENTO_CHAT = 10 ** 9
+
+
+class RequestOffline(BaseRequest):
+    """Responde às chamadas da API do Telegram sem rede."""
+
+    def __init__(self, latencia_ms=0):
+        self.latencia = latencia_ms / 1000
+        self.chamadas = 0
+        self._mensagem_id = 0
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    @property
+    def read_timeout(self):
+        return None
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+        self.chamadas += 1
+        metodo = url.rsplit('/', 1)[-1]
+        parametros = request_data.parameters if request_data else {}
+
+        if metodo == 'getMe':
+            resultado = {'id': 1, 'is_bot': True, 'first_name': 'Bot', 'username': 'bot_carga'}
+        elif metodo.startswith(('send', 'edit')):
+            self._mensagem_id += 1
+            resultado = {
+                'message_id': self._mensagem_id,
+                'date': int(time.time()),
+                'chat': {'id': int(parametros.get('chat_id') or 0), 'type': 'private'},
+            }
+            if metodo == 'sendPhoto':
+                arquivo = f'offline-{self._mensagem_id}'
+                resultado['photo'] = [{'file_id': arquivo, 'file_unique_id': arquivo, 'width': 1, 'height': 1}]
+        else:
+            resultado = True
+        return 200, json.dumps({'ok': True, 'result': resultado}).encode()
+
+
+def _deslocar_ids(dados, deslocamento):
+    """Copia o update trocando chat/usuário, simulando outro operador."""
+    dados = copy.deepcopy(dados)
+    pilha = [dados]
+    while pilha:
+        item = pilha.pop()
+        if isinstance(item, dict):
+            for chave in ('chat', 'from'):
+                if isinstance(item.get(chave), dict) and 'id' in item[chave]:
+                    item[chave]['id'] += deslocamento
+            pilha.extend(item.values())
+        elif isinstance(item, list):
+            pilha.extend(item)
+    return dados
+
+
+def _percentil(ordenados, p):
+    return ordenados[min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))]
+
+
+class Command(BaseCommand):
+    help = 'Reexecuta updates gravados do Telegram e mede a latência (p50/p95) do runtime do bot'
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help='Arquivo .jsonl com um update por linha')
+        parser.add_argument('--offline', action='store_true', help='Não chama a API do Telegram')
+        parser.add_argument('--latencia-api', type=float, default=0, help='Com --offline: ms por chamada à API')
+        parser.add_argument('--multiplicar', type=int, default=1,
+                            help='Repete o arquivo N vezes com chats distintos (simula N operadores)')
+        parser.add_argument('--concorrencia', type=int, default=16, help='Updates processados ao mesmo tempo')
+        parser.add_argument('--json', action='store_true', help='Imprime o resultado em JSON')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['arquivo'], encoding='utf-8') as arquivo:
+                gravados = [json.loads(linha) for linha in arquivo if linha.strip()]
+        except (OSError, json.JSONDecodeError) as e:
+            raise CommandError(f'Não foi possível ler os updates: {e}')
+        if not gravados:
+            raise CommandError('Nenhum update no arquivo')
+
+        updates = []
+        for k in range(options['multiplicar']):
+            updates.extend(_deslocar_ids(u, k * DESLOCAMENTO_CHAT) if k else u for u in gravados)
+
+        request = RequestOffline(options['latencia_api']) if options['offline'] else None
+        runtime = BotRuntime(
+            fabrica=(lambda: criar_bot(token='0:offline', request=request)) if request else None,
+            max_concorrencia=options['concorrencia'],
+            max_fila=len(updates),
+        )
+        runtime.iniciar()
+        try:
+            inicio = time.perf_counter()
+            futuros = [runtime.submeter(u) for u in updates]
+            latencias, erros = [], 0
+            for futuro in futuros:
+                try:
+                    latencias.append(futuro.result() * 1000)
+                except Exception:
+                    erros += 1
+            duracao = time.perf_counter() - inicio
+        finally:
+            runtime.parar()
+
+        latencias.sort()
+        resultado = {
+            'updates': len(updates),
+            'erros': erros,
+            'duracao_s': round(duracao, 3),
+            'updates_por_s': round(len(updates) / duracao, 1) if duracao else None,
+            'p50_ms': round(_percentil(latencias, 50), 1) if latencias else None,
+            'p95_ms': round(_percentil(latencias, 95), 1) if latencias else None,
+            'max_ms': round(latencias[-1], 1) if latencias else None,
+            'chamadas_api': request.chamadas if request else None,
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(resultado, indent=2))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['updates']} updates em {resultado['duracao_s']}s "
+            f"({resultado['updates_por_s']}/s), {erros} erros"
+        ))
+        self.stdout.write(
+            f"latência: p50={resultado['p50_ms']}ms p95={resultado['p95_ms']}ms max={resultado['max_ms']}ms"
+        )
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:27
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadoConversa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('USUARIO', 'Dados do usuário'), ('CONVERSA', 'Estado de conversa')], max_length=10)),
+                ('chave', models.CharField(max_length=200)),
+                ('dados', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Estado de Conversa do Bot',
+                'verbose_name_plural': 'Estados de Conversa do Bot',
+                'constraints': [models.UniqueConstraint(fields=('tipo', 'chave'), name='unique_estado_conversa')],
+            },
+        ),
+    ]
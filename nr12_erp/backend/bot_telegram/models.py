@@ -1,3 +1,29 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
-# Create your models here.
+
+class EstadoConversa(models.Model):
+    """
+    Estado persistido das conversas do bot (bot_telegram/persistencia.py):
+    user_data de cada usuário e o estado de cada ConversationHandler.
+    Permite vários workers do webhook e sobrevive a redeploys.
+    """
+    TIPO_CHOICES = [
+        ('USUARIO', 'Dados do usuário'),
+        ('CONVERSA', 'Estado de conversa'),
+    ]
+
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    chave = models.CharField(max_length=200)
+    dados = models.JSONField(encoder=DjangoJSONEncoder)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Estado de Conversa do Bot'
+        verbose_name_plural = 'Estados de Conversa do Bot'
+        constraints = [
+            models.UniqueConstraint(fields=['tipo', 'chave'], name='unique_estado_conversa'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} {self.chave}"
@@ -0,0 +1,197 @@
+# backend/bot_telegram/persistencia.py
+"""
+Persistência do estado das conversas do bot (interface BasePersistence do PTB).
+
+Guarda o user_data de cada usuário e o estado de cada ConversationHandler
+fora do processo, para que vários workers do webhook compartilhem as
+conversas e um redeploy não perca checklists pela metade. O user_data só
+contém ids e campos primitivos (ver handlers.estado_equipamento e
+get_itens_modelo), serializados em JSON.
+
+Armazenamentos (BOT_PERSISTENCIA):
+- "db" (padrão): tabela EstadoConversa.
+- "redis": um hash por tipo no REDIS_URL (requer o pacote "redis").
+- "": sem persistência (estado só em memória, como antes).
+
+Antes de cada update o runtime recarrega o estado daquele chat/usuário
+(sincronizar) e depois grava o que mudou (Application.update_persistence).
+"""
+import json
+import logging
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from telegram.ext import BasePersistence, ConversationHandler, PersistenceInput
+
+from .banco import sync_to_async
+
+logger = logging.getLogger(__name__)
+
+USUARIO = 'USUARIO'
+CONVERSA = 'CONVERSA'
+
+
+def chave_conversa(nome, chave):
+    return f"{nome}:{json.dumps(list(chave))}"
+
+
+class ArmazenamentoBanco:
+    """Estado em EstadoConversa (uma linha por usuário/conversa ativa)."""
+
+    def carregar(self, tipo, prefixo=''):
+        from .models import EstadoConversa
+        return dict(
+            EstadoConversa.objects.filter(tipo=tipo, chave__startswith=prefixo).values_list('chave', 'dados')
+        )
+
+    def obter_varios(self, tipo, chaves):
+        from .models import EstadoConversa
+        return dict(
+            EstadoConversa.objects.filter(tipo=tipo, chave__in=chaves).values_list('chave', 'dados')
+        )
+
+    def salvar(self, tipo, chave, dados):
+        """Grava o estado; None ou vazio remove a linha (conversa encerrada)."""
+        from .models import EstadoConversa
+        if dados is None or dados == {}:
+            EstadoConversa.objects.filter(tipo=tipo, chave=chave).delete()
+        else:
+            EstadoConversa.objects.update_or_create(tipo=tipo, chave=chave, defaults={'dados': dados})
+
+
+class ArmazenamentoRedis:
+    """Estado em hashes do Redis: <prefixo>:<tipo> -> {chave: json}."""
+
+    def __init__(self, url, prefixo='nr12:bot'):
+        import redis
+        self._redis = redis.Redis.from_url(url)
+        self._prefixo = prefixo
+
+    def _hash(self, tipo):
+        return f"{self._prefixo}:{tipo}"
+
+    def carregar(self, tipo, prefixo=''):
+        return {
+            chave.decode(): json.loads(valor)
+            for chave, valor in self._redis.hgetall(self._hash(tipo)).items()
+            if chave.decode().startswith(prefixo)
+        }
+
+    def obter_varios(self, tipo, chaves):
+        if not chaves:
+            return {}
+        valores = self._redis.hmget(self._hash(tipo), chaves)
+        return {chave: json.loads(valor) for chave, valor in zip(chaves, valores) if valor is not None}
+
+    def salvar(self, tipo, chave, dados):
+        if dados is None or dados == {}:
+            self._redis.hdel(self._hash(tipo), chave)
+        else:
+            self._redis.hset(self._hash(tipo), chave, json.dumps(dados, cls=DjangoJSONEncoder))
+
+
+class PersistenciaBot(BasePersistence):
+    """BasePersistence com user_data e conversas; bot_data/chat_data/callback_data não são usados."""
+
+    def __init__(self, armazenamento, update_interval=10):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        self.armazenamento = armazenamento
+
+    async def _executar(self, metodo, *args):
+        """Acesso ao armazenamento no pool do bot, com as conexões gerenciadas (bot_telegram/banco.py)."""
+        return await sync_to_async(metodo)(*args)
+
+    # --- user_data ---
+    async def get_user_data(self):
+        dados = await self._executar(self.armazenamento.carregar, USUARIO)
+        return {int(chave): valor for chave, valor in dados.items()}
+
+    async def update_user_data(self, user_id, data):
+        await self._executar(self.armazenamento.salvar, USUARIO, str(user_id), dict(data))
+
+    async def refresh_user_data(self, user_id, user_data):
+        # Outro worker pode ter avançado a conversa: o armazenamento é a fonte da verdade
+        dados = await self._executar(self.armazenamento.obter_varios, USUARIO, [str(user_id)])
+        user_data.clear()
+        user_data.update(dados.get(str(user_id), {}))
+
+    async def drop_user_data(self, user_id):
+        await self._executar(self.armazenamento.salvar, USUARIO, str(user_id), None)
+
+    # --- conversas ---
+    async def get_conversations(self, name):
+        dados = await self._executar(self.armazenamento.carregar, CONVERSA, f"{name}:")
+        return {tuple(json.loads(chave.split(':', 1)[1])): estado for chave, estado in dados.items()}
+
+    async def update_conversation(self, name, key, new_state):
+        await self._executar(self.armazenamento.salvar, CONVERSA, chave_conversa(name, key), new_state)
+
+    async def sincronizar(self, application, update):
+        """
+        Recarrega, em uma consulta, o estado das conversas deste chat/usuário
+        em cada ConversationHandler persistente (ConversationHandler não tem
+        gancho de refresh como o user_data; usa a API interna do PTB 21).
+        """
+        alvos = {}
+        for grupo in application.handlers.values():
+            for handler in grupo:
+                if isinstance(handler, ConversationHandler) and handler.persistent:
+                    try:
+                        chave = handler._get_key(update)
+                    except RuntimeError:
+                        continue  # update sem chat/usuário
+                    alvos[chave_conversa(handler.name, chave)] = (handler, chave)
+        if not alvos:
+            return
+        estados = await self._executar(self.armazenamento.obter_varios, CONVERSA, list(alvos))
+        for chave_texto, (handler, chave) in alvos.items():
+            if chave_texto in estados:
+                handler._conversations.update_no_track({chave: estados[chave_texto]})
+            else:
+                handler._conversations.data.pop(chave, None)
+
+    # --- não utilizados ---
+    async def get_chat_data(self):
+        return {}
+
+    async def get_bot_data(self):
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def update_chat_data(self, chat_id, data):
+        pass
+
+    async def update_bot_data(self, data):
+        pass
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def drop_chat_data(self, chat_id):
+        pass
+
+    async def refresh_chat_data(self, chat_id, chat_data):
+        pass
+
+    async def refresh_bot_data(self, bot_data):
+        pass
+
+    async def flush(self):
+        pass
+
+
+def obter_persistencia():
+    """Persistência configurada em BOT_PERSISTENCIA (None = apenas memória)."""
+    tipo = getattr(settings, 'BOT_PERSISTENCIA', 'db')
+    if not tipo:
+        return None
+    if tipo == 'redis':
+        return PersistenciaBot(ArmazenamentoRedis(settings.REDIS_URL))
+    if tipo == 'db':
+        return PersistenciaBot(ArmazenamentoBanco())
+    raise ValueError(f"BOT_PERSISTENCIA inválido: {tipo!r} (use 'db', 'redis' ou vazio)")
@@ -0,0 +1,256 @@
+# backend/bot_telegram/runtime.py
+"""
+Runtime persistente do bot para o modo webhook.
+
+Um único Application (criar_bot) é inicializado uma vez por processo em um
+event loop próprio, rodando numa thread dedicada. O webhook apenas entrega
+o JSON do update com submeter() e responde ao Telegram sem esperar o
+processamento.
+
+- A view assíncrona inicia o runtime com iniciar_async(), que aguarda sem
+  bloquear o event loop do ASGI. Depois de uma falha na inicialização, novas
+  tentativas só após intervalo_nova_tentativa segundos; até lá os updates são
+  recusados na hora (500) em vez de travar cada request.
+
+- No máximo BOT_MAX_CONCORRENCIA updates são processados ao mesmo tempo.
+- Updates do mesmo chat são processados um de cada vez, na ordem de chegada
+  (lock por chat, FIFO), preservando o fluxo das conversas.
+- Com BOT_MAX_FILA updates pendentes, submeter() levanta FilaCheia e o
+  webhook responde 503 para o Telegram reenviar depois.
+- Com persistência (BOT_PERSISTENCIA), o estado do chat é recarregado antes
+  de cada update e gravado ao final (bot_telegram/persistencia.py).
+"""
+import asyncio
+import logging
+import threading
+import time
+
+from django.conf import settings
+from telegram import Update
+
+logger = logging.getLogger(__name__)
+
+
+class FilaCheia(Exception):
+    """Limite de updates pendentes atingido."""
+
+
+def _sem_loop_rodando(metodo):
+    """Os métodos síncronos bloqueiam a thread: proibidos dentro de um event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    raise RuntimeError(f'BotRuntime.{metodo}() bloqueia o event loop; use {metodo}_async()')
+
+
+class BotRuntime:
+    def __init__(self, fabrica=None, max_concorrencia=16, max_fila=500, intervalo_nova_tentativa=30):
+        if fabrica is None:
+            from .bot import criar_bot
+            fabrica = criar_bot
+        self._fabrica = fabrica
+        self.max_concorrencia = max_concorrencia
+        self.max_fila = max_fila
+        self.intervalo_nova_tentativa = intervalo_nova_tentativa
+        self.application = None
+        self._loop = None
+        self._thread = None
+        self._inicializacao = None
+        self._falha = None
+        self._lock = threading.RLock()
+        self._pendentes = 0
+        # Só acessados na thread do loop
+        self._semaforo = None
+        self._locks_chat = {}
+
+    @property
+    def pendentes(self):
+        return self._pendentes
+
+    @property
+    def ativo(self):
+        """Application inicializado e loop rodando."""
+        futuro = self._inicializacao
+        return futuro is not None and futuro.done() and not futuro.cancelled() and futuro.exception() is None
+
+    def iniciar(self, timeout=30):
+        """
+        Inicializa o Application e espera até `timeout` segundos (idempotente).
+        Para código síncrono (WSGI, comandos); no event loop use iniciar_async().
+        """
+        _sem_loop_rodando('iniciar')
+        self._disparar_inicializacao().result(timeout)
+
+    async def iniciar_async(self, timeout=30):
+        """Como iniciar(), mas aguarda sem bloquear o event loop de quem chama."""
+        futuro = asyncio.wrap_future(self._disparar_inicializacao())
+        # shield: o timeout de um request não cancela a inicialização em andamento
+        await asyncio.wait_for(asyncio.shield(futuro), timeout)
+
+    def _disparar_inicializacao(self):
+        """
+        Cria o loop/thread e agenda a inicialização uma única vez; chamadas
+        concorrentes recebem o mesmo concurrent.futures.Future. Depois de uma
+        falha, novas tentativas só após intervalo_nova_tentativa segundos.
+        """
+        with self._lock:
+            futuro = self._inicializacao
+            if futuro is not None and futuro.done():
+                # Quem esperava pode acordar antes do callback registrar a falha
+                self._registrar_falha(futuro)
+            if self._inicializacao is not None:
+                return self._inicializacao
+            if self._falha is not None:
+                momento, erro = self._falha
+                espera = self.intervalo_nova_tentativa - (time.monotonic() - momento)
+                if espera > 0:
+                    raise RuntimeError(f'Bot runtime indisponível, nova tentativa em {espera:.0f}s: {erro}') from erro
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._executar, name='bot-runtime', daemon=True)
+            self._thread.start()
+            futuro = asyncio.run_coroutine_threadsafe(self._inicializar(), self._loop)
+            self._inicializacao = futuro
+        futuro.add_done_callback(self._inicializacao_concluida)
+        return futuro
+
+    def _inicializacao_concluida(self, futuro):
+        with self._lock:
+            if not self._registrar_falha(futuro) and self._inicializacao is futuro:
+                self._falha = None
+                logger.info('Bot runtime iniciado (concorrência=%s, fila=%s)', self.max_concorrencia, self.max_fila)
+
+    def _registrar_falha(self, futuro):
+        """
+        Se a inicialização falhou, derruba o loop e guarda a falha para o
+        intervalo de nova tentativa (uma vez por futuro). Chamar com o lock.
+        """
+        if not futuro.cancelled() and futuro.exception() is None:
+            return False
+        if self._inicializacao is futuro:
+            # Ex.: token ausente ou Telegram fora do ar
+            erro = RuntimeError('inicialização cancelada') if futuro.cancelled() else futuro.exception()
+            logger.error('Falha ao iniciar o bot runtime: %s', erro)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._inicializacao = self._loop = self._thread = None
+            self._falha = (time.monotonic(), erro)
+        return True
+
+    def _executar(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    async def _inicializar(self):
+        self.application = self._fabrica()
+        await self.application.initialize()
+        self._semaforo = asyncio.Semaphore(self.max_concorrencia)
+
+    def _desmontar(self):
+        """Tira o estado do runtime; retorna (inicialização, loop, thread) para encerrar."""
+        with self._lock:
+            partes = (self._inicializacao, self._loop, self._thread)
+            self._inicializacao = self._loop = self._thread = self._falha = None
+        return partes
+
+    def parar(self, timeout=30):
+        """Encerra o Application e o loop (usado no shutdown e nos testes)."""
+        _sem_loop_rodando('parar')
+        inicializacao, loop, thread = self._desmontar()
+        if inicializacao is None:
+            return
+        try:
+            inicializacao.result(timeout)
+            asyncio.run_coroutine_threadsafe(self.application.shutdown(), loop).result(timeout)
+        except Exception:
+            logger.warning('Erro ao encerrar o Application do bot', exc_info=True)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+
+    async def parar_async(self, timeout=30):
+        """Como parar(), mas aguarda sem bloquear o event loop de quem chama."""
+        inicializacao, loop, thread = self._desmontar()
+        if inicializacao is None:
+            return
+        try:
+            await asyncio.wait_for(asyncio.wrap_future(inicializacao), timeout)
+            encerramento = asyncio.run_coroutine_threadsafe(self.application.shutdown(), loop)
+            await asyncio.wait_for(asyncio.wrap_future(encerramento), timeout)
+        except Exception:
+            logger.warning('Erro ao encerrar o Application do bot', exc_info=True)
+        loop.call_soon_threadsafe(loop.stop)
+        await asyncio.to_thread(thread.join, timeout)
+
+    def submeter(self, dados):
+        """
+        Enfileira o JSON de um update (thread-safe, não bloqueia). O runtime
+        precisa estar iniciado (iniciar() ou iniciar_async()).
+
+        Retorna um concurrent.futures.Future com o tempo de processamento
+        em segundos (desde a submissão). Levanta FilaCheia no limite.
+        """
+        with self._lock:
+            if not self.ativo:
+                raise RuntimeError('Bot runtime não iniciado')
+            if self._pendentes >= self.max_fila:
+                raise FilaCheia(f'{self._pendentes} updates pendentes')
+            self._pendentes += 1
+            loop = self._loop
+        return asyncio.run_coroutine_threadsafe(self._processar(dados, time.perf_counter()), loop)
+
+    async def _processar(self, dados, inicio):
+        chave = adquirido = None
+        try:
+            update = Update.de_json(dados, self.application.bot)
+            chave = update.effective_chat.id if update.effective_chat else None
+            lock = self._adquirir_lock_chat(chave)
+            adquirido = True
+            async with lock:
+                async with self._semaforo:
+                    persistencia = getattr(self.application, 'persistence', None)
+                    if persistencia is not None:
+                        # Estado compartilhado entre workers: recarrega antes e grava depois
+                        await persistencia.sincronizar(self.application, update)
+                    await self.application.process_update(update)
+                    if persistencia is not None:
+                        await self.application.update_persistence()
+            return time.perf_counter() - inicio
+        except Exception:
+            logger.error('Erro ao processar update %s', dados.get('update_id'), exc_info=True)
+            raise
+        finally:
+            if adquirido:
+                self._liberar_lock_chat(chave)
+            with self._lock:
+                self._pendentes -= 1
+
+    def _adquirir_lock_chat(self, chave):
+        entrada = self._locks_chat.get(chave)
+        if entrada is None:
+            entrada = self._locks_chat[chave] = [asyncio.Lock(), 0]
+        entrada[1] += 1
+        return entrada[0]
+
+    def _liberar_lock_chat(self, chave):
+        entrada = self._locks_chat.get(chave)
+        if entrada is None:
+            return
+        entrada[1] -= 1
+        if entrada[1] <= 0:
+            del self._locks_chat[chave]
+
+
+_runtime = None
+_runtime_lock = threading.Lock()
+
+
+def get_runtime():
+    """Runtime do processo atual, criado sob demanda (depois do fork do gunicorn)."""
+    global _runtime
+    if _runtime is None:
+        with _runtime_lock:
+            if _runtime is None:
+                _runtime = BotRuntime(
+                    max_concorrencia=getattr(settings, 'BOT_MAX_CONCORRENCIA', 16),
+                    max_fila=getattr(settings, 'BOT_MAX_FILA', 500),
+                )
+    return _runtime
@@ -0,0 +1,65 @@
+# backend/bot_telegram/signals.py
+"""
+Invalidação da identidade do bot em cache (bot_telegram.identidade) quando
+muda o vínculo do Telegram ou as autorizações de acesso a equipamentos.
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from cadastro.models import Empreendimento
+from core.models import Operador, OperadorEquipamento, Supervisor
+from equipamentos.models import Equipamento
+from tecnicos.models import Tecnico
+
+from .identidade import invalidar_identidade
+
+TIPO_POR_MODELO = {Operador: 'operador', Supervisor: 'supervisor', Tecnico: 'tecnico'}
+
+# Campos do equipamento que mudam quem tem acesso a ele
+CAMPOS_ACESSO_EQUIPAMENTO = {'ativo', 'cliente', 'cliente_id', 'empreendimento', 'empreendimento_id'}
+
+
+@receiver(post_save, sender=Operador)
+@receiver(post_delete, sender=Operador)
+@receiver(post_save, sender=Supervisor)
+@receiver(post_delete, sender=Supervisor)
+@receiver(post_save, sender=Tecnico)
+@receiver(post_delete, sender=Tecnico)
+def invalidar_identidade_usuario(sender, instance, **kwargs):
+    # vincular_telegram/desvincular_telegram: chat novo e chat antigo (via tipo + id)
+    invalidar_identidade(instance.telegram_chat_id, tipo=TIPO_POR_MODELO[sender], usuario_id=instance.pk)
+
+
+@receiver(post_save, sender=OperadorEquipamento)
+@receiver(post_delete, sender=OperadorEquipamento)
+def invalidar_identidade_autorizacao(sender, instance, **kwargs):
+    invalidar_identidade(tipo='operador', usuario_id=instance.operador_id)
+
+
+@receiver(m2m_changed, sender=Operador.equipamentos_autorizados.through)
+@receiver(m2m_changed, sender=Supervisor.empreendimentos_vinculados.through)
+@receiver(m2m_changed, sender=Tecnico.clientes.through)
+@receiver(m2m_changed, sender=Tecnico.empreendimentos_vinculados.through)
+def invalidar_identidade_m2m(sender, instance, action, reverse, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidar_identidade(tipo=TIPO_POR_MODELO[type(instance)], usuario_id=instance.pk)
+    else:
+        # Alterado pelo outro lado (ex.: equipamento.operadores_autorizados)
+        invalidar_identidade()
+
+
+@receiver(post_save, sender=Empreendimento)
+@receiver(post_delete, sender=Empreendimento)
+@receiver(post_delete, sender=Equipamento)
+def invalidar_identidades_estrutura(sender, **kwargs):
+    invalidar_identidade()
+
+
+@receiver(post_save, sender=Equipamento)
+def invalidar_identidades_equipamento(sender, update_fields, **kwargs):
+    # Atualizações de leitura (update_fields=['leitura_atual']) não mudam o acesso
+    if update_fields is not None and not CAMPOS_ACESSO_EQUIPAMENTO & set(update_fields):
+        return
+    invalidar_identidade()
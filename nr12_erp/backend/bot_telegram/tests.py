@@ -1,3 +1,394 @@
-from django.test import TestCase
+import asyncio
+import threading
+from datetime import date
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from telegram import Update
+from telegram.ext import CommandHandler, ConversationHandler
+from telegram.ext._utils.trackingdict import TrackingDict
+
+from cadastro.models import Cliente, Empreendimento
+from core.models import Operador, Supervisor
+from equipamentos.models import Equipamento, TipoEquipamento
+from nr12.models import ChecklistRealizado, ItemChecklist, ModeloChecklist
+from tecnicos.models import Tecnico
+
+from . import banco, handlers
+from .identidade import invalidar_identidade, obter_identidade
+from .models import EstadoConversa
+from .persistencia import ArmazenamentoBanco, PersistenciaBot, chave_conversa
+from .runtime import BotRuntime, FilaCheia
+
+
+class AplicacaoFalsa:
+    """Application mínimo: registra a ordem e a concorrência dos updates."""
+
+    def __init__(self, espera=0.01):
+        self.bot = None
+        self.espera = espera
+        self.inicializado = False
+        self.processados = []
+        self.em_andamento = 0
+        self.max_em_andamento = 0
+        self.liberar = None
+
+    async def initialize(self):
+        self.inicializado = True
+
+    async def shutdown(self):
+        pass
+
+    async def process_update(self, update):
+        assert self.inicializado
+        self.em_andamento += 1
+        self.max_em_andamento = max(self.max_em_andamento, self.em_andamento)
+        if self.liberar is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.liberar.wait)
+        await asyncio.sleep(self.espera)
+        self.processados.append((update.effective_chat.id, update.update_id))
+        self.em_andamento -= 1
+
+
+def _update(update_id, chat_id):
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id, 'date': 0, 'text': 'x',
+            'chat': {'id': chat_id, 'type': 'private'},
+        },
+    }
+
+
+class BotRuntimeTest(SimpleTestCase):
+    """Runtime persistente do webhook (bot_telegram/runtime.py)."""
+
+    def _runtime(self, app, iniciar=True, **kwargs):
+        runtime = BotRuntime(fabrica=lambda: app, **kwargs)
+        self.addCleanup(runtime.parar)
+        if iniciar:
+            runtime.iniciar()
+        return runtime
+
+    def test_ordem_por_chat_e_concorrencia_limitada(self):
+        app = AplicacaoFalsa()
+        runtime = self._runtime(app, max_concorrencia=3)
+        futuros = [runtime.submeter(_update(i, chat_id=i % 4)) for i in range(40)]
+        for futuro in futuros:
+            futuro.result(timeout=10)
+
+        self.assertEqual(len(app.processados), 40)
+        self.assertLessEqual(app.max_em_andamento, 3)
+        self.assertGreater(app.max_em_andamento, 1)
+        for chat in range(4):
+            ids = [u for c, u in app.processados if c == chat]
+            self.assertEqual(ids, sorted(ids))
+        self.assertEqual(runtime.pendentes, 0)
+
+    def test_fila_cheia(self):
+        app = AplicacaoFalsa()
+        app.liberar = threading.Event()
+        runtime = self._runtime(app, max_fila=2)
+        primeiros = [runtime.submeter(_update(1, 1)), runtime.submeter(_update(2, 2))]
+        with self.assertRaises(FilaCheia):
+            runtime.submeter(_update(3, 3))
+        app.liberar.set()
+        for futuro in primeiros:
+            futuro.result(timeout=10)
+        runtime.submeter(_update(4, 4)).result(timeout=10)
+
+    def test_iniciar_async_nao_bloqueia_o_loop(self):
+        app = AplicacaoFalsa()
+        liberar = threading.Event()
+
+        async def initialize():
+            await asyncio.get_running_loop().run_in_executor(None, liberar.wait)
+            app.inicializado = True
+        app.initialize = initialize
+        runtime = self._runtime(app, iniciar=False)
+
+        async def cenario():
+            ticks = 0
+            inicio = asyncio.create_task(runtime.iniciar_async(timeout=10))
+            # O loop de quem chama segue atendendo enquanto o Application inicializa
+            while ticks < 5:
+                await asyncio.sleep(0.01)
+                ticks += 1
+            self.assertFalse(inicio.done())
+            with self.assertRaises(RuntimeError):
+                runtime.iniciar()
+            liberar.set()
+            await inicio
+            await asyncio.wrap_future(runtime.submeter(_update(1, 1)))
+            await runtime.parar_async()
+
+        asyncio.run(cenario())
+        self.assertEqual(app.processados, [(1, 1)])
+        self.assertFalse(runtime.ativo)
+
+    def test_falha_na_inicializacao_espera_para_tentar_de_novo(self):
+        tentativas = []
+
+        def fabrica():
+            tentativas.append(1)
+            raise ValueError('sem token')
+        runtime = BotRuntime(fabrica=fabrica, intervalo_nova_tentativa=60)
+        self.addCleanup(runtime.parar)
+
+        with self.assertRaises(ValueError):
+            runtime.iniciar()
+        with self.assertRaisesMessage(RuntimeError, 'sem token'):
+            async_to_sync(runtime.iniciar_async)()
+        with self.assertRaisesMessage(RuntimeError, 'não iniciado'):
+            runtime.submeter(_update(1, 1))
+        self.assertEqual(len(tentativas), 1)
+
+        runtime.intervalo_nova_tentativa = 0
+        with self.assertRaises(ValueError):
+            runtime.iniciar()
+        self.assertEqual(len(tentativas), 2)
+
+
+class ConexoesBotTest(SimpleTestCase):
+    """Consultas do bot no pool próprio, com as conexões fechadas antes e depois (bot_telegram/banco.py)."""
+
+    def test_fecha_conexoes_antigas_em_cada_chamada(self):
+        chamadas = []
+
+        def consulta(valor):
+            chamadas.append(('consulta', threading.current_thread().name))
+            if valor is None:
+                raise ValueError
+            return valor * 2
+
+        with mock.patch.object(banco, 'close_old_connections', lambda: chamadas.append(('fechar', None))):
+            self.assertEqual(async_to_sync(banco.sync_to_async(consulta))(21), 42)
+            with self.assertRaises(ValueError):
+                async_to_sync(banco.sync_to_async(consulta))(None)
+
+        self.assertEqual([c for c, _ in chamadas], ['fechar', 'consulta', 'fechar'] * 2)
+        self.assertTrue(chamadas[1][1].startswith('bot-db'))
+
+    def test_persistencia_usa_o_mesmo_pool(self):
+        fechamentos = []
+        armazenamento = ArmazenamentoMemoria()
+        persistencia = PersistenciaBot(armazenamento)
+        threads = []
+        carregar = armazenamento.carregar
+
+        def carregar_registrando(*args):
+            threads.append(threading.current_thread().name)
+            return carregar(*args)
+        armazenamento.carregar = carregar_registrando
+
+        with mock.patch.object(banco, 'close_old_connections', lambda: fechamentos.append(1)):
+            asyncio.run(persistencia.get_user_data())
+
+        self.assertEqual(len(fechamentos), 2)
+        self.assertTrue(threads[0].startswith('bot-db'))
+
+
+class QRFileIdsTest(SimpleTestCase):
+    def test_lru_limitado(self):
+        self.addCleanup(handlers._qr_file_ids.clear)
+        with mock.patch.object(handlers, 'QR_FILE_IDS_MAX', 3):
+            for etag in 'abc':
+                handlers._guardar_file_id_qr(etag, f'file-{etag}')
+            self.assertEqual(handlers._file_id_qr('a'), 'file-a')  # 'a' passa a ser o mais recente
+            handlers._guardar_file_id_qr('d', 'file-d')
+
+        self.assertEqual(list(handlers._qr_file_ids), ['c', 'a', 'd'])
+        self.assertIsNone(handlers._file_id_qr('b'))
+
+
+class ArmazenamentoMemoria:
+    def __init__(self):
+        self.dados = {}
+
+    def carregar(self, tipo, prefixo=''):
+        return {c: v for (t, c), v in self.dados.items() if t == tipo and c.startswith(prefixo)}
+
+    def obter_varios(self, tipo, chaves):
+        return {c: self.dados[(tipo, c)] for c in chaves if (tipo, c) in self.dados}
+
+    def salvar(self, tipo, chave, dados):
+        if dados is None or dados == {}:
+            self.dados.pop((tipo, chave), None)
+        else:
+            self.dados[(tipo, chave)] = dados
+
+
+class PersistenciaBotTest(TestCase):
+    def test_armazenamento_banco_grava_e_remove(self):
+        armazenamento = ArmazenamentoBanco()
+        armazenamento.salvar('USUARIO', '42', {'checklist_id': 7, 'item_index': 2})
+        armazenamento.salvar('USUARIO', '42', {'checklist_id': 7, 'item_index': 3})
+        self.assertEqual(armazenamento.obter_varios('USUARIO', ['42', '43']), {'42': {'checklist_id': 7, 'item_index': 3}})
+
+        armazenamento.salvar('USUARIO', '42', {})
+        self.assertFalse(EstadoConversa.objects.exists())
+
+    def test_user_data_e_conversa_recarregados_do_armazenamento(self):
+        armazenamento = ArmazenamentoMemoria()
+        persistencia = PersistenciaBot(armazenamento)
+        conversa = ConversationHandler(
+            entry_points=[CommandHandler('checklist', lambda u, c: None)],
+            states={}, fallbacks=[], name='checklist', persistent=True,
+        )
+        conversa._conversations = TrackingDict()  # como após Application.initialize()
+
+        class Aplicacao:
+            handlers = {0: [conversa]}
+
+        update = Update.de_json({
+            'update_id': 1,
+            'message': {'message_id': 1, 'date': 0, 'text': '1',
+                        'chat': {'id': 5, 'type': 'private'},
+                        'from': {'id': 5, 'is_bot': False, 'first_name': 'Op'}},
+        }, None)
+
+        async def cenario():
+            # Outro worker avançou a conversa
+            await persistencia.update_user_data(5, {'item_index': 4})
+            await persistencia.update_conversation('checklist', (5, 5), 3)
+
+            user_data = {'item_index': 1}
+            await persistencia.refresh_user_data(5, user_data)
+            await persistencia.sincronizar(Aplicacao, update)
+            estado = conversa._conversations.get((5, 5))
+
+            # Conversa encerrada em outro worker: some do processo atual também
+            await persistencia.update_conversation('checklist', (5, 5), None)
+            await persistencia.sincronizar(Aplicacao, update)
+            return user_data, estado, conversa._conversations.get((5, 5))
+
+        user_data, estado, estado_final = asyncio.run(cenario())
+        self.assertEqual(user_data, {'item_index': 4})
+        self.assertEqual(estado, 3)
+        self.assertIsNone(estado_final)
+        self.assertNotIn(('CONVERSA', chave_conversa('checklist', (5, 5))), armazenamento.dados)
+
+
+class MensagemFalsa:
+    def __init__(self, texto):
+        self.text = texto
+        self.respostas = []
+
+    async def reply_text(self, texto, **kwargs):
+        self.respostas.append(texto)
+
+
+class ContextoFalso:
+    def __init__(self):
+        self.user_data = {}
+
+
+@override_settings(BOT_CHECKLIST_CHECKPOINT=5)
+class RespostasChecklistBotTest(TransactionTestCase):
+    def setUp(self):
+        cliente = Cliente.objects.create(nome_razao='Mineradora Teste', documento='11222333000181', qr_code='x.png')
+        empreendimento = Empreendimento.objects.create(cliente=cliente, nome='Lavra 1', qr_code='x.png')
+        tipo = TipoEquipamento.objects.create(nome='Escavadeira')
+        self.equipamento = Equipamento.objects.create(
+            cliente=cliente, empreendimento=empreendimento, tipo=tipo, codigo='EQ-001',
+            tipo_medicao='HORA', leitura_atual=Decimal('100'), qr_code='x.png',
+        )
+        modelo = ModeloChecklist.objects.create(tipo_equipamento=tipo, nome='Diário')
+        for i in range(12):
+            ItemChecklist.objects.create(modelo=modelo, ordem=i, pergunta=f'Item {i}')
+        self.checklist = ChecklistRealizado.objects.create(
+            modelo=modelo, equipamento=self.equipamento, origem='BOT', status='EM_ANDAMENTO',
+        )
+        self.itens = async_to_sync(handlers.get_itens_modelo)(modelo)
+
+    def responder(self, contexto, texto):
+        update = type('Update', (), {'message': MensagemFalsa(texto)})()
+        return asyncio.run(handlers.processar_resposta_checklist(update, contexto)), update.message
+
+    def test_respostas_acumuladas_gravadas_em_checkpoint_e_na_finalizacao(self):
+        contexto = ContextoFalso()
+        contexto.user_data.update({
+            'checklist_id': self.checklist.id, 'itens': self.itens, 'item_index': 0,
+            'equipamento': handlers.estado_equipamento(self.equipamento),
+        })
+        handlers.iniciar_respostas(contexto)
+
+        for i in range(6):
+            self.responder(contexto, '❌ Não Conforme' if i in (1, 4) else '✅ Conforme')
+        # Checkpoint após 5 respostas; a 6ª fica só na conversa
+        self.assertEqual(self.checklist.respostas.count(), 5)
+
+        for i in range(6):
+            estado, mensagem = self.responder(contexto, '✅ Conforme')
+
+        self.checklist.refresh_from_db()
+        self.assertEqual(estado, ConversationHandler.END)
+        self.assertEqual(self.checklist.status, 'CONCLUIDO')
+        self.assertEqual(self.checklist.respostas.count(), 12)
+        # Mesmo resultado da recontagem no banco (2 de 12 não conformes)
+        self.assertEqual(self.checklist.resultado_geral, 'APROVADO_RESTRICAO')
+        self.assertEqual(self.checklist.calcular_resultado(), self.checklist.resultado_geral)
+        self.assertIn('Total de itens: 12', mensagem.respostas[-1])
+
+
+class IdentidadeBotTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cliente = Cliente.objects.create(nome_razao='Mineradora Teste', documento='11222333000181', qr_code='x.png')
+        cls.empreendimento = Empreendimento.objects.create(cliente=cliente, nome='Lavra 1', qr_code='x.png')
+        outro = Empreendimento.objects.create(cliente=cliente, nome='Lavra 2', qr_code='x.png')
+        tipo = TipoEquipamento.objects.create(nome='Escavadeira')
+
+        def equipamento(codigo, empreendimento, **extra):
+            return Equipamento.objects.create(
+                cliente=cliente, empreendimento=empreendimento, tipo=tipo, codigo=codigo, qr_code='x.png', **extra,
+            )
+
+        cls.eq1 = equipamento('EQ-001', cls.empreendimento)
+        cls.eq2 = equipamento('EQ-002', outro)
+        cls.inativo = equipamento('EQ-003', cls.empreendimento, ativo=False)
+
+        cls.operador = Operador.objects.create(
+            nome_completo='Operador', cpf='111.444.777-35', data_nascimento=date(1990, 1, 1), telegram_chat_id='100',
+        )
+        cls.operador.equipamentos_autorizados.add(cls.eq1, cls.inativo)
+        cls.supervisor = Supervisor.objects.create(
+            nome_completo='Supervisor', cpf='529.982.247-25', data_nascimento=date(1990, 1, 1), telegram_chat_id='200',
+        )
+        cls.supervisor.empreendimentos_vinculados.add(outro)
+        cls.tecnico = Tecnico.objects.create(nome='Técnico', telegram_chat_id='300')
+        cls.tecnico.clientes.add(cliente)
+
+    def setUp(self):
+        invalidar_identidade()
+
+    def test_uma_consulta_e_depois_cache(self):
+        Empreendimento.objects.filter(pk=self.empreendimento.pk).update(supervisor=self.supervisor)
+
+        with self.assertNumQueries(1):
+            operador = obter_identidade(100)
+            self.assertEqual((operador.tipo, operador.id), ('operador', self.operador.id))
+            self.assertEqual(operador.equipamentos_ids, {self.eq1.id})
+        with self.assertNumQueries(0):
+            self.assertIs(obter_identidade('100'), operador)
+            self.assertTrue(handlers.tem_acesso_equipamento.func(self.operador, self.eq1.id, 'operador'))
+            self.assertFalse(handlers.tem_acesso_equipamento.func(self.operador, self.eq2.id, 'operador'))
+
+        # Supervisor: M2M (eq2) + FK do empreendimento (eq1); técnico: cliente vinculado
+        self.assertEqual(obter_identidade(200).equipamentos_ids, {self.eq1.id, self.eq2.id})
+        self.assertEqual(obter_identidade(300).tipo, 'tecnico')
+        self.assertEqual(obter_identidade(300).equipamentos_ids, {self.eq1.id, self.eq2.id})
+        self.assertIsNone(obter_identidade(999))
+
+    def test_invalidada_ao_mudar_vinculo_ou_autorizacoes(self):
+        self.assertEqual(obter_identidade(100).equipamentos_ids, {self.eq1.id})
+        self.operador.equipamentos_autorizados.add(self.eq2)
+        self.assertEqual(obter_identidade(100).equipamentos_ids, {self.eq1.id, self.eq2.id})
+
+        self.assertIsNone(obter_identidade(555))
+        self.operador.desvincular_telegram()
+        self.assertIsNone(obter_identidade(100))
+        self.operador.vincular_telegram(555)
+        self.assertEqual(obter_identidade(555).id, self.operador.id)
@@ -1,69 +1,99 @@
 # backend/bot_telegram/views.py
 import json
 import logging
+from django.conf import settings
 from django.http import JsonResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_POST
-from telegram import Update
-from .bot import criar_bot
-import asyncio
+from .runtime import FilaCheia, get_runtime
 
 logger = logging.getLogger(__name__)
 
-# Instância global do bot
-_bot_application = None
-
 
 def get_bot_application():
-    """Retorna a instância do bot, criando se necessário"""
-    global _bot_application
-    if _bot_application is None:
-        _bot_application = criar_bot()
-    return _bot_application
+    """Retorna o Application já inicializado do runtime do processo"""
+    runtime = get_runtime()
+    runtime.iniciar()
+    return runtime.application
 
 
-@csrf_exempt
-@require_POST
-async def webhook(request):
-    """
-    Endpoint para receber updates do Telegram via webhook
-    """
+def _gravar_update(corpo):
+    """Grava o JSON bruto do update (BOT_GRAVAR_UPDATES) para o teste de carga."""
+    caminho = getattr(settings, 'BOT_GRAVAR_UPDATES', '')
+    if not caminho:
+        return
     try:
-        # Parse do JSON
-        data = json.loads(request.body.decode('utf-8'))
+        with open(caminho, 'a', encoding='utf-8') as arquivo:
+            arquivo.write(corpo.replace('\n', ' ') + '\n')
+    except OSError:
+        logger.warning(f"Não foi possível gravar update em {caminho}", exc_info=True)
 
-        # Criar objeto Update
-        update = Update.de_json(data, get_bot_application().bot)
 
-        # Processar update
-        await get_bot_application().process_update(update)
+def _ler_update(request):
+    """Retorna (dados, None) ou (None, resposta de erro)."""
+    try:
+        corpo = request.body.decode('utf-8')
+        data = json.loads(corpo)
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        return None, JsonResponse({'ok': False, 'error': 'JSON inválido'}, status=400)
+    _gravar_update(corpo)
+    return data, None
 
-        return JsonResponse({'ok': True})
 
+def _erro_inicializacao(e):
+    logger.error(f"Bot runtime indisponível: {e}")
+    return JsonResponse({'ok': False, 'error': str(e) or 'bot indisponível'}, status=500)
+
+
+def _entregar_update(runtime, data):
+    """Entrega o update ao runtime já iniciado e responde sem esperar o processamento."""
+    try:
+        runtime.submeter(data)
+    except FilaCheia as e:
+        # O Telegram reenvia o update quando a resposta não é 2xx
+        logger.warning(f"Fila do bot cheia, update {data.get('update_id')} recusado: {e}")
+        return JsonResponse({'ok': False, 'error': 'fila cheia'}, status=503)
     except Exception as e:
-        logger.error(f"Erro ao processar webhook: {e}", exc_info=True)
+        logger.error(f"Erro ao receber update: {e}", exc_info=True)
         return JsonResponse({'ok': False, 'error': str(e)}, status=500)
+    return JsonResponse({'ok': True})
 
 
 @csrf_exempt
-def webhook_sync(request):
+async def webhook(request):
     """
-    Wrapper síncrono para o webhook (compatibilidade Django)
+    Endpoint para receber updates do Telegram via webhook (ASGI). A
+    inicialização do runtime é aguardada sem bloquear o event loop.
     """
     if request.method != 'POST':
         return HttpResponse('Method not allowed', status=405)
-
+    data, erro = _ler_update(request)
+    if erro:
+        return erro
+    runtime = get_runtime()
     try:
-        # Executar função assíncrona
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(webhook(request))
-        loop.close()
-        return result
+        await runtime.iniciar_async()
+    except Exception as e:
+        return _erro_inicializacao(e)
+    return _entregar_update(runtime, data)
+
 
+@csrf_exempt
+def webhook_sync(request):
+    """
+    Endpoint síncrono do webhook (WSGI/gunicorn). O processamento acontece
+    no runtime persistente do bot (bot_telegram/runtime.py).
+    """
+    if request.method != 'POST':
+        return HttpResponse('Method not allowed', status=405)
+    data, erro = _ler_update(request)
+    if erro:
+        return erro
+    runtime = get_runtime()
+    try:
+        runtime.iniciar()
     except Exception as e:
-        logger.error(f"Erro no webhook sync: {e}", exc_info=True)
-        return JsonResponse({'ok': False, 'error': str(e)}, status=500)
+        return _erro_inicializacao(e)
+    return _entregar_update(runtime, data)
 
 
 def health_check(request):
@@ -72,10 +102,12 @@ def health_check(request):
     """
     try:
         bot = get_bot_application()
+        runtime = get_runtime()
         return JsonResponse({
             'ok': True,
             'bot_username': bot.bot.username if hasattr(bot, 'bot') else 'N/A',
-            'status': 'running'
+            'status': 'running',
+            'pendentes': runtime.pendentes,
         })
     except Exception as e:
         logger.error(f"Erro no health check: {e}")
@@ -168,16 +168,24 @@ class Empreendimento(models.Model):
             top_text="MANDACARU S M",
             bottom_text=self.nome
         )
-        self.qr_code.save(filename, qr_file, save=True)
+        if self.qr_code:
+            self.qr_code.delete(save=False)
+        self.qr_code.save(filename, qr_file, save=False)
+        # Grava só o campo, sem disparar signals
+        Empreendimento.objects.filter(pk=self.pk).update(qr_code=self.qr_code.name)
 
     def save(self, *args, **kwargs):
         is_new = self.pk is None
         super().save(*args, **kwargs)
-        # Gera QR code automaticamente após salvar
+        # QR code gerado em background (core/qr_jobs.py)
         # Se falhar, não impede o salvamento do empreendimento
         if not self.qr_code:
             try:
-                self.gerar_qr_code()
+                from core.qr_jobs import qr_assincrono, enfileirar_qr
+                if qr_assincrono():
+                    enfileirar_qr(self)
+                else:
+                    self.gerar_qr_code()
             except Exception as e:
                 import logging
                 logger = logging.getLogger(__name__)
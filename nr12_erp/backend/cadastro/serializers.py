@@ -72,10 +72,15 @@ class EmpreendimentoSerializer(serializers.ModelSerializer):
     cliente_nome = serializers.SerializerMethodField(read_only=True)
     supervisor_nome = serializers.SerializerMethodField(read_only=True)
     link_google_maps = serializers.SerializerMethodField(read_only=True)
+    qr_code_status = serializers.SerializerMethodField(read_only=True)
 
     def get_cliente_nome(self, obj):
         return obj.cliente.nome_razao if obj.cliente else "Cliente não definido"
 
+    def get_qr_code_status(self, obj):
+        """PENDENTE enquanto o worker (processar_qr_codes) não gerou o arquivo."""
+        return "PRONTO" if obj.qr_code else "PENDENTE"
+
     def get_supervisor_nome(self, obj):
         if obj.supervisor:
             return obj.supervisor.nome_completo
@@ -175,7 +175,7 @@ def cliente_qr_view(request, uuid_str: str):
         raise Http404("Cliente não encontrado")
 
     payload = getattr(cli, "qr_payload", f"cl:{cli.uuid}")
-    return qr_png_response(payload)
+    return qr_png_response(payload, request=request)
 
 
 # --- Planos ---
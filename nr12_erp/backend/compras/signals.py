@@ -1,3 +1,4 @@
+from django.db import transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from .models import PedidoCompra, StatusPedido
@@ -18,7 +19,8 @@ def processar_entrega_pedido(sender, instance, **kwargs):
     if not instance.data_entrega:
         return
 
-    from almoxarifado.models import Produto, Estoque, MovimentoEstoque, LocalEstoque, CategoriaProduto, UnidadeMedida
+    from almoxarifado.models import Produto, MovimentoEstoque, LocalEstoque, CategoriaProduto, UnidadeMedida
+    from almoxarifado.services import registrar_movimentos
 
     local = instance.local_estoque
     if not local:
@@ -27,6 +29,8 @@ def processar_entrega_pedido(sender, instance, **kwargs):
         if not local:
             return
 
+    movimentos = []
+    entregues = []
     for item in instance.itens.all():
         # Só processar itens ainda não marcados como entregues
         if item.entregue:
@@ -49,17 +53,8 @@ def processar_entrega_pedido(sender, instance, **kwargs):
             )
             item.produto = produto
 
-        # Dar entrada no estoque
-        estoque, _ = Estoque.objects.get_or_create(
-            produto=produto,
-            local=local,
-            defaults={'saldo': 0}
-        )
-        estoque.saldo += item.quantidade
-        estoque.save()
-
-        # Registrar movimento
-        MovimentoEstoque.objects.create(
+        # Movimento de entrada (o saldo é atualizado pelo razão do estoque)
+        movimentos.append(MovimentoEstoque(
             produto=produto,
             local=local,
             tipo='ENTRADA',
@@ -67,9 +62,15 @@ def processar_entrega_pedido(sender, instance, **kwargs):
             documento=f"PC-{instance.numero} NF:{instance.numero_nf or 'S/N'}",
             observacao=f"Recebimento pedido de compra PC-{instance.numero}",
             criado_por=instance.criado_por,
-        )
+        ))
 
         # Marcar item como entregue
         item.quantidade_recebida = item.quantidade
         item.entregue = True
-        item.save()
+        entregues.append(item)
+
+    # Todas as entradas do pedido de uma vez
+    with transaction.atomic():
+        registrar_movimentos(movimentos)
+        for item in entregues:
+            item.save()
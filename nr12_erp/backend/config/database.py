@@ -0,0 +1,58 @@
+"""
+Estratégia de conexão com o PostgreSQL, escolhida por variáveis de ambiente.
+
+DB_CONN_MODE:
+- pooler (padrão): para o pooler do Supabase em Transaction Mode. Uma
+  conexão por request (conn_max_age=0), sem health checks e sem cursores
+  do lado do servidor (não sobrevivem entre transações no pooler).
+- persistent: para deploys sem pooler (local, on-prem, workers). A conexão
+  é reaproveitada entre requests por DB_CONN_MAX_AGE segundos (padrão 600)
+  e validada com conn_health_checks antes do reuso.
+- pool: pool de conexões no próprio processo (psycopg 3 + psycopg_pool,
+  Django >= 5.1). Tamanho em DB_POOL_MIN_SIZE/DB_POOL_MAX_SIZE e espera
+  máxima por conexão em DB_POOL_TIMEOUT segundos.
+"""
+import importlib.util
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+MODOS = ("pooler", "persistent", "pool")
+
+
+def configurar_conexao(config, modo=None, ambiente=None):
+    """Aplica o modo de conexão ao dict de DATABASES (ex.: saída de dj_database_url.parse)."""
+    ambiente = os.environ if ambiente is None else ambiente
+    modo = (modo or ambiente.get("DB_CONN_MODE") or "pooler").lower()
+    if modo not in MODOS:
+        raise ImproperlyConfigured(f"DB_CONN_MODE inválido: {modo!r} (use {', '.join(MODOS)})")
+
+    config = dict(config)
+    options = dict(config.get("OPTIONS", {}))
+
+    if modo == "pooler":
+        config["CONN_MAX_AGE"] = 0
+        config["CONN_HEALTH_CHECKS"] = False
+        config["DISABLE_SERVER_SIDE_CURSORS"] = True
+
+    elif modo == "persistent":
+        config["CONN_MAX_AGE"] = int(ambiente.get("DB_CONN_MAX_AGE", "600"))
+        config["CONN_HEALTH_CHECKS"] = True
+
+    else:
+        if "postgresql" not in config.get("ENGINE", ""):
+            raise ImproperlyConfigured("DB_CONN_MODE=pool só é suportado com PostgreSQL")
+        if not (importlib.util.find_spec("psycopg") and importlib.util.find_spec("psycopg_pool")):
+            raise ImproperlyConfigured('DB_CONN_MODE=pool requer o pacote "psycopg[pool]" (psycopg 3)')
+        # O pool substitui conexões persistentes: o Django exige CONN_MAX_AGE=0
+        config["CONN_MAX_AGE"] = 0
+        config["CONN_HEALTH_CHECKS"] = False
+        options["pool"] = {
+            "min_size": int(ambiente.get("DB_POOL_MIN_SIZE", "2")),
+            "max_size": int(ambiente.get("DB_POOL_MAX_SIZE", "10")),
+            "timeout": float(ambiente.get("DB_POOL_TIMEOUT", "10")),
+        }
+
+    if options:
+        config["OPTIONS"] = options
+    return config
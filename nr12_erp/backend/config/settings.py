@@ -61,6 +61,7 @@ MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",   # alto na pilha
     "django.contrib.sessions.middleware.SessionMiddleware",
     "core.middleware.CookieToAuthorizationMiddleware",  # promove cookie -> Authorization
+    "core.middleware.InstrumentacaoMiddleware",  # queries/latência por endpoint (INSTRUMENTACAO_ENABLED)
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
@@ -76,7 +77,8 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
     ),
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    # ?page=N (com count) ou keyset nas views com paginacao_keyset (core/pagination.py)
+    "DEFAULT_PAGINATION_CLASS": "core.pagination.PaginacaoPadrao",
     "PAGE_SIZE": 50,
 }
 
@@ -128,16 +130,14 @@ import dj_database_url
 DATABASE_URL = os.environ.get("DATABASE_URL")
 
 if DATABASE_URL:
-    # ✅ Produção: Supabase Pooler (Transaction Mode)
-    # - conn_max_age=0: obrigatório para pooler em Transaction Mode
-    # - conn_health_checks=False: evita queries extras que quebram com pooler
+    # ✅ Produção: Supabase Pooler (Transaction Mode) por padrão
+    # - DB_CONN_MODE=pooler: conn_max_age=0, sem health checks (obrigatório no pooler)
+    # - DB_CONN_MODE=persistent / pool: deploys sem pooler (ver config/database.py)
     # - SSL já vem na URL (?sslmode=require), não duplicar
+    from .database import configurar_conexao
+
     DATABASES = {
-        "default": dj_database_url.parse(
-            DATABASE_URL,
-            conn_max_age=0,
-            conn_health_checks=False,
-        )
+        "default": configurar_conexao(dj_database_url.parse(DATABASE_URL))
     }
 else:
     # Desenvolvimento local: SQLite
@@ -148,13 +148,75 @@ else:
         }
     }
 
+# Cache (métricas/dashboards - core/cache.py)
+# - REDIS_URL definido: Redis compartilhado entre workers (requer pacote "redis")
+# - CACHE_BACKEND=file: cache em disco (CACHE_LOCATION), compartilhado na mesma máquina
+# - padrão: memória local do processo, sem o cache de respostas (cada worker teria o seu e a
+#   invalidação feita em um não chegaria aos outros)
+REDIS_URL = os.getenv("REDIS_URL", "")
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "redis" if REDIS_URL else "locmem")
+
+if CACHE_BACKEND == "redis":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+elif CACHE_BACKEND == "file":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.getenv("CACHE_LOCATION", "/tmp/nr12_cache"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "nr12-erp",
+        }
+    }
+
+CACHE_COMPARTILHADO = CACHE_BACKEND in ("redis", "file")  # visto por todos os workers
+METRICAS_CACHE_ENABLED = CACHE_COMPARTILHADO and os.getenv("METRICAS_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+METRICAS_CACHE_TTL = int(os.getenv("METRICAS_CACHE_TTL", "300"))  # segundos
+# Escopo de acesso por usuário (role + clientes) usado por filter_by_role (core/escopo.py); 0 = só por request.
+# Só com cache compartilhado: com locmem um worker manteria o escopo antigo após a revogação feita em outro
+ESCOPO_CACHE_TTL = int(os.getenv("ESCOPO_CACHE_TTL", "60")) if CACHE_COMPARTILHADO else 0  # segundos
+
+# Instrumentação de requests (core/instrumentacao.py): queries/tempo por endpoint
+INSTRUMENTACAO_ENABLED = os.getenv("INSTRUMENTACAO_ENABLED", "false").lower() in ("1", "true", "yes")
+INSTRUMENTACAO_BUFFER = int(os.getenv("INSTRUMENTACAO_BUFFER", "5000"))  # amostras por processo
+INSTRUMENTACAO_PUBLICAR_S = int(os.getenv("INSTRUMENTACAO_PUBLICAR_S", "30"))  # cópia no cache compartilhado
+
 # URL base pública do ERP (ajuste para seu domínio)
 ERP_PUBLIC_BASE_URL = os.getenv("ERP_PUBLIC_BASE_URL", "https://erp.mandacaru.com.br")
 
+# QR codes gerados em background (core/qr_jobs.py + manage.py processar_qr_codes)
+QR_CODE_ASYNC = os.getenv("QR_CODE_ASYNC", "true").lower() in ("1", "true", "yes")
+# Limite (bytes) do cache em memória de PNGs de QR renderizados, por processo (core/qr_utils.py)
+QR_PNG_CACHE_MAX_BYTES = int(os.getenv("QR_PNG_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+# Processos para renderizar folhas de QR (core/qr_folhas.py); vazio = número de CPUs
+QR_FOLHA_WORKERS = int(os.getenv("QR_FOLHA_WORKERS", "0")) or None
+# Registros lidos por consulta (keyset no pk) nas exportações CSV/XLSX (core/exportacao.py)
+EXPORTACAO_CHUNK_SIZE = int(os.getenv("EXPORTACAO_CHUNK_SIZE", "2000"))
+# Relatórios em background (relatorios/jobs.py + manage.py processar_relatorios)
+RELATORIO_JOB_TTL = int(os.getenv("RELATORIO_JOB_TTL", "3600"))  # segundos: validade do resultado e janela de deduplicação
+RELATORIO_JOB_WORKERS = int(os.getenv("RELATORIO_JOB_WORKERS", "2"))  # processos do worker
+
 # Configurações do Telegram Bot
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
 TELEGRAM_BOT_USERNAME = os.getenv("TELEGRAM_BOT_USERNAME", "mandacaru_bot")
 TELEGRAM_WEBHOOK_URL = os.getenv("TELEGRAM_WEBHOOK_URL", "")
+# Runtime do webhook (bot_telegram/runtime.py)
+BOT_MAX_CONCORRENCIA = int(os.getenv("BOT_MAX_CONCORRENCIA", "16"))  # updates processados ao mesmo tempo
+BOT_MAX_FILA = int(os.getenv("BOT_MAX_FILA", "500"))  # pendentes antes de responder 503
+BOT_DB_WORKERS = int(os.getenv("BOT_DB_WORKERS", "8"))  # threads (e conexões) para as consultas do bot
+BOT_GRAVAR_UPDATES = os.getenv("BOT_GRAVAR_UPDATES", "")  # arquivo .jsonl para replay (manage.py bot_carga)
+BOT_PERSISTENCIA = os.getenv("BOT_PERSISTENCIA", "db")  # estado das conversas: "db", "redis" (REDIS_URL) ou vazio (memória)
+BOT_CHECKLIST_CHECKPOINT = int(os.getenv("BOT_CHECKLIST_CHECKPOINT", "10"))  # respostas acumuladas antes de gravar um checkpoint (0 = só no final)
+BOT_IDENTIDADE_TTL = int(os.getenv("BOT_IDENTIDADE_TTL", "60"))  # segundos de cache da identidade do chat_id (0 = sem cache)
 
 # Configurações de segurança para cookies em produção
 if not DEBUG:
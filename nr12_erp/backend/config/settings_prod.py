@@ -40,6 +40,10 @@ if _database_url:
     _port = str(_db_config.get("PORT", "5432"))
     if _port != "6543":
         _db_config.setdefault("OPTIONS", {})["sslmode"] = "require"
+    if os.environ.get("DB_CONN_MODE"):
+        # Estratégia explícita (pooler/persistent/pool - ver config/database.py)
+        from .database import configurar_conexao
+        _db_config = configurar_conexao(_db_config)
     DATABASES = {"default": _db_config}
 elif all(os.environ.get(k) for k in ["DB_NAME", "DB_USER", "DB_PASSWORD", "DB_HOST"]):
     # Prioridade 2: variáveis individuais (compatibilidade Railway)
@@ -7,6 +7,8 @@ class CoreConfig(AppConfig):
 
     def ready(self):
         from . import signals  # noqa
+        from .escopo import construir_registro
+        construir_registro()
         self._iniciar_scheduler()
 
     def _iniciar_scheduler(self):
@@ -20,6 +22,7 @@ class CoreConfig(AppConfig):
         try:
             from apscheduler.schedulers.background import BackgroundScheduler
             from apscheduler.triggers.cron import CronTrigger
+            from apscheduler.triggers.interval import IntervalTrigger
 
             scheduler = BackgroundScheduler(timezone="America/Bahia")
 
@@ -29,6 +32,22 @@ class CoreConfig(AppConfig):
                 id="limpar_fotos_antigas",
                 replace_existing=True,
             )
+            scheduler.add_job(
+                _marcar_contas_vencidas,
+                trigger=CronTrigger(hour=0, minute=5),  # 00:05, logo após a virada do dia
+                id="marcar_contas_vencidas",
+                replace_existing=True,
+                max_instances=1,
+                coalesce=True,
+            )
+            scheduler.add_job(
+                _processar_qr_codes,
+                trigger=IntervalTrigger(minutes=1),
+                id="processar_qr_codes",
+                replace_existing=True,
+                max_instances=1,
+                coalesce=True,
+            )
             scheduler.start()
         except Exception:
             pass  # Não deixa o app falhar por causa do scheduler
@@ -63,3 +82,36 @@ def _limpar_fotos_antigas():
         logger.info(f"[LimparFotos] {removidas}/{total} fotos antigas removidas.")
     except Exception as e:
         logger.error(f"[LimparFotos] Erro no job de limpeza: {e}")
+
+
+def _marcar_contas_vencidas():
+    """Passa para VENCIDA as contas a receber/pagar em aberto já vencidas."""
+    import logging
+    from django.db import close_old_connections
+    logger = logging.getLogger(__name__)
+    # Thread do scheduler fica ociosa um dia inteiro: a conexão pode ter caído
+    close_old_connections()
+    try:
+        from financeiro.services import marcar_contas_vencidas
+        resultado = marcar_contas_vencidas()
+        logger.info(
+            f"[ContasVencidas] {resultado['contas_receber']} a receber e "
+            f"{resultado['contas_pagar']} a pagar marcadas como vencidas"
+        )
+    except Exception as e:
+        logger.error(f"[ContasVencidas] Erro no job de contas vencidas: {e}")
+    finally:
+        close_old_connections()
+
+
+def _processar_qr_codes():
+    """Drena a fila de QR codes (QRCodeJob) pendentes."""
+    import logging
+    logger = logging.getLogger(__name__)
+    try:
+        from .qr_jobs import processar_pendentes
+        resultado = processar_pendentes(limite=200)
+        if resultado:
+            logger.info(f"[QRCode] Jobs processados: {resultado}")
+    except Exception as e:
+        logger.error(f"[QRCode] Erro no job de QR codes: {e}")
@@ -0,0 +1,172 @@
+"""
+Cache de respostas para endpoints de métricas e dashboards.
+
+A chave combina (endpoint, role/escopo do usuário, filtros da query string)
+com as versões dos clientes que o usuário enxerga. Quando um registro de um
+cliente muda, core.signals incrementa a versão daquele cliente (e a versão
+global, usada por quem vê todos os clientes); as entradas antigas deixam de
+ser encontradas e expiram sozinhas.
+
+Uso:
+    @action(detail=False, methods=['get'])
+    @cache_resposta('nr12-checklists-estatisticas')
+    def estatisticas(self, request): ...
+
+Backend configurável em settings.CACHES (locmem, arquivo ou Redis). Com
+locmem cada worker teria o próprio cache e a invalidação não chegaria aos
+outros, por isso METRICAS_CACHE_ENABLED só vale com backend compartilhado.
+"""
+import functools
+import hashlib
+import logging
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+from .escopo import obter_escopo
+
+logger = logging.getLogger(__name__)
+
+PREFIXO = 'metricas'
+VERSAO_GLOBAL = f'{PREFIXO}:versao:global'
+CONTADOR_HITS = f'{PREFIXO}:stats:hits'
+CONTADOR_MISSES = f'{PREFIXO}:stats:misses'
+
+
+def get_cache():
+    return caches[getattr(settings, 'METRICAS_CACHE_ALIAS', 'default')]
+
+
+def _chave_versao_cliente(cliente_id):
+    return f'{PREFIXO}:versao:cliente:{cliente_id}'
+
+
+def _incrementar(chave):
+    cache = get_cache()
+    try:
+        cache.incr(chave)
+    except ValueError:
+        # Contador ainda não existe (ou foi despejado do cache)
+        cache.add(chave, 0, timeout=None)
+        try:
+            cache.incr(chave)
+        except ValueError:
+            pass
+
+
+def invalidar_cliente(cliente_id):
+    """Invalida as respostas em cache de um cliente e as de escopo global."""
+    cache = get_cache()
+    versoes = {VERSAO_GLOBAL: uuid.uuid4().hex}
+    if cliente_id:
+        versoes[_chave_versao_cliente(cliente_id)] = uuid.uuid4().hex
+    cache.set_many(versoes, timeout=None)
+
+
+def escopo_usuario(user):
+    """
+    Retorna (escopo, chaves_de_versao) para o usuário.
+
+    - CLIENTE: o próprio cliente
+    - SUPERVISOR: os clientes vinculados
+    - demais roles: escopo global (invalidado por qualquer alteração)
+    O escopo inclui o id do usuário quando o resultado depende dele.
+    """
+    acesso = obter_escopo(user)
+    role = acesso.role
+
+    if role == 'CLIENTE' and acesso.tem_perfil:
+        cliente_id = next(iter(acesso.clientes_ids))
+        return f'CLIENTE:{cliente_id}', [_chave_versao_cliente(cliente_id)]
+
+    if role == 'SUPERVISOR' and acesso.tem_perfil:
+        return f'SUPERVISOR:{user.id}', [_chave_versao_cliente(c) for c in sorted(acesso.clientes_ids)]
+
+    if role in ('ADMIN', 'TECNICO', 'FINANCEIRO', 'COMPRAS'):
+        return role, [VERSAO_GLOBAL]
+
+    return f'{role}:{user.id}', [VERSAO_GLOBAL]
+
+
+def _versoes(chaves):
+    """Lê as versões; chaves ausentes recebem um valor novo (nunca reaproveitado)."""
+    cache = get_cache()
+    versoes = cache.get_many(chaves)
+    faltando = [c for c in chaves if c not in versoes]
+    for chave in faltando:
+        cache.add(chave, uuid.uuid4().hex, timeout=None)
+    if faltando:
+        versoes.update(cache.get_many(faltando))
+    return [str(versoes.get(c, '')) for c in chaves]
+
+
+def chave_resposta(endpoint, request, extra=()):
+    escopo, chaves_versao = escopo_usuario(request.user)
+    filtros = sorted((k, tuple(request.query_params.getlist(k))) for k in request.query_params.keys())
+    bruto = repr((endpoint, escopo, filtros, tuple(extra), _versoes(chaves_versao)))
+    return f'{PREFIXO}:resp:{endpoint}:{hashlib.sha256(bruto.encode()).hexdigest()}'
+
+
+def cache_resposta(endpoint, timeout=None):
+    """
+    Decorator para views/actions GET que retornam Response com dados serializáveis.
+
+    Só armazena respostas 200. Funciona em funções (request) e em métodos
+    de ViewSet (self, request, ...).
+    """
+    def decorator(view_func):
+        @functools.wraps(view_func)
+        def wrapper(*args, **kwargs):
+            request = next(a for a in args if hasattr(a, 'query_params'))
+            if not getattr(settings, 'METRICAS_CACHE_ENABLED', True) or not request.user.is_authenticated:
+                return view_func(*args, **kwargs)
+
+            cache = get_cache()
+            extra = tuple(sorted(kwargs.items()))
+            try:
+                chave = chave_resposta(endpoint, request, extra)
+                dados = cache.get(chave)
+            except Exception as e:
+                logger.warning(f"[cache] falha ao ler cache de {endpoint}: {e}")
+                return view_func(*args, **kwargs)
+
+            if dados is not None:
+                _incrementar(CONTADOR_HITS)
+                response = Response(dados)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            _incrementar(CONTADOR_MISSES)
+            response = view_func(*args, **kwargs)
+            if getattr(response, 'status_code', None) == 200 and hasattr(response, 'data'):
+                ttl = timeout if timeout is not None else getattr(settings, 'METRICAS_CACHE_TTL', 300)
+                try:
+                    cache.set(chave, response.data, timeout=ttl)
+                except Exception as e:
+                    logger.warning(f"[cache] falha ao gravar cache de {endpoint}: {e}")
+                response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+def estatisticas_cache():
+    """Contadores de hit/miss desde o último reset."""
+    cache = get_cache()
+    valores = cache.get_many([CONTADOR_HITS, CONTADOR_MISSES])
+    hits = valores.get(CONTADOR_HITS, 0)
+    misses = valores.get(CONTADOR_MISSES, 0)
+    total = hits + misses
+    return {
+        'backend': settings.CACHES[getattr(settings, 'METRICAS_CACHE_ALIAS', 'default')]['BACKEND'],
+        'hits': hits,
+        'misses': misses,
+        'total': total,
+        'hit_rate_percent': round(hits / total * 100, 2) if total else 0,
+    }
+
+
+def resetar_estatisticas_cache():
+    get_cache().delete_many([CONTADOR_HITS, CONTADOR_MISSES])
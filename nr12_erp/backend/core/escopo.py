@@ -0,0 +1,240 @@
+"""
+Escopo de acesso do usuário usado por filter_by_role e ClienteFilterMixin.
+
+EscopoAcesso reúne o role e os ids de clientes/equipamentos que o usuário
+enxerga. É resolvido uma vez por request (guardado no próprio objeto user)
+e compartilhado entre requests por ESCOPO_CACHE_TTL segundos no cache,
+invalidado pelos signals de Profile/Supervisor/Operador/Cliente em
+core/signals.py depois do commit. Sem cache compartilhado entre os workers
+(settings.CACHE_COMPARTILHADO) o TTL é 0: a invalidação feita em um worker
+não chegaria aos outros, e o escopo é só por request.
+
+O caminho até o cliente de cada model (ex.: RespostaItemChecklist ->
+checklist__equipamento__cliente) fica em um registro montado uma vez
+no startup (CoreConfig.ready).
+"""
+import logging
+from dataclasses import dataclass, field
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+ATRIBUTO_REQUEST = '_escopo_acesso'
+CHAVE_CACHE = 'escopo:v1:{}:{}'
+
+
+@dataclass(frozen=True)
+class EscopoAcesso:
+    role: str = None
+    user_id: int = None
+    # False quando o role exige um perfil (cliente/supervisor/operador) que não existe
+    tem_perfil: bool = True
+    clientes_ids: frozenset = field(default_factory=frozenset)
+    supervisores_ids: frozenset = field(default_factory=frozenset)
+    equipamentos_ids: frozenset = field(default_factory=frozenset)
+
+
+def get_user_role_safe(user):
+    """Retorna role do usuário de forma segura, sem risco de 500."""
+    try:
+        if user.is_superuser:
+            return 'ADMIN'
+        if hasattr(user, 'profile') and user.profile:
+            return user.profile.role
+    except Exception:
+        pass
+    return None
+
+
+def _resolver(user):
+    role = get_user_role_safe(user)
+
+    if role == 'CLIENTE':
+        cliente = getattr(user, 'cliente_profile', None)
+        if not cliente:
+            return EscopoAcesso(role, user.id, tem_perfil=False)
+        return EscopoAcesso(role, user.id, clientes_ids=frozenset([cliente.id]))
+
+    if role == 'SUPERVISOR':
+        supervisor = getattr(user, 'supervisor_profile', None)
+        if not supervisor:
+            return EscopoAcesso(role, user.id, tem_perfil=False)
+        return EscopoAcesso(
+            role, user.id,
+            clientes_ids=frozenset(supervisor.clientes.values_list('id', flat=True)),
+            supervisores_ids=frozenset([supervisor.id]),
+        )
+
+    if role == 'OPERADOR':
+        operador = getattr(user, 'operador_profile', None)
+        if not operador:
+            return EscopoAcesso(role, user.id, tem_perfil=False)
+        return EscopoAcesso(
+            role, user.id,
+            clientes_ids=frozenset(operador.clientes.values_list('id', flat=True)),
+            equipamentos_ids=frozenset(operador.equipamentos_autorizados.values_list('id', flat=True)),
+        )
+
+    return EscopoAcesso(role, user.id)
+
+
+def obter_escopo(user):
+    """Escopo do usuário: do request atual, do cache (TTL curto) ou resolvido agora."""
+    escopo = getattr(user, ATRIBUTO_REQUEST, None)
+    if escopo is not None:
+        return escopo
+
+    ttl = getattr(settings, 'ESCOPO_CACHE_TTL', 60)
+    chave = CHAVE_CACHE.format(user.id, user.date_joined.timestamp() if user.date_joined else '')
+    escopo = cache.get(chave) if ttl else None
+    if escopo is None:
+        escopo = _resolver(user)
+        if ttl:
+            cache.set(chave, escopo, ttl)
+
+    try:
+        setattr(user, ATRIBUTO_REQUEST, escopo)
+    except AttributeError:
+        pass
+    return escopo
+
+
+def invalidar_escopo(*user_ids):
+    """
+    Descarta o escopo em cache dos usuários (chamado pelos signals) depois do
+    commit: antes dele, um request concorrente leria o vínculo antigo e
+    gravaria de novo o escopo anterior (mais amplo) por ESCOPO_CACHE_TTL.
+    """
+    from django.contrib.auth.models import User
+    ids = [u for u in user_ids if u]
+    if not ids:
+        return
+    chaves = [
+        CHAVE_CACHE.format(u, d.timestamp() if d else '')
+        for u, d in User.objects.filter(id__in=ids).values_list('id', 'date_joined')
+    ]
+    if chaves:
+        transaction.on_commit(lambda: cache.delete_many(chaves))
+
+
+# ============================================
+# Registro model -> caminho até o cliente
+# ============================================
+# Cada entrada: (condicoes, distinct), onde condicoes é uma tupla de
+# (lookup, atributo do escopo) combinadas com OR. None = nenhum registro;
+# () = sem filtro.
+
+def _caminho_cliente(model, role):
+    """Mesma precedência das regras originais de filter_by_role."""
+    nome = model.__name__
+    if nome == 'Cliente':
+        return (('id', 'clientes_ids'),), False
+    if nome == 'Empreendimento':
+        return (('cliente', 'clientes_ids'),), False
+    if nome in ('Tecnico', 'Operador'):
+        return (('clientes', 'clientes_ids'),), True
+    if role == 'SUPERVISOR' and nome == 'Supervisor':
+        return (('id', 'supervisores_ids'),), False
+
+    campos = [
+        ('cliente', 'cliente'),
+        ('equipamento', 'equipamento__cliente'),
+        ('checklist', 'checklist__equipamento__cliente'),
+        ('manutencao', 'manutencao__equipamento__cliente'),
+    ]
+    if role == 'SUPERVISOR':
+        campos.append(('empreendimento', 'empreendimento__cliente'))
+    campos += [
+        ('ordem_servico', 'ordem_servico__cliente'),
+        ('orcamento', 'orcamento__cliente'),
+        ('pedido', 'pedido__cliente'),
+        ('conta_receber', 'conta_receber__cliente'),
+    ]
+    for atributo, lookup in campos:
+        if hasattr(model, atributo):
+            return ((lookup, 'clientes_ids'),), False
+    return None, False
+
+
+def _caminho_operador(model):
+    """Operador: equipamentos autorizados ou clientes vinculados."""
+    nome = model.__name__
+    if nome == 'Equipamento':
+        return (('id', 'equipamentos_ids'), ('cliente', 'clientes_ids')), True
+    for prefixo in ('equipamento', 'checklist__equipamento', 'manutencao__equipamento'):
+        if hasattr(model, prefixo.split('__')[0]):
+            return ((prefixo, 'equipamentos_ids'), (f'{prefixo}__cliente', 'clientes_ids')), True
+    for atributo in ('ordem_servico', 'orcamento'):
+        if hasattr(model, atributo):
+            return ((f'{atributo}__cliente', 'clientes_ids'), (f'{atributo}__equipamento__cliente', 'clientes_ids')), True
+    for atributo in ('pedido', 'conta_receber'):
+        if hasattr(model, atributo):
+            return ((f'{atributo}__cliente', 'clientes_ids'),), True
+    if nome == 'Empreendimento':
+        return (('cliente', 'clientes_ids'),), False
+    if nome == 'Cliente':
+        return (('id', 'clientes_ids'),), False
+    return (), False
+
+
+def _caminho_mixin(model, role):
+    """Regras (mais restritas) do ClienteFilterMixin."""
+    nome = model.__name__
+    if role == 'CLIENTE':
+        if hasattr(model, 'cliente'):
+            return (('cliente', 'clientes_ids'),), False
+        if nome == 'Cliente':
+            return (('id', 'clientes_ids'),), False
+    else:
+        if nome == 'Cliente':
+            return (('id', 'clientes_ids'),), False
+        if nome == 'Empreendimento' or hasattr(model, 'cliente'):
+            return (('cliente', 'clientes_ids'),), False
+    if hasattr(model, 'equipamento'):
+        return (('equipamento__cliente', 'clientes_ids'),), False
+    return None, False
+
+
+REGRAS = {
+    'CLIENTE': lambda model: _caminho_cliente(model, 'CLIENTE'),
+    'SUPERVISOR': lambda model: _caminho_cliente(model, 'SUPERVISOR'),
+    'OPERADOR': _caminho_operador,
+    'MIXIN_CLIENTE': lambda model: _caminho_mixin(model, 'CLIENTE'),
+    'MIXIN_SUPERVISOR': lambda model: _caminho_mixin(model, 'SUPERVISOR'),
+}
+_registro = {}
+
+
+def construir_registro():
+    """Pré-calcula os caminhos de todos os models instalados (CoreConfig.ready)."""
+    for model in apps.get_models():
+        for regra, funcao in REGRAS.items():
+            _registro[(regra, model)] = funcao(model)
+
+
+def caminho(regra, model):
+    try:
+        return _registro[(regra, model)]
+    except KeyError:
+        # Model criado após o startup (ex.: testes): calcula e guarda
+        _registro[(regra, model)] = REGRAS[regra](model)
+        return _registro[(regra, model)]
+
+
+def aplicar_escopo(queryset, escopo, regra):
+    """Aplica ao queryset o caminho registrado para a regra e o model."""
+    condicoes, distinct = caminho(regra, queryset.model)
+    if condicoes is None:
+        return queryset.none()
+    if not condicoes:
+        return queryset
+    filtro = Q()
+    for lookup, atributo in condicoes:
+        filtro |= Q(**{f'{lookup}__in': getattr(escopo, atributo)})
+    queryset = queryset.filter(filtro)
+    return queryset.distinct() if distinct else queryset
@@ -0,0 +1,325 @@
+"""
+Exportação de listagens em CSV ou XLSX sem montar o arquivo em memória.
+
+As linhas são lidas em blocos por keyset no pk (linhas_por_chave): cada
+consulta traz os próximos EXPORTACAO_CHUNK_SIZE registros com pk menor que o
+último lido, do mais novo para o mais antigo. Não depende de server-side
+cursor, que o psycopg2 não usa com DISABLE_SERVER_SIDE_CURSORS (modo pooler,
+config/database.py) e que não é seguro no pooler de transação. Os bytes são
+emitidos em blocos pelo StreamingHttpResponse, então o consumo de memória não
+depende do número de linhas exportadas:
+
+    COLUNAS = [('Data', 'data'), ('Equipamento', 'equipamento__codigo')]
+    return exportar_queryset(request, qs, COLUNAS, 'abastecimentos')
+
+- CSV no padrão do Excel pt-BR: UTF-8 com BOM, separador ";", decimais
+  com vírgula e datas dd/mm/aaaa;
+- XLSX gerado direto em XML/ZIP (zipfile em modo streaming), com números
+  e datas tipados e cabeçalho congelado. Limitado a 1.048.576 linhas
+  (limite do Excel); acima disso use CSV.
+
+O formato vem de ?formato=csv|xlsx (padrão csv).
+"""
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime, time
+from decimal import Decimal
+from itertools import islice
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+LINHAS_POR_BLOCO = 500
+LIMITE_LINHAS_XLSX = 1048576 - 1  # menos o cabeçalho
+LIMITE_TEXTO_XLSX = 32767
+EPOCA_EXCEL = datetime(1899, 12, 30)
+
+# Caracteres de controle não permitidos em XML 1.0
+_CONTROLE_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _local(valor):
+    """datetime aware -> horário local ingênuo (TIME_ZONE)."""
+    if timezone.is_aware(valor):
+        valor = timezone.localtime(valor)
+    return valor.replace(tzinfo=None)
+
+
+# ----------------------------------------------------------------------
+# CSV
+# ----------------------------------------------------------------------
+
+def _texto_csv(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, bool):
+        return 'Sim' if valor else 'Não'
+    if isinstance(valor, (Decimal, float)):
+        return str(valor).replace('.', ',')
+    if isinstance(valor, datetime):
+        return _local(valor).strftime('%d/%m/%Y %H:%M:%S')
+    if isinstance(valor, date):
+        return valor.strftime('%d/%m/%Y')
+    return valor
+
+
+def gerar_csv(cabecalho, linhas):
+    """Gera o CSV em blocos de bytes (LINHAS_POR_BLOCO linhas por bloco)."""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, delimiter=';')
+    buffer.write('\ufeff')  # BOM: o Excel reconhece UTF-8
+    escritor.writerow(cabecalho)
+    for i, linha in enumerate(linhas, 1):
+        escritor.writerow([_texto_csv(valor) for valor in linha])
+        if i % LINHAS_POR_BLOCO == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+# ----------------------------------------------------------------------
+# XLSX
+# ----------------------------------------------------------------------
+
+ESTILO_DATA = 1
+ESTILO_DATA_HORA = 2
+ESTILO_CABECALHO = 3
+
+_CONTENT_TYPES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{nome}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_WORKBOOK_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+# Estilos (índices em cellXfs): 0 padrão, 1 data, 2 data/hora, 3 cabeçalho em negrito
+_STYLES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="dd/mm/yyyy hh:mm"/></numFmts>'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="4">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '</cellXfs>'
+    '</styleSheet>'
+)
+_INICIO_PLANILHA = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetViews><sheetView workbookViewId="0">'
+    '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+    '</sheetView></sheetViews>'
+    '<sheetData>'
+)
+_FIM_PLANILHA = '</sheetData></worksheet>'
+
+
+class _Saida:
+    """Destino sem seek para o ZipFile: acumula os bytes até serem emitidos."""
+
+    def __init__(self):
+        self.partes = []
+
+    def write(self, dados):
+        self.partes.append(bytes(dados))
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def esvaziar(self):
+        dados = b''.join(self.partes)
+        self.partes.clear()
+        return dados
+
+
+def _coluna(indice):
+    """0 -> A, 25 -> Z, 26 -> AA."""
+    letras = ''
+    indice += 1
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+def _celula(ref, valor, estilo=0):
+    if valor is None or valor == '':
+        return ''
+    if isinstance(valor, bool):
+        return f'<c r="{ref}" t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float, Decimal)):
+        return f'<c r="{ref}"><v>{valor}</v></c>'
+    if isinstance(valor, datetime):
+        serial = (_local(valor) - EPOCA_EXCEL).total_seconds() / 86400
+        return f'<c r="{ref}" s="{ESTILO_DATA_HORA}"><v>{serial:.10f}</v></c>'
+    if isinstance(valor, date):
+        serial = (datetime.combine(valor, time()) - EPOCA_EXCEL).days
+        return f'<c r="{ref}" s="{ESTILO_DATA}"><v>{serial}</v></c>'
+    texto = escape(_CONTROLE_XML.sub('', str(valor))[:LIMITE_TEXTO_XLSX])
+    estilo = f' s="{estilo}"' if estilo else ''
+    return f'<c r="{ref}" t="inlineStr"{estilo}><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _linha_xml(numero, colunas, valores, estilo=0):
+    celulas = ''.join(
+        _celula(f'{coluna}{numero}', valor, estilo) for coluna, valor in zip(colunas, valores)
+    )
+    return f'<row r="{numero}">{celulas}</row>'
+
+
+def gerar_xlsx(cabecalho, linhas, nome_planilha='Dados'):
+    """Gera o XLSX (uma planilha) em blocos de bytes."""
+    saida = _Saida()
+    colunas = [_coluna(i) for i in range(len(cabecalho))]
+    with zipfile.ZipFile(saida, 'w', compression=zipfile.ZIP_DEFLATED) as arquivo:
+        arquivo.writestr('[Content_Types].xml', _CONTENT_TYPES_XML)
+        arquivo.writestr('_rels/.rels', _RELS_XML)
+        arquivo.writestr('xl/workbook.xml', _WORKBOOK_XML.format(nome=escape(nome_planilha[:31])))
+        arquivo.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS_XML)
+        arquivo.writestr('xl/styles.xml', _STYLES_XML)
+
+        with arquivo.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as planilha:
+            planilha.write((_INICIO_PLANILHA + _linha_xml(1, colunas, cabecalho, ESTILO_CABECALHO)).encode())
+            bloco = []
+            for numero, linha in enumerate(islice(linhas, LIMITE_LINHAS_XLSX), 2):
+                bloco.append(_linha_xml(numero, colunas, linha))
+                if len(bloco) == LINHAS_POR_BLOCO:
+                    planilha.write(''.join(bloco).encode())
+                    bloco = []
+                    dados = saida.esvaziar()
+                    if dados:
+                        yield dados
+            planilha.write((''.join(bloco) + _FIM_PLANILHA).encode())
+    yield saida.esvaziar()
+
+
+# ----------------------------------------------------------------------
+# Views
+# ----------------------------------------------------------------------
+
+GERADORES = {'csv': gerar_csv, 'xlsx': gerar_xlsx}
+
+
+def filtrar_periodo(queryset, request, campo):
+    """Aplica ?data_inicio=/?data_fim= (YYYY-MM-DD, inclusivos) ao campo de data informado."""
+    for parametro, operador in (('data_inicio', 'gte'), ('data_fim', 'lte')):
+        texto = request.query_params.get(parametro)
+        if not texto:
+            continue
+        try:
+            valor = parse_date(texto)
+        except ValueError:
+            valor = None
+        if valor is None:
+            raise ValidationError({parametro: 'Use o formato YYYY-MM-DD.'})
+        queryset = queryset.filter(**{f'{campo}__{operador}': valor})
+    return queryset
+
+
+def resposta_exportacao(request, nome_arquivo, cabecalho, linhas):
+    """StreamingHttpResponse no formato de ?formato= (400 se inválido)."""
+    formato = request.query_params.get('formato', 'csv').lower()
+    if formato not in GERADORES:
+        return Response({'detail': 'formato deve ser csv ou xlsx'}, status=status.HTTP_400_BAD_REQUEST)
+    response = StreamingHttpResponse(GERADORES[formato](cabecalho, linhas), content_type=CONTENT_TYPES[formato])
+    response['Content-Disposition'] = f'attachment; filename="{nome_arquivo}.{formato}"'
+    return response
+
+
+def linhas_por_chave(queryset, campos, ordem_linhas=(), tamanho=None):
+    """
+    Gera as tuplas de values_list(*campos) de `queryset` em consultas de até
+    `tamanho` registros (padrão EXPORTACAO_CHUNK_SIZE), por pk decrescente.
+
+    Com `ordem_linhas` (campos de uma relação com várias linhas por registro,
+    ex.: respostas de um checklist), cada bloco busca primeiro os pks e depois
+    todas as linhas desses registros, ordenadas por pk e `ordem_linhas`.
+    """
+    tamanho = tamanho or settings.EXPORTACAO_CHUNK_SIZE
+    queryset = queryset.prefetch_related(None).order_by()
+    ultimo = None
+    while True:
+        bloco = queryset if ultimo is None else queryset.filter(pk__lt=ultimo)
+        if ordem_linhas:
+            pks = list(bloco.order_by('-pk').values_list('pk', flat=True).distinct()[:tamanho])
+            if not pks:
+                return
+            yield from queryset.filter(pk__in=pks).order_by('-pk', *ordem_linhas).values_list(*campos)
+            lidos, ultimo = len(pks), pks[-1]
+        else:
+            linhas = list(bloco.order_by('-pk').values_list('pk', *campos)[:tamanho])
+            if not linhas:
+                return
+            for linha in linhas:
+                yield linha[1:]
+            lidos, ultimo = len(linhas), linhas[-1][0]
+        if lidos < tamanho:
+            return
+
+
+def exportar_queryset(request, queryset, colunas, nome_arquivo, ordem_linhas=()):
+    """
+    Exporta `queryset` com as colunas [(título, campo), ...], do registro
+    mais novo (maior pk) para o mais antigo.
+
+    Os campos podem atravessar relações (ex.: 'equipamento__codigo'); a
+    leitura usa values_list em blocos (linhas_por_chave), então nenhum objeto
+    de model é criado.
+    """
+    cabecalho = [titulo for titulo, _ in colunas]
+    linhas = linhas_por_chave(queryset, [campo for _, campo in colunas], ordem_linhas)
+    return resposta_exportacao(request, nome_arquivo, cabecalho, linhas)
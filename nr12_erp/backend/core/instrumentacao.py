@@ -0,0 +1,135 @@
+"""
+Instrumentação de requests: número de queries, tempo de banco e tempo total
+por endpoint (nome da URL resolvida).
+
+As amostras ficam em um ring buffer em memória (collections.deque com
+INSTRUMENTACAO_BUFFER posições) de cada processo. A cada
+INSTRUMENTACAO_PUBLICAR_S segundos o processo publica uma cópia do buffer
+no cache padrão, para que o relatório (GET /api/v1/instrumentacao/ e
+manage.py relatorio_instrumentacao) junte os workers do gunicorn quando o
+cache é compartilhado (Redis/arquivo).
+
+Com INSTRUMENTACAO_ENABLED=False o middleware levanta MiddlewareNotUsed e
+sai da pilha: nenhum custo por request.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import cache
+
+CHAVE_PROCESSOS = 'instrumentacao:processos'
+CHAVE_AMOSTRAS = 'instrumentacao:amostras:{}'
+TTL_PUBLICACAO = 24 * 60 * 60
+
+
+class BufferAmostras:
+    """Ring buffer de (endpoint, queries, db_ms, total_ms); append é thread-safe no deque."""
+
+    def __init__(self, tamanho):
+        self.amostras = deque(maxlen=tamanho)
+        self.ultima_publicacao = 0.0
+        self._lock = threading.Lock()
+
+    def registrar(self, endpoint, queries, db_ms, total_ms):
+        self.amostras.append((endpoint, queries, db_ms, total_ms))
+        intervalo = getattr(settings, 'INSTRUMENTACAO_PUBLICAR_S', 30)
+        if time.monotonic() - self.ultima_publicacao >= intervalo:
+            self.publicar()
+
+    def publicar(self):
+        """Copia o buffer para o cache (chave por pid)."""
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self.ultima_publicacao = time.monotonic()
+            pid = os.getpid()
+            cache.set(CHAVE_AMOSTRAS.format(pid), list(self.amostras), TTL_PUBLICACAO)
+            processos = cache.get(CHAVE_PROCESSOS) or set()
+            if pid not in processos:
+                cache.set(CHAVE_PROCESSOS, processos | {pid}, TTL_PUBLICACAO)
+        except Exception:
+            pass  # instrumentação nunca derruba o request
+        finally:
+            self._lock.release()
+
+    def limpar(self):
+        self.amostras.clear()
+
+
+buffer = BufferAmostras(getattr(settings, 'INSTRUMENTACAO_BUFFER', 5000))
+
+
+class ContadorQueries:
+    """execute_wrapper que conta as queries e soma o tempo gasto no banco."""
+
+    def __init__(self):
+        self.queries = 0
+        self.segundos = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.segundos += time.perf_counter() - inicio
+            self.queries += 1
+
+
+def _percentil(ordenados, p):
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+def _resumo(valores):
+    ordenados = sorted(valores)
+    return {
+        'p50': round(_percentil(ordenados, 50), 2),
+        'p95': round(_percentil(ordenados, 95), 2),
+        'max': round(ordenados[-1], 2),
+    }
+
+
+def coletar_amostras(incluir_local=True):
+    """Amostras publicadas por todos os processos (+ o buffer deste processo, atualizado)."""
+    pid_local = os.getpid()
+    processos = cache.get(CHAVE_PROCESSOS) or set()
+    amostras = []
+    publicadas = cache.get_many([CHAVE_AMOSTRAS.format(pid) for pid in processos if pid != pid_local])
+    for lista in publicadas.values():
+        amostras.extend(lista)
+    if incluir_local:
+        amostras.extend(list(buffer.amostras))
+    return amostras
+
+
+def gerar_relatorio(amostras):
+    """p50/p95/max de queries, tempo de banco e tempo total por endpoint (mais lentos primeiro)."""
+    por_endpoint = {}
+    for endpoint, queries, db_ms, total_ms in amostras:
+        grupo = por_endpoint.setdefault(endpoint, ([], [], []))
+        grupo[0].append(queries)
+        grupo[1].append(db_ms)
+        grupo[2].append(total_ms)
+
+    relatorio = [
+        {
+            'endpoint': endpoint,
+            'requests': len(queries),
+            'queries': _resumo(queries),
+            'db_ms': _resumo(db_ms),
+            'total_ms': _resumo(total_ms),
+        }
+        for endpoint, (queries, db_ms, total_ms) in por_endpoint.items()
+    ]
+    relatorio.sort(key=lambda item: item['total_ms']['p95'], reverse=True)
+    return relatorio
+
+
+def limpar_amostras():
+    """Descarta o buffer local e as cópias publicadas por todos os processos."""
+    buffer.limpar()
+    processos = cache.get(CHAVE_PROCESSOS) or set()
+    cache.delete_many([CHAVE_AMOSTRAS.format(pid) for pid in processos] + [CHAVE_PROCESSOS])
@@ -0,0 +1,49 @@
+"""
+Worker da fila de geração de QR codes (QRCodeJob).
+
+Uso:
+    python manage.py processar_qr_codes                       # processa os pendentes e sai
+    python manage.py processar_qr_codes --loop --intervalo 5  # worker contínuo
+    python manage.py processar_qr_codes --regenerar-todos     # enfileira todos e processa
+    python manage.py processar_qr_codes --regenerar-todos --tipo EQUIPAMENTO --somente-sem-qr
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.qr_jobs import MODELOS, enfileirar_todos, processar_pendentes
+
+
+class Command(BaseCommand):
+    help = 'Processa a fila de geração de QR codes de equipamentos e empreendimentos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Continua aguardando novos jobs')
+        parser.add_argument('--intervalo', type=float, default=5, help='Segundos entre verificações no modo --loop')
+        parser.add_argument('--lote', type=int, default=100, help='Jobs por lote (padrão: 100)')
+        parser.add_argument('--regenerar-todos', action='store_true', help='Enfileira a regeneração de todos os QR codes')
+        parser.add_argument('--somente-sem-qr', action='store_true', help='Com --regenerar-todos: apenas registros sem QR')
+        parser.add_argument('--tipo', choices=list(MODELOS), help='Restringe --regenerar-todos a um tipo')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote deve ser maior que zero')
+
+        if options['regenerar_todos']:
+            tipos = [options['tipo']] if options['tipo'] else None
+            criados = enfileirar_todos(tipos=tipos, somente_sem_qr=options['somente_sem_qr'])
+            self.stdout.write(f"📥 {criados} job(s) enfileirado(s)")
+
+        total = {}
+        while True:
+            resultado = processar_pendentes(limite=options['lote'])
+            for status, qtd in resultado.items():
+                total[status] = total.get(status, 0) + qtd
+            if resultado:
+                self.stdout.write(f"  Lote: {resultado}")
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['intervalo'])
+
+        self.stdout.write(self.style.SUCCESS(f"✅ QR codes processados: {total or 'nenhum pendente'}"))
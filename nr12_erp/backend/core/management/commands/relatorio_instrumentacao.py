@@ -0,0 +1,51 @@
+"""
+Exporta em JSON o relatório de instrumentação de requests (core/instrumentacao.py).
+
+Lê as amostras publicadas no cache pelos processos do servidor
+(INSTRUMENTACAO_ENABLED=True; com cache compartilhado Redis/arquivo junta
+todos os workers).
+
+Uso:
+    python manage.py relatorio_instrumentacao                     # imprime no stdout
+    python manage.py relatorio_instrumentacao --saida relatorio.json
+    python manage.py relatorio_instrumentacao --top 20 --limpar   # 20 mais lentos e zera
+"""
+import json
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.instrumentacao import coletar_amostras, gerar_relatorio, limpar_amostras
+
+
+class Command(BaseCommand):
+    help = 'Exporta p50/p95/max de queries e latência por endpoint em JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--saida', help='Arquivo de saída (padrão: stdout)')
+        parser.add_argument('--top', type=int, help='Apenas os N endpoints mais lentos (p95 do tempo total)')
+        parser.add_argument('--limpar', action='store_true', help='Descarta as amostras após exportar')
+
+    def handle(self, *args, **options):
+        amostras = coletar_amostras()
+        endpoints = gerar_relatorio(amostras)
+        if options['top']:
+            endpoints = endpoints[:options['top']]
+
+        conteudo = json.dumps({
+            'gerado_em': timezone.now().isoformat(),
+            'amostras': len(amostras),
+            'endpoints': endpoints,
+        }, indent=2, ensure_ascii=False)
+
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+                arquivo.write(conteudo)
+            self.stdout.write(self.style.SUCCESS(
+                f"{len(endpoints)} endpoints ({len(amostras)} amostras) exportados para {options['saida']}"
+            ))
+        else:
+            self.stdout.write(conteudo)
+
+        if options['limpar']:
+            limpar_amostras()
@@ -13,3 +13,36 @@ class CookieToAuthorizationMiddleware(MiddlewareMixin):
         access = request.COOKIES.get("access")
         if access:
             request.META["HTTP_AUTHORIZATION"] = f"Bearer {access}"
+
+
+class InstrumentacaoMiddleware:
+    """
+    Registra queries, tempo de banco e tempo total por endpoint (core/instrumentacao.py).
+
+    Desligado (INSTRUMENTACAO_ENABLED=False) o middleware é removido da pilha.
+    """
+    def __init__(self, get_response):
+        from django.conf import settings
+        from django.core.exceptions import MiddlewareNotUsed
+        if not getattr(settings, "INSTRUMENTACAO_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        import time
+        from contextlib import ExitStack
+        from django.db import connections
+        from .instrumentacao import ContadorQueries, buffer
+
+        contador = ContadorQueries()
+        inicio = time.perf_counter()
+        with ExitStack() as stack:
+            for conexao in connections.all():
+                stack.enter_context(conexao.execute_wrapper(contador))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - inicio) * 1000
+
+        match = getattr(request, "resolver_match", None)
+        nome = match.view_name if match and match.view_name else "<nao-resolvido>"
+        buffer.registrar(f"{request.method} {nome}", contador.queries, contador.segundos * 1000, total_ms)
+        return response
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:14
+
+from django.db import migrations, models
+
+SERIES = [
+    ('financeiro', 'ContaReceber', 'CR'),
+    ('financeiro', 'ContaPagar', 'CP'),
+    ('financeiro', 'Pagamento', 'PAG'),
+    ('orcamentos', 'Orcamento', 'ORC'),
+    ('ordens_servico', 'OrdemServico', 'OS'),
+]
+
+
+def iniciar_contadores(apps, schema_editor):
+    """Cada contador começa no maior número já usado pela série."""
+    SequenciaDocumento = apps.get_model('core', 'SequenciaDocumento')
+    for app_label, model_name, serie in SERIES:
+        prefixo = f"{serie}-"
+        numeros = apps.get_model(app_label, model_name).objects.filter(
+            numero__startswith=prefixo
+        ).values_list('numero', flat=True)
+        ultimo = max(
+            (int(numero[len(prefixo):]) for numero in numeros.iterator() if numero[len(prefixo):].isdigit()),
+            default=0,
+        )
+        SequenciaDocumento.objects.update_or_create(serie=serie, defaults={'ultimo': ultimo})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_qrcodejob'),
+        ('financeiro', '0004_pagamento'),
+        ('orcamentos', '0005_orcamento_itens_manutencao'),
+        ('ordens_servico', '0003_ordemservico_horimetro_final_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SequenciaDocumento',
+            fields=[
+                ('serie', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('ultimo', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Sequência de Documento',
+                'verbose_name_plural': 'Sequências de Documentos',
+            },
+        ),
+        migrations.RunPython(iniciar_contadores, migrations.RunPython.noop),
+    ]
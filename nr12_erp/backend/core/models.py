@@ -621,3 +621,65 @@ class OperadorEquipamento(models.Model):
             from django.utils import timezone
             return timezone.now().date() <= self.data_validade
         return True
+
+
+class QRCodeJob(models.Model):
+    """
+    Fila de geração de QR codes (processada por: python manage.py processar_qr_codes).
+
+    Há no máximo um job PENDENTE por objeto (tipo + uuid); pedidos repetidos
+    enquanto o job não é processado são descartados.
+    """
+    TIPO_CHOICES = [
+        ("EQUIPAMENTO", "Equipamento"),
+        ("EMPREENDIMENTO", "Empreendimento"),
+    ]
+    STATUS_CHOICES = [
+        ("PENDENTE", "Pendente"),
+        ("PROCESSANDO", "Processando"),
+        ("CONCLUIDO", "Concluído"),
+        ("ERRO", "Erro"),
+    ]
+
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    objeto_uuid = models.UUIDField(db_index=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="PENDENTE")
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    erro = models.TextField(blank=True, default="")
+    criado_em = models.DateTimeField(auto_now_add=True)
+    iniciado_em = models.DateTimeField(null=True, blank=True)
+    concluido_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['criado_em']
+        verbose_name = 'Job de QR Code'
+        verbose_name_plural = 'Jobs de QR Code'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tipo', 'objeto_uuid'],
+                condition=models.Q(status='PENDENTE'),
+                name='unique_qrcodejob_pendente',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'criado_em']),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} {self.objeto_uuid} ({self.status})"
+
+
+class SequenciaDocumento(models.Model):
+    """
+    Contador de uma série de numeração de documentos (CR, CP, PAG, ORC, OS).
+    Usado só por core/numeracao.py.
+    """
+    serie = models.CharField(max_length=20, primary_key=True)
+    ultimo = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Sequência de Documento'
+        verbose_name_plural = 'Sequências de Documentos'
+
+    def __str__(self):
+        return f"{self.serie}: {self.ultimo}"
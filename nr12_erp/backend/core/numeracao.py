@@ -0,0 +1,45 @@
+"""
+Numeração sequencial de documentos (CR-000001, PAG-000001, OS-000001...).
+
+Cada série tem um contador em SequenciaDocumento. reservar_numeros() soma ao
+contador com um UPDATE (ultimo = ultimo + n), que trava a linha até o fim da
+transação: inserções simultâneas na mesma série esperam umas pelas outras e
+nunca recebem o mesmo número. O contador anda na mesma transação que grava o
+documento, então um rollback devolve os números e a série fica sem buracos
+(o que uma sequence nativa do banco não garante).
+
+Lotes reservam um bloco de números de uma vez (numerar(objetos, serie)).
+"""
+from django.db import transaction
+from django.db.models import F
+
+from .models import SequenciaDocumento
+
+
+def reservar_numeros(serie, quantidade=1):
+    """
+    Reserva `quantidade` números consecutivos da série e retorna o range.
+    Deve rodar na transação que grava os documentos.
+    """
+    with transaction.atomic():
+        contador = SequenciaDocumento.objects.filter(serie=serie)
+        if not contador.update(ultimo=F('ultimo') + quantidade):
+            # Primeiro uso da série: cria o contador (concorrência resolvida pela PK)
+            SequenciaDocumento.objects.bulk_create([SequenciaDocumento(serie=serie)], ignore_conflicts=True)
+            contador.update(ultimo=F('ultimo') + quantidade)
+        ultimo = contador.values_list('ultimo', flat=True).get()
+    return range(ultimo - quantidade + 1, ultimo + 1)
+
+
+def formatar_numero(serie, numero):
+    return f"{serie}-{numero:06d}"
+
+
+def numerar(objetos, serie):
+    """Preenche `numero` dos objetos (ainda não salvos) que não têm, com um único bloco da série."""
+    sem_numero = [obj for obj in objetos if not obj.numero]
+    if sem_numero:
+        for obj, numero in zip(sem_numero, reservar_numeros(serie, len(sem_numero))):
+            obj.numero = formatar_numero(serie, numero)
+    return objetos
+
@@ -0,0 +1,117 @@
+"""
+Paginação da API (REST_FRAMEWORK.DEFAULT_PAGINATION_CLASS).
+
+PaginacaoPadrao mantém o comportamento do PageNumberPagination (?page=N,
+com "count") e, nas views que declaram `paginacao_keyset` (nome do campo de
+data/hora), oferece paginação keyset ordenada por (campo, id), do mais
+recente para o mais antigo:
+
+- ativada com ?paginacao=keyset, ao seguir um link "next" (?cursor=...) ou
+  sempre, na view com `paginacao_keyset_padrao = True`;
+- sem COUNT(*) e sem OFFSET: cada página filtra (campo, id) < último item
+  da página anterior, usando o índice composto (campo, id) do model;
+- resposta: {"next": url ou null, "previous": null, "results": [...]}.
+
+O ?ordering do OrderingFilter é ignorado no modo keyset.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class PaginacaoKeyset(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size = None  # padrão: REST_FRAMEWORK.PAGE_SIZE
+
+    def __init__(self):
+        if self.page_size is None:
+            self.page_size = PageNumberPagination.page_size
+
+    @staticmethod
+    def codificar(valor, pk):
+        texto = json.dumps([valor.isoformat(), pk])
+        return base64.urlsafe_b64encode(texto.encode()).decode().rstrip('=')
+
+    def decodificar(self, cursor, campo):
+        try:
+            texto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+            valor, pk = json.loads(texto)
+            return campo.to_python(valor), int(pk)
+        except (ValueError, TypeError, ValidationError):
+            raise NotFound('Cursor inválido.')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        nome = view.paginacao_keyset
+        campo = queryset.model._meta.get_field(nome)
+        self.request = request
+        self.nome_campo = nome
+
+        queryset = queryset.order_by(f'-{nome}', '-pk')
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            valor, pk = self.decodificar(cursor, campo)
+            queryset = queryset.filter(Q(**{f'{nome}__lt': valor}) | Q(**{nome: valor, 'pk__lt': pk}))
+
+        # Um item a mais indica se existe próxima página
+        itens = list(queryset[:self.page_size + 1])
+        self.tem_proxima = len(itens) > self.page_size
+        self.pagina = itens[:self.page_size]
+        return self.pagina
+
+    def get_next_link(self):
+        if not self.tem_proxima:
+            return None
+        ultimo = self.pagina[-1]
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, 'page')
+        return replace_query_param(
+            url, self.cursor_query_param, self.codificar(getattr(ultimo, self.nome_campo), ultimo.pk)
+        )
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'previous': None, 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+def usar_keyset(request, view):
+    if not getattr(view, 'paginacao_keyset', None):
+        return False
+    return (
+        getattr(view, 'paginacao_keyset_padrao', False)
+        or request.query_params.get('paginacao') == 'keyset'
+        or PaginacaoKeyset.cursor_query_param in request.query_params
+    )
+
+
+class PaginacaoPadrao(PageNumberPagination):
+    """PageNumberPagination com o modo keyset opcional (ver docstring do módulo)."""
+
+    keyset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if usar_keyset(request, view):
+            self.keyset = PaginacaoKeyset()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -1,20 +1,13 @@
 """
 Permissões customizadas baseadas em roles e módulos habilitados
 """
-from django.db import models
+import logging
+
 from rest_framework import permissions
 
+from .escopo import aplicar_escopo, get_user_role_safe, obter_escopo  # noqa: F401 (get_user_role_safe é API pública)
 
-def get_user_role_safe(user):
-    """Retorna role do usuário de forma segura, sem risco de 500."""
-    try:
-        if user.is_superuser:
-            return 'ADMIN'
-        if hasattr(user, 'profile') and user.profile:
-            return user.profile.role
-    except Exception:
-        pass
-    return None
+logger = logging.getLogger(__name__)
 
 
 def filter_by_role(queryset, user):
@@ -27,17 +20,16 @@ def filter_by_role(queryset, user):
     - CLIENTE: vê apenas dados do seu cliente (por campo 'cliente' ou 'equipamento__cliente')
     - SUPERVISOR: vê dados dos empreendimentos que supervisiona
     - OPERADOR/TECNICO: veem tudo (controle feito por HasModuleAccess)
-    """
-    import logging
-    logger = logging.getLogger(__name__)
 
+    O role e os ids de clientes vêm do EscopoAcesso (core/escopo.py), resolvido
+    uma vez por request; o caminho até o cliente vem do registro por model.
+    """
     if not user.is_authenticated:
-        logger.warning(f"filter_by_role: usuário não autenticado")
+        logger.warning("filter_by_role: usuário não autenticado")
         return queryset.none()
 
-    role = get_user_role_safe(user)
-    model_name = queryset.model.__name__
-    logger.info(f"filter_by_role: user={user.username}, role={role}, model={model_name}")
+    escopo = obter_escopo(user)
+    role = escopo.role
 
     # Se não conseguiu determinar o role, bloqueia acesso por segurança
     if role is None:
@@ -45,182 +37,35 @@ def filter_by_role(queryset, user):
         return queryset.none()
 
     if role == 'ADMIN':
-        logger.info(f"filter_by_role: ADMIN - retornando queryset completo")
         return queryset
 
     if role == 'CLIENTE':
+        if not escopo.tem_perfil:
+            return queryset.none()
         try:
-            cliente = getattr(user, 'cliente_profile', None)
-            if not cliente:
-                return queryset.none()
-            model = queryset.model
-            # Model é Cliente
-            if model.__name__ == 'Cliente':
-                return queryset.filter(id=cliente.id)
-            # Model é Empreendimento
-            if model.__name__ == 'Empreendimento':
-                return queryset.filter(cliente=cliente)
-            # Tecnico/Operador com M2M 'clientes'
-            if model.__name__ in ('Tecnico', 'Operador'):
-                return queryset.filter(clientes=cliente).distinct()
-            # Model tem campo 'cliente' direto (Orcamento, OrdemServico, ContaReceber, PedidoCompra)
-            if hasattr(model, 'cliente'):
-                return queryset.filter(cliente=cliente)
-            # Model tem campo 'equipamento' (Abastecimento, Manutencao, ChecklistRealizado)
-            if hasattr(model, 'equipamento'):
-                return queryset.filter(equipamento__cliente=cliente)
-            # Model tem campo 'checklist' (RespostaItemChecklist)
-            if hasattr(model, 'checklist'):
-                return queryset.filter(checklist__equipamento__cliente=cliente)
-            # Model tem campo 'manutencao' (RespostaItemManutencao)
-            if hasattr(model, 'manutencao'):
-                return queryset.filter(manutencao__equipamento__cliente=cliente)
-            # Model tem campo 'ordem_servico' (ItemOrdemServico)
-            if hasattr(model, 'ordem_servico'):
-                return queryset.filter(ordem_servico__cliente=cliente)
-            # Model tem campo 'orcamento' (ItemOrcamento)
-            if hasattr(model, 'orcamento'):
-                return queryset.filter(orcamento__cliente=cliente)
-            # Model tem campo 'pedido' (ItemPedidoCompra)
-            if hasattr(model, 'pedido'):
-                return queryset.filter(pedido__cliente=cliente)
-            # Model tem campo 'conta_receber' (Pagamento)
-            if hasattr(model, 'conta_receber'):
-                return queryset.filter(conta_receber__cliente=cliente)
+            return aplicar_escopo(queryset, escopo, 'CLIENTE')
         except Exception:
-            pass
-        return queryset.none()
+            return queryset.none()
 
     if role == 'SUPERVISOR':
+        if not escopo.tem_perfil:
+            return queryset
+        # Se não tem clientes vinculados, não vê nada
+        if not escopo.clientes_ids:
+            return queryset.none()
         try:
-            supervisor = getattr(user, 'supervisor_profile', None)
-            if not supervisor:
-                return queryset
-            model = queryset.model
-
-            # Pega os clientes vinculados ao supervisor (acesso igual ao CLIENTE)
-            clientes_ids = list(supervisor.clientes.values_list('id', flat=True))
-            logger.info(f"filter_by_role SUPERVISOR: clientes_ids={clientes_ids}")
-
-            # Se não tem clientes vinculados, não vê nada
-            if not clientes_ids:
-                return queryset.none()
-
-            # Model é Cliente - vê apenas os clientes vinculados
-            if model.__name__ == 'Cliente':
-                return queryset.filter(id__in=clientes_ids)
-
-            # Model é Empreendimento - vê empreendimentos dos clientes vinculados
-            if model.__name__ == 'Empreendimento':
-                return queryset.filter(cliente_id__in=clientes_ids)
-
-            # Tecnico/Operador com M2M 'clientes'
-            if model.__name__ in ('Tecnico', 'Operador'):
-                return queryset.filter(clientes__id__in=clientes_ids).distinct()
-
-            # Supervisor - vê apenas ele mesmo
-            if model.__name__ == 'Supervisor':
-                return queryset.filter(id=supervisor.id)
-
-            # Model tem campo 'cliente' direto (Orcamento, OrdemServico, ContaReceber, PedidoCompra, Equipamento)
-            if hasattr(model, 'cliente'):
-                return queryset.filter(cliente_id__in=clientes_ids)
-
-            # Model tem campo 'equipamento' (Abastecimento, Manutencao, ChecklistRealizado)
-            if hasattr(model, 'equipamento'):
-                return queryset.filter(equipamento__cliente_id__in=clientes_ids)
-
-            # Model tem campo 'checklist' (RespostaItemChecklist)
-            if hasattr(model, 'checklist'):
-                return queryset.filter(checklist__equipamento__cliente_id__in=clientes_ids)
-
-            # Model tem campo 'manutencao' (RespostaItemManutencao)
-            if hasattr(model, 'manutencao'):
-                return queryset.filter(manutencao__equipamento__cliente_id__in=clientes_ids)
-
-            # Model tem campo 'empreendimento'
-            if hasattr(model, 'empreendimento'):
-                return queryset.filter(empreendimento__cliente_id__in=clientes_ids)
-
-            # Model tem campo 'ordem_servico' (ItemOrdemServico)
-            if hasattr(model, 'ordem_servico'):
-                return queryset.filter(ordem_servico__cliente_id__in=clientes_ids)
-
-            # Model tem campo 'orcamento' (ItemOrcamento)
-            if hasattr(model, 'orcamento'):
-                return queryset.filter(orcamento__cliente_id__in=clientes_ids)
-
-            # Model tem campo 'pedido' (ItemPedidoCompra)
-            if hasattr(model, 'pedido'):
-                return queryset.filter(pedido__cliente_id__in=clientes_ids)
-
-            # Model tem campo 'conta_receber' (Pagamento)
-            if hasattr(model, 'conta_receber'):
-                return queryset.filter(conta_receber__cliente_id__in=clientes_ids)
-
+            return aplicar_escopo(queryset, escopo, 'SUPERVISOR')
         except Exception as e:
             logger.error(f"filter_by_role SUPERVISOR error: {e}")
-            pass
-        return queryset.none()
+            return queryset.none()
 
     if role == 'OPERADOR':
+        if not escopo.tem_perfil:
+            return queryset
         try:
-            operador = getattr(user, 'operador_profile', None)
-            if not operador:
-                return queryset
-            model = queryset.model
-            # Operador ve apenas equipamentos autorizados
-            if model.__name__ == 'Equipamento':
-                return queryset.filter(
-                    models.Q(id__in=operador.equipamentos_autorizados.values_list('id', flat=True)) |
-                    models.Q(cliente__in=operador.clientes.all())
-                ).distinct()
-            # Models com equipamento (Checklist, Abastecimento, Manutencao, etc)
-            if hasattr(model, 'equipamento'):
-                return queryset.filter(
-                    models.Q(equipamento__in=operador.equipamentos_autorizados.all()) |
-                    models.Q(equipamento__cliente__in=operador.clientes.all())
-                ).distinct()
-            # Models com checklist (RespostaItemChecklist)
-            if hasattr(model, 'checklist'):
-                return queryset.filter(
-                    models.Q(checklist__equipamento__in=operador.equipamentos_autorizados.all()) |
-                    models.Q(checklist__equipamento__cliente__in=operador.clientes.all())
-                ).distinct()
-            # Models com manutencao (RespostaItemManutencao)
-            if hasattr(model, 'manutencao'):
-                return queryset.filter(
-                    models.Q(manutencao__equipamento__in=operador.equipamentos_autorizados.all()) |
-                    models.Q(manutencao__equipamento__cliente__in=operador.clientes.all())
-                ).distinct()
-            # Sub-recursos com FK indireto
-            if hasattr(model, 'ordem_servico'):
-                return queryset.filter(
-                    models.Q(ordem_servico__cliente__in=operador.clientes.all()) |
-                    models.Q(ordem_servico__equipamento__cliente__in=operador.clientes.all())
-                ).distinct()
-            if hasattr(model, 'orcamento'):
-                return queryset.filter(
-                    models.Q(orcamento__cliente__in=operador.clientes.all()) |
-                    models.Q(orcamento__equipamento__cliente__in=operador.clientes.all())
-                ).distinct()
-            if hasattr(model, 'pedido'):
-                return queryset.filter(
-                    pedido__cliente__in=operador.clientes.all()
-                ).distinct()
-            if hasattr(model, 'conta_receber'):
-                return queryset.filter(
-                    conta_receber__cliente__in=operador.clientes.all()
-                ).distinct()
-            # Empreendimento
-            if model.__name__ == 'Empreendimento':
-                return queryset.filter(cliente__in=operador.clientes.all())
-            # Cliente
-            if model.__name__ == 'Cliente':
-                return queryset.filter(id__in=operador.clientes.values_list('id', flat=True))
+            return aplicar_escopo(queryset, escopo, 'OPERADOR')
         except Exception:
-            pass
-        return queryset
+            return queryset
 
     # TECNICO, FINANCEIRO, COMPRAS: retorna tudo (HasModuleAccess controla acesso)
     if role in ('TECNICO', 'FINANCEIRO', 'COMPRAS'):
@@ -239,15 +84,6 @@ class ClienteFilterMixin:
     - CLIENTE: Vê apenas seus próprios dados
     """
 
-    def _get_user_role(self, user):
-        """Retorna role do usuário de forma segura"""
-        try:
-            if hasattr(user, 'profile') and user.profile:
-                return user.profile.role
-        except Exception:
-            pass
-        return None
-
     def get_queryset(self):
         queryset = super().get_queryset()
         user = self.request.user
@@ -255,50 +91,30 @@ class ClienteFilterMixin:
         if not user.is_authenticated:
             return queryset.none()
 
-        # Superuser sempre vê tudo
-        if user.is_superuser:
-            return queryset
+        escopo = obter_escopo(user)
+        role = escopo.role
 
-        role = self._get_user_role(user)
-
-        # ADMIN vê tudo
+        # ADMIN (inclui superuser) vê tudo
         if role == 'ADMIN':
             return queryset
 
         # CLIENTE vê apenas seus próprios dados
         if role == 'CLIENTE':
+            if not escopo.tem_perfil:
+                return queryset.none()
             try:
-                cliente = getattr(user, 'cliente_profile', None)
-                if cliente:
-                    if hasattr(queryset.model, 'cliente'):
-                        return queryset.filter(cliente=cliente)
-                    if queryset.model.__name__ == 'Cliente':
-                        return queryset.filter(id=cliente.id)
-                    if hasattr(queryset.model, 'equipamento'):
-                        return queryset.filter(equipamento__cliente=cliente)
+                return aplicar_escopo(queryset, escopo, 'MIXIN_CLIENTE')
             except Exception:
-                pass
-            return queryset.none()
+                return queryset.none()
 
         # SUPERVISOR vê dados dos clientes vinculados (igual ao CLIENTE)
         if role == 'SUPERVISOR':
+            if not escopo.tem_perfil or not escopo.clientes_ids:
+                return queryset.none()
             try:
-                supervisor = getattr(user, 'supervisor_profile', None)
-                if supervisor:
-                    clientes_ids = list(supervisor.clientes.values_list('id', flat=True))
-                    if not clientes_ids:
-                        return queryset.none()
-                    if queryset.model.__name__ == 'Cliente':
-                        return queryset.filter(id__in=clientes_ids)
-                    if queryset.model.__name__ == 'Empreendimento':
-                        return queryset.filter(cliente_id__in=clientes_ids)
-                    if hasattr(queryset.model, 'cliente'):
-                        return queryset.filter(cliente_id__in=clientes_ids)
-                    if hasattr(queryset.model, 'equipamento'):
-                        return queryset.filter(equipamento__cliente_id__in=clientes_ids)
+                return aplicar_escopo(queryset, escopo, 'MIXIN_SUPERVISOR')
             except Exception:
-                pass
-            return queryset.none()
+                return queryset.none()
 
         # OPERADOR, TECNICO e outros roles: retorna queryset sem filtro extra
         # (o HasModuleAccess já limita o acesso ao módulo)
@@ -0,0 +1,179 @@
+"""
+Folhas de QR codes para impressão (PDF A4 com várias páginas ou PNG em mosaico).
+
+As etiquetas usam generate_qr_code/add_text_to_qr (mesmo visual do QR
+individual). Cada página (PDF) ou faixa de etiquetas (PNG) é renderizada
+em um pool de processos e os bytes são emitidos em ordem assim que ficam
+prontos, então o documento nunca é montado inteiro em memória:
+
+    StreamingHttpResponse(gerar_pdf(rotulos), content_type="application/pdf")
+
+`rotulos` é uma lista de (payload, texto_inferior).
+"""
+import os
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from PIL import Image
+
+from .qr_utils import add_text_to_qr, generate_qr_code
+
+TOP_TEXT = "MANDACARU S M"
+
+
+@dataclass(frozen=True)
+class LayoutFolha:
+    """Dimensões em pixels (A4 a 150 dpi por padrão)."""
+    largura: int = 1240
+    altura: int = 1754
+    colunas: int = 3
+    linhas: int = 4
+    margem: int = 40
+    dpi: int = 150
+
+    @property
+    def por_pagina(self):
+        return self.colunas * self.linhas
+
+    @property
+    def celula(self):
+        return (
+            (self.largura - 2 * self.margem) // self.colunas,
+            (self.altura - 2 * self.margem) // self.linhas,
+        )
+
+
+def _etiqueta(payload, texto, tamanho):
+    """Etiqueta em tons de cinza, centralizada numa célula de `tamanho`."""
+    img = add_text_to_qr(generate_qr_code(payload, box_size=8, border=2), TOP_TEXT, texto).convert("L")
+    img.thumbnail((tamanho[0] - 10, tamanho[1] - 10))
+    celula = Image.new("L", tamanho, 255)
+    celula.paste(img, ((tamanho[0] - img.width) // 2, (tamanho[1] - img.height) // 2))
+    return celula
+
+
+def _faixa(rotulos, layout, largura):
+    """Uma linha de etiquetas com a largura total informada."""
+    largura_celula, altura_celula = layout.celula
+    faixa = Image.new("L", (largura, altura_celula), 255)
+    for i, (payload, texto) in enumerate(rotulos):
+        faixa.paste(_etiqueta(payload, texto, layout.celula), (layout.margem + i * largura_celula, 0))
+    return faixa
+
+
+def renderizar_pagina_pdf(rotulos, layout):
+    """(Worker) Página A4 em tons de cinza, já comprimida com Flate."""
+    pagina = Image.new("L", (layout.largura, layout.altura), 255)
+    altura_celula = layout.celula[1]
+    for linha in range(layout.linhas):
+        bloco = rotulos[linha * layout.colunas:(linha + 1) * layout.colunas]
+        if not bloco:
+            break
+        pagina.paste(_faixa(bloco, layout, layout.largura), (0, layout.margem + linha * altura_celula))
+    return zlib.compress(pagina.tobytes(), 6)
+
+
+def renderizar_faixa_png(rotulos, layout):
+    """(Worker) Scanlines PNG (filtro 0) de uma linha de etiquetas do mosaico."""
+    largura = layout.colunas * layout.celula[0] + 2 * layout.margem
+    faixa = _faixa(rotulos, layout, largura)
+    bruto = faixa.tobytes()
+    return b"".join(b"\x00" + bruto[y * largura:(y + 1) * largura] for y in range(faixa.height))
+
+
+def _em_ordem(funcao, lotes, layout, workers):
+    """
+    Executa funcao(lote, layout) no pool e devolve os resultados em ordem.
+
+    Mantém no máximo 2 * workers lotes em andamento, limitando a memória.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(lotes) <= 1:
+        for lote in lotes:
+            yield funcao(lote, layout)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pendentes = []
+        proximo = 0
+        while proximo < len(lotes) or pendentes:
+            while proximo < len(lotes) and len(pendentes) < 2 * workers:
+                pendentes.append(executor.submit(funcao, lotes[proximo], layout))
+                proximo += 1
+            yield pendentes.pop(0).result()
+
+
+def _lotes(rotulos, tamanho):
+    rotulos = list(rotulos)
+    return [rotulos[i:i + tamanho] for i in range(0, len(rotulos), tamanho)]
+
+
+def gerar_pdf(rotulos, layout=LayoutFolha(), workers=None):
+    """Gera (em pedaços de bytes) um PDF A4 com `layout.por_pagina` etiquetas por página."""
+    paginas = _lotes(rotulos, layout.por_pagina) or [[]]
+    largura_pt = layout.largura * 72 / layout.dpi
+    altura_pt = layout.altura * 72 / layout.dpi
+
+    # Objetos: 1 = catálogo, 2 = árvore de páginas (escritos no fim);
+    # cada página usa 3 objetos: imagem, conteúdo e página
+    offsets = {}
+    posicao = 0
+
+    def objeto(numero, corpo):
+        nonlocal posicao
+        offsets[numero] = posicao
+        dados = f"{numero} 0 obj\n".encode() + corpo + b"\nendobj\n"
+        posicao += len(dados)
+        return dados
+
+    cabecalho = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+    posicao = len(cabecalho)
+    yield cabecalho
+
+    kids = []
+    for i, imagem in enumerate(_em_ordem(renderizar_pagina_pdf, paginas, layout, workers)):
+        n_img, n_conteudo, n_pagina = 3 + 3 * i, 4 + 3 * i, 5 + 3 * i
+        yield objeto(n_img, (
+            f"<< /Type /XObject /Subtype /Image /Width {layout.largura} /Height {layout.altura} "
+            f"/ColorSpace /DeviceGray /BitsPerComponent 8 /Filter /FlateDecode /Length {len(imagem)} >>\n"
+            "stream\n"
+        ).encode() + imagem + b"\nendstream")
+        conteudo = f"q {largura_pt:.2f} 0 0 {altura_pt:.2f} 0 0 cm /Im0 Do Q".encode()
+        yield objeto(n_conteudo, f"<< /Length {len(conteudo)} >>\nstream\n".encode() + conteudo + b"\nendstream")
+        yield objeto(n_pagina, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {largura_pt:.2f} {altura_pt:.2f}] "
+            f"/Resources << /XObject << /Im0 {n_img} 0 R >> >> /Contents {n_conteudo} 0 R >>"
+        ).encode())
+        kids.append(f"{n_pagina} 0 R")
+
+    yield objeto(2, f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode())
+    yield objeto(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+
+    total = max(offsets) + 1
+    xref = [f"xref\n0 {total}\n0000000000 65535 f \n"]
+    xref += [f"{offsets[n]:010d} 00000 n \n" for n in range(1, total)]
+    xref.append(f"trailer\n<< /Size {total} /Root 1 0 R >>\nstartxref\n{posicao}\n%%EOF\n")
+    yield "".join(xref).encode()
+
+
+def _chunk_png(tipo, dados):
+    return struct.pack(">I", len(dados)) + tipo + dados + struct.pack(">I", zlib.crc32(tipo + dados))
+
+
+def gerar_png(rotulos, layout=LayoutFolha(), workers=None):
+    """Gera (em pedaços de bytes) um PNG em mosaico com `layout.colunas` etiquetas por linha."""
+    faixas = _lotes(rotulos, layout.colunas) or [[]]
+    largura = layout.colunas * layout.celula[0] + 2 * layout.margem
+    altura = len(faixas) * layout.celula[1]
+
+    yield b"\x89PNG\r\n\x1a\n" + _chunk_png(
+        b"IHDR", struct.pack(">IIBBBBB", largura, altura, 8, 0, 0, 0, 0)  # 8 bits, tons de cinza
+    )
+    compressor = zlib.compressobj(6)
+    for scanlines in _em_ordem(renderizar_faixa_png, faixas, layout, workers):
+        dados = compressor.compress(scanlines)
+        if dados:
+            yield _chunk_png(b"IDAT", dados)
+    yield _chunk_png(b"IDAT", compressor.flush()) + _chunk_png(b"IEND", b"")
@@ -0,0 +1,140 @@
+"""
+Geração assíncrona de QR codes de Equipamento e Empreendimento.
+
+O save() dos modelos só enfileira um QRCodeJob; a renderização (qrcode +
+PIL) roda no worker:
+
+    python manage.py processar_qr_codes            # processa a fila e sai
+    python manage.py processar_qr_codes --loop     # worker contínuo
+    python manage.py processar_qr_codes --regenerar-todos
+
+Em produção (gunicorn) o scheduler de core.apps também drena a fila.
+Com QR_CODE_ASYNC=False a geração volta a ser síncrona.
+"""
+import logging
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import QRCodeJob
+
+logger = logging.getLogger(__name__)
+
+MODELOS = {
+    'EQUIPAMENTO': 'equipamentos.Equipamento',
+    'EMPREENDIMENTO': 'cadastro.Empreendimento',
+}
+MAX_TENTATIVAS = 3
+TEMPO_MAXIMO_PROCESSANDO = timedelta(minutes=10)
+
+
+def _tipo(obj):
+    label = obj._meta.label
+    return next(tipo for tipo, modelo in MODELOS.items() if modelo == label)
+
+
+def qr_assincrono():
+    return getattr(settings, 'QR_CODE_ASYNC', True)
+
+
+def enfileirar_qr(obj):
+    """Enfileira a geração do QR do objeto (idempotente enquanto houver job pendente)."""
+    tipo = _tipo(obj)
+    if QRCodeJob.objects.filter(tipo=tipo, objeto_uuid=obj.uuid, status='PENDENTE').exists():
+        return None
+    try:
+        with transaction.atomic():
+            return QRCodeJob.objects.create(tipo=tipo, objeto_uuid=obj.uuid)
+    except IntegrityError:
+        return None  # outro processo enfileirou ao mesmo tempo
+
+
+def enfileirar_todos(tipos=None, somente_sem_qr=False):
+    """Enfileira a (re)geração de todos os QR codes. Retorna quantos jobs novos foram criados."""
+    total = 0
+    for tipo in tipos or MODELOS:
+        model = apps.get_model(MODELOS[tipo])
+        qs = model.objects.all()
+        if somente_sem_qr:
+            qs = qs.filter(qr_code__in=['', None])
+        pendentes = set(
+            QRCodeJob.objects.filter(tipo=tipo, status='PENDENTE').values_list('objeto_uuid', flat=True)
+        )
+        novos = [
+            QRCodeJob(tipo=tipo, objeto_uuid=u)
+            for u in qs.values_list('uuid', flat=True).iterator(chunk_size=2000)
+            if u not in pendentes
+        ]
+        QRCodeJob.objects.bulk_create(novos, batch_size=1000, ignore_conflicts=True)
+        total += len(novos)
+    return total
+
+
+def _reservar(limite):
+    """Marca até `limite` jobs como PROCESSANDO e os devolve (seguro com vários workers)."""
+    agora = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            QRCodeJob.objects.select_for_update(skip_locked=True)
+            .filter(status='PENDENTE')
+            .values_list('id', flat=True)[:limite]
+        )
+        QRCodeJob.objects.filter(id__in=ids).update(
+            status='PROCESSANDO', iniciado_em=agora, tentativas=F('tentativas') + 1
+        )
+    return list(QRCodeJob.objects.filter(id__in=ids))
+
+
+def recuperar_travados():
+    """Devolve à fila jobs que ficaram PROCESSANDO (worker interrompido)."""
+    limite = timezone.now() - TEMPO_MAXIMO_PROCESSANDO
+    travados = QRCodeJob.objects.filter(status='PROCESSANDO', iniciado_em__lt=limite)
+    recuperados = 0
+    for job in travados:
+        status = 'ERRO' if job.tentativas >= MAX_TENTATIVAS else 'PENDENTE'
+        try:
+            with transaction.atomic():
+                QRCodeJob.objects.filter(pk=job.pk, status='PROCESSANDO').update(status=status)
+        except IntegrityError:
+            # Já existe outro job pendente para o mesmo objeto
+            QRCodeJob.objects.filter(pk=job.pk).update(status='CONCLUIDO', concluido_em=timezone.now())
+        recuperados += 1
+    return recuperados
+
+
+def processar_job(job):
+    model = apps.get_model(MODELOS[job.tipo])
+    obj = model.objects.filter(uuid=job.objeto_uuid).first()
+    if obj is None:
+        job.status, job.erro = 'ERRO', 'Objeto não encontrado'
+    else:
+        try:
+            obj.gerar_qr_code()
+            job.status, job.erro = 'CONCLUIDO', ''
+        except Exception as e:
+            logger.warning(f"[QRCode] Erro ao gerar QR de {job}: {e}")
+            job.erro = str(e)
+            job.status = 'ERRO' if job.tentativas >= MAX_TENTATIVAS else 'PENDENTE'
+    job.concluido_em = timezone.now()
+    try:
+        with transaction.atomic():
+            job.save(update_fields=['status', 'erro', 'concluido_em'])
+    except IntegrityError:
+        # Voltaria para PENDENTE, mas um novo pedido já está na fila
+        job.status = 'ERRO'
+        job.save(update_fields=['status', 'erro', 'concluido_em'])
+    return job.status
+
+
+def processar_pendentes(limite=100):
+    """Processa até `limite` jobs pendentes. Retorna {status: quantidade}."""
+    recuperar_travados()
+    resultado = {}
+    for job in _reservar(limite):
+        status = processar_job(job)
+        resultado[status] = resultado.get(status, 0) + 1
+    return resultado
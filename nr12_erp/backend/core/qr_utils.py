@@ -1,11 +1,85 @@
 # backend/core/qr_utils.py
+import functools
+import hashlib
 import io
 import os
+import threading
+from collections import OrderedDict
+
 import qrcode
 from PIL import Image, ImageDraw, ImageFont
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseNotModified
 from django.core.files.base import ContentFile
 from django.conf import settings
+from django.utils.http import parse_etags, quote_etag
+
+# Alterar quando o layout da imagem mudar (invalida ETags já emitidos)
+QR_RENDER_VERSAO = "1"
+
+FONTES_NEGRITO = ("arialbd.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf")
+FONTES_NORMAL = ("arial.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf")
+
+
+@functools.lru_cache(maxsize=None)
+def _carregar_fonte(candidatas, tamanho):
+    """Carrega a primeira fonte TrueType disponível (uma vez por processo)."""
+    for nome in candidatas:
+        try:
+            return ImageFont.truetype(nome, tamanho)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+class CachePNG:
+    """LRU de PNGs renderizados, limitado pelo total de bytes (thread-safe)."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._itens = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, chave):
+        with self._lock:
+            png = self._itens.get(chave)
+            if png is None:
+                self.misses += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.hits += 1
+            return png
+
+    def set(self, chave, png):
+        if len(png) > self.max_bytes:
+            return
+        with self._lock:
+            anterior = self._itens.pop(chave, None)
+            if anterior is not None:
+                self._bytes -= len(anterior)
+            self._itens[chave] = png
+            self._bytes += len(png)
+            while self._bytes > self.max_bytes:
+                _, removido = self._itens.popitem(last=False)
+                self._bytes -= len(removido)
+
+    def clear(self):
+        with self._lock:
+            self._itens.clear()
+            self._bytes = 0
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'itens': len(self._itens), 'bytes': self._bytes, 'max_bytes': self.max_bytes,
+                'hits': self.hits, 'misses': self.misses,
+            }
+
+
+cache_png = CachePNG(getattr(settings, 'QR_PNG_CACHE_MAX_BYTES', 32 * 1024 * 1024))
 
 
 def generate_qr_code(data: str, box_size: int = 10, border: int = 4):
@@ -53,24 +127,9 @@ def add_text_to_qr(qr_img, top_text: str = "MANDACARU S M", bottom_text: str = "
     # Preparar para desenhar texto
     draw = ImageDraw.Draw(new_img)
 
-    # Tentar carregar fonte (usar fonte padrão se não encontrar)
-    try:
-        # Fonte para o texto superior (maior e negrito)
-        font_top = ImageFont.truetype("arialbd.ttf", 28)
-    except:
-        try:
-            font_top = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 28)
-        except:
-            font_top = ImageFont.load_default()
-
-    try:
-        # Fonte para o texto inferior (menor)
-        font_bottom = ImageFont.truetype("arial.ttf", 20)
-    except:
-        try:
-            font_bottom = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 20)
-        except:
-            font_bottom = ImageFont.load_default()
+    # Fontes carregadas uma vez por processo (fonte padrão se não encontrar)
+    font_top = _carregar_fonte(FONTES_NEGRITO, 28)  # texto superior (maior e negrito)
+    font_bottom = _carregar_fonte(FONTES_NORMAL, 20)  # texto inferior (menor)
 
     # Desenhar texto superior (MANDACARU S M)
     # Calcular posição centralizada
@@ -104,15 +163,54 @@ def add_text_to_qr(qr_img, top_text: str = "MANDACARU S M", bottom_text: str = "
     return new_img
 
 
-def qr_png_response(data: str, box_size: int = 10, border: int = 4) -> HttpResponse:
+def _chave_render(data, box_size, border, top_text, bottom_text):
+    return (QR_RENDER_VERSAO, data, box_size, border, top_text, bottom_text)
+
+
+def qr_etag(data: str, box_size: int = 10, border: int = 4, top_text=None, bottom_text: str = "") -> str:
+    """ETag determinístico da imagem (calculado sem renderizar)."""
+    chave = repr(_chave_render(data, box_size, border, top_text, bottom_text))
+    return hashlib.sha1(chave.encode()).hexdigest()
+
+
+def render_qr_png(data: str, box_size: int = 10, border: int = 4, top_text=None, bottom_text: str = "") -> bytes:
+    """
+    Retorna os bytes PNG do QR code, usando o cache LRU do processo.
+
+    top_text=None gera só o QR; com top_text aplica add_text_to_qr.
+    """
+    chave = _chave_render(data, box_size, border, top_text, bottom_text)
+    png = cache_png.get(chave)
+    if png is None:
+        img = generate_qr_code(data, box_size, border)
+        if top_text is not None:
+            img = add_text_to_qr(img, top_text, bottom_text)
+        buf = io.BytesIO()
+        img.save(buf, format="PNG")
+        png = buf.getvalue()
+        cache_png.set(chave, png)
+    return png
+
+
+def qr_png_response(data: str, box_size: int = 10, border: int = 4, request=None,
+                    top_text=None, bottom_text: str = "") -> HttpResponse:
     """
     Gera QR code e retorna como HttpResponse PNG.
     Usado para servir QR codes via HTTP sem salvar.
+
+    Com request, responde 304 quando o If-None-Match bate com o ETag.
     """
-    img = generate_qr_code(data, box_size, border)
-    buf = io.BytesIO()
-    img.save(buf, format="PNG")
-    return HttpResponse(buf.getvalue(), content_type="image/png")
+    etag = quote_etag(qr_etag(data, box_size, border, top_text, bottom_text))
+    enviados = parse_etags(request.headers.get("If-None-Match", "")) if request is not None else []
+    if etag in enviados or "*" in enviados:
+        response = HttpResponseNotModified()
+    else:
+        png = render_qr_png(data, box_size, border, top_text, bottom_text)
+        response = HttpResponse(png, content_type="image/png")
+    response["ETag"] = etag
+    # Sempre revalida: o texto do equipamento pode mudar, o ETag evita o download
+    response["Cache-Control"] = "no-cache"
+    return response
 
 
 def save_qr_code_to_file(
@@ -137,14 +235,4 @@ def save_qr_code_to_file(
     Returns:
         ContentFile contendo a imagem PNG do QR code com texto
     """
-    # Gerar QR code
-    qr_img = generate_qr_code(data, box_size, border)
-
-    # Adicionar texto
-    final_img = add_text_to_qr(qr_img, top_text, bottom_text)
-
-    # Salvar em buffer
-    buf = io.BytesIO()
-    final_img.save(buf, format="PNG")
-    buf.seek(0)
-    return ContentFile(buf.read(), name=filename)
+    return ContentFile(render_qr_png(data, box_size, border, top_text, bottom_text), name=filename)
@@ -1,9 +1,12 @@
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.utils.crypto import get_random_string
-from .models import Profile, Operador, Supervisor
+from .models import Profile, Operador, Supervisor, OperadorCliente, OperadorEquipamento
 from cadastro.models import Cliente
+from .cache import invalidar_cliente
+from .escopo import invalidar_escopo
 
 @receiver(post_save, sender=User)
 def create_profile(sender, instance, created, **kwargs):
@@ -173,3 +176,97 @@ def create_cliente_user(sender, instance, created, **kwargs):
 
         # TODO: Enviar email com credenciais
         print(f"              Email: {instance.email_financeiro} | Módulos: {len(modulos_habilitados)}")
+
+
+# ============================================
+# Invalidação do escopo de acesso em cache (core.escopo)
+# ============================================
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+@receiver(post_save, sender=Cliente)
+@receiver(post_delete, sender=Cliente)
+@receiver(post_save, sender=Supervisor)
+@receiver(post_delete, sender=Supervisor)
+@receiver(post_save, sender=Operador)
+@receiver(post_delete, sender=Operador)
+def invalidar_escopo_usuario(sender, instance, **kwargs):
+    invalidar_escopo(instance.user_id)
+
+
+@receiver(post_save, sender=OperadorCliente)
+@receiver(post_delete, sender=OperadorCliente)
+@receiver(post_save, sender=OperadorEquipamento)
+@receiver(post_delete, sender=OperadorEquipamento)
+def invalidar_escopo_operador(sender, instance, **kwargs):
+    invalidar_escopo(*Operador.objects.filter(pk=instance.operador_id).values_list('user_id', flat=True))
+
+
+@receiver(m2m_changed, sender=Supervisor.clientes.through)
+def invalidar_escopo_supervisor(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidar_escopo(instance.user_id)
+    else:
+        # Alterado pelo lado do Cliente (cliente.supervisores)
+        supervisores = Supervisor.objects.all() if pk_set is None else Supervisor.objects.filter(pk__in=pk_set)
+        invalidar_escopo(*supervisores.values_list('user_id', flat=True))
+
+
+# ============================================
+# Invalidação do cache de métricas/dashboards (core.cache)
+# ============================================
+from abastecimentos.models import Abastecimento  # noqa: E402
+from equipamentos.models import Equipamento, PlanoManutencaoItem, MedicaoEquipamento  # noqa: E402
+from financeiro.models import ContaReceber, ContaPagar, Pagamento  # noqa: E402
+from fio_diamantado.models import FioDiamantado, RegistroCorte, MovimentacaoFio  # noqa: E402
+from manutencao.models import Manutencao  # noqa: E402
+from nr12.models import ChecklistRealizado, ProgramacaoManutencao  # noqa: E402
+from ordens_servico.models import OrdemServico  # noqa: E402
+
+
+def _cliente_do_registro(instance):
+    """Resolve o cliente dono do registro sem carregar objetos relacionados."""
+    if getattr(instance, 'cliente_id', None):
+        return instance.cliente_id
+    if getattr(instance, 'equipamento_id', None):
+        return Equipamento.objects.filter(pk=instance.equipamento_id).values_list('cliente_id', flat=True).first()
+    if getattr(instance, 'fio_id', None):
+        return FioDiamantado.objects.filter(pk=instance.fio_id).values_list('cliente_id', flat=True).first()
+    if getattr(instance, 'conta_receber_id', None):
+        return ContaReceber.objects.filter(pk=instance.conta_receber_id).values_list('cliente_id', flat=True).first()
+    return None
+
+
+@receiver(post_save, sender=Equipamento)
+@receiver(post_save, sender=PlanoManutencaoItem)
+@receiver(post_save, sender=MedicaoEquipamento)
+@receiver(post_save, sender=Abastecimento)
+@receiver(post_save, sender=Manutencao)
+@receiver(post_save, sender=OrdemServico)
+@receiver(post_save, sender=ChecklistRealizado)
+@receiver(post_save, sender=ProgramacaoManutencao)
+@receiver(post_save, sender=FioDiamantado)
+@receiver(post_save, sender=RegistroCorte)
+@receiver(post_save, sender=MovimentacaoFio)
+@receiver(post_save, sender=ContaReceber)
+@receiver(post_save, sender=ContaPagar)
+@receiver(post_save, sender=Pagamento)
+@receiver(post_delete, sender=Equipamento)
+@receiver(post_delete, sender=PlanoManutencaoItem)
+@receiver(post_delete, sender=MedicaoEquipamento)
+@receiver(post_delete, sender=Abastecimento)
+@receiver(post_delete, sender=Manutencao)
+@receiver(post_delete, sender=OrdemServico)
+@receiver(post_delete, sender=ChecklistRealizado)
+@receiver(post_delete, sender=ProgramacaoManutencao)
+@receiver(post_delete, sender=FioDiamantado)
+@receiver(post_delete, sender=RegistroCorte)
+@receiver(post_delete, sender=MovimentacaoFio)
+@receiver(post_delete, sender=ContaReceber)
+@receiver(post_delete, sender=ContaPagar)
+@receiver(post_delete, sender=Pagamento)
+def invalidar_cache_metricas(sender, instance, **kwargs):
+    """Invalida o cache do cliente após o commit (evita recachear dados antigos)."""
+    cliente_id = _cliente_do_registro(instance)
+    transaction.on_commit(lambda: invalidar_cliente(cliente_id))
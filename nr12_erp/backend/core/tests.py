@@ -1,3 +1,488 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
+import io
+import time
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from xml.etree import ElementTree
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError, close_old_connections, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from abastecimentos.models import Abastecimento
+from cadastro.models import Cliente, Empreendimento
+from config.database import configurar_conexao
+from equipamentos.models import Equipamento, MedicaoEquipamento, TipoEquipamento
+from financeiro.models import ContaPagar
+
+from .cache import estatisticas_cache, get_cache
+from .exportacao import LINHAS_POR_BLOCO, gerar_csv, gerar_xlsx
+from .instrumentacao import buffer, gerar_relatorio, limpar_amostras
+from .models import Profile, QRCodeJob, SequenciaDocumento, Supervisor
+from .numeracao import numerar, reservar_numeros
+from .permissions import filter_by_role
+from .qr_jobs import enfileirar_todos, processar_pendentes
+from .qr_utils import CachePNG, cache_png
+
+
+@override_settings(METRICAS_CACHE_ENABLED=True)  # locmem basta em um único processo
+class CacheMetricasTest(TestCase):
+    """Cache de respostas com invalidação por cliente (core/cache.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin_cache', 'admin@example.com', 'senha-forte-123')
+        cls.cliente_a = Cliente.objects.create(nome_razao='Cliente A', documento='11222333000181', qr_code='x.png')
+        cls.cliente_b = Cliente.objects.create(nome_razao='Cliente B', documento='45997418000153', qr_code='x.png')
+        cls.empreendimento_a = Empreendimento.objects.create(cliente=cls.cliente_a, nome='Lavra A', qr_code='x.png')
+        cls.empreendimento_b = Empreendimento.objects.create(cliente=cls.cliente_b, nome='Lavra B', qr_code='x.png')
+        cls.tipo = TipoEquipamento.objects.create(nome='Escavadeira')
+
+    def setUp(self):
+        get_cache().clear()
+
+    def _client(self, user):
+        api = APIClient()
+        api.force_authenticate(user)
+        return api
+
+    def _criar_equipamento(self, cliente, empreendimento, codigo):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Equipamento.objects.create(
+                cliente=cliente, empreendimento=empreendimento, tipo=self.tipo, codigo=codigo,
+                tipo_medicao='HORA', leitura_atual=Decimal('0'), qr_code='x.png',
+            )
+
+    def test_hit_miss_e_invalidacao(self):
+        api = self._client(self.admin)
+        url = reverse('metricas-dashboard')
+
+        r1 = api.get(url)
+        r2 = api.get(url)
+        self.assertEqual(r1['X-Cache'], 'MISS')
+        self.assertEqual(r2['X-Cache'], 'HIT')
+        self.assertEqual(r1.data, r2.data)
+
+        # Filtros diferentes geram outra entrada
+        self.assertEqual(api.get(url, {'data_inicio': str(date.today())})['X-Cache'], 'MISS')
+
+        self._criar_equipamento(self.cliente_a, self.empreendimento_a, 'EQ-A1')
+        r3 = api.get(url)
+        self.assertEqual(r3['X-Cache'], 'MISS')
+        self.assertEqual(r3.data['totais']['equipamentos'], 1)
+
+        stats = estatisticas_cache()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 3))
+
+    def test_invalidacao_restrita_ao_cliente(self):
+        usuario_a = self.cliente_a.user
+        api = self._client(usuario_a)
+        url = reverse('metricas-dashboard')
+
+        self.assertEqual(api.get(url)['X-Cache'], 'MISS')
+        self._criar_equipamento(self.cliente_b, self.empreendimento_b, 'EQ-B1')
+        self.assertEqual(api.get(url)['X-Cache'], 'HIT')
+
+        self._criar_equipamento(self.cliente_a, self.empreendimento_a, 'EQ-A1')
+        self.assertEqual(api.get(url)['X-Cache'], 'MISS')
+
+    def test_estatisticas_apenas_admin(self):
+        url = reverse('cache-estatisticas')
+        self.assertEqual(self._client(self.cliente_a.user).get(url).status_code, 403)
+
+        api = self._client(self.admin)
+        self.assertEqual(api.get(url).status_code, 200)
+        self.assertEqual(api.delete(url).status_code, 204)
+
+
+class QRCodeJobTest(TestCase):
+    """Geração de QR codes em background (core/qr_jobs.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Cliente.objects.create(nome_razao='Cliente QR', documento='11222333000181', qr_code='x.png')
+        cls.tipo = TipoEquipamento.objects.create(nome='Escavadeira')
+
+    def test_save_enfileira_e_worker_gera(self):
+        empreendimento = Empreendimento.objects.create(cliente=self.cliente, nome='Lavra QR')
+        equip = Equipamento.objects.create(
+            cliente=self.cliente, empreendimento=empreendimento, tipo=self.tipo, codigo='EQ-QR',
+        )
+        self.assertFalse(equip.qr_code)
+        self.assertEqual(QRCodeJob.objects.filter(status='PENDENTE').count(), 2)
+
+        # Novo save sem QR não duplica o job pendente
+        equip.save()
+        self.assertEqual(QRCodeJob.objects.filter(objeto_uuid=equip.uuid).count(), 1)
+
+        self.assertEqual(processar_pendentes(), {'CONCLUIDO': 2})
+        equip.refresh_from_db()
+        empreendimento.refresh_from_db()
+        self.assertTrue(equip.qr_code.name.endswith('.png'))
+        self.assertTrue(empreendimento.qr_code)
+
+    def test_regenerar_todos(self):
+        empreendimento = Empreendimento.objects.create(cliente=self.cliente, nome='Lavra QR', qr_code='x.png')
+        Equipamento.objects.create(
+            cliente=self.cliente, empreendimento=empreendimento, tipo=self.tipo, codigo='EQ-QR', qr_code='x.png',
+        )
+        self.assertEqual(enfileirar_todos(somente_sem_qr=True), 0)
+        self.assertEqual(enfileirar_todos(), 2)
+        self.assertEqual(enfileirar_todos(), 0)  # já pendentes
+
+
+class QRRenderCacheTest(TestCase):
+    """Cache de PNGs renderizados e ETag dos endpoints de QR (core/qr_utils.py)."""
+
+    def setUp(self):
+        cache_png.clear()
+
+    def test_etag_e_304(self):
+        cliente = Cliente.objects.create(nome_razao='Cliente QR', documento='11222333000181', qr_code='x.png')
+        url = reverse('cliente_qr', args=[cliente.uuid])
+
+        r1 = self.client.get(url)
+        self.assertEqual(r1.status_code, 200)
+        self.assertEqual(r1['Content-Type'], 'image/png')
+
+        r2 = self.client.get(url, HTTP_IF_NONE_MATCH=r1['ETag'])
+        self.assertEqual(r2.status_code, 304)
+        self.assertEqual(r2['ETag'], r1['ETag'])
+
+        self.client.get(url)
+        self.assertEqual(cache_png.stats()['hits'], 1)
+
+    def test_cache_limitado_em_bytes(self):
+        lru = CachePNG(max_bytes=10)
+        lru.set('a', b'12345')
+        lru.set('b', b'12345')
+        lru.get('a')  # 'a' passa a ser o mais recente
+        lru.set('c', b'123')
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('a'), b'12345')
+        self.assertLessEqual(lru.stats()['bytes'], 10)
+
+
+@override_settings(ESCOPO_CACHE_TTL=60)
+class EscopoAcessoTest(TestCase):
+    """Escopo de filter_by_role resolvido uma vez e invalidado pelos signals."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente_a = Cliente.objects.create(nome_razao='Cliente A', documento='11222333000181', qr_code='x.png')
+        cls.cliente_b = Cliente.objects.create(nome_razao='Cliente B', documento='45997418000153', qr_code='x.png')
+        cls.user = User.objects.create_user('supervisor_escopo', password='senha-forte-123')
+        Profile.objects.update_or_create(user=cls.user, defaults={'role': 'SUPERVISOR'})
+        cls.supervisor = Supervisor.objects.create(
+            user=cls.user, nome_completo='Supervisor', cpf='529.982.247-25', data_nascimento=date(1990, 1, 1),
+        )
+        cls.supervisor.clientes.add(cls.cliente_a)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_escopo_resolvido_uma_vez_por_request(self):
+        user = User.objects.get(pk=self.user.pk)
+        with CaptureQueriesContext(connection) as primeira:
+            filter_by_role(Cliente.objects.all(), user)
+        with CaptureQueriesContext(connection) as seguintes:
+            filter_by_role(Empreendimento.objects.all(), user)
+            filter_by_role(Equipamento.objects.all(), user)
+        self.assertGreater(len(primeira), 0)
+        self.assertEqual(len(seguintes), 0)
+
+        # Outro request (novo objeto user) usa o cache sem consultar o vínculo
+        with CaptureQueriesContext(connection) as outro_request:
+            qs = filter_by_role(Cliente.objects.all(), User.objects.get(pk=self.user.pk))
+        self.assertEqual(len(outro_request), 1)  # só o get do user
+        self.assertEqual(list(qs), [self.cliente_a])
+
+    def test_vinculo_m2m_invalida_escopo(self):
+        filter_by_role(Cliente.objects.all(), User.objects.get(pk=self.user.pk))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.supervisor.clientes.add(self.cliente_b)
+        qs = filter_by_role(Cliente.objects.all(), User.objects.get(pk=self.user.pk))
+        self.assertEqual(set(qs), {self.cliente_a, self.cliente_b})
+
+    def test_revogacao_invalida_depois_do_commit(self):
+        filter_by_role(Cliente.objects.all(), User.objects.get(pk=self.user.pk))
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.supervisor.clientes.remove(self.cliente_a)
+            # Ainda na transação: o escopo em cache não foi descartado
+            qs = filter_by_role(Cliente.objects.all(), User.objects.get(pk=self.user.pk))
+            self.assertEqual(list(qs), [self.cliente_a])
+        self.assertEqual(len(callbacks), 1)
+        qs = filter_by_role(Cliente.objects.all(), User.objects.get(pk=self.user.pk))
+        self.assertEqual(list(qs), [])
+
+    @override_settings(ESCOPO_CACHE_TTL=0)
+    def test_sem_cache_compartilhado_escopo_so_por_request(self):
+        filter_by_role(Cliente.objects.all(), User.objects.get(pk=self.user.pk))
+        with CaptureQueriesContext(connection) as outro_request:
+            filter_by_role(Cliente.objects.all(), User.objects.get(pk=self.user.pk))
+        self.assertGreater(len(outro_request), 1)
+
+
+class ModoConexaoTest(TestCase):
+    """DB_CONN_MODE (config/database.py)."""
+
+    BASE = {"ENGINE": "django.db.backends.postgresql", "NAME": "nr12", "OPTIONS": {"sslmode": "require"}}
+
+    def test_pooler_e_padrao(self):
+        config = configurar_conexao(self.BASE, ambiente={})
+        self.assertEqual(config["CONN_MAX_AGE"], 0)
+        self.assertFalse(config["CONN_HEALTH_CHECKS"])
+        self.assertTrue(config["DISABLE_SERVER_SIDE_CURSORS"])
+
+    def test_persistent(self):
+        config = configurar_conexao(self.BASE, ambiente={"DB_CONN_MODE": "persistent", "DB_CONN_MAX_AGE": "120"})
+        self.assertEqual(config["CONN_MAX_AGE"], 120)
+        self.assertTrue(config["CONN_HEALTH_CHECKS"])
+        self.assertEqual(config["OPTIONS"], {"sslmode": "require"})
+
+    def test_modo_invalido(self):
+        with self.assertRaises(ImproperlyConfigured):
+            configurar_conexao(self.BASE, ambiente={"DB_CONN_MODE": "qualquer"})
+
+
+@override_settings(INSTRUMENTACAO_ENABLED=True)
+class InstrumentacaoTest(TestCase):
+    """Middleware de queries/latência e relatório por endpoint."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin_instr', 'admin@example.com', 'senha-forte-123')
+
+    def setUp(self):
+        limpar_amostras()
+
+    def test_registra_amostras_e_relatorio(self):
+        self.client.force_login(self.admin)
+        for _ in range(3):
+            self.client.get(reverse('health'), {'db': '1'})
+
+        relatorio = {item['endpoint']: item for item in gerar_relatorio(list(buffer.amostras))}
+        health = relatorio['GET health']
+        self.assertEqual(health['requests'], 3)
+        self.assertEqual(health['queries']['max'], 1)
+        self.assertGreaterEqual(health['total_ms']['max'], health['total_ms']['p50'])
+
+        api = APIClient()
+        api.force_authenticate(self.admin)
+        resposta = api.get(reverse('instrumentacao-relatorio'))
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn('GET health', [item['endpoint'] for item in resposta.data['endpoints']])
+
+    @override_settings(INSTRUMENTACAO_ENABLED=False)
+    def test_desligado_nao_registra(self):
+        self.client.get(reverse('health'))
+        self.assertEqual(len(buffer.amostras), 0)
+
+    def test_buffer_limitado(self):
+        from .instrumentacao import BufferAmostras
+        anel = BufferAmostras(tamanho=2)
+        for i in range(5):
+            anel.amostras.append(('GET x', i, 0.0, 0.0))
+        self.assertEqual([a[1] for a in anel.amostras], [3, 4])
+
+
+class PaginacaoKeysetTest(TestCase):
+    """Paginação keyset opcional (core/pagination.py) nas listagens de histórico."""
+
+    url = '/api/v1/equipamentos/medicoes/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin_paginacao', 'admin@example.com', 'senha-forte-123')
+        cliente = Cliente.objects.create(nome_razao='Mineradora Teste', documento='11222333000181', qr_code='x.png')
+        empreendimento = Empreendimento.objects.create(cliente=cliente, nome='Lavra 1', qr_code='x.png')
+        equipamento = Equipamento.objects.create(
+            cliente=cliente, empreendimento=empreendimento, tipo=TipoEquipamento.objects.create(nome='Escavadeira'),
+            codigo='EQ-001', qr_code='x.png',
+        )
+        MedicaoEquipamento.objects.bulk_create(
+            [MedicaoEquipamento(equipamento=equipamento, leitura=Decimal(i)) for i in range(120)]
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_percorre_todas_as_paginas_sem_count(self):
+        esperado = list(MedicaoEquipamento.objects.order_by('-criado_em', '-id').values_list('id', flat=True))
+        vistos, url, paginas = [], f'{self.url}?paginacao=keyset', 0
+        while url:
+            with CaptureQueriesContext(connection) as contexto:
+                dados = self.client.get(url).json()
+            self.assertFalse(any('COUNT(' in q['sql'].upper() for q in contexto.captured_queries))
+            self.assertNotIn('count', dados)
+            vistos += [m['id'] for m in dados['results']]
+            url, paginas = dados['next'], paginas + 1
+
+        self.assertEqual(paginas, 3)
+        self.assertEqual(vistos, esperado)
+
+    def test_paginacao_por_numero_continua_padrao(self):
+        dados = self.client.get(f'{self.url}?page=3').json()
+        self.assertEqual((dados['count'], len(dados['results'])), (120, 20))
+
+        self.assertEqual(self.client.get(f'{self.url}?cursor=invalido').status_code, 404)
+
+
+class ExportacaoTest(TestCase):
+    """Exportação CSV/XLSX em streaming (core/exportacao.py)."""
+
+    NS = {'s': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente_a = Cliente.objects.create(nome_razao='Cliente A', documento='11222333000181', qr_code='x.png')
+        cliente_b = Cliente.objects.create(nome_razao='Cliente B', documento='45997418000153', qr_code='x.png')
+        tipo = TipoEquipamento.objects.create(nome='Escavadeira')
+        for cliente, codigo in ((cls.cliente_a, 'EQ-A'), (cliente_b, 'EQ-B')):
+            empreendimento = Empreendimento.objects.create(cliente=cliente, nome=f'Lavra {codigo}', qr_code='x.png')
+            equipamento = Equipamento.objects.create(
+                cliente=cliente, empreendimento=empreendimento, tipo=tipo, codigo=codigo, qr_code='x.png',
+            )
+            for dia in (5, 20):
+                Abastecimento.objects.create(
+                    equipamento=equipamento, data=date(2026, 3, dia), horimetro_km=Decimal(dia),
+                    quantidade_litros=Decimal('50.5'), valor_total=Decimal('300'),
+                )
+        cls.user = User.objects.create_user('supervisor_exportacao', password='senha-forte-123')
+        Profile.objects.update_or_create(
+            user=cls.user, defaults={'role': 'SUPERVISOR', 'modules_enabled': ['abastecimentos']},
+        )
+        supervisor = Supervisor.objects.create(
+            user=cls.user, nome_completo='Supervisor', cpf='529.982.247-25', data_nascimento=date(1990, 1, 1),
+        )
+        supervisor.clientes.add(cls.cliente_a)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(pk=self.user.pk))  # sem escopo memorizado no objeto
+
+    def linhas_xlsx(self, conteudo):
+        with zipfile.ZipFile(io.BytesIO(conteudo)) as arquivo:
+            self.assertIn('xl/workbook.xml', arquivo.namelist())
+            planilha = ElementTree.fromstring(arquivo.read('xl/worksheets/sheet1.xml'))
+        return [
+            [celula.findtext('s:v', namespaces=self.NS) or celula.findtext('s:is/s:t', namespaces=self.NS)
+             for celula in linha.findall('s:c', self.NS)]
+            for linha in planilha.iterfind('s:sheetData/s:row', self.NS)
+        ]
+
+    def test_csv_em_blocos_no_padrao_excel(self):
+        linhas = [(i, Decimal('12.50'), date(2026, 2, 1), None, True) for i in range(LINHAS_POR_BLOCO * 2 + 1)]
+        blocos = list(gerar_csv(['N', 'Valor', 'Data', 'Vazio', 'Ativo'], iter(linhas)))
+
+        self.assertEqual(len(blocos), 3)
+        texto = b''.join(blocos).decode('utf-8')
+        self.assertTrue(texto.startswith('\ufeffN;Valor;Data;Vazio;Ativo'))
+        self.assertEqual(texto.splitlines()[1], '0;12,50;01/02/2026;;Sim')
+        self.assertEqual(len(texto.splitlines()), len(linhas) + 1)
+
+    def test_xlsx_valido_e_tipado(self):
+        linhas = [(i, Decimal('1.5'), date(2026, 1, 1), datetime(2026, 1, 1, 12), 'a < b & c') for i in range(1200)]
+        blocos = list(gerar_xlsx(['N', 'Valor', 'Data', 'Hora', 'Texto'], iter(linhas)))
+
+        self.assertGreater(len(blocos), 1)
+        tabela = self.linhas_xlsx(b''.join(blocos))
+        self.assertEqual(len(tabela), 1201)
+        self.assertEqual(tabela[0], ['N', 'Valor', 'Data', 'Hora', 'Texto'])
+        numero, valor, dia, hora, texto = tabela[-1]
+        self.assertEqual((numero, valor, dia, texto), ('1199', '1.5', '46023', 'a < b & c'))
+        self.assertAlmostEqual(float(hora), 46023.5)
+
+    def test_exportar_abastecimentos_respeita_escopo_e_periodo(self):
+        url = '/api/v1/abastecimentos/exportar/'
+        resposta = self.client.get(url, {'formato': 'xlsx', 'data_inicio': '2026-03-10'})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertIn('abastecimentos.xlsx', resposta['Content-Disposition'])
+        tabela = self.linhas_xlsx(b''.join(resposta.streaming_content))
+        self.assertEqual([(linha[0], linha[1]) for linha in tabela[1:]], [('46101', 'EQ-A')])
+
+        csv = b''.join(self.client.get(url).streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(len(csv), 3)
+        self.assertTrue(all('EQ-A' in linha for linha in csv[1:]))
+
+        self.assertEqual(self.client.get(url, {'formato': 'pdf'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'data_inicio': '10/03/2026'}).status_code, 400)
+
+    def test_exportacao_em_blocos_por_chave(self):
+        self.client.force_authenticate(User.objects.create_superuser('admin_exportacao', password='x'))
+        url = '/api/v1/abastecimentos/exportar/'
+        completo = b''.join(self.client.get(url).streaming_content)
+
+        with override_settings(EXPORTACAO_CHUNK_SIZE=3), CaptureQueriesContext(connection) as contexto:
+            em_blocos = b''.join(self.client.get(url).streaming_content)
+
+        self.assertEqual(em_blocos, completo)
+        self.assertEqual(len(completo.decode('utf-8').splitlines()), 5)
+        # 4 abastecimentos em blocos de 3: duas consultas limitadas, sem cursor no servidor
+        consultas = [q['sql'] for q in contexto.captured_queries if 'abastecimentos_abastecimento' in q['sql']]
+        self.assertEqual(len(consultas), 2)
+        self.assertTrue(all('LIMIT 3' in sql for sql in consultas))
+
+
+class NumeracaoDocumentosTest(TestCase):
+    """Numeração sequencial de documentos (core/numeracao.py)."""
+
+    def conta(self, **campos):
+        return ContaPagar(tipo='OUTROS', fornecedor='Fornecedor', data_vencimento=date(2026, 1, 10),
+                          valor_original=Decimal('100'), **campos)
+
+    def test_numeros_sequenciais_e_em_bloco(self):
+        SequenciaDocumento.objects.create(serie='CP', ultimo=41)
+        primeira = self.conta()
+        primeira.save()
+        self.assertEqual(primeira.numero, 'CP-000042')
+
+        lote = numerar([self.conta() for _ in range(5)] + [self.conta(numero='CP-IMPORTADA')], 'CP')
+        self.assertEqual([c.numero for c in lote], [f'CP-0000{n}' for n in range(43, 48)] + ['CP-IMPORTADA'])
+        self.assertEqual(SequenciaDocumento.objects.get(serie='CP').ultimo, 47)
+        # Uma reserva, não uma consulta por documento
+        with self.assertNumQueries(4):
+            numerar([self.conta() for _ in range(20)], 'CP')
+
+    def test_rollback_nao_deixa_buraco(self):
+        with self.assertRaises(ValueError), transaction.atomic():
+            self.conta().save()
+            raise ValueError
+        conta = self.conta()
+        conta.save()
+        self.assertEqual(conta.numero, 'CP-000001')
+        self.assertEqual(list(reservar_numeros('NOVA', 3)), [1, 2, 3])
+
+
+class NumeracaoConcorrenteTest(TransactionTestCase):
+    """Reservas simultâneas na mesma série nunca repetem números."""
+
+    def test_reservas_em_paralelo(self):
+        def reservar(_):
+            try:
+                while True:
+                    try:
+                        with transaction.atomic():
+                            return list(reservar_numeros('CP', 3))
+                    except OperationalError:
+                        # SQLite: banco travado por outra escrita (no PostgreSQL o UPDATE só espera)
+                        if connection.vendor != 'sqlite':
+                            raise
+                        time.sleep(0.005)
+            finally:
+                close_old_connections()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            blocos = list(pool.map(reservar, range(30)))
+
+        numeros = sorted(n for bloco in blocos for n in bloco)
+        self.assertEqual(numeros, list(range(1, 91)))
+        self.assertTrue(all(bloco == list(range(bloco[0], bloco[0] + 3)) for bloco in blocos))
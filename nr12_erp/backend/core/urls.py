@@ -14,6 +14,8 @@ from .views import (
     bot_verificar_acesso_equipamento,
     geocodificar_coordenadas,
     validar_geofence,
+    cache_estatisticas,
+    instrumentacao_relatorio,
 )
 
 # ============================================
@@ -54,6 +56,8 @@ urlpatterns = [
     # Core endpoints
     path('health/', HealthView.as_view(), name='health'),
     path('me/', MeView.as_view(), name='me'),
+    path('cache/estatisticas/', cache_estatisticas, name='cache-estatisticas'),
+    path('instrumentacao/', instrumentacao_relatorio, name='instrumentacao-relatorio'),
 
     # Bot endpoints
     path('bot/', include(bot_patterns)),
@@ -23,6 +23,15 @@ from .permissions import IsAdminUser
 class HealthView(APIView):
     permission_classes = [AllowAny]
     def get(self, request):
+        # ?db=1 também verifica o banco (SELECT 1), exercitando a conexão
+        if request.query_params.get("db") in ("1", "true"):
+            from django.db import connection
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+            except Exception:
+                return Response({"status": "erro", "db": "indisponivel"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            return Response({"status": "ok", "db": "ok"})
         return Response({"status": "ok"})
 
 
@@ -642,3 +651,35 @@ def validar_geofence(request):
             'link_google_maps': gerar_link_google_maps(lat, lon)
         }
     })
+
+
+# ============================================
+# CACHE DE MÉTRICAS
+# ============================================
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def cache_estatisticas(request):
+    """GET: contadores de hit/miss do cache de métricas. DELETE: zera os contadores."""
+    from .cache import estatisticas_cache, resetar_estatisticas_cache
+    if request.method == 'DELETE':
+        resetar_estatisticas_cache()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    return Response(estatisticas_cache())
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def instrumentacao_relatorio(request):
+    """GET: p50/p95/max de queries e tempos por endpoint. DELETE: descarta as amostras."""
+    from .instrumentacao import coletar_amostras, gerar_relatorio, limpar_amostras
+    if request.method == 'DELETE':
+        limpar_amostras()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    from django.conf import settings
+    amostras = coletar_amostras()
+    return Response({
+        'habilitado': getattr(settings, 'INSTRUMENTACAO_ENABLED', False),
+        'amostras': len(amostras),
+        'endpoints': gerar_relatorio(amostras),
+    })
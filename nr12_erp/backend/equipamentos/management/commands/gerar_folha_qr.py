@@ -0,0 +1,56 @@
+"""
+Gera a folha de QR codes (PDF A4 ou PNG em mosaico) dos equipamentos de um
+cliente ou empreendimento, para impressão das etiquetas.
+
+Uso:
+    python manage.py gerar_folha_qr --empreendimento 3 --saida lavra3.pdf
+    python manage.py gerar_folha_qr --cliente 1 --formato png --saida cliente1.png
+    python manage.py gerar_folha_qr --cliente 1 --saida etiquetas.pdf --workers 4 --colunas 4 --linhas 5
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from core.qr_folhas import LayoutFolha, gerar_pdf, gerar_png
+from equipamentos.models import Equipamento
+from equipamentos.services import rotulos_qr
+
+
+class Command(BaseCommand):
+    help = 'Gera folha de QR codes dos equipamentos de um cliente ou empreendimento'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cliente', type=int, help='ID do cliente')
+        parser.add_argument('--empreendimento', type=int, help='ID do empreendimento')
+        parser.add_argument('--formato', choices=['pdf', 'png'], default='pdf')
+        parser.add_argument('--saida', type=str, required=True, help='Arquivo de saída')
+        parser.add_argument('--workers', type=int, help='Processos de renderização (padrão: número de CPUs)')
+        parser.add_argument('--colunas', type=int, default=3, help='Etiquetas por linha (padrão: 3)')
+        parser.add_argument('--linhas', type=int, default=4, help='Linhas por página do PDF (padrão: 4)')
+        parser.add_argument('--incluir-inativos', action='store_true', help='Inclui equipamentos inativos')
+
+    def handle(self, *args, **options):
+        if not (options['cliente'] or options['empreendimento']):
+            raise CommandError('Informe --cliente ou --empreendimento')
+        if options['colunas'] < 1 or options['linhas'] < 1:
+            raise CommandError('--colunas e --linhas devem ser maiores que zero')
+
+        qs = Equipamento.objects.all()
+        if not options['incluir_inativos']:
+            qs = qs.filter(ativo=True)
+        if options['cliente']:
+            qs = qs.filter(cliente_id=options['cliente'])
+        if options['empreendimento']:
+            qs = qs.filter(empreendimento_id=options['empreendimento'])
+
+        rotulos = rotulos_qr(qs)
+        if not rotulos:
+            raise CommandError('Nenhum equipamento encontrado')
+
+        layout = LayoutFolha(colunas=options['colunas'], linhas=options['linhas'])
+        gerar = gerar_pdf if options['formato'] == 'pdf' else gerar_png
+        with open(options['saida'], 'wb') as arquivo:
+            for pedaco in gerar(rotulos, layout=layout, workers=options['workers']):
+                arquivo.write(pedaco)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {len(rotulos)} QR code(s) gravados em {options['saida']}"
+        ))
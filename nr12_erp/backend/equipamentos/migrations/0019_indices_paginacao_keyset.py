@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipamentos', '0018_allow_duplicate_codigo_per_cliente'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='medicaoequipamento',
+            index=models.Index(fields=['criado_em', 'id'], name='equipamento_criado__46bceb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicaoequipamento',
+            index=models.Index(fields=['equipamento', 'criado_em', 'id'], name='equipamento_equipam_6166e9_idx'),
+        ),
+    ]
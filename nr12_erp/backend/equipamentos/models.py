@@ -135,14 +135,22 @@ class Equipamento(models.Model):
             top_text="MANDACARU S M",
             bottom_text=bottom_text
         )
-        self.qr_code.save(filename, qr_file, save=True)
+        if self.qr_code:
+            self.qr_code.delete(save=False)
+        self.qr_code.save(filename, qr_file, save=False)
+        # Grava só o campo, sem novo registro de histórico nem signals
+        Equipamento.objects.filter(pk=self.pk).update(qr_code=self.qr_code.name)
 
     def save(self, *args, **kwargs):
         is_new = self.pk is None
         super().save(*args, **kwargs)
-        # Gera QR code automaticamente após salvar
+        # QR code gerado em background (core/qr_jobs.py)
         if not self.qr_code:
-            self.gerar_qr_code()
+            from core.qr_jobs import qr_assincrono, enfileirar_qr
+            if qr_assincrono():
+                enfileirar_qr(self)
+            else:
+                self.gerar_qr_code()
 
     class Meta:
         ordering = ["codigo"]
@@ -287,6 +295,11 @@ class MedicaoEquipamento(models.Model):
 
     class Meta:
         ordering = ["-criado_em"]
+        # Paginação keyset: (criado_em, id), geral e por equipamento
+        indexes = [
+            models.Index(fields=["criado_em", "id"]),
+            models.Index(fields=["equipamento", "criado_em", "id"]),
+        ]
 
     def __str__(self):
         return f"{self.equipamento.codigo} {self.leitura} ({self.origem})"
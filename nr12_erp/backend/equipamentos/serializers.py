@@ -11,12 +11,17 @@ class EquipamentoSerializer(serializers.ModelSerializer):
     empreendimento_nome = serializers.CharField(source="empreendimento.nome", read_only=True)
     tipo_nome = serializers.CharField(source="tipo.nome", read_only=True)
     consumo_medio = serializers.SerializerMethodField()
+    qr_code_status = serializers.SerializerMethodField()
 
     class Meta:
         model = Equipamento
         fields = "__all__"
         read_only_fields = ['uuid', 'qr_code', 'criado_em', 'atualizado_em']
 
+    def get_qr_code_status(self, obj):
+        """PENDENTE enquanto o worker (processar_qr_codes) não gerou o arquivo."""
+        return "PRONTO" if obj.qr_code else "PENDENTE"
+
     def get_consumo_medio(self, obj):
         """
         Calcula o consumo médio real baseado nos abastecimentos.
@@ -99,3 +104,11 @@ class MedicaoEquipamentoSerializer(serializers.ModelSerializer):
     class Meta:
         model = MedicaoEquipamento
         fields = "__all__"
+
+
+class MedicaoLoteItemSerializer(serializers.Serializer):
+    """Item da importação em lote (equipamento por id, sem query por item)."""
+    equipamento = serializers.IntegerField()
+    leitura = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=0)
+    origem = serializers.ChoiceField(choices=MedicaoEquipamento.ORIGEM_CHOICES, default="MANUAL")
+    observacao = serializers.CharField(max_length=255, required=False, allow_blank=True, default="")
@@ -0,0 +1,122 @@
+"""
+Serviços de equipamentos.
+
+registrar_medicoes_em_lote() grava muitas leituras de horímetro/km (ex.:
+sincronização de telemetria) com o mesmo resultado final do caminho
+registro a registro (MedicaoEquipamento.save + signal atualiza_leitura),
+mas com um número fixo de queries: um bulk_create das medições, um
+bulk_update dos equipamentos e um bulk_update dos planos afetados.
+"""
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from core.cache import invalidar_cliente
+
+from .models import Equipamento, MedicaoEquipamento, PlanoManutencaoItem
+
+
+@transaction.atomic
+def registrar_medicoes_em_lote(leituras, equipamentos=None):
+    """
+    Registra uma lista de leituras e atualiza equipamentos e planos uma vez.
+
+    leituras: iterável de dicts com 'equipamento' (id), 'leitura' (Decimal)
+    e opcionalmente 'origem' e 'observacao'. A ordem da lista é a ordem
+    cronológica das leituras de cada equipamento.
+
+    equipamentos: queryset de equipamentos permitidos (ex.: filter_by_role);
+    padrão: todos.
+
+    Valida em memória, antes de gravar, que as leituras de cada equipamento
+    não diminuem (nem em relação à última medição/leitura atual) e levanta
+    ValidationError com a lista de problemas. Retorna as medições criadas.
+    """
+    leituras = list(leituras)
+    if not leituras:
+        return []
+
+    ids = {item['equipamento'] for item in leituras}
+    if equipamentos is None:
+        equipamentos = Equipamento.objects.all()
+    permitidos = set(equipamentos.filter(id__in=ids).values_list('id', flat=True))
+
+    # Trava os equipamentos para que leituras concorrentes não se intercalem
+    equips = {
+        e.id: e for e in Equipamento.objects.select_for_update().filter(id__in=permitidos)
+        .only('id', 'codigo', 'cliente_id', 'leitura_atual', 'atualizado_em')
+    }
+    ultima_medicao = dict(
+        MedicaoEquipamento.objects.filter(equipamento_id__in=equips)
+        .values('equipamento_id').annotate(maior=Max('leitura'))
+        .values_list('equipamento_id', 'maior')
+    )
+
+    erros = []
+    maior_leitura = {}
+    for indice, item in enumerate(leituras):
+        equip = equips.get(item['equipamento'])
+        if equip is None:
+            erros.append(f"Item {indice}: equipamento {item['equipamento']} não encontrado")
+            continue
+        anterior = maior_leitura.get(equip.id)
+        if anterior is None:
+            anterior = max(equip.leitura_atual or 0, ultima_medicao.get(equip.id) or 0)
+        if item['leitura'] < anterior:
+            erros.append(
+                f"Item {indice}: a leitura informada ({item['leitura']}) é menor que a última leitura "
+                f"registrada ({anterior}) do equipamento {equip.codigo}"
+            )
+            continue
+        maior_leitura[equip.id] = item['leitura']
+
+    if erros:
+        raise ValidationError(erros)
+
+    medicoes = MedicaoEquipamento.objects.bulk_create([
+        MedicaoEquipamento(
+            equipamento_id=item['equipamento'],
+            origem=item.get('origem') or 'MANUAL',
+            leitura=item['leitura'],
+            observacao=item.get('observacao') or '',
+        )
+        for item in leituras
+    ], batch_size=1000)
+
+    # Mesmo efeito de atualiza_leitura: a leitura atual passa a ser a última
+    # do lote e todos os planos ativos são recalculados
+    agora = timezone.now()
+    for equipamento_id, leitura in maior_leitura.items():
+        equips[equipamento_id].leitura_atual = leitura
+        equips[equipamento_id].atualizado_em = agora
+    Equipamento.objects.bulk_update(
+        [equips[i] for i in maior_leitura], ['leitura_atual', 'atualizado_em'], batch_size=1000
+    )
+
+    planos = list(PlanoManutencaoItem.objects.filter(equipamento_id__in=maior_leitura, ativo=True))
+    for plano in planos:
+        plano.recalc_proximos(leitura_atual=equips[plano.equipamento_id].leitura_atual)
+        plano.atualizado_em = agora
+    PlanoManutencaoItem.objects.bulk_update(
+        planos, ['proxima_leitura', 'proxima_data', 'atualizado_em'], batch_size=1000
+    )
+
+    # bulk_create/bulk_update não disparam signals: replica os efeitos colaterais
+    from relatorios.services import recalcular_metricas_diarias
+    hoje = timezone.localdate(agora)
+    recalcular_metricas_diarias(hoje, hoje, equipamento_ids=list(maior_leitura))
+
+    clientes = {equips[i].cliente_id for i in maior_leitura}
+    transaction.on_commit(lambda: [invalidar_cliente(c) for c in clientes])
+
+    return medicoes
+
+
+def rotulos_qr(equipamentos):
+    """(payload, texto inferior) de cada equipamento, no formato de core.qr_folhas."""
+    return [
+        (e.qr_payload, f"{e.codigo} - {e.descricao or e.modelo}")
+        for e in equipamentos.select_related(None).only('uuid', 'codigo', 'descricao', 'modelo')
+        .order_by('codigo').iterator(chunk_size=500)
+    ]
@@ -1,3 +1,144 @@
-from django.test import TestCase
+from decimal import Decimal
+from io import BytesIO
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APIClient
+
+from cadastro.models import Cliente, Empreendimento
+
+from .models import Equipamento, MedicaoEquipamento, PlanoManutencaoItem, TipoEquipamento
+from .services import registrar_medicoes_em_lote
+
+
+class MedicoesEmLoteTest(TestCase):
+    """Importação em lote deve ter o mesmo resultado do caminho registro a registro."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin_medicoes', 'admin@example.com', 'senha-forte-123')
+        cls.cliente = Cliente.objects.create(nome_razao='Mineradora Teste', documento='11222333000181', qr_code='x.png')
+        cls.empreendimento = Empreendimento.objects.create(cliente=cls.cliente, nome='Lavra 1', qr_code='x.png')
+        cls.tipo = TipoEquipamento.objects.create(nome='Escavadeira')
+
+    def criar_equipamento(self, codigo):
+        equip = Equipamento.objects.create(
+            cliente=self.cliente, empreendimento=self.empreendimento, tipo=self.tipo, codigo=codigo,
+            tipo_medicao='HORA', leitura_atual=Decimal('100'), qr_code='x.png',
+        )
+        PlanoManutencaoItem.objects.create(
+            equipamento=equip, titulo='Troca de óleo', modo='HORA', periodicidade_valor=250,
+        )
+        PlanoManutencaoItem.objects.create(
+            equipamento=equip, titulo='Lubrificação', modo='DIAS', periodicidade_valor=7,
+        )
+        return equip
+
+    def estado(self, equip):
+        equip.refresh_from_db()
+        return {
+            'leitura_atual': equip.leitura_atual,
+            'medicoes': list(equip.medicoes.order_by('id').values_list('leitura', 'origem')),
+            'planos': list(equip.planos.order_by('titulo').values_list(
+                'leitura_base', 'proxima_leitura', 'data_base', 'proxima_data'
+            )),
+        }
+
+    def test_mesmo_resultado_do_caminho_por_registro(self):
+        leituras = [Decimal('110'), Decimal('110'), Decimal('135.5'), Decimal('180')]
+
+        por_registro = self.criar_equipamento('EQ-001')
+        for leitura in leituras:
+            MedicaoEquipamento.objects.create(equipamento=por_registro, leitura=leitura)
+
+        em_lote = self.criar_equipamento('EQ-002')
+        registrar_medicoes_em_lote([{'equipamento': em_lote.id, 'leitura': l} for l in leituras])
+
+        self.assertEqual(self.estado(por_registro), self.estado(em_lote))
+        self.assertEqual(em_lote.leitura_atual, Decimal('180'))
+
+    def test_queries_nao_crescem_com_o_lote(self):
+        equipamentos = [self.criar_equipamento(f'EQ-{i}') for i in range(3)]
+
+        def importar(n):
+            leituras = [
+                {'equipamento': e.id, 'leitura': Decimal('100') + n + i}
+                for e in equipamentos for i in range(n)
+            ]
+            with CaptureQueriesContext(connection) as ctx:
+                registrar_medicoes_em_lote(leituras)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(importar(2), importar(20))
+
+    def test_leitura_menor_rejeita_o_lote_inteiro(self):
+        equip = self.criar_equipamento('EQ-001')
+        with self.assertRaises(ValidationError) as ctx:
+            registrar_medicoes_em_lote([
+                {'equipamento': equip.id, 'leitura': Decimal('150')},
+                {'equipamento': equip.id, 'leitura': Decimal('140')},
+                {'equipamento': equip.id, 'leitura': Decimal('90')},
+            ])
+        self.assertEqual(len(ctx.exception.messages), 2)  # 140 e 90 são checados contra 150
+        self.assertFalse(equip.medicoes.exists())
+
+    def test_endpoint_lote(self):
+        equip = self.criar_equipamento('EQ-001')
+        api = APIClient()
+        api.force_authenticate(self.admin)
+        url = reverse('medicoes-lote')
+
+        response = api.post(url, {'medicoes': [
+            {'equipamento': equip.id, 'leitura': '120'},
+            {'equipamento': equip.id, 'leitura': '130', 'origem': 'CHECKLIST'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['criadas'], 2)
+
+        response = api.post(url, [{'equipamento': equip.id, 'leitura': '10'}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.data['erros']), 1)
+
+
+@override_settings(QR_FOLHA_WORKERS=1)
+class FolhaQRTest(TestCase):
+    """Folha de QR codes para impressão (core/qr_folhas.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin_folha', 'admin@example.com', 'senha-forte-123')
+        cls.cliente = Cliente.objects.create(nome_razao='Mineradora Teste', documento='11222333000181', qr_code='x.png')
+        cls.empreendimento = Empreendimento.objects.create(cliente=cls.cliente, nome='Lavra 1', qr_code='x.png')
+        tipo = TipoEquipamento.objects.create(nome='Escavadeira')
+        for i in range(13):
+            Equipamento.objects.create(
+                cliente=cls.cliente, empreendimento=cls.empreendimento, tipo=tipo, codigo=f'EQ-{i:02d}', qr_code='x.png',
+            )
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+        self.url = reverse('equipamentos-qr-folha')
+
+    def test_pdf_com_uma_pagina_a_cada_12_etiquetas(self):
+        response = self.api.get(self.url, {'empreendimento': self.empreendimento.id})
+        self.assertEqual(response.status_code, 200)
+        pdf = b''.join(response.streaming_content)
+        self.assertTrue(pdf.startswith(b'%PDF-1.4'))
+        self.assertTrue(pdf.endswith(b'%%EOF\n'))
+        self.assertEqual(pdf.count(b'/Type /Page '), 2)
+
+    def test_png_em_mosaico(self):
+        response = self.api.get(self.url, {'cliente': self.cliente.id, 'formato': 'png'})
+        self.assertEqual(response['Content-Type'], 'image/png')
+        imagem = Image.open(BytesIO(b''.join(response.streaming_content)))
+        imagem.load()
+        self.assertEqual(imagem.mode, 'L')
+
+    def test_exige_cliente_ou_empreendimento(self):
+        self.assertEqual(self.api.get(self.url).status_code, 400)
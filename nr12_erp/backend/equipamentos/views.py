@@ -1,17 +1,27 @@
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.permissions import IsAuthenticated
-from rest_framework import filters
+from rest_framework import filters, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import StreamingHttpResponse
 from .models import TipoEquipamento, Equipamento, PlanoManutencaoItem, MedicaoEquipamento, ItemManutencao
 from django.shortcuts import get_object_or_404
 from django.http import Http404
 from .models import Equipamento
 from core.qr_utils import qr_png_response
+from core.qr_folhas import gerar_pdf, gerar_png
 from core.permissions import HasModuleAccess, CannotEditMasterData, filter_by_role
 from core.plan_validators import PlanLimitValidator
 from .serializers import (
     TipoEquipamentoSerializer, EquipamentoSerializer,
-    PlanoManutencaoItemSerializer, MedicaoEquipamentoSerializer, ItemManutencaoSerializer
+    PlanoManutencaoItemSerializer, MedicaoEquipamentoSerializer, ItemManutencaoSerializer,
+    MedicaoLoteItemSerializer,
 )
+from .services import registrar_medicoes_em_lote, rotulos_qr
+
+MAX_MEDICOES_POR_LOTE = 10000
 
 class BaseAuthViewSet(ModelViewSet):
     permission_classes = [IsAuthenticated]
@@ -52,6 +62,33 @@ class EquipamentoViewSet(BaseAuthViewSet):
             qs = qs.filter(empreendimento_id=emp_id)
         return qs
 
+    @action(detail=False, methods=["get"], url_path="qr-folha")
+    def qr_folha(self, request):
+        """
+        Folha de QR codes para impressão de todos os equipamentos de um cliente ou empreendimento.
+
+        Query params: cliente ou empreendimento (obrigatório um deles), formato=pdf|png (padrão pdf).
+        """
+        if not (request.query_params.get("cliente") or request.query_params.get("empreendimento")):
+            return Response(
+                {"detail": "Informe cliente ou empreendimento"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        formato = request.query_params.get("formato", "pdf").lower()
+        if formato not in ("pdf", "png"):
+            return Response({"detail": "formato deve ser pdf ou png"}, status=status.HTTP_400_BAD_REQUEST)
+
+        rotulos = rotulos_qr(self.get_queryset().filter(ativo=True))
+        if not rotulos:
+            return Response({"detail": "Nenhum equipamento encontrado"}, status=status.HTTP_404_NOT_FOUND)
+
+        gerar = gerar_pdf if formato == "pdf" else gerar_png
+        response = StreamingHttpResponse(
+            gerar(rotulos, workers=settings.QR_FOLHA_WORKERS),
+            content_type="application/pdf" if formato == "pdf" else "image/png",
+        )
+        response["Content-Disposition"] = f'attachment; filename="qrcodes_equipamentos.{formato}"'
+        return response
+
     def perform_create(self, serializer):
         """Valida limite de equipamentos antes de criar"""
         # Obtém cliente do equipamento sendo criado
@@ -101,40 +138,66 @@ class MedicaoEquipamentoViewSet(BaseAuthViewSet):
     serializer_class = MedicaoEquipamentoSerializer
     search_fields = ["equipamento__codigo","origem"]
     ordering = ["-criado_em"]
+    paginacao_keyset = "criado_em"  # ?paginacao=keyset (core/pagination.py)
 
     def get_queryset(self):
         qs = filter_by_role(super().get_queryset(), self.request.user)
         eq_id = self.request.query_params.get("equipamento")
         if eq_id:
             qs = qs.filter(equipamento_id=eq_id)
-        return qs[:200]  # proteção simples
+        return qs  # volume limitado pela paginação (page=N ou keyset)
+
+    @action(detail=False, methods=["post"])
+    def lote(self, request):
+        """
+        Importa várias leituras de uma vez (ex.: telemetria).
+
+        Body: lista de {equipamento, leitura, origem?, observacao?} ou {"medicoes": [...]},
+        em ordem cronológica. Tudo ou nada: se alguma leitura for inválida nada é gravado.
+        """
+        itens = request.data.get("medicoes") if isinstance(request.data, dict) else request.data
+        if not isinstance(itens, list) or not itens:
+            return Response({"detail": "Envie uma lista de medições"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(itens) > MAX_MEDICOES_POR_LOTE:
+            return Response(
+                {"detail": f"Máximo de {MAX_MEDICOES_POR_LOTE} medições por lote"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializer = MedicaoLoteItemSerializer(data=itens, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            medicoes = registrar_medicoes_em_lote(
+                serializer.validated_data,
+                equipamentos=filter_by_role(Equipamento.objects.all(), request.user),
+            )
+        except ValidationError as e:
+            return Response(
+                {"detail": "Leituras inválidas", "erros": e.messages},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response({
+            "criadas": len(medicoes),
+            "equipamentos": len({m.equipamento_id for m in medicoes}),
+        }, status=status.HTTP_201_CREATED)
 
 
 def equipamento_qr_view(request, uuid_str: str):
     """
     Gera QR Code do equipamento dinamicamente (nao depende de arquivo salvo).
     Isso resolve o problema de filesystem efemero em Railway/Render/Heroku.
+    PNG em cache no processo e ETag/If-None-Match (core.qr_utils).
     """
-    from django.http import HttpResponse
-    from core.qr_utils import generate_qr_code, add_text_to_qr
-    import io
-
     try:
         equip = get_object_or_404(Equipamento, uuid=uuid_str)
     except (ValueError, Http404):
         raise Http404("Equipamento não encontrado")
 
-    payload = equip.qr_payload
-    # Gera QR Code com texto personalizado
-    qr_img = generate_qr_code(payload, box_size=10, border=4)
-
-    # Adiciona texto: MANDACARU S M no topo e codigo/descricao embaixo
+    # Texto: MANDACARU S M no topo e codigo/descricao embaixo
     bottom_text = f"{equip.codigo} - {equip.descricao or equip.modelo}"
-    final_img = add_text_to_qr(qr_img, top_text="MANDACARU S M", bottom_text=bottom_text)
-
-    # Retorna como PNG
-    buf = io.BytesIO()
-    final_img.save(buf, format="PNG")
-    buf.seek(0)
-    return HttpResponse(buf.getvalue(), content_type="image/png")
-
+    return qr_png_response(
+        equip.qr_payload, box_size=10, border=4, request=request,
+        top_text="MANDACARU S M", bottom_text=bottom_text,
+    )
@@ -0,0 +1,39 @@
+"""
+Management command para marcar como VENCIDA as contas a receber/pagar em
+aberto com vencimento passado (os endpoints de resumo não gravam mais nada).
+
+Uso:
+    python manage.py marcar_contas_vencidas
+    python manage.py marcar_contas_vencidas --data 2025-07-01   # como se hoje fosse 01/07/2025
+
+Em produção roda todo dia às 00:05 no scheduler do app (core/apps.py).
+Fora do gunicorn, agendar via cron logo após a meia-noite:
+    5 0 * * * cd /path && python manage.py marcar_contas_vencidas
+"""
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from financeiro.services import marcar_contas_vencidas
+
+
+class Command(BaseCommand):
+    help = 'Marca como VENCIDA as contas ABERTA com vencimento anterior a hoje'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--data', type=str, help='Data de referência YYYY-MM-DD (padrão: hoje)')
+
+    def handle(self, *args, **options):
+        hoje = None
+        if options['data']:
+            try:
+                hoje = datetime.strptime(options['data'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError(f"Data inválida: {options['data']} (use YYYY-MM-DD)")
+
+        resultado = marcar_contas_vencidas(hoje)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {resultado['contas_receber']} conta(s) a receber e "
+            f"{resultado['contas_pagar']} conta(s) a pagar marcadas como vencidas"
+        ))
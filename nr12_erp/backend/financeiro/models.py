@@ -1,6 +1,7 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
-from decimal import Decimal
+
+from core.numeracao import numerar
 
 
 class ContaReceber(models.Model):
@@ -95,12 +96,6 @@ class ContaReceber(models.Model):
         return f"{self.numero} - {self.cliente.nome_razao} - R$ {self.valor_original}"
 
     def save(self, *args, **kwargs):
-        if not self.numero:
-            # Gerar número da conta
-            ultimo = ContaReceber.objects.order_by('-id').first()
-            proximo_numero = 1 if not ultimo else ultimo.id + 1
-            self.numero = f"CR-{proximo_numero:06d}"
-
         # Calcular valor final
         self.valor_final = self.valor_original + self.valor_juros - self.valor_desconto
 
@@ -111,7 +106,11 @@ class ContaReceber(models.Model):
                 from django.utils import timezone
                 self.data_pagamento = timezone.now().date()
 
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            if not self.numero:
+                # Gerar número da conta (core/numeracao.py: sem repetição nem buracos)
+                numerar([self], 'CR')
+            super().save(*args, **kwargs)
 
 
 class ContaPagar(models.Model):
@@ -194,12 +193,6 @@ class ContaPagar(models.Model):
         return f"{self.numero} - {self.fornecedor} - R$ {self.valor_original}"
 
     def save(self, *args, **kwargs):
-        if not self.numero:
-            # Gerar número da conta
-            ultimo = ContaPagar.objects.order_by('-id').first()
-            proximo_numero = 1 if not ultimo else ultimo.id + 1
-            self.numero = f"CP-{proximo_numero:06d}"
-
         # Calcular valor final
         self.valor_final = self.valor_original + self.valor_juros - self.valor_desconto
 
@@ -210,7 +203,11 @@ class ContaPagar(models.Model):
                 from django.utils import timezone
                 self.data_pagamento = timezone.now().date()
 
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            if not self.numero:
+                # Gerar número da conta (core/numeracao.py: sem repetição nem buracos)
+                numerar([self], 'CP')
+            super().save(*args, **kwargs)
 
 
 class Pagamento(models.Model):
@@ -308,36 +305,22 @@ class Pagamento(models.Model):
         return f"{self.numero} - {self.get_forma_pagamento_display()} - R$ {self.valor}{parcela_info}"
 
     def save(self, *args, **kwargs):
-        if not self.numero:
-            # Gerar número do pagamento
-            ultimo = Pagamento.objects.order_by('-id').first()
-            proximo_numero = 1 if not ultimo else ultimo.id + 1
-            self.numero = f"PAG-{proximo_numero:06d}"
-
-        # Calcular valor final
-        self.valor_final = self.valor - self.valor_desconto
+        self.calcular_valor_final()
 
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            if not self.numero:
+                # Gerar número do pagamento (core/numeracao.py: sem repetição nem buracos)
+                numerar([self], 'PAG')
+            super().save(*args, **kwargs)
 
         # Atualizar valor_pago da ContaReceber
         if self.status == 'CONFIRMADO':
             self._atualizar_conta_receber()
 
+    def calcular_valor_final(self):
+        self.valor_final = self.valor - self.valor_desconto
+
     def _atualizar_conta_receber(self):
         """Atualiza o valor pago total na ContaReceber"""
-        from django.db.models import Sum
-        from django.db import transaction
-
-        # Usar transaction.atomic para garantir consistência
-        with transaction.atomic():
-            # Refresh da conta para pegar valores mais recentes
-            conta = ContaReceber.objects.select_for_update().get(pk=self.conta_receber.pk)
-
-            # Calcular total pago de todos os pagamentos confirmados
-            total_pago = Pagamento.objects.filter(
-                conta_receber=conta,
-                status='CONFIRMADO'
-            ).aggregate(total=Sum('valor_final'))['total'] or Decimal('0')
-
-            conta.valor_pago = total_pago
-            conta.save()
+        from .services import atualizar_valor_pago
+        atualizar_valor_pago(self.conta_receber_id)
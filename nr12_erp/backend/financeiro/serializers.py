@@ -1,5 +1,8 @@
+from decimal import Decimal
+
 from rest_framework import serializers
 from .models import ContaReceber, ContaPagar, Pagamento
+from .services import registrar_pagamentos
 
 
 class ContaReceberListSerializer(serializers.ModelSerializer):
@@ -216,7 +219,7 @@ class PagamentoParceladoSerializer(serializers.Serializer):
     """
     conta_receber = serializers.IntegerField()
     valor_total = serializers.DecimalField(max_digits=12, decimal_places=2)
-    valor_desconto = serializers.DecimalField(max_digits=12, decimal_places=2, default=0)
+    valor_desconto = serializers.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0'))
     forma_pagamento = serializers.ChoiceField(choices=Pagamento.FORMA_PAGAMENTO_CHOICES)
     numero_parcelas = serializers.IntegerField(min_value=1, max_value=24)
     data_primeiro_pagamento = serializers.DateField()
@@ -238,7 +241,8 @@ class PagamentoParceladoSerializer(serializers.Serializer):
         from datetime import timedelta
         from decimal import Decimal
 
-        conta_receber_id = validated_data['conta_receber']
+        # Uma instância para todas as parcelas (a resposta lista conta e cliente de cada uma)
+        conta_receber = ContaReceber.objects.select_related('cliente').get(id=validated_data['conta_receber'])
         valor_total = validated_data['valor_total']
         valor_desconto = validated_data.get('valor_desconto', Decimal('0'))
         forma_pagamento = validated_data['forma_pagamento']
@@ -260,8 +264,8 @@ class PagamentoParceladoSerializer(serializers.Serializer):
                 valor_parcela = valor_liquido - sum(p.valor - p.valor_desconto for p in pagamentos)
                 desconto_por_parcela = valor_desconto - sum(p.valor_desconto for p in pagamentos)
 
-            pagamento = Pagamento.objects.create(
-                conta_receber_id=conta_receber_id,
+            pagamento = Pagamento(
+                conta_receber=conta_receber,
                 tipo_pagamento='PARCIAL',
                 forma_pagamento=forma_pagamento,
                 status='PENDENTE',  # Parcelas futuras ficam pendentes
@@ -275,4 +279,5 @@ class PagamentoParceladoSerializer(serializers.Serializer):
             )
             pagamentos.append(pagamento)
 
-        return pagamentos
+        # Todas as parcelas em um INSERT (financeiro/services.py)
+        return registrar_pagamentos(pagamentos)
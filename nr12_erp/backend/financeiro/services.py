@@ -0,0 +1,151 @@
+"""
+Serviços do financeiro.
+
+Pagamentos em lote: registrar_pagamentos() grava todas as parcelas com um
+bulk_create e números PAG reservados em um único bloco (core/numeracao.py),
+em vez de um save() por parcela. O valor pago de cada ContaReceber afetada é
+recalculado uma vez no fim, e só quando o lote tem pagamentos confirmados
+(mesma regra de Pagamento.save()).
+
+Resumos: resumo_contas() e aging_contas() fazem uma consulta de agregação
+condicional cada e não gravam nada. Contas ABERTA com vencimento passado
+contam como vencidas mesmo antes de marcar_contas_vencidas() (comando
+marcar_contas_vencidas, agendado) mudar o status. As respostas ficam no cache
+de métricas (core/cache.py), invalidado pelos signals de ContaReceber,
+ContaPagar e Pagamento e pelas gravações em lote daqui.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.utils import timezone
+
+from core.cache import invalidar_cliente
+from core.numeracao import numerar
+
+from .models import ContaPagar, ContaReceber, Pagamento
+
+# (chave, menor e maior número de dias de atraso; None = sem limite)
+FAIXAS_AGING = [
+    ('a_vencer', None, 0),
+    ('0_30', 1, 30),
+    ('31_60', 31, 60),
+    ('61_90', 61, 90),
+    ('mais_90', 91, None),
+]
+SALDO_DEVEDOR = ExpressionWrapper(
+    F('valor_final') - F('valor_pago'), output_field=DecimalField(max_digits=12, decimal_places=2)
+)
+
+
+def atualizar_valor_pago(conta_id):
+    """Recalcula ContaReceber.valor_pago pela soma dos pagamentos confirmados (conta travada durante o cálculo)."""
+    with transaction.atomic():
+        conta = ContaReceber.objects.select_for_update().get(pk=conta_id)
+        total_pago = Pagamento.objects.filter(
+            conta_receber=conta,
+            status='CONFIRMADO'
+        ).aggregate(total=Sum('valor_final'))['total'] or Decimal('0')
+
+        conta.valor_pago = total_pago
+        conta.save()
+
+
+@transaction.atomic
+def registrar_pagamentos(pagamentos):
+    """
+    Grava pagamentos ainda não salvos com o mesmo resultado de um save() em
+    cada um: valor_final calculado, número sequencial e valor pago das contas
+    atualizado. Retorna a lista com os pks preenchidos.
+    """
+    for pagamento in pagamentos:
+        pagamento.calcular_valor_final()
+    numerar(pagamentos, 'PAG')
+    pagamentos = Pagamento.objects.bulk_create(pagamentos)
+
+    for conta_id in sorted({p.conta_receber_id for p in pagamentos if p.status == 'CONFIRMADO'}):
+        atualizar_valor_pago(conta_id)
+
+    _invalidar_cache(ContaReceber.objects.filter(
+        id__in={p.conta_receber_id for p in pagamentos}
+    ).values_list('cliente_id', flat=True))
+    return pagamentos
+
+
+def _invalidar_cache(clientes_ids):
+    """
+    Invalida o cache dos clientes após o commit: bulk_create e update() não
+    disparam os signals de core.signals. None = só o escopo global.
+    """
+    clientes_ids = set(clientes_ids)
+
+    def invalidar():
+        for cliente_id in clientes_ids:
+            invalidar_cliente(cliente_id)
+    transaction.on_commit(invalidar)
+
+
+def _vencida(hoje):
+    return Q(status='VENCIDA') | Q(status='ABERTA', data_vencimento__lt=hoje)
+
+
+def resumo_contas(queryset, hoje=None):
+    """
+    Contagens e totais por status de contas a receber/pagar em uma consulta.
+    ABERTA já vencida conta como VENCIDA.
+    """
+    hoje = hoje or timezone.localdate()
+    aberta = Q(status='ABERTA', data_vencimento__gte=hoje)
+    vencida = _vencida(hoje)
+    return queryset.order_by().aggregate(
+        total=Count('id'),
+        abertas=Count('id', filter=aberta),
+        pagas=Count('id', filter=Q(status='PAGA')),
+        vencidas=Count('id', filter=vencida),
+        total_aberto=Sum('valor_final', filter=aberta, default=Decimal('0')),
+        total_vencido=Sum('valor_final', filter=vencida, default=Decimal('0')),
+        total_pago=Sum('valor_pago', filter=Q(status='PAGA'), default=Decimal('0')),
+    )
+
+
+def aging_contas(queryset, agrupar_por, hoje=None):
+    """
+    Saldo devedor (valor_final - valor_pago) das contas abertas/vencidas por
+    faixa de atraso (FAIXAS_AGING), agrupado pelos campos `agrupar_por`.
+    Uma consulta; retorna uma lista de dicts com os campos do grupo, as
+    faixas e 'total'.
+    """
+    hoje = hoje or timezone.localdate()
+    faixas = {}
+    for chave, minimo, maximo in FAIXAS_AGING:
+        filtro = Q()
+        if minimo is not None:
+            filtro &= Q(data_vencimento__lte=hoje - timedelta(days=minimo))
+        if maximo is not None:
+            filtro &= Q(data_vencimento__gte=hoje - timedelta(days=maximo))
+        faixas[chave] = Sum(SALDO_DEVEDOR, filter=filtro, default=Decimal('0'))
+    return list(
+        queryset.filter(status__in=['ABERTA', 'VENCIDA']).order_by()
+        .values(*agrupar_por).annotate(**faixas, total=Sum(SALDO_DEVEDOR))
+        .order_by('-total')
+    )
+
+
+@transaction.atomic
+def marcar_contas_vencidas(hoje=None):
+    """
+    Passa para VENCIDA as contas a receber/pagar ABERTA com vencimento
+    anterior a hoje. Retorna {'contas_receber': n, 'contas_pagar': n}.
+    """
+    hoje = hoje or timezone.localdate()
+    receber = ContaReceber.objects.filter(status='ABERTA', data_vencimento__lt=hoje)
+    clientes = set(receber.values_list('cliente_id', flat=True).distinct())
+    resultado = {
+        'contas_receber': receber.update(status='VENCIDA'),
+        'contas_pagar': ContaPagar.objects.filter(status='ABERTA', data_vencimento__lt=hoje).update(status='VENCIDA'),
+    }
+    if resultado['contas_pagar'] and not clientes:
+        clientes = {None}
+    _invalidar_cache(clientes)
+    return resultado
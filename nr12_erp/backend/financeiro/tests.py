@@ -1,3 +1,200 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from cadastro.models import Cliente
+from core.apps import _marcar_contas_vencidas
+from core.cache import get_cache
+
+from .models import ContaPagar, ContaReceber, Pagamento
+from .services import registrar_pagamentos
+
+CAMPOS_PAGAMENTO = ('tipo_pagamento', 'status', 'valor', 'valor_desconto', 'valor_final', 'forma_pagamento',
+                    'data_pagamento', 'numero_parcela', 'total_parcelas', 'observacoes', 'registrado_por_id')
+
+
+class ParcelamentoEmLoteTest(TestCase):
+    """Parcelas gravadas em lote (financeiro/services.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Cliente.objects.create(nome_razao='Mineradora Teste', documento='11222333000181', qr_code='x.png')
+        cls.usuario = User.objects.create_superuser(username='financeiro', password='x')
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.usuario)
+
+    def conta(self, valor='1000.00'):
+        return ContaReceber.objects.create(
+            cliente=self.cliente, tipo='SERVICO', data_vencimento=date(2026, 1, 10), valor_original=Decimal(valor),
+        )
+
+    def parcelas(self, conta):
+        return [
+            Pagamento(conta_receber=conta, tipo_pagamento='PARCIAL', status=status, forma_pagamento='PIX',
+                      valor=Decimal('1000') / 3, valor_desconto=Decimal('50') / 3,
+                      data_pagamento=date(2026, 1, 10) + timedelta(days=30 * i), numero_parcela=i + 1,
+                      total_parcelas=3, observacoes=f'Parcela {i + 1}/3', registrado_por=self.usuario)
+            for i, status in enumerate(['CONFIRMADO', 'CONFIRMADO', 'PENDENTE'])
+        ]
+
+    def gravados(self, conta):
+        return list(conta.pagamentos.order_by('numero_parcela').values_list(*CAMPOS_PAGAMENTO))
+
+    def test_mesmo_resultado_que_save_um_a_um(self):
+        um_a_um, em_lote = self.conta(), self.conta()
+        for pagamento in self.parcelas(um_a_um):
+            pagamento.save()
+
+        criados = registrar_pagamentos(self.parcelas(em_lote))
+
+        self.assertEqual(self.gravados(em_lote), self.gravados(um_a_um))
+        um_a_um.refresh_from_db()
+        em_lote.refresh_from_db()
+        self.assertEqual(em_lote.valor_pago, um_a_um.valor_pago)
+        self.assertEqual([p.numero for p in criados], ['PAG-000004', 'PAG-000005', 'PAG-000006'])
+        self.assertTrue(all(p.pk for p in criados))
+
+    def test_consultas_nao_crescem_com_as_parcelas(self):
+        def consultas(numero_parcelas):
+            conta = self.conta()
+            with CaptureQueriesContext(connection) as ctx:
+                resposta = self.api.post('/api/v1/financeiro/pagamentos/parcelar/', {
+                    'conta_receber': conta.pk, 'valor_total': '1000.00', 'forma_pagamento': 'BOLETO',
+                    'numero_parcelas': numero_parcelas, 'data_primeiro_pagamento': '2026-02-01',
+                }, format='json')
+            self.assertEqual(resposta.status_code, 201)
+            self.assertEqual(len(resposta.data), numero_parcelas)
+            return len(ctx.captured_queries)
+
+        consultas(1)  # cria o contador da série PAG
+        self.assertEqual(consultas(24), consultas(2))
+        self.assertEqual(Pagamento.objects.filter(total_parcelas=24).count(), 24)
+
+    def test_parcelar_conta_receber(self):
+        conta = self.conta()
+        primeira = self.api.post(f'/api/v1/financeiro/contas-receber/{conta.pk}/parcelar/',
+                                 {'prazo': '30', 'forma_pagamento': 'PIX'}, format='json')
+        self.assertEqual(primeira.status_code, 201)
+
+        resposta = self.api.post(f'/api/v1/financeiro/contas-receber/{conta.pk}/parcelar/',
+                                 {'prazo': '30_60_90', 'forma_pagamento': 'PIX'}, format='json')
+
+        self.assertEqual(resposta.status_code, 201)
+        pendentes = conta.pagamentos.filter(status='PENDENTE').order_by('numero_parcela')
+        self.assertEqual([p.valor for p in pendentes], [Decimal('333.33'), Decimal('333.33'), Decimal('333.34')])
+        self.assertEqual(conta.pagamentos.get(status='CANCELADO').tipo_pagamento, 'TOTAL')
+        conta.refresh_from_db()
+        self.assertEqual(conta.data_vencimento, pendentes[0].data_pagamento)
+
+
+class ResumoFinanceiroTest(TestCase):
+    """Resumos sem escrita, aging por cliente e cache (financeiro/services.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser(username='financeiro', password='x')
+        cls.cliente_a = Cliente.objects.create(nome_razao='Cliente A', documento='11222333000181', qr_code='x.png')
+        cls.cliente_b = Cliente.objects.create(nome_razao='Cliente B', documento='45997418000153', qr_code='x.png')
+        cls.hoje = timezone.localdate()
+
+    def setUp(self):
+        get_cache().clear()
+        self.api = APIClient()
+        self.api.force_authenticate(self.usuario)
+
+    def conta(self, cliente, dias_atraso, valor, **campos):
+        with self.captureOnCommitCallbacks(execute=True):
+            return ContaReceber.objects.create(
+                cliente=cliente, tipo='SERVICO', valor_original=Decimal(valor),
+                data_vencimento=self.hoje - timedelta(days=dias_atraso), **campos,
+            )
+
+    def test_resumo_nao_grava_e_conta_vencidas(self):
+        self.conta(self.cliente_a, -5, '100')
+        atrasada = self.conta(self.cliente_a, 3, '200')
+        self.conta(self.cliente_b, 40, '300', status='VENCIDA')
+        self.conta(self.cliente_b, 10, '50', valor_pago=Decimal('50'))
+        ContaPagar.objects.create(tipo='OUTROS', fornecedor='Posto', data_vencimento=self.hoje - timedelta(days=1),
+                                  valor_original=Decimal('80'))
+
+        with CaptureQueriesContext(connection) as ctx:
+            resposta = self.api.get('/api/v1/financeiro/contas-receber/resumo/')
+        self.assertEqual(resposta.data, {
+            'total': 4, 'abertas': 1, 'pagas': 1, 'vencidas': 2,
+            'total_aberto': 100.0, 'total_vencido': 500.0, 'total_recebido': 50.0,
+        })
+        sql = [q['sql'] for q in ctx.captured_queries if 'financeiro_' in q['sql']]
+        self.assertEqual(len(sql), 1)
+        self.assertFalse(any(q['sql'].startswith('UPDATE') for q in ctx.captured_queries))
+        atrasada.refresh_from_db()
+        self.assertEqual(atrasada.status, 'ABERTA')
+
+        saida = StringIO()
+        call_command('marcar_contas_vencidas', stdout=saida)
+        self.assertIn('1 conta(s) a receber e 1 conta(s) a pagar', saida.getvalue())
+        atrasada.refresh_from_db()
+        self.assertEqual(atrasada.status, 'VENCIDA')
+        self.assertEqual(self.api.get('/api/v1/financeiro/contas-pagar/resumo/').data['vencidas'], 1)
+
+    def test_job_do_scheduler_marca_vencidas(self):
+        atrasada = self.conta(self.cliente_a, 1, '200')
+        em_dia = self.conta(self.cliente_a, 0, '100')
+
+        with mock.patch('django.db.close_old_connections'):  # não derruba a conexão do TestCase
+            _marcar_contas_vencidas()
+
+        atrasada.refresh_from_db()
+        em_dia.refresh_from_db()
+        self.assertEqual((atrasada.status, em_dia.status), ('VENCIDA', 'ABERTA'))
+
+    def test_aging_por_cliente(self):
+        self.conta(self.cliente_a, -5, '100')
+        self.conta(self.cliente_a, 0, '10')
+        self.conta(self.cliente_a, 30, '20')
+        self.conta(self.cliente_a, 31, '40', valor_pago=Decimal('15'))
+        self.conta(self.cliente_b, 90, '300', status='VENCIDA')
+        self.conta(self.cliente_b, 91, '700')
+        self.conta(self.cliente_b, 200, '999', status='CANCELADA')
+
+        resposta = self.api.get('/api/v1/financeiro/contas-receber/aging/')
+
+        self.assertEqual(resposta.data['faixas'], ['a_vencer', '0_30', '31_60', '61_90', 'mais_90'])
+        self.assertEqual(resposta.data['grupos'], [
+            {'cliente': self.cliente_b.pk, 'cliente_nome': 'Cliente B', 'a_vencer': 0.0, '0_30': 0.0,
+             '31_60': 0.0, '61_90': 300.0, 'mais_90': 700.0, 'total': 1000.0},
+            {'cliente': self.cliente_a.pk, 'cliente_nome': 'Cliente A', 'a_vencer': 110.0, '0_30': 20.0,
+             '31_60': 25.0, '61_90': 0.0, 'mais_90': 0.0, 'total': 155.0},
+        ])
+        self.assertEqual(resposta.data['totais']['total'], 1155.0)
+
+    @override_settings(METRICAS_CACHE_ENABLED=True)
+    def test_cache_invalidado_por_pagamento(self):
+        conta = self.conta(self.cliente_a, 5, '100')
+        url = '/api/v1/financeiro/contas-receber/aging/'
+        self.assertEqual(self.api.get(url)['X-Cache'], 'MISS')
+        self.assertEqual(self.api.get(url)['X-Cache'], 'HIT')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Pagamento.objects.create(conta_receber=conta, tipo_pagamento='PARCIAL', valor=Decimal('30'),
+                                     forma_pagamento='PIX', data_pagamento=self.hoje)
+        resposta = self.api.get(url)
+        self.assertEqual(resposta['X-Cache'], 'MISS')
+        self.assertEqual(resposta.data['totais']['total'], 70.0)
+
+        # Parcelas em lote (bulk_create) também invalidam
+        with self.captureOnCommitCallbacks(execute=True):
+            registrar_pagamentos([Pagamento(conta_receber=conta, tipo_pagamento='PARCIAL', status='CONFIRMADO',
+                                            valor=Decimal('20'), forma_pagamento='PIX', data_pagamento=self.hoje)])
+        self.assertEqual(self.api.get(url).data['totais']['total'], 50.0)
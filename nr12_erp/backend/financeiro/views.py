@@ -2,12 +2,14 @@ from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db import transaction
 from django.db.models import Sum, Q
-from datetime import date
 from rest_framework.permissions import IsAuthenticated
+from core.cache import cache_resposta
 from core.permissions import filter_by_role
 
 from .models import ContaReceber, ContaPagar, Pagamento
+from .services import FAIXAS_AGING, aging_contas, registrar_pagamentos, resumo_contas
 from .serializers import (
     ContaReceberListSerializer,
     ContaReceberDetailSerializer,
@@ -22,6 +24,20 @@ from .serializers import (
 )
 
 
+def resposta_aging(linhas, grupo):
+    """Corpo das respostas de aging: uma entrada por grupo e os totais por faixa."""
+    faixas = [chave for chave, _, _ in FAIXAS_AGING]
+    totais = dict.fromkeys(faixas + ['total'], 0.0)
+    resultado = []
+    for linha in linhas:
+        item = grupo(linha)
+        for chave in totais:
+            item[chave] = float(linha[chave])
+            totais[chave] += item[chave]
+        resultado.append(item)
+    return {'faixas': faixas, 'grupos': resultado, 'totais': {k: round(v, 2) for k, v in totais.items()}}
+
+
 class ContaReceberViewSet(viewsets.ModelViewSet):
     queryset = ContaReceber.objects.all().select_related(
         'cliente', 'orcamento', 'ordem_servico',
@@ -113,17 +129,12 @@ class ContaReceberViewSet(viewsets.ModelViewSet):
         if not dias_parcelas:
             return Response({"detail": "Prazo inválido."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Cancelar parcelas pendentes anteriores (se existirem)
-        conta.pagamentos.filter(status='PENDENTE').update(status='CANCELADO')
-
         data_base = timezone.now().date()
         total_parcelas = len(dias_parcelas)
         valor = conta.valor_final or conta.valor_original
 
-        pagamentos_criados = []
-
         if total_parcelas == 1:
-            pag = Pagamento.objects.create(
+            parcelas = [Pagamento(
                 conta_receber=conta,
                 tipo_pagamento='TOTAL',
                 status='PENDENTE',
@@ -131,32 +142,38 @@ class ContaReceberViewSet(viewsets.ModelViewSet):
                 forma_pagamento=forma_pagamento,
                 data_pagamento=data_base + timedelta(days=dias_parcelas[0]),
                 registrado_por=request.user,
-            )
-            pagamentos_criados.append(pag)
+            )]
         else:
             valor_parcela = (valor / Decimal(total_parcelas)).quantize(
                 Decimal('0.01'), rounding=ROUND_HALF_UP
             )
             valor_ultima = valor - (valor_parcela * (total_parcelas - 1))
 
-            for i, dias in enumerate(dias_parcelas, start=1):
-                v = valor_parcela if i < total_parcelas else valor_ultima
-                pag = Pagamento.objects.create(
+            parcelas = [
+                Pagamento(
                     conta_receber=conta,
                     tipo_pagamento='PARCIAL',
                     status='PENDENTE',
-                    valor=v,
+                    valor=valor_parcela if i < total_parcelas else valor_ultima,
                     forma_pagamento=forma_pagamento,
                     data_pagamento=data_base + timedelta(days=dias),
                     numero_parcela=i,
                     total_parcelas=total_parcelas,
                     registrado_por=request.user,
                 )
-                pagamentos_criados.append(pag)
+                for i, dias in enumerate(dias_parcelas, start=1)
+            ]
+
+        with transaction.atomic():
+            # Cancelar parcelas pendentes anteriores (se existirem)
+            conta.pagamentos.filter(status='PENDENTE').update(status='CANCELADO')
 
-        # Atualizar data_vencimento da conta para o primeiro vencimento
-        conta.data_vencimento = data_base + timedelta(days=dias_parcelas[0])
-        conta.save(update_fields=['data_vencimento'])
+            # Todas as parcelas em um INSERT (financeiro/services.py)
+            pagamentos_criados = registrar_pagamentos(parcelas)
+
+            # Atualizar data_vencimento da conta para o primeiro vencimento
+            conta.data_vencimento = data_base + timedelta(days=dias_parcelas[0])
+            conta.save(update_fields=['data_vencimento'])
 
         return Response({
             "detail": f"{total_parcelas} parcela(s) criada(s) com sucesso.",
@@ -164,44 +181,37 @@ class ContaReceberViewSet(viewsets.ModelViewSet):
         }, status=status.HTTP_201_CREATED)
 
     @action(detail=False, methods=['get'])
+    @cache_resposta('financeiro-contas-receber-resumo')
     def resumo(self, request):
-        """Retorna resumo de contas a receber"""
-        queryset = self.filter_queryset(self.get_queryset())
-
-        # Atualizar status de vencidas primeiro
-        hoje = date.today()
-        queryset.filter(
-            status='ABERTA',
-            data_vencimento__lt=hoje
-        ).update(status='VENCIDA')
-
-        total = queryset.count()
-        abertas = queryset.filter(status='ABERTA').count()
-        pagas = queryset.filter(status='PAGA').count()
-        vencidas = queryset.filter(status='VENCIDA').count()
-
-        valor_aberto = queryset.filter(status='ABERTA').aggregate(
-            total=Sum('valor_final')
-        )['total'] or 0
-
-        valor_vencido = queryset.filter(status='VENCIDA').aggregate(
-            total=Sum('valor_final')
-        )['total'] or 0
-
-        valor_recebido = queryset.filter(status='PAGA').aggregate(
-            total=Sum('valor_pago')
-        )['total'] or 0
+        """
+        Retorna resumo de contas a receber (uma consulta, sem gravar).
+        O status VENCIDA é gravado pelo comando marcar_contas_vencidas.
+        """
+        resumo = resumo_contas(self.filter_queryset(self.get_queryset()))
 
         return Response({
-            'total': total,
-            'abertas': abertas,
-            'pagas': pagas,
-            'vencidas': vencidas,
-            'total_aberto': float(valor_aberto),
-            'total_vencido': float(valor_vencido),
-            'total_recebido': float(valor_recebido),
+            'total': resumo['total'],
+            'abertas': resumo['abertas'],
+            'pagas': resumo['pagas'],
+            'vencidas': resumo['vencidas'],
+            'total_aberto': float(resumo['total_aberto']),
+            'total_vencido': float(resumo['total_vencido']),
+            'total_recebido': float(resumo['total_pago']),
         })
 
+    @action(detail=False, methods=['get'])
+    @cache_resposta('financeiro-contas-receber-aging')
+    def aging(self, request):
+        """
+        Saldo a receber por cliente e faixa de atraso (a vencer, 0-30, 31-60,
+        61-90 e mais de 90 dias), maiores saldos primeiro.
+        """
+        linhas = aging_contas(self.filter_queryset(self.get_queryset()), ['cliente_id', 'cliente__nome_razao'])
+        return Response(resposta_aging(linhas, lambda linha: {
+            'cliente': linha['cliente_id'],
+            'cliente_nome': linha['cliente__nome_razao'],
+        }))
+
 
 class ContaPagarViewSet(viewsets.ModelViewSet):
     queryset = ContaPagar.objects.all().select_related(
@@ -264,44 +274,31 @@ class ContaPagarViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
+    @cache_resposta('financeiro-contas-pagar-resumo')
     def resumo(self, request):
-        """Retorna resumo de contas a pagar"""
-        queryset = self.filter_queryset(self.get_queryset())
-
-        # Atualizar status de vencidas primeiro
-        hoje = date.today()
-        queryset.filter(
-            status='ABERTA',
-            data_vencimento__lt=hoje
-        ).update(status='VENCIDA')
-
-        total = queryset.count()
-        abertas = queryset.filter(status='ABERTA').count()
-        pagas = queryset.filter(status='PAGA').count()
-        vencidas = queryset.filter(status='VENCIDA').count()
-
-        valor_aberto = queryset.filter(status='ABERTA').aggregate(
-            total=Sum('valor_final')
-        )['total'] or 0
-
-        valor_vencido = queryset.filter(status='VENCIDA').aggregate(
-            total=Sum('valor_final')
-        )['total'] or 0
-
-        valor_pago_total = queryset.filter(status='PAGA').aggregate(
-            total=Sum('valor_pago')
-        )['total'] or 0
+        """
+        Retorna resumo de contas a pagar (uma consulta, sem gravar).
+        O status VENCIDA é gravado pelo comando marcar_contas_vencidas.
+        """
+        resumo = resumo_contas(self.filter_queryset(self.get_queryset()))
 
         return Response({
-            'total': total,
-            'abertas': abertas,
-            'pagas': pagas,
-            'vencidas': vencidas,
-            'total_aberto': float(valor_aberto),
-            'total_vencido': float(valor_vencido),
-            'total_pago': float(valor_pago_total),
+            'total': resumo['total'],
+            'abertas': resumo['abertas'],
+            'pagas': resumo['pagas'],
+            'vencidas': resumo['vencidas'],
+            'total_aberto': float(resumo['total_aberto']),
+            'total_vencido': float(resumo['total_vencido']),
+            'total_pago': float(resumo['total_pago']),
         })
 
+    @action(detail=False, methods=['get'])
+    @cache_resposta('financeiro-contas-pagar-aging')
+    def aging(self, request):
+        """Saldo a pagar por fornecedor e faixa de atraso, maiores saldos primeiro."""
+        linhas = aging_contas(self.filter_queryset(self.get_queryset()), ['fornecedor'])
+        return Response(resposta_aging(linhas, lambda linha: {'fornecedor': linha['fornecedor']}))
+
 
 class PagamentoViewSet(viewsets.ModelViewSet):
     """
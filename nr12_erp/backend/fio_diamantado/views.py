@@ -22,6 +22,7 @@ from .serializers import (
     CorteEmAndamentoSerializer,
 )
 from core.permissions import filter_by_role
+from core.cache import cache_resposta
 
 
 class FioDiamantadoViewSet(viewsets.ModelViewSet):
@@ -247,6 +248,7 @@ class FioDiamantadoViewSet(viewsets.ModelViewSet):
         })
 
     @action(detail=False, methods=['get'])
+    @cache_resposta('fio-diamantado-resumo')
     def resumo(self, request):
         """Retorna resumo geral dos fios"""
         qs = self.get_queryset()
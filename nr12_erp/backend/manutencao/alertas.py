@@ -0,0 +1,211 @@
+"""
+Avaliação em lote dos gatilhos de manutenção preventiva (GatilhoManutencao).
+
+verificar_gatilhos() carrega todos os gatilhos ativos já com a leitura e as
+datas do equipamento em uma única consulta, calcula a situação de cada um
+(VENCIDA/PRÓXIMA) em memória e grava os alertas com bulk_create/bulk_update.
+As regras são as de GatilhoManutencao.verificar_e_criar_alerta(), que passou
+a usar este módulo.
+
+Cada alerta aponta para o gatilho que o gerou (ManutencaoAlerta.gatilho) e
+há no máximo um alerta em aberto por gatilho (índice único parcial
+unique_alerta_aberto_por_gatilho): a busca é por gatilho_id e a criação usa
+INSERT ... ON CONFLICT DO NOTHING, então verificações simultâneas não duplicam.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from equipamentos.models import Equipamento
+
+from .models_alertas import GatilhoManutencao, ItemGatilhoManutencao, ManutencaoAlerta
+
+UNIDADES = dict(Equipamento.MEDICAO_CHOICES)
+
+CAMPOS = (
+    'id', 'nome', 'tipo_gatilho', 'intervalo_leitura', 'antecedencia_leitura',
+    'intervalo_dias', 'antecedencia_dias', 'proxima_execucao_leitura', 'proxima_execucao_data',
+    'equipamento_id', 'equipamento__codigo', 'equipamento__leitura_atual', 'equipamento__tipo_medicao',
+    'equipamento__leitura_ultima_manutencao', 'equipamento__data_ultima_manutencao',
+)
+CAMPOS_ALERTA = ('titulo', 'tipo', 'prioridade', 'mensagem', 'leitura_atual', 'leitura_limite', 'data_limite')
+
+
+def titulo_alerta(nome):
+    return f"Manutenção: {nome}"
+
+
+def _proxima_execucao(g, hoje):
+    """Mesmo cálculo de GatilhoManutencao.calcular_proxima_execucao(), sobre a linha da consulta."""
+    proxima_leitura = proxima_data = None
+    if g['tipo_gatilho'] in ('HORIMETRO', 'AMBOS') and g['intervalo_leitura']:
+        base = g['equipamento__leitura_ultima_manutencao'] or g['equipamento__leitura_atual']
+        proxima_leitura = base + g['intervalo_leitura']
+    if g['tipo_gatilho'] in ('CALENDARIO', 'AMBOS') and g['intervalo_dias']:
+        base = g['equipamento__data_ultima_manutencao'] or hoje
+        proxima_data = base + timedelta(days=g['intervalo_dias'])
+    return proxima_leitura, proxima_data
+
+
+def avaliar(g, hoje):
+    """
+    Situação de um gatilho (linha de CAMPOS). Retorna (prioridade, partes da
+    mensagem) ou None quando não há o que alertar.
+    """
+    partes = []
+    prioridade = None
+
+    meta = g['proxima_execucao_leitura']
+    if g['tipo_gatilho'] in ('HORIMETRO', 'AMBOS') and meta:
+        leitura = g['equipamento__leitura_atual']
+        unidade = UNIDADES.get(g['equipamento__tipo_medicao'], '')
+        if leitura >= meta:
+            prioridade = 'ALTA'
+            partes.append(f"VENCIDA: Leitura atual {leitura} {unidade} já passou da meta {meta}")
+        elif leitura >= meta - meta * g['antecedencia_leitura']:
+            prioridade = 'MEDIA'
+            partes.append(f"PRÓXIMA: Faltam {meta - leitura} {unidade} para atingir {meta}")
+
+    data = g['proxima_execucao_data']
+    if g['tipo_gatilho'] in ('CALENDARIO', 'AMBOS') and data:
+        if hoje >= data:
+            prioridade = 'ALTA'
+            partes.append(
+                f"VENCIDA: {(hoje - data).days} dias de atraso (venceu em {data.strftime('%d/%m/%Y')})"
+            )
+        elif hoje >= data - timedelta(days=g['antecedencia_dias']):
+            prioridade = prioridade or 'MEDIA'
+            partes.append(
+                f"PRÓXIMA: Faltam {(data - hoje).days} dias para a data prevista ({data.strftime('%d/%m/%Y')})"
+            )
+
+    return (prioridade, partes) if partes else None
+
+
+def avaliar_gatilhos(gatilhos=None, hoje=None):
+    """
+    Avalia os gatilhos ativos (de equipamentos ativos) em uma consulta.
+
+    Gatilhos ainda sem próxima execução recebem o cálculo inicial (gravado com
+    bulk_update). Retorna (total de gatilhos avaliados, avaliações que geram
+    alerta), cada avaliação um dict com os campos do ManutencaoAlerta.
+    """
+    hoje = hoje or timezone.localdate()
+    if gatilhos is None:
+        gatilhos = GatilhoManutencao.objects.all()
+    linhas = list(gatilhos.filter(ativo=True, equipamento__ativo=True).order_by().values(*CAMPOS))
+
+    sem_proxima = []
+    avaliacoes = []
+    for g in linhas:
+        if not g['proxima_execucao_leitura'] and not g['proxima_execucao_data']:
+            g['proxima_execucao_leitura'], g['proxima_execucao_data'] = _proxima_execucao(g, hoje)
+            sem_proxima.append(GatilhoManutencao(
+                id=g['id'],
+                proxima_execucao_leitura=g['proxima_execucao_leitura'],
+                proxima_execucao_data=g['proxima_execucao_data'],
+                atualizado_em=timezone.now(),
+            ))
+
+        situacao = avaliar(g, hoje)
+        if situacao is None:
+            continue
+        prioridade, partes = situacao
+        avaliacoes.append({
+            'gatilho_id': g['id'],
+            'nome': g['nome'],
+            'equipamento_id': g['equipamento_id'],
+            'codigo': g['equipamento__codigo'],
+            'titulo': titulo_alerta(g['nome']),
+            'tipo': 'PREVENTIVA_VENCIDA' if prioridade == 'ALTA' else 'PREVENTIVA_PROXIMA',
+            'prioridade': prioridade,
+            'mensagem': "\n".join(partes),
+            'leitura_atual': g['equipamento__leitura_atual'],
+            'leitura_limite': g['proxima_execucao_leitura'],
+            'data_limite': g['proxima_execucao_data'],
+        })
+
+    if sem_proxima:
+        GatilhoManutencao.objects.bulk_update(
+            sem_proxima, ['proxima_execucao_leitura', 'proxima_execucao_data', 'atualizado_em'], batch_size=1000
+        )
+    return len(linhas), avaliacoes
+
+
+def sincronizar_alertas(avaliacoes):
+    """
+    Cria ou atualiza o alerta em aberto de cada avaliação (bulk). Cada
+    avaliação recebe a chave 'alerta'. Retorna (criadas, atualizadas,
+    inalteradas), listas de avaliações.
+    """
+    if not avaliacoes:
+        return [], [], []
+    agora = timezone.now()
+    abertos = alertas_abertos([a['gatilho_id'] for a in avaliacoes])
+
+    criadas, atualizadas, inalteradas = [], [], []
+    for a in avaliacoes:
+        alerta = abertos.get(a['gatilho_id'])
+        if alerta is None:
+            criadas.append(a)
+            continue
+        a['alerta'] = alerta
+        if all(getattr(alerta, campo) == a[campo] for campo in CAMPOS_ALERTA):
+            inalteradas.append(a)
+            continue
+        for campo in CAMPOS_ALERTA:
+            setattr(alerta, campo, a[campo])
+        alerta.atualizado_em = agora
+        atualizadas.append(a)
+
+    if criadas:
+        # Um pedido concorrente pode ter aberto o alerta depois da busca: o
+        # conflito no índice único é ignorado e o alerta dele é usado
+        ManutencaoAlerta.objects.bulk_create([
+            ManutencaoAlerta(
+                equipamento_id=a['equipamento_id'], gatilho_id=a['gatilho_id'],
+                **{campo: a[campo] for campo in CAMPOS_ALERTA},
+            )
+            for a in criadas
+        ], batch_size=1000, ignore_conflicts=True)
+        ids = [a['gatilho_id'] for a in criadas]
+        gravados = alertas_abertos(ids)
+        for a in criadas:
+            a['alerta'] = gravados[a['gatilho_id']]
+        GatilhoManutencao.objects.filter(id__in=ids).update(ultima_execucao=agora, atualizado_em=agora)
+    ManutencaoAlerta.objects.bulk_update(
+        [a['alerta'] for a in atualizadas], [*CAMPOS_ALERTA, 'atualizado_em'], batch_size=1000
+    )
+    return criadas, atualizadas, inalteradas
+
+
+def alertas_abertos(gatilho_ids):
+    """Alerta em aberto de cada gatilho: {gatilho_id: ManutencaoAlerta}."""
+    return {
+        alerta.gatilho_id: alerta
+        for alerta in ManutencaoAlerta.objects.filter(gatilho_id__in=gatilho_ids, resolvido=False)
+    }
+
+
+def verificar_gatilhos(gatilhos=None, hoje=None):
+    """
+    Avalia os gatilhos e sincroniza os alertas em uma transação.
+
+    Retorna {'gatilhos': total avaliado, 'criados': [...], 'atualizados': [...],
+    'inalterados': [...]} com as avaliações (ver avaliar_gatilhos) de cada grupo.
+    """
+    with transaction.atomic():
+        total, avaliacoes = avaliar_gatilhos(gatilhos, hoje)
+        criadas, atualizadas, inalteradas = sincronizar_alertas(avaliacoes)
+    return {'gatilhos': total, 'criados': criadas, 'atualizados': atualizadas, 'inalterados': inalteradas}
+
+
+def itens_por_gatilho(gatilho_ids):
+    """Itens necessários (ItemGatilhoManutencao) dos gatilhos, em uma consulta: {gatilho_id: [itens]}."""
+    itens = {}
+    for item in ItemGatilhoManutencao.objects.filter(gatilho_id__in=gatilho_ids).select_related(
+        'produto', 'produto__unidade'
+    ):
+        itens.setdefault(item.gatilho_id, []).append(item)
+    return itens
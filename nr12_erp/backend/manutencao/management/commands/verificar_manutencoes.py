@@ -7,6 +7,7 @@ Ou agendar via cron: */30 * * * * cd /path && python manage.py verificar_manuten
 
 from django.core.management.base import BaseCommand
 from django.utils import timezone
+from manutencao.alertas import itens_por_gatilho, verificar_gatilhos
 from manutencao.models_alertas import GatilhoManutencao, ManutencaoAlerta
 from equipamentos.models import Equipamento
 
@@ -41,69 +42,41 @@ class Command(BaseCommand):
             equipamentos = Equipamento.objects.filter(ativo=True)
 
         total_equipamentos = equipamentos.count()
-        total_gatilhos = 0
-        total_alertas_criados = 0
-        total_alertas_atualizados = 0
-
         self.stdout.write(f"\n📋 Verificando {total_equipamentos} equipamento(s)...\n")
 
-        for equipamento in equipamentos:
-            self.stdout.write(f"\n🔧 {equipamento.codigo} - {equipamento.descricao}")
-            self.stdout.write(f"   Leitura atual: {equipamento.leitura_atual} {equipamento.get_tipo_medicao_display()}")
-
-            gatilhos = GatilhoManutencao.objects.filter(
-                equipamento=equipamento,
-                ativo=True
-            )
-
-            if not gatilhos.exists():
-                self.stdout.write(self.style.WARNING(f"   ⚠️  Nenhum gatilho configurado"))
-                continue
-
-            for gatilho in gatilhos:
-                total_gatilhos += 1
-
-                # Calcula próxima execução se necessário
-                if not gatilho.proxima_execucao_leitura and not gatilho.proxima_execucao_data:
-                    gatilho.calcular_proxima_execucao()
-
-                # Verifica e cria alerta
-                alerta_criado = gatilho.verificar_e_criar_alerta()
-
-                if alerta_criado:
-                    if alerta_criado.criado_em >= timezone.now() - timezone.timedelta(minutes=5):
-                        total_alertas_criados += 1
-                        self.stdout.write(self.style.WARNING(
-                            f"   🚨 NOVO ALERTA: {gatilho.nome} "
-                            f"[{alerta_criado.get_prioridade_display()}]"
-                        ))
-                    else:
-                        total_alertas_atualizados += 1
-                        self.stdout.write(self.style.WARNING(
-                            f"   🔄 ATUALIZADO: {gatilho.nome} "
-                            f"[{alerta_criado.get_prioridade_display()}]"
-                        ))
-
-                    # Mostra detalhes do alerta
-                    self.stdout.write(f"      {alerta_criado.mensagem}")
-
-                    # Gera requisição de peças se aplicável
-                    itens = gatilho.gerar_requisicao_pecas()
-                    if itens:
-                        self.stdout.write(f"      📦 Itens necessários:")
-                        for item in itens:
-                            self.stdout.write(f"         - {item.produto.nome}: {item.quantidade} {item.produto.unidade}")
-                else:
-                    self.stdout.write(self.style.SUCCESS(f"   ✅ {gatilho.nome} - OK"))
+        # Todos os gatilhos em lote (manutencao/alertas.py)
+        inicio = timezone.now()
+        resultado = verificar_gatilhos(GatilhoManutencao.objects.filter(equipamento__in=equipamentos))
+        duracao = (timezone.now() - inicio).total_seconds()
+
+        alertas = resultado['criados'] + resultado['atualizados']
+        itens = itens_por_gatilho([a['gatilho_id'] for a in alertas])
+        for rotulo, grupo in (('🚨 NOVO ALERTA', resultado['criados']), ('🔄 ATUALIZADO', resultado['atualizados'])):
+            for avaliacao in grupo:
+                alerta = avaliacao['alerta']
+                self.stdout.write(self.style.WARNING(
+                    f"   {rotulo}: {avaliacao['codigo']} - {avaliacao['nome']} "
+                    f"[{alerta.get_prioridade_display()}]"
+                ))
+
+                # Mostra detalhes do alerta
+                self.stdout.write(f"      {alerta.mensagem}")
+
+                # Itens necessários (requisição de peças)
+                if itens.get(avaliacao['gatilho_id']):
+                    self.stdout.write(f"      📦 Itens necessários:")
+                    for item in itens[avaliacao['gatilho_id']]:
+                        self.stdout.write(f"         - {item.produto.nome}: {item.quantidade} {item.produto.unidade}")
 
         # Resumo final
         self.stdout.write('\n' + '='*70)
         self.stdout.write(self.style.SUCCESS('RESUMO DA VERIFICAÇÃO'))
         self.stdout.write('='*70)
         self.stdout.write(f"Equipamentos verificados: {total_equipamentos}")
-        self.stdout.write(f"Gatilhos processados: {total_gatilhos}")
-        self.stdout.write(self.style.WARNING(f"Alertas NOVOS criados: {total_alertas_criados}"))
-        self.stdout.write(self.style.WARNING(f"Alertas ATUALIZADOS: {total_alertas_atualizados}"))
+        self.stdout.write(f"Gatilhos processados: {resultado['gatilhos']} em {duracao:.2f}s")
+        self.stdout.write(self.style.WARNING(f"Alertas NOVOS criados: {len(resultado['criados'])}"))
+        self.stdout.write(self.style.WARNING(f"Alertas ATUALIZADOS: {len(resultado['atualizados'])}"))
+        self.stdout.write(f"Alertas sem alteração: {len(resultado['inalterados'])}")
 
         # Mostra alertas pendentes
         alertas_pendentes = ManutencaoAlerta.objects.filter(resolvido=False).count()
@@ -0,0 +1,100 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:59
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('almoxarifado', '0004_indices_paginacao_keyset'),
+        ('equipamentos', '0019_indices_paginacao_keyset'),
+        ('manutencao', '0003_manutencao_ordem_servico'),
+        ('nr12', '0011_indices_paginacao_keyset'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GatilhoManutencao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(help_text='Ex: Revisão 250h, Troca de óleo 500h, Inspeção mensal', max_length=150)),
+                ('descricao', models.TextField(blank=True, default='')),
+                ('tipo_gatilho', models.CharField(choices=[('HORIMETRO', 'Por Horímetro/KM'), ('CALENDARIO', 'Por Calendário (dias)'), ('AMBOS', 'Horímetro E Calendário')], max_length=10)),
+                ('intervalo_leitura', models.DecimalField(blank=True, decimal_places=2, help_text='Ex: 250 (a cada 250h ou 250km)', max_digits=12, null=True)),
+                ('antecedencia_leitura', models.DecimalField(decimal_places=2, default=Decimal('0.10'), help_text='Percentual de antecedência (0.10 = 10%)', max_digits=8)),
+                ('intervalo_dias', models.PositiveIntegerField(blank=True, help_text='Ex: 30 (a cada 30 dias)', null=True)),
+                ('antecedencia_dias', models.PositiveIntegerField(default=7, help_text='Dias de antecedência para alertar')),
+                ('ativo', models.BooleanField(default=True)),
+                ('proxima_execucao_leitura', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('proxima_execucao_data', models.DateField(blank=True, null=True)),
+                ('ultima_execucao', models.DateTimeField(blank=True, null=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('equipamento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='gatilhos_manutencao', to='equipamentos.equipamento')),
+            ],
+            options={
+                'verbose_name': 'Gatilho de Manutenção',
+                'verbose_name_plural': 'Gatilhos de Manutenção',
+                'ordering': ['equipamento', 'nome'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ItemGatilhoManutencao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantidade', models.DecimalField(decimal_places=3, default=Decimal('1.000'), max_digits=10)),
+                ('observacao', models.CharField(blank=True, default='', max_length=200)),
+                ('gatilho', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='itens', to='manutencao.gatilhomanutencao')),
+                ('produto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='almoxarifado.produto')),
+            ],
+            options={
+                'verbose_name': 'Item do Gatilho',
+                'verbose_name_plural': 'Itens do Gatilho',
+                'unique_together': {('gatilho', 'produto')},
+            },
+        ),
+        migrations.AddField(
+            model_name='gatilhomanutencao',
+            name='itens_necessarios',
+            field=models.ManyToManyField(blank=True, related_name='gatilhos_manutencao', through='manutencao.ItemGatilhoManutencao', to='almoxarifado.produto'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='gatilhomanutencao',
+            unique_together={('equipamento', 'nome')},
+        ),
+        migrations.CreateModel(
+            name='ManutencaoAlerta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('PREVENTIVA_VENCIDA', 'Manutenção Preventiva Vencida'), ('PREVENTIVA_PROXIMA', 'Manutenção Preventiva Próxima'), ('CHECKLIST_VENCIDO', 'Checklist NR12 Vencido'), ('CHECKLIST_PROXIMO', 'Checklist NR12 Próximo'), ('COMPONENTE_VIDA_UTIL', 'Componente Próximo da Vida Útil'), ('OPERADOR_RECICLAGEM', 'Operador Precisa de Reciclagem NR12')], max_length=30)),
+                ('prioridade', models.CharField(choices=[('BAIXA', 'Baixa'), ('MEDIA', 'Média'), ('ALTA', 'Alta'), ('CRITICA', 'Crítica')], default='MEDIA', max_length=10)),
+                ('titulo', models.CharField(max_length=200)),
+                ('mensagem', models.TextField()),
+                ('leitura_atual', models.DecimalField(blank=True, decimal_places=2, help_text='Horímetro/KM no momento do alerta', max_digits=12, null=True)),
+                ('leitura_limite', models.DecimalField(blank=True, decimal_places=2, help_text='Leitura limite que disparou o alerta', max_digits=12, null=True)),
+                ('data_limite', models.DateField(blank=True, help_text='Data limite que disparou o alerta', null=True)),
+                ('lido', models.BooleanField(default=False)),
+                ('data_lido', models.DateTimeField(blank=True, null=True)),
+                ('resolvido', models.BooleanField(default=False)),
+                ('data_resolucao', models.DateTimeField(blank=True, null=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('equipamento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alertas_manutencao', to='equipamentos.equipamento')),
+                ('lido_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='alertas_lidos', to=settings.AUTH_USER_MODEL)),
+                ('manutencao_realizada', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='alertas', to='manutencao.manutencao')),
+                ('plano_manutencao', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='alertas', to='equipamentos.planomanutencaoitem')),
+                ('programacao_manutencao', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='alertas', to='nr12.programacaomanutencao')),
+                ('resolvido_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='alertas_resolvidos', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Alerta de Manutenção',
+                'verbose_name_plural': 'Alertas de Manutenção',
+                'ordering': ['-prioridade', '-criado_em'],
+                'indexes': [models.Index(fields=['equipamento', 'lido', 'resolvido'], name='manutencao__equipam_3c525d_idx'), models.Index(fields=['tipo', 'prioridade'], name='manutencao__tipo_d10435_idx'), models.Index(fields=['-criado_em'], name='manutencao__criado__c0810e_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def vincular_alertas_abertos(apps, schema_editor):
+    """Liga os alertas em aberto ao gatilho pelo título; só o mais recente de cada gatilho fica em aberto."""
+    GatilhoManutencao = apps.get_model('manutencao', 'GatilhoManutencao')
+    ManutencaoAlerta = apps.get_model('manutencao', 'ManutencaoAlerta')
+    gatilhos = {
+        (equipamento_id, f"Manutenção: {nome}"): gatilho_id
+        for gatilho_id, equipamento_id, nome in GatilhoManutencao.objects.values_list('id', 'equipamento_id', 'nome')
+    }
+    vinculados = set()
+    abertos = ManutencaoAlerta.objects.filter(
+        tipo__in=['PREVENTIVA_VENCIDA', 'PREVENTIVA_PROXIMA'], resolvido=False
+    ).order_by('-criado_em', '-id')
+    for alerta_id, equipamento_id, titulo in abertos.values_list('id', 'equipamento_id', 'titulo'):
+        gatilho_id = gatilhos.get((equipamento_id, titulo))
+        if gatilho_id is None:
+            continue
+        if gatilho_id in vinculados:
+            # Duplicado antigo: fica no histórico como resolvido
+            ManutencaoAlerta.objects.filter(id=alerta_id).update(gatilho_id=gatilho_id, resolvido=True)
+        else:
+            ManutencaoAlerta.objects.filter(id=alerta_id).update(gatilho_id=gatilho_id)
+            vinculados.add(gatilho_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manutencao', '0004_alertas_gatilhos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='manutencaoalerta',
+            name='gatilho',
+            field=models.ForeignKey(blank=True, help_text='Gatilho que gerou o alerta (um alerta em aberto por gatilho)', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='alertas', to='manutencao.gatilhomanutencao'),
+        ),
+        migrations.RunPython(vincular_alertas_abertos, migrations.RunPython.noop),
+    ]
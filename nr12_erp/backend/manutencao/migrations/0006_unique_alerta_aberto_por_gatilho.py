@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Separada de 0005: no PostgreSQL o índice não pode ser criado na mesma
+    # transação em que o RunPython atualizou a FK (eventos de trigger pendentes)
+
+    dependencies = [
+        ('manutencao', '0005_alerta_gatilho'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='manutencaoalerta',
+            constraint=models.UniqueConstraint(condition=models.Q(('resolvido', False)), fields=('gatilho',), name='unique_alerta_aberto_por_gatilho'),
+        ),
+    ]
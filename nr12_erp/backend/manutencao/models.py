@@ -75,3 +75,7 @@ class AnexoManutencao(models.Model):
 
     def __str__(self):
         return self.nome_original or self.arquivo.name
+
+
+# Alertas e gatilhos de manutenção preventiva (manutencao/alertas.py)
+from .models_alertas import GatilhoManutencao, ItemGatilhoManutencao, ManutencaoAlerta  # noqa: E402,F401
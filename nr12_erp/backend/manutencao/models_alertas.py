@@ -66,6 +66,14 @@ class ManutencaoAlerta(models.Model):
     )
 
     # Relacionamentos opcionais
+    gatilho = models.ForeignKey(
+        'manutencao.GatilhoManutencao',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='alertas',
+        help_text='Gatilho que gerou o alerta (um alerta em aberto por gatilho)'
+    )
     plano_manutencao = models.ForeignKey(
         'equipamentos.PlanoManutencaoItem',
         on_delete=models.CASCADE,
@@ -121,6 +129,14 @@ class ManutencaoAlerta(models.Model):
             models.Index(fields=['tipo', 'prioridade']),
             models.Index(fields=['-criado_em']),
         ]
+        constraints = [
+            # Um alerta em aberto por gatilho: verificações simultâneas não duplicam
+            models.UniqueConstraint(
+                fields=['gatilho'],
+                condition=models.Q(resolvido=False),
+                name='unique_alerta_aberto_por_gatilho',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.equipamento.codigo} - {self.get_tipo_display()} [{self.get_prioridade_display()}]"
@@ -259,93 +275,19 @@ class GatilhoManutencao(models.Model):
     def verificar_e_criar_alerta(self):
         """
         Verifica se deve criar um alerta baseado nos gatilhos configurados
-        Retorna o alerta criado ou None
+        Retorna o alerta criado/atualizado ou None
+
+        Para vários gatilhos use manutencao.alertas.verificar_gatilhos (em lote).
         """
+        from .alertas import verificar_gatilhos
+
         if not self.ativo:
             return None
 
-        deve_alertar = False
-        mensagem_partes = []
-        prioridade = 'MEDIA'
-
-        # Verifica gatilho por horímetro/KM
-        if self.tipo_gatilho in ['HORIMETRO', 'AMBOS'] and self.proxima_execucao_leitura:
-            leitura_atual = self.equipamento.leitura_atual
-            leitura_alerta = self.proxima_execucao_leitura - (self.proxima_execucao_leitura * self.antecedencia_leitura)
-
-            if leitura_atual >= self.proxima_execucao_leitura:
-                deve_alertar = True
-                prioridade = 'ALTA'
-                mensagem_partes.append(
-                    f"VENCIDA: Leitura atual {leitura_atual} {self.equipamento.get_tipo_medicao_display()} "
-                    f"já passou da meta {self.proxima_execucao_leitura}"
-                )
-            elif leitura_atual >= leitura_alerta:
-                deve_alertar = True
-                faltam = self.proxima_execucao_leitura - leitura_atual
-                mensagem_partes.append(
-                    f"PRÓXIMA: Faltam {faltam} {self.equipamento.get_tipo_medicao_display()} "
-                    f"para atingir {self.proxima_execucao_leitura}"
-                )
-
-        # Verifica gatilho por calendário
-        if self.tipo_gatilho in ['CALENDARIO', 'AMBOS'] and self.proxima_execucao_data:
-            hoje = timezone.now().date()
-            data_alerta = self.proxima_execucao_data - timedelta(days=self.antecedencia_dias)
-
-            if hoje >= self.proxima_execucao_data:
-                deve_alertar = True
-                prioridade = 'ALTA'
-                dias_atraso = (hoje - self.proxima_execucao_data).days
-                mensagem_partes.append(
-                    f"VENCIDA: {dias_atraso} dias de atraso (venceu em {self.proxima_execucao_data.strftime('%d/%m/%Y')})"
-                )
-            elif hoje >= data_alerta:
-                deve_alertar = True
-                if prioridade != 'ALTA':
-                    prioridade = 'MEDIA'
-                faltam_dias = (self.proxima_execucao_data - hoje).days
-                mensagem_partes.append(
-                    f"PRÓXIMA: Faltam {faltam_dias} dias para a data prevista ({self.proxima_execucao_data.strftime('%d/%m/%Y')})"
-                )
-
-        if deve_alertar:
-            # Verifica se já existe alerta não resolvido para este gatilho
-            alerta_existente = ManutencaoAlerta.objects.filter(
-                equipamento=self.equipamento,
-                tipo__in=['PREVENTIVA_VENCIDA', 'PREVENTIVA_PROXIMA'],
-                resolvido=False,
-                titulo__icontains=self.nome
-            ).first()
-
-            if alerta_existente:
-                # Atualiza o alerta existente
-                alerta_existente.prioridade = prioridade
-                alerta_existente.mensagem = f"{self.nome}\n\n" + "\n".join(mensagem_partes)
-                alerta_existente.leitura_atual = self.equipamento.leitura_atual
-                alerta_existente.save()
-                return alerta_existente
-            else:
-                # Cria novo alerta
-                tipo_alerta = 'PREVENTIVA_VENCIDA' if prioridade == 'ALTA' else 'PREVENTIVA_PROXIMA'
-
-                alerta = ManutencaoAlerta.objects.create(
-                    equipamento=self.equipamento,
-                    tipo=tipo_alerta,
-                    prioridade=prioridade,
-                    titulo=f"Manutenção: {self.nome}",
-                    mensagem="\n".join(mensagem_partes),
-                    leitura_atual=self.equipamento.leitura_atual,
-                    leitura_limite=self.proxima_execucao_leitura,
-                    data_limite=self.proxima_execucao_data,
-                )
-
-                self.ultima_execucao = timezone.now()
-                self.save(update_fields=['ultima_execucao', 'atualizado_em'])
-
-                return alerta
-
-        return None
+        resultado = verificar_gatilhos(GatilhoManutencao.objects.filter(pk=self.pk))
+        avaliacoes = resultado['criados'] + resultado['atualizados'] + resultado['inalterados']
+        self.refresh_from_db(fields=['ultima_execucao', 'proxima_execucao_leitura', 'proxima_execucao_data'])
+        return avaliacoes[0]['alerta'] if avaliacoes else None
 
     def gerar_requisicao_pecas(self):
         """
@@ -0,0 +1,130 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from cadastro.models import Cliente, Empreendimento
+from equipamentos.models import Equipamento, TipoEquipamento
+
+from .alertas import verificar_gatilhos
+from .models_alertas import GatilhoManutencao, ManutencaoAlerta
+
+
+class GatilhosEmLoteTest(TestCase):
+    """Avaliação em lote dos gatilhos (manutencao/alertas.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Cliente.objects.create(nome_razao='Mineradora Teste', documento='11222333000181', qr_code='x.png')
+        cls.empreendimento = Empreendimento.objects.create(cliente=cls.cliente, nome='Lavra 1', qr_code='x.png')
+        cls.tipo = TipoEquipamento.objects.create(nome='Escavadeira')
+        cls.hoje = timezone.localdate()
+
+    def criar_equipamento(self, codigo, leitura='240'):
+        return Equipamento.objects.create(
+            cliente=self.cliente, empreendimento=self.empreendimento, tipo=self.tipo, codigo=codigo,
+            tipo_medicao='HORA', leitura_atual=Decimal(leitura), qr_code='x.png',
+        )
+
+    def criar_gatilho(self, equip, nome, **campos):
+        return GatilhoManutencao.objects.create(equipamento=equip, nome=nome, **campos)
+
+    def test_situacao_de_cada_gatilho(self):
+        equip = self.criar_equipamento('EQ-001')
+        proxima = self.criar_gatilho(equip, 'Revisão 250h', tipo_gatilho='HORIMETRO',
+                                     intervalo_leitura=250, proxima_execucao_leitura=250)
+        vencida = self.criar_gatilho(equip, 'Revisão 2500h', tipo_gatilho='HORIMETRO',
+                                     intervalo_leitura=2500, proxima_execucao_leitura=200)
+        self.criar_gatilho(equip, 'Inspeção mensal', tipo_gatilho='CALENDARIO', intervalo_dias=30,
+                           proxima_execucao_data=self.hoje + timedelta(days=20))
+        atrasada = self.criar_gatilho(equip, 'Inspeção semanal', tipo_gatilho='CALENDARIO', intervalo_dias=7,
+                                      proxima_execucao_data=self.hoje - timedelta(days=2))
+        self.criar_gatilho(equip, 'Inativo', tipo_gatilho='HORIMETRO', ativo=False, proxima_execucao_leitura=1)
+
+        resultado = verificar_gatilhos()
+
+        self.assertEqual(resultado['gatilhos'], 4)
+        self.assertEqual(len(resultado['criados']), 3)
+        alertas = {a.titulo: a for a in ManutencaoAlerta.objects.all()}
+        self.assertEqual(set(alertas), {
+            'Manutenção: Revisão 250h', 'Manutenção: Revisão 2500h', 'Manutenção: Inspeção semanal',
+        })
+        self.assertEqual(alertas['Manutenção: Revisão 250h'].tipo, 'PREVENTIVA_PROXIMA')
+        self.assertEqual(alertas['Manutenção: Revisão 250h'].prioridade, 'MEDIA')
+        self.assertEqual(alertas['Manutenção: Revisão 2500h'].tipo, 'PREVENTIVA_VENCIDA')
+        self.assertIn('2 dias de atraso', alertas['Manutenção: Inspeção semanal'].mensagem)
+        for gatilho in (proxima, vencida, atrasada):
+            gatilho.refresh_from_db()
+            self.assertIsNotNone(gatilho.ultima_execucao)
+
+        # Nova execução sem mudança: nada criado nem regravado
+        resultado = verificar_gatilhos()
+        self.assertEqual((len(resultado['criados']), len(resultado['atualizados'])), (0, 0))
+        self.assertEqual(len(resultado['inalterados']), 3)
+
+        # Leitura passou da meta: o mesmo alerta vira VENCIDA (e os demais do equipamento
+        # recebem a leitura nova)
+        Equipamento.objects.filter(pk=equip.pk).update(leitura_atual=Decimal('260'))
+        resultado = verificar_gatilhos()
+        self.assertEqual(len(resultado['criados']), 0)
+        self.assertIn('Revisão 250h', [a['nome'] for a in resultado['atualizados']])
+        alerta = ManutencaoAlerta.objects.get(titulo='Manutenção: Revisão 250h')
+        self.assertEqual((alerta.tipo, alerta.prioridade), ('PREVENTIVA_VENCIDA', 'ALTA'))
+        self.assertEqual(ManutencaoAlerta.objects.count(), 3)
+
+        # Resolvido: a próxima verificação abre outro alerta
+        alerta.resolvido = True
+        alerta.save()
+        self.assertEqual(len(verificar_gatilhos()['criados']), 1)
+
+    def test_um_alerta_em_aberto_por_gatilho(self):
+        equip = self.criar_equipamento('EQ-001')
+        gatilho = self.criar_gatilho(equip, 'Revisão 250h', tipo_gatilho='HORIMETRO', proxima_execucao_leitura=200)
+        # Aberto por outra verificação, com título antigo: é o alerta do gatilho
+        existente = ManutencaoAlerta.objects.create(
+            equipamento=equip, gatilho=gatilho, tipo='PREVENTIVA_PROXIMA', titulo='Revisão', mensagem='',
+        )
+
+        resultado = verificar_gatilhos()
+
+        self.assertEqual([a['alerta'].pk for a in resultado['atualizados']], [existente.pk])
+        existente.refresh_from_db()
+        self.assertEqual((existente.titulo, existente.tipo), ('Manutenção: Revisão 250h', 'PREVENTIVA_VENCIDA'))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ManutencaoAlerta.objects.create(
+                equipamento=equip, gatilho=gatilho, tipo='PREVENTIVA_VENCIDA', titulo='x', mensagem='',
+            )
+        existente.resolver(usuario=None)
+        self.assertEqual(len(verificar_gatilhos()['criados']), 1)
+
+    def test_calcula_proxima_execucao_pendente(self):
+        equip = self.criar_equipamento('EQ-001', leitura='900')
+        Equipamento.objects.filter(pk=equip.pk).update(leitura_ultima_manutencao=Decimal('700'))
+        gatilho = self.criar_gatilho(equip, 'Revisão 250h', tipo_gatilho='AMBOS',
+                                     intervalo_leitura=250, intervalo_dias=30)
+
+        alerta = gatilho.verificar_e_criar_alerta()
+
+        self.assertEqual(gatilho.proxima_execucao_leitura, Decimal('950'))
+        self.assertEqual(gatilho.proxima_execucao_data, self.hoje + timedelta(days=30))
+        self.assertEqual(alerta.tipo, 'PREVENTIVA_PROXIMA')
+        self.assertEqual(alerta.leitura_limite, Decimal('950'))
+
+    def test_consultas_nao_crescem_com_os_gatilhos(self):
+        def consultas():
+            with CaptureQueriesContext(connection) as ctx:
+                verificar_gatilhos()
+            return len(ctx.captured_queries)
+
+        equip = self.criar_equipamento('EQ-001', leitura='1000')
+        self.criar_gatilho(equip, 'G0', tipo_gatilho='HORIMETRO', proxima_execucao_leitura=500)
+        poucos = consultas()
+
+        for i in range(2, 12):
+            outro = self.criar_equipamento(f'EQ-{i:03d}', leitura='1000')
+            self.criar_gatilho(outro, f'G{i}', tipo_gatilho='HORIMETRO', proxima_execucao_leitura=500)
+        ManutencaoAlerta.objects.all().delete()
+        self.assertEqual(consultas(), poucos)
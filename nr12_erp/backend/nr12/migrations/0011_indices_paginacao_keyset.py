@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nr12', '0010_programacaomanutencao_itens_manutencao'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='checklistrealizado',
+            index=models.Index(fields=['data_hora_inicio', 'id'], name='nr12_checkl_data_ho_250f90_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='checklistrealizado',
+            index=models.Index(fields=['equipamento', 'data_hora_inicio', 'id'], name='nr12_checkl_equipam_016f65_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='respostaitemchecklist',
+            index=models.Index(fields=['data_hora_resposta', 'id'], name='nr12_respos_data_ho_a11265_idx'),
+        ),
+    ]
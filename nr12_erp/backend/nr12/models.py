@@ -235,21 +235,22 @@ class ChecklistRealizado(models.Model):
     class Meta:
         ordering = ['-data_hora_inicio']
         verbose_name = 'Checklist Realizado'
+        # Paginação keyset: (data_hora_inicio, id), geral e por equipamento
+        indexes = [
+            models.Index(fields=['data_hora_inicio', 'id']),
+            models.Index(fields=['equipamento', 'data_hora_inicio', 'id']),
+        ]
         verbose_name_plural = 'Checklists Realizados'
 
     def __str__(self):
         return f"{self.equipamento.codigo} - {self.data_hora_inicio.strftime('%d/%m/%Y %H:%M')}"
 
-    def calcular_resultado(self):
-        """Calcula o resultado geral baseado nas respostas"""
-        respostas = self.respostas.all()
-        total = respostas.count()
-        
+    @staticmethod
+    def resultado_por_contagem(total, nao_conformes):
+        """Resultado geral a partir do total de respostas e de não conformes"""
         if total == 0:
             return None
-        
-        nao_conformes = respostas.filter(resposta='NAO_CONFORME').count()
-        
+
         if nao_conformes == 0:
             return 'APROVADO'
         elif nao_conformes <= (total * 0.2):  # Até 20% de não conformidade
@@ -257,13 +258,32 @@ class ChecklistRealizado(models.Model):
         else:
             return 'REPROVADO'
 
-    def finalizar(self):
+    def calcular_resultado(self, contagem=None):
+        """
+        Calcula o resultado geral baseado nas respostas.
+
+        contagem: {resposta: quantidade} já conhecida (ex.: respostas do bot
+        acumuladas na conversa); sem ela, as respostas são contadas no banco.
+        """
+        if contagem is not None:
+            return self.resultado_por_contagem(sum(contagem.values()), contagem.get('NAO_CONFORME', 0))
+
+        respostas = self.respostas.all()
+        total = respostas.count()
+        
+        if total == 0:
+            return None
+        
+        nao_conformes = respostas.filter(resposta='NAO_CONFORME').count()
+        return self.resultado_por_contagem(total, nao_conformes)
+
+    def finalizar(self, contagem=None):
         """Finaliza o checklist e calcula resultado"""
         from django.utils import timezone
         
         self.data_hora_fim = timezone.now()
         self.status = 'CONCLUIDO'
-        self.resultado_geral = self.calcular_resultado()
+        self.resultado_geral = self.calcular_resultado(contagem)
         self.save()
 
         # Atualizar leitura do equipamento se informada
@@ -333,6 +353,9 @@ class RespostaItemChecklist(models.Model):
         verbose_name = 'Resposta de Item'
         verbose_name_plural = 'Respostas de Itens'
         unique_together = ['checklist', 'item']
+        indexes = [
+            models.Index(fields=['data_hora_resposta', 'id']),  # paginação keyset
+        ]
 
     def __str__(self):
         return f"{self.checklist.id} - {self.item.pergunta}: {self.resposta}"
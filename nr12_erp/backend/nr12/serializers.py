@@ -12,6 +12,15 @@ from .models import (
 )
 
 
+def contagem_anotada(obj, nome, contar):
+    """
+    Contagem anotada no queryset pelo viewset (ex.: total_respostas);
+    sem a anotação (objeto carregado de outra forma), consulta o banco.
+    """
+    valor = getattr(obj, nome, None)
+    return contar() if valor is None else valor
+
+
 class ItemChecklistSerializer(serializers.ModelSerializer):
     class Meta:
         model = ItemChecklist
@@ -37,7 +46,7 @@ class ModeloChecklistSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
     def get_total_itens(self, obj):
-        return obj.itens.filter(ativo=True).count()
+        return contagem_anotada(obj, 'total_itens', lambda: obj.itens.filter(ativo=True).count())
 
 
 class ModeloChecklistDetailSerializer(serializers.ModelSerializer):
@@ -96,10 +105,12 @@ class ChecklistRealizadoSerializer(serializers.ModelSerializer):
         return obj.operador_nome or 'Não informado'
 
     def get_total_respostas(self, obj):
-        return obj.respostas.count()
+        return contagem_anotada(obj, 'total_respostas', obj.respostas.count)
 
     def get_total_nao_conformidades(self, obj):
-        return obj.respostas.filter(resposta__in=['NAO_CONFORME', 'NAO']).count()
+        return contagem_anotada(
+            obj, 'total_nao_conformidades', lambda: obj.respostas.filter(resposta__in=['NAO_CONFORME', 'NAO']).count()
+        )
 
 
 class ChecklistRealizadoDetailSerializer(serializers.ModelSerializer):
@@ -123,10 +134,12 @@ class ChecklistRealizadoDetailSerializer(serializers.ModelSerializer):
         return obj.operador_nome or 'Não informado'
 
     def get_total_respostas(self, obj):
-        return obj.respostas.count()
+        return contagem_anotada(obj, 'total_respostas', obj.respostas.count)
 
     def get_total_nao_conformidades(self, obj):
-        return obj.respostas.filter(resposta__in=['NAO_CONFORME', 'NAO']).count()
+        return contagem_anotada(
+            obj, 'total_nao_conformidades', lambda: obj.respostas.filter(resposta__in=['NAO_CONFORME', 'NAO']).count()
+        )
 
 
 class RespostaItemChecklistCreateSerializer(serializers.Serializer):
@@ -283,7 +296,7 @@ class BotModeloChecklistSerializer(serializers.ModelSerializer):
         fields = ['id', 'nome', 'tipo_equipamento_nome', 'total_itens']
 
     def get_total_itens(self, obj):
-        return obj.itens.filter(ativo=True).count()
+        return contagem_anotada(obj, 'total_itens', lambda: obj.itens.filter(ativo=True).count())
 
 
 class BotItemChecklistSerializer(serializers.ModelSerializer):
@@ -459,7 +472,7 @@ class ModeloManutencaoPreventivaSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
     def get_total_itens(self, obj):
-        return obj.itens.filter(ativo=True).count()
+        return contagem_anotada(obj, 'total_itens', lambda: obj.itens.filter(ativo=True).count())
 
 
 class ModeloManutencaoPreventivaDetailSerializer(serializers.ModelSerializer):
@@ -574,10 +587,12 @@ class ManutencaoPreventivaRealizadaSerializer(serializers.ModelSerializer):
         return obj.tecnico_nome or 'Não informado'
 
     def get_total_respostas(self, obj):
-        return obj.respostas.count()
+        return contagem_anotada(obj, 'total_respostas', obj.respostas.count)
 
     def get_total_nao_conformidades(self, obj):
-        return obj.respostas.filter(resposta__in=['NAO_EXECUTADO', 'NAO_CONFORME']).count()
+        return contagem_anotada(
+            obj, 'total_nao_conformidades', lambda: obj.respostas.filter(resposta__in=['NAO_EXECUTADO', 'NAO_CONFORME']).count()
+        )
 
 
 class ManutencaoPreventivaRealizadaDetailSerializer(serializers.ModelSerializer):
@@ -606,10 +621,12 @@ class ManutencaoPreventivaRealizadaDetailSerializer(serializers.ModelSerializer)
         return obj.tecnico_nome or 'Não informado'
 
     def get_total_respostas(self, obj):
-        return obj.respostas.count()
+        return contagem_anotada(obj, 'total_respostas', obj.respostas.count)
 
     def get_total_nao_conformidades(self, obj):
-        return obj.respostas.filter(resposta__in=['NAO_EXECUTADO', 'NAO_CONFORME']).count()
+        return contagem_anotada(
+            obj, 'total_nao_conformidades', lambda: obj.respostas.filter(resposta__in=['NAO_EXECUTADO', 'NAO_CONFORME']).count()
+        )
 
 
 class RespostaItemManutencaoCreateSerializer(serializers.Serializer):
@@ -682,7 +699,7 @@ class BotModeloManutencaoPreventivaSerializer(serializers.ModelSerializer):
         fields = ['id', 'nome', 'tipo_equipamento_nome', 'tipo_medicao', 'tipo_medicao_display', 'intervalo', 'total_itens']
 
     def get_total_itens(self, obj):
-        return obj.itens.filter(ativo=True).count()
+        return contagem_anotada(obj, 'total_itens', lambda: obj.itens.filter(ativo=True).count())
 
 
 class BotItemManutencaoPreventivaSerializer(serializers.ModelSerializer):
@@ -1,3 +1,98 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from cadastro.models import Cliente, Empreendimento
+from equipamentos.models import Equipamento, TipoEquipamento
+
+from .models import ChecklistRealizado, ItemChecklist, ModeloChecklist, RespostaItemChecklist
+from .serializers import ChecklistRealizadoSerializer
+
+
+class ListagemContagensTest(TestCase):
+    """Contagens das listagens vêm anotadas: nº de queries não depende do nº de linhas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin_nr12', 'admin@example.com', 'senha-forte-123')
+        cliente = Cliente.objects.create(nome_razao='Mineradora Teste', documento='11222333000181', qr_code='x.png')
+        empreendimento = Empreendimento.objects.create(cliente=cliente, nome='Lavra 1', qr_code='x.png')
+        cls.tipo = TipoEquipamento.objects.create(nome='Escavadeira')
+        cls.equipamento = Equipamento.objects.create(
+            cliente=cliente, empreendimento=empreendimento, tipo=cls.tipo, codigo='EQ-001',
+            leitura_atual=Decimal('100'), qr_code='x.png',
+        )
+        cls.modelo = ModeloChecklist.objects.create(tipo_equipamento=cls.tipo, nome='Diário')
+        cls.itens = [ItemChecklist.objects.create(modelo=cls.modelo, ordem=i, pergunta=f'Item {i}') for i in range(3)]
+        ItemChecklist.objects.create(modelo=cls.modelo, ordem=9, pergunta='Inativo', ativo=False)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def criar_checklists(self, quantidade):
+        for _ in range(quantidade):
+            checklist = ChecklistRealizado.objects.create(modelo=self.modelo, equipamento=self.equipamento)
+            RespostaItemChecklist.objects.bulk_create([
+                RespostaItemChecklist(checklist=checklist, item=item, resposta=resposta)
+                for item, resposta in zip(self.itens, ['CONFORME', 'NAO_CONFORME', 'NAO'])
+            ])
+
+    def contar_queries(self, url):
+        with CaptureQueriesContext(connection) as contexto:
+            resposta = self.client.get(url)
+        self.assertEqual(resposta.status_code, 200)
+        return len(contexto), resposta.json()
+
+    def test_checklists_numero_fixo_de_queries(self):
+        url = '/api/v1/nr12/checklists/'
+        self.criar_checklists(5)
+        queries_5, dados = self.contar_queries(url)
+        self.criar_checklists(45)
+        queries_50, dados = self.contar_queries(url)
+
+        self.assertEqual(queries_5, queries_50)
+        self.assertLessEqual(queries_50, 6)
+        self.assertEqual(len(dados['results']), 50)
+        self.assertEqual({(c['total_respostas'], c['total_nao_conformidades']) for c in dados['results']}, {(3, 2)})
+
+        detalhe = self.client.get(f"{url}{dados['results'][0]['id']}/").json()
+        self.assertEqual((detalhe['total_respostas'], len(detalhe['respostas'])), (3, 3))
+
+    def test_modelos_total_itens_anotado(self):
+        for i in range(10):
+            ModeloChecklist.objects.create(tipo_equipamento=self.tipo, nome=f'Modelo {i}')
+        queries, dados = self.contar_queries('/api/v1/nr12/modelos-checklist/')
+
+        self.assertLessEqual(queries, 6)
+        totais = {m['nome']: m['total_itens'] for m in dados['results']}
+        self.assertEqual(totais['Diário'], 3)
+        self.assertEqual(totais['Modelo 0'], 0)
+
+    def test_serializer_sem_anotacao_consulta_o_banco(self):
+        self.criar_checklists(1)
+        dados = ChecklistRealizadoSerializer(ChecklistRealizado.objects.get()).data
+        self.assertEqual((dados['total_respostas'], dados['total_nao_conformidades']), (3, 2))
+
+    def test_exportar_checklists_com_respostas(self):
+        self.criar_checklists(2)
+        ChecklistRealizado.objects.create(modelo=self.modelo, equipamento=self.equipamento)
+
+        resposta = self.client.get('/api/v1/nr12/checklists/exportar/')
+        self.assertEqual(resposta.status_code, 200)
+        linhas = b''.join(resposta.streaming_content).decode('utf-8').splitlines()[1:]
+
+        # 2 checklists x 3 respostas + 1 checklist sem respostas, na ordem dos itens
+        self.assertEqual(len(linhas), 7)
+        self.assertEqual([linha.split(';')[-5] for linha in linhas[1:4]], ['Item 0', 'Item 1', 'Item 2'])
+
+        # Em blocos de 2 checklists: mesmas linhas, respostas de um checklist nunca divididas
+        with override_settings(EXPORTACAO_CHUNK_SIZE=2), CaptureQueriesContext(connection) as contexto:
+            em_blocos = b''.join(self.client.get('/api/v1/nr12/checklists/exportar/').streaming_content)
+        self.assertEqual(em_blocos.decode('utf-8').splitlines()[1:], linhas)
+        consultas = [q['sql'] for q in contexto.captured_queries if 'LIMIT 2' in q['sql']]
+        self.assertEqual(len(consultas), 2)
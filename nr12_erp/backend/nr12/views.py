@@ -8,6 +8,8 @@ from django.db.models import Count, Q
 from django.utils import timezone
 from datetime import timedelta
 from core.permissions import HasModuleAccess, OperadorCanOnlyCreate, CanManageNR12Models, filter_by_role
+from core.cache import cache_resposta
+from core.exportacao import exportar_queryset
 
 from .models import (
     ModeloChecklist, ItemChecklist,
@@ -47,6 +49,46 @@ class BaseAuthViewSet(viewsets.ModelViewSet):
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
 
 
+# Contagens exibidas nas listagens (total_respostas, total_itens...), anotadas
+# no queryset em vez de um COUNT por linha no serializer. distinct=True: os
+# filtros por role podem adicionar joins que multiplicam as linhas.
+def anotar_totais_respostas(qs, respostas_nao_conformes):
+    return qs.annotate(
+        total_respostas=Count('respostas', distinct=True),
+        total_nao_conformidades=Count(
+            'respostas', filter=Q(respostas__resposta__in=respostas_nao_conformes), distinct=True
+        ),
+    )
+
+
+def anotar_total_itens(qs):
+    return qs.annotate(total_itens=Count('itens', filter=Q(itens__ativo=True), distinct=True))
+
+
+# Exportação de checklists: uma linha por resposta (checklist sem respostas sai em uma linha só)
+COLUNAS_EXPORTACAO_CHECKLIST = [
+    ('Checklist', 'id'),
+    ('Início', 'data_hora_inicio'),
+    ('Fim', 'data_hora_fim'),
+    ('Equipamento', 'equipamento__codigo'),
+    ('Cliente', 'equipamento__cliente__nome_razao'),
+    ('Empreendimento', 'equipamento__empreendimento__nome'),
+    ('Modelo', 'modelo__nome'),
+    ('Operador', 'operador__nome_completo'),
+    ('Operador (sem cadastro)', 'operador_nome'),
+    ('Origem', 'origem'),
+    ('Leitura', 'leitura_equipamento'),
+    ('Status', 'status'),
+    ('Resultado', 'resultado_geral'),
+    ('Ordem', 'respostas__item__ordem'),
+    ('Item', 'respostas__item__pergunta'),
+    ('Resposta', 'respostas__resposta'),
+    ('Valor numérico', 'respostas__valor_numerico'),
+    ('Valor texto', 'respostas__valor_texto'),
+    ('Observação', 'respostas__observacao'),
+]
+
+
 # ============================================
 # VIEWSETS PARA INTERFACE WEB
 # ============================================
@@ -112,6 +154,9 @@ class ModeloChecklistViewSet(BaseAuthViewSet):
         if ativo is not None:
             qs = qs.filter(ativo=ativo.lower() == 'true')
 
+        if self.action == 'list':
+            qs = anotar_total_itens(qs)
+
         return qs
 
     def perform_create(self, serializer):
@@ -232,12 +277,13 @@ class ChecklistRealizadoViewSet(BaseAuthViewSet):
     """
     queryset = ChecklistRealizado.objects.select_related(
         'modelo', 'equipamento__cliente', 'equipamento__empreendimento', 'operador', 'usuario'
-    ).prefetch_related('respostas').all()
+    ).all()
     serializer_class = ChecklistRealizadoSerializer
     permission_classes = [IsAuthenticated, HasModuleAccess, OperadorCanOnlyCreate]
     required_module = 'nr12'
     search_fields = ['equipamento__codigo', 'modelo__nome', 'operador__nome_completo']
     ordering = ['-data_hora_inicio']
+    paginacao_keyset = 'data_hora_inicio'  # ?paginacao=keyset (core/pagination.py)
 
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -314,6 +360,11 @@ class ChecklistRealizadoViewSet(BaseAuthViewSet):
         if data_fim:
             qs = qs.filter(data_hora_inicio__lte=data_fim)
 
+        if self.action in ('list', 'retrieve'):
+            qs = anotar_totais_respostas(qs, ['NAO_CONFORME', 'NAO'])
+        if self.action == 'retrieve':
+            qs = qs.prefetch_related('respostas__item')
+
         return qs
 
     def perform_create(self, serializer):
@@ -356,6 +407,23 @@ class ChecklistRealizadoViewSet(BaseAuthViewSet):
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
+    def exportar(self, request):
+        """
+        Exporta os checklists filtrados, com as respostas, em CSV/XLSX (streaming).
+
+        Query params: os mesmos da listagem (equipamento, modelo, status,
+        resultado, data_inicio, data_fim...) e formato=csv|xlsx (padrão csv).
+        """
+        # pk__in: os joins dos filtros por role não multiplicam as linhas do join com respostas
+        ids = self.filter_queryset(self.get_queryset()).order_by().values('pk')
+        qs = ChecklistRealizado.objects.filter(pk__in=ids)
+        # Blocos por checklist: todas as respostas de um checklist saem na mesma consulta
+        return exportar_queryset(
+            request, qs, COLUNAS_EXPORTACAO_CHECKLIST, 'checklists', ordem_linhas=['respostas__item__ordem']
+        )
+
+    @action(detail=False, methods=['get'])
+    @cache_resposta('nr12-checklists-estatisticas')
     def estatisticas(self, request):
         """Retorna estatísticas gerais de checklists"""
         # Período (últimos 30 dias por padrão)
@@ -402,6 +470,7 @@ class RespostaItemChecklistViewSet(BaseAuthViewSet):
     serializer_class = RespostaItemChecklistSerializer
     search_fields = ['item__pergunta', 'observacao']
     ordering = ['-data_hora_resposta']
+    paginacao_keyset = 'data_hora_resposta'  # ?paginacao=keyset (core/pagination.py)
 
     def get_queryset(self):
         qs = filter_by_role(super().get_queryset(), self.request.user)
@@ -462,7 +531,7 @@ class BotChecklistViewSet(viewsets.ViewSet):
         """Lista modelos de checklist disponíveis"""
         tipo_eq = request.query_params.get('tipo_equipamento')
         
-        qs = ModeloChecklist.objects.filter(ativo=True)
+        qs = anotar_total_itens(ModeloChecklist.objects.filter(ativo=True).select_related('tipo_equipamento'))
         if tipo_eq:
             qs = qs.filter(tipo_equipamento_id=tipo_eq)
         
@@ -594,6 +663,9 @@ class ModeloManutencaoPreventivaViewSet(BaseAuthViewSet):
         if ativo is not None:
             qs = qs.filter(ativo=ativo.lower() == 'true')
 
+        if self.action == 'list':
+            qs = anotar_total_itens(qs)
+
         return qs
 
     @action(detail=True, methods=['post'])
@@ -770,6 +842,7 @@ class ProgramacaoManutencaoViewSet(BaseAuthViewSet):
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
+    @cache_resposta('nr12-programacoes-dashboard')
     def dashboard(self, request):
         """Dashboard de programações"""
         qs = self.get_queryset().filter(ativo=True)
@@ -799,7 +872,7 @@ class ProgramacaoManutencaoViewSet(BaseAuthViewSet):
 class ManutencaoPreventivaRealizadaViewSet(BaseAuthViewSet):
     queryset = ManutencaoPreventivaRealizada.objects.select_related(
         'programacao', 'equipamento', 'modelo', 'tecnico', 'usuario'
-    ).prefetch_related('respostas').all()
+    ).all()
     serializer_class = ManutencaoPreventivaRealizadaSerializer
     search_fields = ['equipamento__codigo', 'modelo__nome', 'tecnico__nome']
     ordering = ['-data_hora_inicio']
@@ -843,6 +916,11 @@ class ManutencaoPreventivaRealizadaViewSet(BaseAuthViewSet):
         if data_fim:
             qs = qs.filter(data_hora_inicio__lte=data_fim)
 
+        if self.action in ('list', 'retrieve'):
+            qs = anotar_totais_respostas(qs, ['NAO_EXECUTADO', 'NAO_CONFORME'])
+        if self.action == 'retrieve':
+            qs = qs.prefetch_related('respostas__item')
+
         return qs
 
     def perform_create(self, serializer):
@@ -1,7 +1,9 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from decimal import Decimal
 
+from core.numeracao import numerar
+
 
 class Orcamento(models.Model):
     TIPO_CHOICES = [
@@ -90,15 +92,13 @@ class Orcamento(models.Model):
         return f"{self.numero} - {self.cliente.nome_razao}"
 
     def save(self, *args, **kwargs):
-        if not self.numero:
-            # Gerar número do orçamento
-            ultimo = Orcamento.objects.order_by('-id').first()
-            proximo_numero = 1 if not ultimo else ultimo.id + 1
-            self.numero = f"ORC-{proximo_numero:06d}"
-
         # Calcular total
         self.calcular_total()
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            if not self.numero:
+                # Gerar número do orçamento (core/numeracao.py: sem repetição nem buracos)
+                numerar([self], 'ORC')
+            super().save(*args, **kwargs)
 
     def calcular_total(self):
         """Calcula o valor total do orçamento"""
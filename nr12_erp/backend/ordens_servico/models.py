@@ -1,7 +1,9 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from decimal import Decimal
 
+from core.numeracao import numerar
+
 
 class OrdemServico(models.Model):
     STATUS_CHOICES = [
@@ -90,12 +92,6 @@ class OrdemServico(models.Model):
         return f"{self.numero} - {self.cliente.nome_razao}"
 
     def save(self, *args, **kwargs):
-        if not self.numero:
-            # Gerar número da OS
-            ultimo = OrdemServico.objects.order_by('-id').first()
-            proximo_numero = 1 if not ultimo else ultimo.id + 1
-            self.numero = f"OS-{proximo_numero:06d}"
-
         # Recalcular valor_total baseado nos componentes
         self.valor_total = (
             self.valor_servicos +
@@ -107,7 +103,11 @@ class OrdemServico(models.Model):
         # Calcular valor final (total + adicional)
         self.valor_final = self.valor_total + self.valor_adicional
 
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            if not self.numero:
+                # Gerar número da OS (core/numeracao.py: sem repetição nem buracos)
+                numerar([self], 'OS')
+            super().save(*args, **kwargs)
 
 
 class ItemOrdemServico(models.Model):
@@ -3,6 +3,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.permissions import IsAuthenticated
+from core.exportacao import exportar_queryset, filtrar_periodo
 from core.permissions import filter_by_role
 
 from .models import OrdemServico, ItemOrdemServico
@@ -14,6 +15,29 @@ from .serializers import (
     ItemOrdemServicoSerializer,
 )
 
+COLUNAS_EXPORTACAO = [
+    ('Número', 'numero'),
+    ('Status', 'status'),
+    ('Abertura', 'data_abertura'),
+    ('Prevista', 'data_prevista'),
+    ('Início', 'data_inicio'),
+    ('Conclusão', 'data_conclusao'),
+    ('Cliente', 'cliente__nome_razao'),
+    ('Empreendimento', 'empreendimento__nome'),
+    ('Equipamento', 'equipamento__codigo'),
+    ('Orçamento', 'orcamento__numero'),
+    ('Técnico', 'tecnico_responsavel__nome'),
+    ('Horímetro inicial', 'horimetro_inicial'),
+    ('Horímetro final', 'horimetro_final'),
+    ('Serviços', 'valor_servicos'),
+    ('Produtos', 'valor_produtos'),
+    ('Deslocamento', 'valor_deslocamento'),
+    ('Desconto', 'valor_desconto'),
+    ('Adicional', 'valor_adicional'),
+    ('Valor final', 'valor_final'),
+    ('Descrição', 'descricao'),
+]
+
 
 class OrdemServicoViewSet(viewsets.ModelViewSet):
     queryset = OrdemServico.objects.all().select_related(
@@ -38,6 +62,17 @@ class OrdemServicoViewSet(viewsets.ModelViewSet):
             return OrdemServicoUpdateSerializer
         return OrdemServicoDetailSerializer
 
+    @action(detail=False, methods=['get'])
+    def exportar(self, request):
+        """
+        Exporta as OS filtradas em CSV/XLSX (streaming).
+
+        Query params: os mesmos da listagem, data_inicio/data_fim (YYYY-MM-DD,
+        pela data de abertura) e formato=csv|xlsx (padrão csv).
+        """
+        qs = filtrar_periodo(self.filter_queryset(self.get_queryset()), request, 'data_abertura')
+        return exportar_queryset(request, qs, COLUNAS_EXPORTACAO, 'ordens_servico')
+
     @action(detail=True, methods=['post'])
     def iniciar(self, request, pk=None):
         """Iniciar execução da OS"""
@@ -1,3 +1,18 @@
 from django.contrib import admin
+from .models import MetricaDiariaEquipamento, RelatorioJob
 
-# Register your models here.
+
+@admin.register(MetricaDiariaEquipamento)
+class MetricaDiariaEquipamentoAdmin(admin.ModelAdmin):
+    list_display = ("equipamento", "data", "litros", "valor_combustivel", "horas_manutencao", "custo_os", "atualizado_em")
+    search_fields = ("equipamento__codigo",)
+    list_filter = ("data",)
+    raw_id_fields = ("equipamento",)
+
+
+@admin.register(RelatorioJob)
+class RelatorioJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "tipo", "status", "escopo", "usuario", "criado_em", "concluido_em", "expira_em")
+    list_filter = ("tipo", "status")
+    readonly_fields = ("chave", "criado_em", "iniciado_em", "concluido_em")
+    raw_id_fields = ("usuario",)
@@ -0,0 +1,630 @@
+"""
+Motor de métricas da frota (set-based).
+
+Calcula DF%, consumo, utilização, CPH e alertas para toda a frota em um
+número fixo de queries agrupadas por equipamento, independente do tamanho
+da frota. Cada fonte (OrdemServico, Abastecimento, MedicaoEquipamento,
+PlanoManutencaoItem, Manutencao) é lida uma única vez.
+
+MetricasFrotaConsolidada lê as mesmas fontes da consolidação diária
+(relatorios.models.MetricaDiariaEquipamento), de modo que o custo de um
+relatório não depende do tamanho do período.
+
+Uso:
+    frota = MetricasFrotaConsolidada(equipamentos, data_inicio, data_fim)
+    frota.disponibilidade()
+    frota.consumo()
+    frota.cph()
+    frota.indicadores_por_equipamento()  # exportação CSV/XLSX
+"""
+from decimal import Decimal
+from functools import cached_property
+
+from django.db.models import (
+    Count, DurationField, Exists, ExpressionWrapper, F, Max, Min, OuterRef, Q, Sum, Window,
+)
+from django.db.models.functions import Coalesce, FirstValue, RowNumber
+
+from equipamentos.models import PlanoManutencaoItem, MedicaoEquipamento
+from manutencao.models import Manutencao
+from abastecimentos.models import Abastecimento
+from ordens_servico.models import OrdemServico
+
+from .models import MetricaDiariaEquipamento
+
+ZERO = Decimal('0')
+
+PRIORIDADE_ORDEM = {'CRITICO': 0, 'URGENTE': 1, 'ATENCAO': 2}
+
+
+def _por_equipamento(queryset, **janelas):
+    """
+    Reduz um queryset a uma linha por equipamento usando funções de janela.
+
+    As janelas recebidas são particionadas por equipamento_id; a linha
+    mantida é a primeira de cada partição (ROW_NUMBER() = 1).
+    """
+    particao = [F('equipamento_id')]
+    anotacoes = {
+        nome: Window(expressao, partition_by=particao, order_by=ordem)
+        for nome, (expressao, ordem) in janelas.items()
+    }
+    return {
+        row['equipamento_id']: row
+        for row in queryset.annotate(
+            _linha=Window(RowNumber(), partition_by=particao, order_by=F('id').asc()),
+            **anotacoes
+        ).filter(_linha=1).values('equipamento_id', *janelas.keys())
+    }
+
+
+class MetricasFrota:
+    """
+    Agregados de uma frota em um período.
+
+    Os dados de cada fonte são carregados sob demanda (uma query por fonte)
+    e reaproveitados por todas as métricas da mesma instância.
+    """
+
+    def __init__(self, equipamentos, data_inicio=None, data_fim=None):
+        self.queryset = equipamentos
+        self.data_inicio = data_inicio
+        self.data_fim = data_fim
+
+    # ------------------------------------------------------------------
+    # Carga (uma query por fonte)
+    # ------------------------------------------------------------------
+
+    @cached_property
+    def equipamentos(self):
+        """Linhas dos equipamentos, na ordenação padrão (codigo)."""
+        return list(self.queryset.values(
+            'id', 'codigo', 'descricao', 'modelo', 'tipo_medicao', 'leitura_atual', 'tipo__nome'
+        ))
+
+    @cached_property
+    def ids_em_atividade(self):
+        """Equipamentos com abastecimento, manutenção, medição ou OS no período."""
+        di, df = self.data_inicio, self.data_fim
+        eq = OuterRef('pk')
+        rows = self.queryset.annotate(
+            _abast=Exists(Abastecimento.objects.filter(equipamento=eq, data__gte=di, data__lte=df)),
+            _manut=Exists(Manutencao.objects.filter(equipamento=eq, data__gte=di, data__lte=df)),
+            _medicao=Exists(MedicaoEquipamento.objects.filter(
+                equipamento=eq, criado_em__date__gte=di, criado_em__date__lte=df
+            )),
+            _os=Exists(OrdemServico.objects.filter(
+                equipamento=eq, data_abertura__gte=di, data_abertura__lte=df
+            )),
+        ).filter(
+            Q(_abast=True) | Q(_manut=True) | Q(_medicao=True) | Q(_os=True)
+        ).values_list('id', flat=True)
+        return set(rows)
+
+    @cached_property
+    def ordens_servico(self):
+        """
+        OS concluídas por equipamento: custos (conclusão no período) e
+        dias parados (início e conclusão dentro do período).
+        """
+        di, df = self.data_inicio, self.data_fim
+        no_periodo = Q(data_conclusao__gte=di, data_conclusao__lte=df)
+        parada = Q(
+            data_inicio__isnull=False, data_conclusao__isnull=False,
+            data_inicio__gte=di, data_conclusao__lte=df,
+        )
+        rows = list(OrdemServico.objects.filter(
+            no_periodo | parada,
+            equipamento__in=self.queryset,
+            status='CONCLUIDA',
+        ).values('equipamento_id').annotate(
+            mao_obra=Coalesce(Sum('valor_servicos', filter=no_periodo), ZERO),
+            pecas=Coalesce(Sum('valor_produtos', filter=no_periodo), ZERO),
+            total=Coalesce(Sum('valor_final', filter=no_periodo), ZERO),
+            tempo_parado=Sum(
+                ExpressionWrapper(F('data_conclusao') - F('data_inicio'), output_field=DurationField()),
+                filter=parada,
+            ),
+        ).order_by())
+        for row in rows:
+            tempo_parado = row.pop('tempo_parado')
+            row['horas_manutencao'] = tempo_parado.days * 8 if tempo_parado else 0  # Assume 8h/dia de trabalho
+        return {row['equipamento_id']: row for row in rows}
+
+    @cached_property
+    def abastecimentos(self):
+        """Totais, leituras extremas e primeira/última leitura por equipamento."""
+        ordem = [F('data').asc(), F('horimetro_km').asc()]
+        ordem_inversa = [F('data').desc(), F('horimetro_km').desc()]
+        qs = Abastecimento.objects.filter(
+            equipamento__in=self.queryset,
+            data__gte=self.data_inicio,
+            data__lte=self.data_fim,
+        )
+        return _por_equipamento(
+            qs,
+            quantidade=(Count('id'), None),
+            litros=(Sum('quantidade_litros'), None),
+            valor=(Sum('valor_total'), None),
+            leitura_min=(Min('horimetro_km'), None),
+            leitura_max=(Max('horimetro_km'), None),
+            primeira_leitura=(FirstValue('horimetro_km'), ordem),
+            ultima_leitura=(FirstValue('horimetro_km'), ordem_inversa),
+        )
+
+    @cached_property
+    def medicoes(self):
+        """Quantidade e primeira/última leitura (por criado_em) por equipamento."""
+        qs = MedicaoEquipamento.objects.filter(
+            equipamento__in=self.queryset,
+            criado_em__date__gte=self.data_inicio,
+            criado_em__date__lte=self.data_fim,
+        )
+        return _por_equipamento(
+            qs,
+            quantidade=(Count('id'), None),
+            primeira_leitura=(FirstValue('leitura'), [F('criado_em').asc(), F('id').asc()]),
+            ultima_leitura=(FirstValue('leitura'), [F('criado_em').desc(), F('id').desc()]),
+        )
+
+    # ------------------------------------------------------------------
+    # Métricas
+    # ------------------------------------------------------------------
+
+    def totais_combustivel(self):
+        litros = sum((a['litros'] for a in self.abastecimentos.values()), ZERO)
+        valor = sum((a['valor'] for a in self.abastecimentos.values()), ZERO)
+        return {'litros': litros, 'valor': valor}
+
+    def totais_os(self):
+        os_rows = self.ordens_servico.values()
+        return {
+            'servicos': sum((o['mao_obra'] for o in os_rows), ZERO),
+            'produtos': sum((o['pecas'] for o in os_rows), ZERO),
+            'total': sum((o['total'] for o in os_rows), ZERO),
+        }
+
+    def _disponibilidade_equipamento(self, equip, total_horas_periodo):
+        """(horas em manutenção, DF%) de um equipamento."""
+        os_equip = self.ordens_servico.get(equip['id'])
+        horas_manut = os_equip['horas_manutencao'] if os_equip else 0
+        if total_horas_periodo > 0:
+            df_percent = ((total_horas_periodo - horas_manut) / total_horas_periodo) * 100
+            return horas_manut, max(0, min(100, df_percent))
+        return horas_manut, 100
+
+    def _consumo_equipamento(self, equip):
+        """(litros, diferença de leitura, consumo médio) ou None sem 2 abastecimentos com avanço de leitura."""
+        abast = self.abastecimentos.get(equip['id'])
+        if not abast or abast['quantidade'] < 2:
+            return None
+        litros = abast['litros'] or ZERO
+        diferenca_leitura = abast['ultima_leitura'] - abast['primeira_leitura']
+        if diferenca_leitura <= 0:
+            return None
+        return litros, diferenca_leitura, litros / diferenca_leitura
+
+    def _custos_equipamento(self, equip):
+        """(combustível, mão de obra, peças, horas trabalhadas) de um equipamento."""
+        abast = self.abastecimentos.get(equip['id'])
+        os_equip = self.ordens_servico.get(equip['id'])
+        medicao = self.medicoes.get(equip['id'])
+
+        custo_combustivel = (abast['valor'] if abast else None) or ZERO
+        custo_mao_obra = os_equip['mao_obra'] if os_equip else ZERO
+        custo_pecas = os_equip['pecas'] if os_equip else ZERO
+
+        # Horas trabalhadas: medições, com fallback para abastecimentos
+        if medicao and medicao['quantidade'] >= 2:
+            horas_trabalhadas = medicao['ultima_leitura'] - medicao['primeira_leitura']
+        elif abast and abast['quantidade'] >= 2:
+            horas_trabalhadas = abast['leitura_max'] - abast['leitura_min']
+        else:
+            horas_trabalhadas = ZERO
+        return custo_combustivel, custo_mao_obra, custo_pecas, horas_trabalhadas
+
+    def disponibilidade(self):
+        """
+        Disponibilidade Física (DF%).
+
+        DF% = ((Horas Totais - Horas em Manutenção) / Horas Totais) * 100
+        """
+        total_horas_periodo = (self.data_fim - self.data_inicio).days * 24
+
+        total_horas_manutencao = 0
+        disponibilidades = []
+
+        for equip in self.equipamentos:
+            horas_manut, df_percent = self._disponibilidade_equipamento(equip, total_horas_periodo)
+            total_horas_manutencao += horas_manut
+
+            disponibilidades.append({
+                'equipamento_id': equip['id'],
+                'codigo': equip['codigo'],
+                'tipo': equip['tipo__nome'] or '',
+                'horas_manutencao': horas_manut,
+                'disponibilidade_percent': round(df_percent, 2)
+            })
+
+        if disponibilidades:
+            media_df = sum(d['disponibilidade_percent'] for d in disponibilidades) / len(disponibilidades)
+        else:
+            media_df = 100
+
+        return {
+            'media_percent': round(media_df, 2),
+            'total_horas_periodo': total_horas_periodo,
+            'total_horas_manutencao': total_horas_manutencao,
+            'equipamentos_analisados': len(disponibilidades),
+            'detalhes': sorted(disponibilidades, key=lambda x: x['disponibilidade_percent'])[:10]
+        }
+
+    def consumo(self):
+        """
+        Consumo Médio de Combustível (L/h ou L/km).
+
+        Consumo = Total Litros / (Leitura Final - Leitura Inicial)
+        """
+        consumos = []
+        total_litros = ZERO
+        total_horas_km = ZERO
+
+        for equip in self.equipamentos:
+            consumo = self._consumo_equipamento(equip)
+            if consumo:
+                litros, diferenca_leitura, consumo_medio = consumo
+                total_litros += litros
+                total_horas_km += diferenca_leitura
+
+                unidade = 'L/h' if equip['tipo_medicao'] == 'HORA' else 'L/km'
+                consumos.append({
+                    'equipamento_id': equip['id'],
+                    'codigo': equip['codigo'],
+                    'tipo': equip['tipo__nome'] or '',
+                    'tipo_medicao': equip['tipo_medicao'],
+                    'litros_total': float(litros),
+                    'diferenca_leitura': float(diferenca_leitura),
+                    'consumo_medio': round(float(consumo_medio), 2),
+                    'unidade': unidade
+                })
+
+        # Média geral (apenas para equipamentos com horímetro)
+        consumos_horimetro = [c for c in consumos if c['tipo_medicao'] == 'HORA']
+        if consumos_horimetro:
+            media_consumo = sum(c['consumo_medio'] for c in consumos_horimetro) / len(consumos_horimetro)
+        else:
+            media_consumo = 0
+
+        return {
+            'media_litros_hora': round(media_consumo, 2),
+            'total_litros': float(total_litros),
+            'equipamentos_analisados': len(consumos),
+            'aviso': 'São necessários pelo menos 2 abastecimentos por equipamento para calcular consumo.' if len(consumos) == 0 else None,
+            'detalhes': sorted(consumos, key=lambda x: x['consumo_medio'], reverse=True)[:10]
+        }
+
+    def utilizacao(self):
+        """
+        Utilização de Frota.
+
+        Utilização = Equipamentos com atividade / Total de Equipamentos
+        """
+        total_equipamentos = len(self.equipamentos)
+
+        if total_equipamentos == 0:
+            return {
+                'percentual': 0,
+                'operando': 0,
+                'parados': 0,
+                'total': 0
+            }
+
+        ativos = self.ids_em_atividade
+        operando = len(ativos)
+        parados = total_equipamentos - operando
+        percentual = (operando / total_equipamentos) * 100
+
+        equipamentos_parados = [
+            {
+                'id': equip['id'],
+                'codigo': equip['codigo'],
+                'descricao': equip['descricao'],
+                'leitura_atual': equip['leitura_atual'],
+                'tipo__nome': equip['tipo__nome'],
+            }
+            for equip in self.equipamentos
+            if equip['id'] not in ativos
+        ][:10]
+
+        return {
+            'percentual': round(percentual, 2),
+            'operando': operando,
+            'parados': parados,
+            'total': total_equipamentos,
+            'equipamentos_parados': equipamentos_parados
+        }
+
+    def cph(self):
+        """
+        Custo Por Hora (CPH).
+
+        CPH = (Combustível + Peças + Mão de Obra) / Horas Trabalhadas
+        """
+        cphs = []
+        total_custo = ZERO
+        total_horas = ZERO
+
+        for equip in self.equipamentos:
+            custo_combustivel, custo_mao_obra, custo_pecas, horas_trabalhadas = self._custos_equipamento(equip)
+            custo_total = custo_combustivel + custo_mao_obra + custo_pecas
+
+            if horas_trabalhadas > 0 and custo_total > 0:
+                cph = custo_total / horas_trabalhadas
+                total_custo += custo_total
+                total_horas += horas_trabalhadas
+
+                cphs.append({
+                    'equipamento_id': equip['id'],
+                    'codigo': equip['codigo'],
+                    'tipo': equip['tipo__nome'] or '',
+                    'custo_combustivel': float(custo_combustivel),
+                    'custo_mao_obra': float(custo_mao_obra),
+                    'custo_pecas': float(custo_pecas),
+                    'custo_total': float(custo_total),
+                    'horas_trabalhadas': float(horas_trabalhadas),
+                    'cph': round(float(cph), 2)
+                })
+
+        cph_medio = total_custo / total_horas if total_horas > 0 else ZERO
+
+        return {
+            'cph_medio': round(float(cph_medio), 2),
+            'custo_total': float(total_custo),
+            'horas_totais': float(total_horas),
+            'equipamentos_analisados': len(cphs),
+            'aviso': 'São necessárias medições de horímetro para calcular CPH com precisão.' if len(cphs) == 0 else None,
+            'detalhes': sorted(cphs, key=lambda x: x['cph'], reverse=True)[:10]
+        }
+
+    def indicadores_por_equipamento(self):
+        """
+        Uma linha por equipamento com todos os indicadores (exportação).
+
+        Gerador: os dados de cada fonte já estão agregados por equipamento,
+        então nenhuma lista com a frota inteira é montada.
+        """
+        total_horas_periodo = (self.data_fim - self.data_inicio).days * 24
+        ativos = self.ids_em_atividade
+        for equip in self.equipamentos:
+            horas_manut, df_percent = self._disponibilidade_equipamento(equip, total_horas_periodo)
+            consumo = self._consumo_equipamento(equip)
+            abast = self.abastecimentos.get(equip['id'])
+            custo_combustivel, custo_mao_obra, custo_pecas, horas_trabalhadas = self._custos_equipamento(equip)
+            custo_total = custo_combustivel + custo_mao_obra + custo_pecas
+            yield {
+                'codigo': equip['codigo'],
+                'descricao': equip['descricao'] or equip['modelo'],
+                'tipo': equip['tipo__nome'] or '',
+                'tipo_medicao': equip['tipo_medicao'],
+                'em_atividade': equip['id'] in ativos,
+                'horas_manutencao': horas_manut,
+                'disponibilidade_percent': round(df_percent, 2),
+                'litros': (abast['litros'] if abast else None) or ZERO,
+                'consumo_medio': round(consumo[2], 2) if consumo else None,
+                'custo_combustivel': custo_combustivel,
+                'custo_mao_obra': custo_mao_obra,
+                'custo_pecas': custo_pecas,
+                'custo_total': custo_total,
+                'horas_trabalhadas': horas_trabalhadas,
+                'cph': round(custo_total / horas_trabalhadas, 2) if horas_trabalhadas > 0 and custo_total > 0 else None,
+            }
+
+    def consumo_por_equipamento(self, limite=10):
+        """Litros abastecidos pelos primeiros equipamentos da frota (gráfico)."""
+        consumo = []
+        for equip in self.equipamentos[:limite]:
+            abast = self.abastecimentos.get(equip['id'])
+            litros = (abast['litros'] if abast else None) or ZERO
+            if litros > 0:
+                consumo.append({
+                    'codigo': equip['codigo'],
+                    'descricao': equip['descricao'] or equip['modelo'],
+                    'tipo': equip['tipo__nome'] or '',
+                    'litros': float(litros)
+                })
+        consumo.sort(key=lambda x: x['litros'], reverse=True)
+        return consumo
+
+    def alertas(self):
+        """
+        Alertas de manutenção preventiva baseados em:
+        1. PlanoManutencaoItem (intervalos configurados)
+        2. Manutencao.proxima_manutencao (última preventiva do equipamento)
+        """
+        planos_por_equip = {}
+        for plano in PlanoManutencaoItem.objects.filter(
+            equipamento__in=self.queryset, ativo=True
+        ).values('equipamento_id', 'titulo', 'proxima_leitura', 'periodicidade_valor', 'antecedencia_percent'):
+            planos_por_equip.setdefault(plano['equipamento_id'], []).append(plano)
+
+        preventivas = Manutencao.objects.filter(
+            equipamento__in=self.queryset,
+            tipo='preventiva',
+            proxima_manutencao__isnull=False,
+        )
+        ultima_preventiva = _por_equipamento(
+            preventivas,
+            data_ultima=(FirstValue('data'), [F('data').desc(), F('id').desc()]),
+            proxima=(FirstValue('proxima_manutencao'), [F('data').desc(), F('id').desc()]),
+        )
+
+        alertas = []
+        for equip in self.equipamentos:
+            leitura_atual = equip['leitura_atual'] or ZERO
+            unidade = 'h' if equip['tipo_medicao'] == 'HORA' else 'km'
+            tem_alerta_plano = False
+
+            for plano in planos_por_equip.get(equip['id'], ()):
+                if not plano['proxima_leitura']:
+                    continue
+                diferenca = plano['proxima_leitura'] - leitura_atual
+                periodicidade = plano['periodicidade_valor']
+                percentual_restante = (diferenca / periodicidade * 100) if periodicidade > 0 else 100
+
+                if diferenca <= 0:
+                    prioridade, status = 'CRITICO', 'VENCIDO'
+                elif percentual_restante <= 10:
+                    prioridade, status = 'URGENTE', 'PROXIMO'
+                elif percentual_restante <= plano['antecedencia_percent']:
+                    prioridade, status = 'ATENCAO', 'PROGRAMAR'
+                else:
+                    continue
+
+                tem_alerta_plano = True
+                alertas.append({
+                    'equipamento_id': equip['id'],
+                    'codigo': equip['codigo'],
+                    'tipo_equipamento': equip['tipo__nome'] or '',
+                    'item': plano['titulo'],
+                    'tipo': 'PLANO',
+                    'leitura_atual': float(leitura_atual),
+                    'proxima_leitura': float(plano['proxima_leitura']),
+                    'diferenca': float(diferenca),
+                    'unidade': unidade,
+                    'prioridade': prioridade,
+                    'status': status,
+                    'periodicidade': f"A cada {periodicidade} {unidade}"
+                })
+
+            preventiva = ultima_preventiva.get(equip['id'])
+            if not preventiva or not preventiva['proxima'] or tem_alerta_plano:
+                continue
+
+            # Assume intervalo de 250h padrão: 10% = 25, 20% = 50
+            diferenca = preventiva['proxima'] - leitura_atual
+            if diferenca <= 0:
+                prioridade, status = 'CRITICO', 'VENCIDO'
+            elif diferenca <= 25:
+                prioridade, status = 'URGENTE', 'PROXIMO'
+            elif diferenca <= 50:
+                prioridade, status = 'ATENCAO', 'PROGRAMAR'
+            else:
+                continue
+
+            alertas.append({
+                'equipamento_id': equip['id'],
+                'codigo': equip['codigo'],
+                'tipo_equipamento': equip['tipo__nome'] or '',
+                'item': 'Manutenção Preventiva Geral',
+                'tipo': 'MANUTENCAO',
+                'leitura_atual': float(leitura_atual),
+                'proxima_leitura': float(preventiva['proxima']),
+                'diferenca': float(diferenca),
+                'unidade': unidade,
+                'prioridade': prioridade,
+                'status': status,
+                'ultima_manutencao': str(preventiva['data_ultima'])
+            })
+
+        alertas.sort(key=lambda x: (PRIORIDADE_ORDEM.get(x['prioridade'], 99), x['diferenca']))
+        return alertas
+
+
+class MetricasFrotaConsolidada(MetricasFrota):
+    """
+    MetricasFrota lida de MetricaDiariaEquipamento.
+
+    Uma query agrupada sobre a consolidação diária substitui as leituras de
+    OrdemServico, Abastecimento, MedicaoEquipamento e Manutencao; a primeira
+    e a última leitura do período vêm do primeiro e do último dia com
+    registros (menor leitura do primeiro dia, maior leitura do último).
+    """
+
+    @cached_property
+    def periodo(self):
+        return MetricaDiariaEquipamento.objects.filter(
+            equipamento__in=self.queryset,
+            data__gte=self.data_inicio,
+            data__lte=self.data_fim,
+        )
+
+    def _extremos(self, filtro, campo_min, campo_max):
+        return _por_equipamento(
+            self.periodo.filter(**filtro),
+            primeira_leitura=(FirstValue(campo_min), [F('data').asc()]),
+            ultima_leitura=(FirstValue(campo_max), [F('data').desc()]),
+        )
+
+    @cached_property
+    def consolidado(self):
+        rows = self.periodo.values('equipamento_id').annotate(
+            abastecimentos=Sum('abastecimentos'),
+            litros=Sum('litros'),
+            valor=Sum('valor_combustivel'),
+            leitura_abastecimento_min=Min('leitura_abastecimento_min'),
+            leitura_abastecimento_max=Max('leitura_abastecimento_max'),
+            medicoes=Sum('medicoes'),
+            horas_manutencao=Sum('horas_manutencao'),
+            custo_servicos=Sum('custo_servicos'),
+            custo_produtos=Sum('custo_produtos'),
+            custo_os=Sum('custo_os'),
+            manutencoes=Sum('manutencoes'),
+            os_abertas=Sum('os_abertas'),
+        ).order_by()
+        return {row['equipamento_id']: row for row in rows}
+
+    @cached_property
+    def ids_em_atividade(self):
+        return {
+            equipamento_id
+            for equipamento_id, row in self.consolidado.items()
+            if row['abastecimentos'] or row['manutencoes'] or row['medicoes'] or row['os_abertas']
+        }
+
+    @cached_property
+    def ordens_servico(self):
+        return {
+            equipamento_id: {
+                'equipamento_id': equipamento_id,
+                'mao_obra': row['custo_servicos'],
+                'pecas': row['custo_produtos'],
+                'total': row['custo_os'],
+                'horas_manutencao': row['horas_manutencao'],
+            }
+            for equipamento_id, row in self.consolidado.items()
+            if row['horas_manutencao'] or row['custo_os'] or row['custo_servicos'] or row['custo_produtos']
+        }
+
+    @cached_property
+    def abastecimentos(self):
+        extremos = self._extremos(
+            {'abastecimentos__gt': 0}, 'leitura_abastecimento_min', 'leitura_abastecimento_max'
+        )
+        return {
+            equipamento_id: {
+                'equipamento_id': equipamento_id,
+                'quantidade': row['abastecimentos'],
+                'litros': row['litros'],
+                'valor': row['valor'],
+                'leitura_min': row['leitura_abastecimento_min'],
+                'leitura_max': row['leitura_abastecimento_max'],
+                'primeira_leitura': extremos[equipamento_id]['primeira_leitura'],
+                'ultima_leitura': extremos[equipamento_id]['ultima_leitura'],
+            }
+            for equipamento_id, row in self.consolidado.items()
+            if row['abastecimentos']
+        }
+
+    @cached_property
+    def medicoes(self):
+        extremos = self._extremos({'medicoes__gt': 0}, 'leitura_min', 'leitura_max')
+        return {
+            equipamento_id: {
+                'equipamento_id': equipamento_id,
+                'quantidade': row['medicoes'],
+                'primeira_leitura': extremos[equipamento_id]['primeira_leitura'],
+                'ultima_leitura': extremos[equipamento_id]['ultima_leitura'],
+            }
+            for equipamento_id, row in self.consolidado.items()
+            if row['medicoes']
+        }
@@ -0,0 +1,264 @@
+"""
+Relatórios pesados em background (RelatorioJob).
+
+A API só registra o pedido (solicitar_relatorio) e devolve o id do job; a
+geração roda no worker, fora dos processos do gunicorn:
+
+    python manage.py processar_relatorios                        # processa a fila e sai
+    python manage.py processar_relatorios --loop --workers 4     # worker contínuo
+
+Em produção o worker contínuo é um processo próprio: `worker` em fly.toml
+([processes]) e no Procfile. Sem ele os jobs ficam PENDENTE.
+
+Cada job executa a mesma view síncrona do relatório (RELATORIOS) com os
+filtros e o usuário do pedido, e grava a resposta como JSON no storage
+padrão, com nome aleatório. O download passa pela API (o bucket de mídia de
+produção é público). Resultados expiram após RELATORIO_JOB_TTL segundos e
+são removidos por limpar_expirados().
+
+Pedidos iguais (tipo + filtros + escopo do usuário, o mesmo de core.cache)
+acompanham o job em andamento ou reaproveitam o resultado ainda válido.
+"""
+import hashlib
+import json
+import logging
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, close_old_connections, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.cache import escopo_usuario
+
+from .models import RelatorioJob
+
+logger = logging.getLogger(__name__)
+
+# tipo -> (view síncrona, filtros aceitos)
+RELATORIOS = {
+    'OPERACIONAL': (
+        'relatorios.views.relatorio_operacional',
+        ('data_inicio', 'data_fim', 'cliente', 'equipamento', 'tecnico'),
+    ),
+    'METRICAS_DASHBOARD': (
+        'relatorios.metricas.dashboard_metricas',
+        ('data_inicio', 'data_fim', 'empreendimento'),
+    ),
+}
+EM_ANDAMENTO = ('PENDENTE', 'PROCESSANDO')
+MAX_TENTATIVAS = 2
+TEMPO_MAXIMO_PROCESSANDO = timedelta(minutes=30)
+
+
+def validade():
+    return timedelta(seconds=settings.RELATORIO_JOB_TTL)
+
+
+def normalizar_parametros(tipo, parametros):
+    """Só os filtros do relatório, como texto e em ordem (entram na chave)."""
+    _, filtros = RELATORIOS[tipo]
+    return {
+        nome: str(parametros[nome])
+        for nome in sorted(filtros)
+        if parametros.get(nome) not in (None, '')
+    }
+
+
+def chave_job(tipo, parametros, escopo):
+    bruto = json.dumps([tipo, parametros, escopo], sort_keys=True)
+    return hashlib.sha256(bruto.encode()).hexdigest()
+
+
+def _reaproveitavel(chave):
+    return RelatorioJob.objects.filter(
+        Q(status__in=EM_ANDAMENTO) | Q(status='CONCLUIDO', expira_em__gt=timezone.now()),
+        chave=chave,
+    ).order_by('-criado_em').first()
+
+
+def solicitar_relatorio(tipo, parametros, user):
+    """
+    Registra o pedido de relatório. Retorna (job, criado).
+
+    Se já existe um job com a mesma chave em andamento, ou concluído e ainda
+    válido, ele é devolvido no lugar de um novo.
+    """
+    escopo, _ = escopo_usuario(user)
+    parametros = normalizar_parametros(tipo, parametros)
+    chave = chave_job(tipo, parametros, escopo)
+
+    existente = _reaproveitavel(chave)
+    if existente:
+        return existente, False
+    try:
+        with transaction.atomic():
+            job = RelatorioJob.objects.create(
+                tipo=tipo, parametros=parametros, escopo=escopo, chave=chave, usuario=user,
+            )
+        return job, True
+    except IntegrityError:
+        # Pedido idêntico registrado ao mesmo tempo
+        return _reaproveitavel(chave), False
+
+
+def _reservar(limite):
+    """Marca até `limite` jobs como PROCESSANDO e devolve os ids (seguro com vários workers)."""
+    if limite < 1:
+        return []
+    agora = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            RelatorioJob.objects.select_for_update(skip_locked=True)
+            .filter(status='PENDENTE')
+            .order_by('criado_em')
+            .values_list('id', flat=True)[:limite]
+        )
+        RelatorioJob.objects.filter(id__in=ids).update(
+            status='PROCESSANDO', iniciado_em=agora, tentativas=F('tentativas') + 1
+        )
+    return ids
+
+
+def recuperar_travados():
+    """Devolve à fila jobs que ficaram PROCESSANDO (worker interrompido)."""
+    limite = timezone.now() - TEMPO_MAXIMO_PROCESSANDO
+    travados = RelatorioJob.objects.filter(status='PROCESSANDO', iniciado_em__lt=limite)
+    recuperados = 0
+    for job in travados:
+        status = 'ERRO' if job.tentativas >= MAX_TENTATIVAS else 'PENDENTE'
+        RelatorioJob.objects.filter(pk=job.pk, status='PROCESSANDO').update(
+            status=status, erro='Tempo máximo de processamento excedido'
+        )
+        recuperados += 1
+    return recuperados
+
+
+def gerar_resultado(job):
+    """Executa a view do relatório como o usuário do pedido. Retorna (status HTTP, JSON em bytes)."""
+    caminho, _ = RELATORIOS[job.tipo]
+    request = APIRequestFactory().get('/', job.parametros)
+    force_authenticate(request, user=job.usuario)
+    response = import_string(caminho)(request)
+    return response.status_code, JSONRenderer().render(response.data)
+
+
+def processar_job(job_id):
+    """Gera o resultado de um job reservado. Retorna o status final."""
+    job = RelatorioJob.objects.select_related('usuario').get(pk=job_id)
+    agora = timezone.now()
+    try:
+        if job.usuario is None or not job.usuario.is_active:
+            status_http, conteudo = 403, None
+        else:
+            status_http, conteudo = gerar_resultado(job)
+        if status_http == 200:
+            job.arquivo.save(f'{job.tipo.lower()}_{uuid.uuid4().hex}.json', ContentFile(conteudo), save=False)
+            job.status, job.erro = 'CONCLUIDO', ''
+            job.expira_em = timezone.now() + validade()
+        else:
+            # Resposta de erro da própria view (ex.: cliente não vinculado): não adianta repetir
+            job.status = 'ERRO'
+            job.erro = conteudo.decode()[:1000] if conteudo else 'Usuário inativo ou removido'
+    except Exception as e:
+        logger.warning(f"[Relatorio] Erro ao gerar {job}: {e}")
+        job.erro = str(e)
+        job.status = 'ERRO' if job.tentativas >= MAX_TENTATIVAS else 'PENDENTE'
+    job.concluido_em = timezone.now()
+    logger.info(f"[Relatorio] {job} em {(job.concluido_em - agora).total_seconds():.1f}s")
+    try:
+        with transaction.atomic():
+            job.save(update_fields=['status', 'erro', 'arquivo', 'concluido_em', 'expira_em'])
+    except IntegrityError:
+        # Voltaria para PENDENTE, mas um pedido idêntico já está na fila
+        job.status = 'ERRO'
+        job.save(update_fields=['status', 'erro', 'arquivo', 'concluido_em', 'expira_em'])
+    return job.status
+
+
+def _inicializar_processo():
+    """Initializer do pool: com start method 'spawn' o Django ainda não foi carregado."""
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def _processar_no_pool(job_id):
+    close_old_connections()
+    try:
+        return job_id, processar_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def processar_pendentes(limite=10):
+    """Processa até `limite` jobs no próprio processo. Retorna {status: quantidade}."""
+    recuperar_travados()
+    resultado = {}
+    for job_id in _reservar(limite):
+        status = processar_job(job_id)
+        resultado[status] = resultado.get(status, 0) + 1
+    return resultado
+
+
+def processar_fila(workers=None, continuar=False, intervalo=5, ao_concluir=None):
+    """
+    Processa a fila com um pool de `workers` processos (RELATORIO_JOB_WORKERS).
+
+    Cada processo livre recebe um job assim que ele é reservado; com
+    continuar=True aguarda novos pedidos indefinidamente. ao_concluir(job_id,
+    status) é chamado no processo principal. Retorna {status: quantidade}.
+    """
+    workers = workers or settings.RELATORIO_JOB_WORKERS
+    total = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_processo) as pool:
+        em_execucao = set()
+        while True:
+            if recuperar_travados():
+                logger.info("[Relatorio] Jobs travados devolvidos à fila")
+            ids = _reservar(workers - len(em_execucao))
+            if ids:
+                # Processos novos do pool não podem herdar conexões abertas (fork)
+                connections.close_all()
+                em_execucao |= {pool.submit(_processar_no_pool, job_id) for job_id in ids}
+            if not em_execucao:
+                if not continuar:
+                    break
+                time.sleep(intervalo)
+                limpar_expirados()
+                continue
+            concluidos, em_execucao = wait(em_execucao, timeout=intervalo, return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                job_id, status = futuro.result()
+                total[status] = total.get(status, 0) + 1
+                if ao_concluir:
+                    ao_concluir(job_id, status)
+    return total
+
+
+def limpar_expirados():
+    """Remove os arquivos e os jobs cujo resultado expirou (e erros antigos). Retorna quantos."""
+    agora = timezone.now()
+    expirados = RelatorioJob.objects.filter(
+        Q(status='CONCLUIDO', expira_em__lt=agora)
+        | Q(status='ERRO', concluido_em__lt=agora - validade())
+    )
+    removidos = 0
+    for job in expirados:
+        if job.arquivo:
+            try:
+                job.arquivo.delete(save=False)
+            except Exception as e:
+                logger.warning(f"[Relatorio] Erro ao remover arquivo de {job}: {e}")
+                continue
+        job.delete()
+        removidos += 1
+    return removidos
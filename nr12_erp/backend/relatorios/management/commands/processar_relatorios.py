@@ -0,0 +1,48 @@
+"""
+Worker da fila de relatórios em background (RelatorioJob).
+
+Uso:
+    python manage.py processar_relatorios                           # processa os pendentes e sai
+    python manage.py processar_relatorios --loop --workers 4        # worker contínuo com 4 processos
+    python manage.py processar_relatorios --workers 1               # sem pool, no próprio processo
+    python manage.py processar_relatorios --limpar                  # só remove resultados expirados
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from relatorios.jobs import limpar_expirados, processar_fila, processar_pendentes
+
+
+class Command(BaseCommand):
+    help = 'Gera os relatórios pedidos via API (fila RelatorioJob)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.RELATORIO_JOB_WORKERS,
+            help='Processos geradores (padrão: RELATORIO_JOB_WORKERS)',
+        )
+        parser.add_argument('--loop', action='store_true', help='Continua aguardando novos jobs')
+        parser.add_argument('--intervalo', type=float, default=5, help='Segundos entre verificações no modo --loop')
+        parser.add_argument('--limpar', action='store_true', help='Apenas remove resultados expirados')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers deve ser maior que zero')
+
+        removidos = limpar_expirados()
+        if removidos:
+            self.stdout.write(f"🧹 {removidos} resultado(s) expirado(s) removido(s)")
+        if options['limpar']:
+            return
+
+        if options['workers'] == 1 and not options['loop']:
+            total = processar_pendentes(limite=1000)
+        else:
+            total = processar_fila(
+                workers=options['workers'],
+                continuar=options['loop'],
+                intervalo=options['intervalo'],
+                ao_concluir=lambda job_id, status: self.stdout.write(f"  Job #{job_id}: {status}"),
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Relatórios processados: {total or 'nenhum pendente'}"))
@@ -0,0 +1,70 @@
+"""
+Management command para reconstruir a consolidação diária das métricas de frota.
+
+Uso:
+    python manage.py recalcular_metricas_diarias                      # últimos 30 dias
+    python manage.py recalcular_metricas_diarias --inicio 2025-01-01 --fim 2025-12-31
+    python manage.py recalcular_metricas_diarias --inicio 2025-01-01 --equipamento EQ-001
+"""
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from equipamentos.models import Equipamento
+from relatorios.services import recalcular_metricas_diarias
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói MetricaDiariaEquipamento para um intervalo de datas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--inicio', type=str, help='Data inicial YYYY-MM-DD (padrão: fim - 30 dias)')
+        parser.add_argument('--fim', type=str, help='Data final YYYY-MM-DD (padrão: hoje)')
+        parser.add_argument(
+            '--equipamento',
+            type=str,
+            help='Código específico do equipamento (opcional)',
+        )
+        parser.add_argument(
+            '--dias-por-lote',
+            type=int,
+            default=31,
+            help='Tamanho de cada lote em dias, uma transação por lote (padrão: 31)',
+        )
+
+    def _data(self, valor, padrao):
+        if not valor:
+            return padrao
+        try:
+            return datetime.strptime(valor, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f"Data inválida: {valor} (use YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        data_fim = self._data(options['fim'], timezone.localdate())
+        data_inicio = self._data(options['inicio'], data_fim - timedelta(days=30))
+        if data_inicio > data_fim:
+            raise CommandError('--inicio deve ser anterior a --fim')
+
+        equipamento_ids = None
+        if options['equipamento']:
+            equipamento_ids = list(
+                Equipamento.objects.filter(codigo=options['equipamento']).values_list('id', flat=True)
+            )
+            if not equipamento_ids:
+                raise CommandError(f"Equipamento '{options['equipamento']}' não encontrado")
+
+        passo = timedelta(days=max(1, options['dias_por_lote']))
+        total = 0
+        lote_inicio = data_inicio
+        while lote_inicio <= data_fim:
+            lote_fim = min(lote_inicio + passo - timedelta(days=1), data_fim)
+            linhas = recalcular_metricas_diarias(lote_inicio, lote_fim, equipamento_ids=equipamento_ids)
+            total += linhas
+            self.stdout.write(f"  {lote_inicio} a {lote_fim}: {linhas} linha(s)")
+            lote_inicio = lote_fim + timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Consolidação recalculada de {data_inicio} a {data_fim}: {total} linha(s)"
+        ))
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('equipamentos', '0018_allow_duplicate_codigo_per_cliente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricaDiariaEquipamento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField()),
+                ('abastecimentos', models.PositiveIntegerField(default=0)),
+                ('litros', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('valor_combustivel', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('leitura_abastecimento_min', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('leitura_abastecimento_max', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('medicoes', models.PositiveIntegerField(default=0)),
+                ('leitura_min', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('leitura_max', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('horas_manutencao', models.PositiveIntegerField(default=0)),
+                ('custo_servicos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('custo_produtos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('custo_os', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('manutencoes', models.PositiveIntegerField(default=0)),
+                ('os_abertas', models.PositiveIntegerField(default=0)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('equipamento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metricas_diarias', to='equipamentos.equipamento')),
+            ],
+            options={
+                'verbose_name': 'Métrica Diária de Equipamento',
+                'verbose_name_plural': 'Métricas Diárias de Equipamentos',
+                'ordering': ['equipamento', 'data'],
+                'indexes': [models.Index(fields=['data', 'equipamento'], name='relatorios__data_62136d_idx')],
+                'constraints': [models.UniqueConstraint(fields=('equipamento', 'data'), name='unique_metrica_diaria_equipamento')],
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+from datetime import timedelta
+
+from django.db import migrations
+from django.db.models import Min
+from django.utils import timezone
+
+DIAS_POR_LOTE = 31
+
+
+def _primeiro_dia(apps):
+    """Data mais antiga entre as fontes da consolidação (None sem dados)."""
+    datas = [
+        apps.get_model('abastecimentos', 'Abastecimento').objects.aggregate(d=Min('data'))['d'],
+        apps.get_model('manutencao', 'Manutencao').objects.aggregate(d=Min('data'))['d'],
+    ]
+    datas.extend(apps.get_model('ordens_servico', 'OrdemServico').objects.aggregate(
+        a=Min('data_abertura'), i=Min('data_inicio'), c=Min('data_conclusao'),
+    ).values())
+    medicao = apps.get_model('equipamentos', 'MedicaoEquipamento').objects.aggregate(d=Min('criado_em'))['d']
+    if medicao is not None:
+        datas.append(timezone.localtime(medicao).date())
+    return min((d for d in datas if d is not None), default=None)
+
+
+def preencher_metricas(apps, schema_editor):
+    """
+    Backfill da consolidação diária com o mesmo serviço do comando
+    recalcular_metricas_diarias, em lotes de DIAS_POR_LOTE dias até hoje:
+    os endpoints de /relatorios/metricas/ leem só MetricaDiariaEquipamento.
+    """
+    from relatorios.services import recalcular_metricas_diarias
+
+    dia = _primeiro_dia(apps)
+    if dia is None:
+        return
+    hoje = timezone.localdate()
+    while dia <= hoje:
+        fim = min(dia + timedelta(days=DIAS_POR_LOTE - 1), hoje)
+        recalcular_metricas_diarias(dia, fim)
+        dia = fim + timedelta(days=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('relatorios', '0002_relatoriojob'),
+        ('abastecimentos', '0004_indices_paginacao_keyset'),
+        ('equipamentos', '0019_indices_paginacao_keyset'),
+        ('manutencao', '0006_unique_alerta_aberto_por_gatilho'),
+        ('ordens_servico', '0003_ordemservico_horimetro_final_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(preencher_metricas, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,118 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class MetricaDiariaEquipamento(models.Model):
+    """
+    Consolidação diária por equipamento usada pelas métricas de gestão.
+
+    Mantida incrementalmente pelos signals de Abastecimento, MedicaoEquipamento,
+    Manutencao e OrdemServico (relatorios/signals.py) e reconstruída por
+    período com: python manage.py recalcular_metricas_diarias
+    """
+    equipamento = models.ForeignKey(
+        'equipamentos.Equipamento',
+        on_delete=models.CASCADE,
+        related_name='metricas_diarias'
+    )
+    data = models.DateField()
+
+    # Abastecimentos do dia
+    abastecimentos = models.PositiveIntegerField(default=0)
+    litros = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    valor_combustivel = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    leitura_abastecimento_min = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    leitura_abastecimento_max = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+
+    # Medições de horímetro/km do dia
+    medicoes = models.PositiveIntegerField(default=0)
+    leitura_min = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    leitura_max = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+
+    # Manutenção: horas paradas (8h/dia entre início e conclusão da OS) e custos das OS concluídas no dia
+    horas_manutencao = models.PositiveIntegerField(default=0)
+    custo_servicos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    custo_produtos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    custo_os = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    # Atividade (utilização de frota)
+    manutencoes = models.PositiveIntegerField(default=0)
+    os_abertas = models.PositiveIntegerField(default=0)
+
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['equipamento', 'data']
+        verbose_name = 'Métrica Diária de Equipamento'
+        verbose_name_plural = 'Métricas Diárias de Equipamentos'
+        constraints = [
+            models.UniqueConstraint(fields=['equipamento', 'data'], name='unique_metrica_diaria_equipamento'),
+        ]
+        indexes = [
+            models.Index(fields=['data', 'equipamento']),
+        ]
+
+    def __str__(self):
+        return f"{self.equipamento_id} - {self.data}"
+
+
+class RelatorioJob(models.Model):
+    """
+    Relatório pesado gerado em background (relatorios/jobs.py).
+
+    O pedido guarda o tipo, os filtros e o escopo do usuário (o mesmo de
+    core.cache); o worker (python manage.py processar_relatorios) grava o
+    resultado em um arquivo JSON que expira após RELATORIO_JOB_TTL segundos.
+    Pedidos com a mesma chave (tipo + filtros + escopo) dentro desse prazo
+    reaproveitam o mesmo job.
+    """
+    TIPO_CHOICES = [
+        ('OPERACIONAL', 'Relatório operacional'),
+        ('METRICAS_DASHBOARD', 'Dashboard de métricas'),
+    ]
+    STATUS_CHOICES = [
+        ('PENDENTE', 'Pendente'),
+        ('PROCESSANDO', 'Processando'),
+        ('CONCLUIDO', 'Concluído'),
+        ('ERRO', 'Erro'),
+    ]
+
+    tipo = models.CharField(max_length=30, choices=TIPO_CHOICES)
+    parametros = models.JSONField(default=dict, blank=True)
+    escopo = models.CharField(max_length=100)
+    chave = models.CharField(max_length=64, db_index=True)
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='relatorio_jobs'
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDENTE')
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    erro = models.TextField(blank=True, default='')
+    arquivo = models.FileField(upload_to='relatorios/jobs/%Y/%m/', null=True, blank=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    iniciado_em = models.DateTimeField(null=True, blank=True)
+    concluido_em = models.DateTimeField(null=True, blank=True)
+    expira_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-criado_em']
+        verbose_name = 'Job de Relatório'
+        verbose_name_plural = 'Jobs de Relatório'
+        constraints = [
+            # Um job em andamento por chave: pedidos repetidos acompanham o mesmo
+            models.UniqueConstraint(
+                fields=['chave'],
+                condition=models.Q(status__in=['PENDENTE', 'PROCESSANDO']),
+                name='unique_relatoriojob_em_andamento',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'criado_em']),
+            models.Index(fields=['expira_em']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.pk} ({self.status})"
@@ -0,0 +1,24 @@
+from rest_framework import serializers
+from rest_framework.reverse import reverse
+
+from .jobs import RELATORIOS
+from .models import RelatorioJob
+
+
+class RelatorioJobSerializer(serializers.ModelSerializer):
+    tipo = serializers.ChoiceField(choices=[(t, t) for t in RELATORIOS])
+    parametros = serializers.DictField(required=False, default=dict)
+    resultado_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = RelatorioJob
+        fields = [
+            'id', 'tipo', 'parametros', 'status', 'erro',
+            'criado_em', 'concluido_em', 'expira_em', 'resultado_url',
+        ]
+        read_only_fields = ['status', 'erro', 'criado_em', 'concluido_em', 'expira_em']
+
+    def get_resultado_url(self, obj):
+        if obj.status != 'CONCLUIDO':
+            return None
+        return reverse('relatorio-job-resultado', args=[obj.pk], request=self.context.get('request'))
@@ -0,0 +1,124 @@
+"""
+Consolidação diária das métricas de frota (MetricaDiariaEquipamento).
+
+recalcular_metricas_diarias() reconstrói as linhas de um período a partir
+dos dados brutos com uma query agrupada por fonte; é usada tanto pelos
+signals (um equipamento, poucos dias) quanto pelo backfill.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate
+
+from abastecimentos.models import Abastecimento
+from equipamentos.models import MedicaoEquipamento
+from manutencao.models import Manutencao
+from ordens_servico.models import OrdemServico
+
+from .models import MetricaDiariaEquipamento
+
+HORAS_MANUTENCAO_POR_DIA = 8  # Assume 8h/dia de trabalho
+
+
+def _filtro_equipamentos(equipamento_ids, campo='equipamento_id'):
+    return Q(**{f'{campo}__in': equipamento_ids}) if equipamento_ids is not None else Q()
+
+
+@transaction.atomic
+def recalcular_metricas_diarias(data_inicio, data_fim, equipamento_ids=None):
+    """
+    Reconstrói MetricaDiariaEquipamento no intervalo [data_inicio, data_fim].
+
+    Se equipamento_ids for informado, apenas esses equipamentos são
+    recalculados. Retorna o número de linhas gravadas.
+    """
+    if equipamento_ids is not None:
+        equipamento_ids = list(equipamento_ids)
+        if not equipamento_ids:
+            return 0
+
+    filtro_equip = _filtro_equipamentos(equipamento_ids)
+    linhas = {}
+
+    def linha(equipamento_id, dia):
+        chave = (equipamento_id, dia)
+        if chave not in linhas:
+            linhas[chave] = MetricaDiariaEquipamento(equipamento_id=equipamento_id, data=dia)
+        return linhas[chave]
+
+    # Abastecimentos
+    for row in Abastecimento.objects.filter(
+        filtro_equip, data__gte=data_inicio, data__lte=data_fim
+    ).values('equipamento_id', 'data').annotate(
+        total=Count('id'),
+        litros=Sum('quantidade_litros'),
+        valor=Sum('valor_total'),
+        leitura_min=Min('horimetro_km'),
+        leitura_max=Max('horimetro_km'),
+    ).order_by():
+        m = linha(row['equipamento_id'], row['data'])
+        m.abastecimentos = row['total']
+        m.litros = row['litros'] or Decimal('0')
+        m.valor_combustivel = row['valor'] or Decimal('0')
+        m.leitura_abastecimento_min = row['leitura_min']
+        m.leitura_abastecimento_max = row['leitura_max']
+
+    # Medições (dia no fuso local, igual a criado_em__date)
+    for row in MedicaoEquipamento.objects.filter(
+        filtro_equip, criado_em__date__gte=data_inicio, criado_em__date__lte=data_fim
+    ).annotate(dia=TruncDate('criado_em')).values('equipamento_id', 'dia').annotate(
+        total=Count('id'),
+        leitura_min=Min('leitura'),
+        leitura_max=Max('leitura'),
+    ).order_by():
+        m = linha(row['equipamento_id'], row['dia'])
+        m.medicoes = row['total']
+        m.leitura_min = row['leitura_min']
+        m.leitura_max = row['leitura_max']
+
+    # Manutenções registradas
+    for row in Manutencao.objects.filter(
+        filtro_equip, data__gte=data_inicio, data__lte=data_fim
+    ).values('equipamento_id', 'data').annotate(total=Count('id')).order_by():
+        linha(row['equipamento_id'], row['data']).manutencoes = row['total']
+
+    # OS abertas
+    for row in OrdemServico.objects.filter(
+        filtro_equip, equipamento__isnull=False,
+        data_abertura__gte=data_inicio, data_abertura__lte=data_fim,
+    ).values('equipamento_id', 'data_abertura').annotate(total=Count('id')).order_by():
+        linha(row['equipamento_id'], row['data_abertura']).os_abertas = row['total']
+
+    # Custos das OS concluídas (no dia da conclusão)
+    for row in OrdemServico.objects.filter(
+        filtro_equip, equipamento__isnull=False, status='CONCLUIDA',
+        data_conclusao__gte=data_inicio, data_conclusao__lte=data_fim,
+    ).values('equipamento_id', 'data_conclusao').annotate(
+        servicos=Sum('valor_servicos'),
+        produtos=Sum('valor_produtos'),
+        total=Sum('valor_final'),
+    ).order_by():
+        m = linha(row['equipamento_id'], row['data_conclusao'])
+        m.custo_servicos = row['servicos'] or Decimal('0')
+        m.custo_produtos = row['produtos'] or Decimal('0')
+        m.custo_os = row['total'] or Decimal('0')
+
+    # Horas paradas: cada dia entre o início e a conclusão da OS (exclusive)
+    for equipamento_id, inicio, conclusao in OrdemServico.objects.filter(
+        filtro_equip, equipamento__isnull=False, status='CONCLUIDA',
+        data_inicio__isnull=False, data_conclusao__isnull=False,
+        data_inicio__lte=data_fim, data_conclusao__gt=data_inicio,
+    ).values_list('equipamento_id', 'data_inicio', 'data_conclusao'):
+        dia = max(inicio, data_inicio)
+        ultimo_dia = min(conclusao - timedelta(days=1), data_fim)
+        while dia <= ultimo_dia:
+            linha(equipamento_id, dia).horas_manutencao += HORAS_MANUTENCAO_POR_DIA
+            dia += timedelta(days=1)
+
+    MetricaDiariaEquipamento.objects.filter(
+        filtro_equip, data__gte=data_inicio, data__lte=data_fim
+    ).delete()
+    MetricaDiariaEquipamento.objects.bulk_create(linhas.values(), batch_size=1000)
+    return len(linhas)
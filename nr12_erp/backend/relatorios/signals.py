@@ -0,0 +1,62 @@
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from abastecimentos.models import Abastecimento
+from equipamentos.models import Equipamento, MedicaoEquipamento
+from manutencao.models import Manutencao
+from ordens_servico.models import OrdemServico
+
+from .services import recalcular_metricas_diarias
+
+
+def _datas(instance):
+    """Datas que um registro afeta na consolidação diária."""
+    if isinstance(instance, MedicaoEquipamento):
+        return [timezone.localdate(instance.criado_em)] if instance.criado_em else []
+    if isinstance(instance, OrdemServico):
+        return [d for d in (instance.data_abertura, instance.data_inicio, instance.data_conclusao) if d]
+    return [instance.data] if instance.data else []
+
+
+def _recalcular(instance, anteriores=None):
+    afetados = {}
+    for equipamento_id, datas in [(instance.equipamento_id, _datas(instance))] + (anteriores or []):
+        if equipamento_id and datas:
+            afetados.setdefault(equipamento_id, []).extend(datas)
+
+    for equipamento_id, datas in afetados.items():
+        recalcular_metricas_diarias(min(datas), max(datas), equipamento_ids=[equipamento_id])
+
+
+@receiver(pre_save, sender=Abastecimento)
+@receiver(pre_save, sender=Manutencao)
+@receiver(pre_save, sender=OrdemServico)
+def guardar_datas_anteriores(sender, instance, **kwargs):
+    """Guarda equipamento/datas antigos para recalcular os dias que o registro deixou."""
+    instance._metricas_anteriores = []
+    if not instance.pk:
+        return
+    anterior = sender.objects.filter(pk=instance.pk).first()
+    if anterior:
+        instance._metricas_anteriores = [(anterior.equipamento_id, _datas(anterior))]
+
+
+@receiver(post_save, sender=Abastecimento)
+@receiver(post_save, sender=MedicaoEquipamento)
+@receiver(post_save, sender=Manutencao)
+@receiver(post_save, sender=OrdemServico)
+def atualizar_metricas_diarias(sender, instance, **kwargs):
+    """Mantém MetricaDiariaEquipamento atualizada para os dias afetados."""
+    _recalcular(instance, getattr(instance, '_metricas_anteriores', None))
+
+
+@receiver(post_delete, sender=Abastecimento)
+@receiver(post_delete, sender=MedicaoEquipamento)
+@receiver(post_delete, sender=Manutencao)
+@receiver(post_delete, sender=OrdemServico)
+def remover_metricas_diarias(sender, instance, origin=None, **kwargs):
+    # Exclusão em cascata do equipamento: as métricas dele também são removidas
+    if isinstance(origin, Equipamento) or getattr(origin, 'model', None) is Equipamento:
+        return
+    _recalcular(instance)
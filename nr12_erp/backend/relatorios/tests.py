@@ -1,3 +1,293 @@
-from django.test import TestCase
+import json
+import shutil
+import tempfile
+from importlib import import_module
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from abastecimentos.models import Abastecimento
+from cadastro.models import Cliente, Empreendimento
+from equipamentos.models import Equipamento, TipoEquipamento, PlanoManutencaoItem
+from orcamentos.models import Orcamento
+from ordens_servico.models import OrdemServico
+
+from .engine import MetricasFrota, MetricasFrotaConsolidada
+from .jobs import limpar_expirados, processar_pendentes
+from .models import MetricaDiariaEquipamento, RelatorioJob
+
+
+class MetricasFrotaTestBase(TestCase):
+    """Cria uma frota mínima com abastecimentos, OS concluídas e planos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin_metricas', 'admin@example.com', 'senha-forte-123')
+        cls.cliente = Cliente.objects.create(nome_razao='Mineradora Teste', documento='11222333000181', qr_code='x.png')
+        cls.empreendimento = Empreendimento.objects.create(cliente=cls.cliente, nome='Lavra 1', qr_code='x.png')
+        cls.tipo = TipoEquipamento.objects.create(nome='Escavadeira')
+        cls.hoje = date.today()
+
+    def criar_equipamento(self, codigo):
+        """Equipamento com 2 abastecimentos, 1 OS concluída e 1 plano vencido."""
+        equip = Equipamento.objects.create(
+            cliente=self.cliente,
+            empreendimento=self.empreendimento,
+            tipo=self.tipo,
+            codigo=codigo,
+            tipo_medicao='HORA',
+            leitura_atual=Decimal('100'),
+            qr_code='x.png',
+        )
+        Abastecimento.objects.create(
+            equipamento=equip, data=self.hoje - timedelta(days=5), horimetro_km=Decimal('100'),
+            quantidade_litros=Decimal('50'), valor_total=Decimal('300'),
+        )
+        Abastecimento.objects.create(
+            equipamento=equip, data=self.hoje - timedelta(days=1), horimetro_km=Decimal('120'),
+            quantidade_litros=Decimal('40'), valor_total=Decimal('240'),
+        )
+        orcamento = Orcamento.objects.create(
+            tipo='MANUTENCAO_CORRETIVA', cliente=self.cliente, equipamento=equip,
+            data_validade=self.hoje,
+        )
+        OrdemServico.objects.create(
+            orcamento=orcamento, cliente=self.cliente, equipamento=equip, status='CONCLUIDA',
+            data_prevista=self.hoje, data_inicio=self.hoje - timedelta(days=4),
+            data_conclusao=self.hoje - timedelta(days=2), valor_servicos=Decimal('500'),
+            valor_produtos=Decimal('200'),
+        )
+        PlanoManutencaoItem.objects.create(
+            equipamento=equip, titulo='Troca de óleo', modo='HORA',
+            periodicidade_valor=100, leitura_base=Decimal('10'),
+        )
+        return equip
+
+
+class MetricasFrotaTest(MetricasFrotaTestBase):
+
+    def test_metricas_de_um_equipamento(self):
+        equip = self.criar_equipamento('EQ-001')
+        frota = MetricasFrota(
+            Equipamento.objects.filter(ativo=True), self.hoje - timedelta(days=30), self.hoje
+        )
+
+        df = frota.disponibilidade()
+        self.assertEqual(df['total_horas_manutencao'], 16)  # 2 dias * 8h
+        self.assertEqual(df['detalhes'][0]['equipamento_id'], equip.id)
+
+        consumo = frota.consumo()
+        self.assertEqual(consumo['equipamentos_analisados'], 1)
+        self.assertEqual(consumo['detalhes'][0]['diferenca_leitura'], 20.0)
+        self.assertEqual(consumo['detalhes'][0]['consumo_medio'], 4.5)  # 90L / 20h
+
+        cph = frota.cph()
+        self.assertEqual(cph['detalhes'][0]['custo_total'], 1240.0)
+        self.assertEqual(cph['detalhes'][0]['horas_trabalhadas'], 20.0)
+
+        utilizacao = frota.utilizacao()
+        self.assertEqual(utilizacao['operando'], 1)
+        self.assertEqual(utilizacao['parados'], 0)
+
+        alertas = frota.alertas()
+        self.assertEqual(len(alertas), 1)
+        self.assertEqual(alertas[0]['prioridade'], 'CRITICO')
+
+    def test_totais(self):
+        self.criar_equipamento('EQ-001')
+        self.criar_equipamento('EQ-002')
+        frota = MetricasFrota(
+            Equipamento.objects.filter(ativo=True), self.hoje - timedelta(days=30), self.hoje
+        )
+        self.assertEqual(frota.totais_combustivel(), {'litros': Decimal('180'), 'valor': Decimal('1080')})
+        self.assertEqual(frota.totais_os()['total'], Decimal('1400'))
+
+    def test_indicadores_por_equipamento(self):
+        equip = self.criar_equipamento('EQ-001')
+        frota = MetricasFrota(
+            Equipamento.objects.filter(ativo=True), self.hoje - timedelta(days=30), self.hoje
+        )
+        linha, = frota.indicadores_por_equipamento()
+
+        self.assertEqual(linha['codigo'], equip.codigo)
+        self.assertTrue(linha['em_atividade'])
+        self.assertEqual(linha['horas_manutencao'], 16)
+        self.assertEqual(linha['disponibilidade_percent'], frota.disponibilidade()['media_percent'])
+        self.assertEqual(linha['consumo_medio'], Decimal('4.5'))
+        self.assertEqual((linha['custo_total'], linha['horas_trabalhadas']), (Decimal('1240'), Decimal('20')))
+        self.assertEqual(linha['cph'], Decimal('62'))
+
+    def test_exportar_csv(self):
+        self.criar_equipamento('EQ-001')
+        self.criar_equipamento('EQ-002')
+        client = APIClient()
+        client.force_authenticate(self.admin)
+
+        response = client.get(reverse('metricas-exportar'), {'formato': 'csv'})
+        self.assertEqual(response.status_code, 200)
+        linhas = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual([linha.split(';')[0] for linha in linhas], ['\ufeffCódigo', 'EQ-001', 'EQ-002'])
+        self.assertEqual(linhas[1].split(';')[-1], '62,00')
+
+
+@override_settings(METRICAS_CACHE_ENABLED=False)
+class DashboardMetricasQueryCountTest(MetricasFrotaTestBase):
+    """O número de queries do dashboard não pode crescer com o tamanho da frota."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def contar_queries(self, url_name):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse(url_name))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_query_count_constante(self):
+        for url_name in ('metricas-dashboard', 'metricas-exportar'):
+            with self.subTest(url_name=url_name):
+                self.criar_equipamento(f'{url_name}-A')
+                poucos = self.contar_queries(url_name)
+
+                for i in range(5):
+                    self.criar_equipamento(f'{url_name}-B{i}')
+                muitos = self.contar_queries(url_name)
+
+                self.assertEqual(poucos, muitos)
+
+
+class MetricaDiariaEquipamentoTest(MetricasFrotaTestBase):
+    """A consolidação diária é mantida pelos signals e reconstruída pelo backfill."""
+
+    def test_signals_mantem_consolidacao(self):
+        equip = self.criar_equipamento('EQ-001')
+        linhas = MetricaDiariaEquipamento.objects.filter(equipamento=equip)
+
+        abast = linhas.get(data=self.hoje - timedelta(days=5))
+        self.assertEqual(abast.abastecimentos, 1)
+        self.assertEqual(abast.litros, Decimal('50'))
+        self.assertEqual(linhas.get(data=self.hoje - timedelta(days=2)).custo_os, Decimal('700'))
+        # OS de hoje-4 a hoje-2: 2 dias parados
+        self.assertEqual(sum(linhas.values_list('horas_manutencao', flat=True)), 16)
+
+        Abastecimento.objects.filter(equipamento=equip).first().delete()
+        self.assertEqual(sum(linhas.values_list('abastecimentos', flat=True)), 1)
+
+    def test_consolidado_igual_aos_dados_brutos(self):
+        for i in range(3):
+            self.criar_equipamento(f'EQ-{i:03d}')
+        args = (Equipamento.objects.filter(ativo=True), self.hoje - timedelta(days=30), self.hoje)
+        bruto, consolidado = MetricasFrota(*args), MetricasFrotaConsolidada(*args)
+
+        for metrica in ('disponibilidade', 'consumo', 'utilizacao', 'cph'):
+            with self.subTest(metrica=metrica):
+                self.assertEqual(getattr(bruto, metrica)(), getattr(consolidado, metrica)())
+
+    def test_backfill_reconstroi_periodo(self):
+        equip = self.criar_equipamento('EQ-001')
+        esperado = list(MetricaDiariaEquipamento.objects.filter(equipamento=equip).values(
+            'data', 'abastecimentos', 'litros', 'medicoes', 'horas_manutencao', 'custo_os'
+        ))
+        MetricaDiariaEquipamento.objects.all().delete()
+
+        call_command(
+            'recalcular_metricas_diarias',
+            inicio=str(self.hoje - timedelta(days=365)), fim=str(self.hoje),
+            stdout=StringIO(),
+        )
+
+        self.assertEqual(esperado, list(MetricaDiariaEquipamento.objects.filter(equipamento=equip).values(
+            'data', 'abastecimentos', 'litros', 'medicoes', 'horas_manutencao', 'custo_os'
+        )))
+
+    def test_migracao_preenche_consolidacao_existente(self):
+        equip = self.criar_equipamento('EQ-001')
+        Abastecimento.objects.create(
+            equipamento=equip, data=self.hoje - timedelta(days=400), horimetro_km=Decimal('130'),
+            quantidade_litros=Decimal('10'), valor_total=Decimal('60'),
+        )
+        campos = ('equipamento_id', 'data', 'abastecimentos', 'litros', 'horas_manutencao', 'custo_os')
+        esperado = list(MetricaDiariaEquipamento.objects.values(*campos))
+        MetricaDiariaEquipamento.objects.all().delete()
+
+        migracao = import_module('relatorios.migrations.0003_backfill_metricas_diarias')
+        migracao.preencher_metricas(apps, None)
+
+        self.assertEqual(list(MetricaDiariaEquipamento.objects.values(*campos)), esperado)
+        self.assertTrue(MetricaDiariaEquipamento.objects.filter(data=self.hoje - timedelta(days=400)).exists())
+
+
+@override_settings(METRICAS_CACHE_ENABLED=False)
+class RelatorioJobTest(MetricasFrotaTestBase):
+    """Relatórios em background: pedido, deduplicação, worker, download e expiração."""
+
+    url = '/api/v1/relatorios/jobs/'
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        configuracao = override_settings(MEDIA_ROOT=media)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def solicitar(self, **parametros):
+        return self.client.post(self.url, {'tipo': 'METRICAS_DASHBOARD', 'parametros': parametros}, format='json')
+
+    def test_fluxo_completo_com_deduplicacao(self):
+        self.criar_equipamento('EQ-001')
+        filtros = {'data_inicio': str(self.hoje - timedelta(days=30)), 'data_fim': str(self.hoje)}
+
+        pedido = self.solicitar(**filtros)
+        self.assertEqual(pedido.status_code, 202)
+        job_id = pedido.json()['id']
+        self.assertEqual(self.solicitar(**filtros, ignorado='x').json()['id'], job_id)
+        self.assertEqual(self.client.get(f'{self.url}{job_id}/resultado/').status_code, 409)
+
+        self.assertEqual(processar_pendentes(), {'CONCLUIDO': 1})
+
+        status = self.client.get(f'{self.url}{job_id}/').json()
+        self.assertEqual(status['status'], 'CONCLUIDO')
+        resultado = self.client.get(status['resultado_url'])
+        self.assertEqual(resultado.status_code, 200)
+        sincrono = self.client.get(reverse('metricas-dashboard'), filtros).json()
+        self.assertEqual(json.loads(b''.join(resultado.streaming_content)), sincrono)
+
+        # Dentro do TTL o mesmo resultado é reaproveitado
+        repetido = self.solicitar(**filtros)
+        self.assertEqual((repetido.status_code, repetido.json()['id']), (200, job_id))
+        self.assertNotEqual(self.solicitar(data_inicio=str(self.hoje)).json()['id'], job_id)
+
+    def test_resultado_expirado_e_removido(self):
+        self.solicitar()
+        processar_pendentes()
+        job = RelatorioJob.objects.get()
+        arquivo = job.arquivo.path
+        RelatorioJob.objects.filter(pk=job.pk).update(expira_em=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(self.client.get(f'{self.url}{job.pk}/resultado/').status_code, 410)
+        self.assertEqual(limpar_expirados(), 1)
+        self.assertFalse(RelatorioJob.objects.exists())
+        self.assertFalse(default_storage.exists(arquivo))
+        self.assertEqual(self.solicitar().status_code, 202)
+
+    def test_jobs_visiveis_apenas_no_mesmo_escopo(self):
+        job_id = self.solicitar().json()['id']
+        outro = User.objects.get(cliente_profile=self.cliente)  # criado com o cliente (role CLIENTE)
+        cliente = APIClient()
+        cliente.force_authenticate(outro)
+        self.assertEqual(cliente.get(f'{self.url}{job_id}/').status_code, 404)
+        self.assertEqual(cliente.get(self.url).json()['count'], 0)
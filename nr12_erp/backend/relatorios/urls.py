@@ -1,5 +1,7 @@
 from django.urls import path
-from .views import relatorio_operacional
+from rest_framework.routers import DefaultRouter
+
+from .views import RelatorioJobViewSet, relatorio_operacional
 from .metricas import (
     dashboard_metricas,
     disponibilidade_fisica,
@@ -10,6 +12,9 @@ from .metricas import (
     exportar_relatorio,
 )
 
+router = DefaultRouter()
+router.register(r'jobs', RelatorioJobViewSet, basename='relatorio-job')
+
 urlpatterns = [
     path('operacional/', relatorio_operacional, name='relatorio-operacional'),
 
@@ -22,3 +27,5 @@ urlpatterns = [
     path('metricas/alertas-manutencao/', alertas_manutencao, name='metricas-alertas'),
     path('metricas/exportar/', exportar_relatorio, name='metricas-exportar'),
 ]
+
+urlpatterns += router.urls
@@ -1,7 +1,9 @@
-from rest_framework.decorators import api_view, permission_classes as perm_classes
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action, api_view, permission_classes as perm_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.db.models import Sum, Count, Q, Avg
+from django.http import FileResponse
 from django.utils import timezone
 from datetime import datetime, timedelta
 
@@ -9,8 +11,13 @@ from ordens_servico.models import OrdemServico
 from manutencao.models import Manutencao
 from equipamentos.models import Equipamento
 from orcamentos.models import Orcamento
+from core.cache import escopo_usuario
 from core.permissions import get_user_role_safe
 
+from .jobs import solicitar_relatorio
+from .models import RelatorioJob
+from .serializers import RelatorioJobSerializer
+
 
 @api_view(['GET'])
 @perm_classes([IsAuthenticated])
@@ -236,3 +243,41 @@ def relatorio_operacional(request):
             'manutencoes': list(manutencoes_recentes)
         }
     })
+
+
+class RelatorioJobViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                          mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Relatórios pesados em background (relatorios/jobs.py).
+
+    POST {tipo, parametros} -> 202 com o id do job (200 se um resultado
+    idêntico ainda válido foi reaproveitado); GET /<id>/ acompanha o status e
+    GET /<id>/resultado/ baixa o JSON. Cada usuário vê os jobs do seu escopo.
+    """
+    serializer_class = RelatorioJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        escopo, _ = escopo_usuario(self.request.user)
+        return RelatorioJob.objects.filter(escopo=escopo)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job, _ = solicitar_relatorio(
+            serializer.validated_data['tipo'], serializer.validated_data['parametros'], request.user
+        )
+        codigo = status.HTTP_200_OK if job.status == 'CONCLUIDO' else status.HTTP_202_ACCEPTED
+        return Response(self.get_serializer(job).data, status=codigo)
+
+    @action(detail=True, methods=['get'])
+    def resultado(self, request, pk=None):
+        job = self.get_object()
+        if job.status != 'CONCLUIDO':
+            return Response(
+                {'detail': 'Relatório ainda não disponível', 'status': job.status, 'erro': job.erro},
+                status=status.HTTP_409_CONFLICT
+            )
+        if job.expira_em <= timezone.now() or not job.arquivo:
+            return Response({'detail': 'Resultado expirado, solicite novamente'}, status=status.HTTP_410_GONE)
+        return FileResponse(job.arquivo.open('rb'), content_type='application/json')